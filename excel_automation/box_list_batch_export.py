@@ -0,0 +1,294 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+import logging
+
+from openpyxl import Workbook
+from openpyxl.styles import Font
+
+from excel_automation.box_list_export_config import BoxListExportConfig
+from excel_automation.box_list_export_manager import BoxListExportManager, BoxListExportResult
+from excel_automation.box_list_offline_export import (
+    BOX_LIST_SUFFIX,
+    OUTPUT_MODES,
+    OUTPUT_SHEET,
+    OUTPUT_TEXT,
+    OUTPUT_XLSX,
+    OfflineBoxListExporter,
+    box_list_copy_path,
+    load_source_workbook,
+    load_workbook_data,
+    unique_sheet_name
+)
+from excel_automation.bulk_edit import set_screen_updating
+from excel_automation.sheet_layout_profile import get_layout_profile
+from excel_automation.sheet_snapshot import SheetSnapshot
+from excel_automation.utils import convert_column_letter_to_index
+
+logger = logging.getLogger(__name__)
+
+
+EXCEL_FILE_PATTERNS = ("*.xlsx", "*.xlsm")
+DEFAULT_OUTPUT_NAME = "box_lists"
+SUMMARY_SHEET_NAME = "Tổng hợp"
+
+
+@dataclass
+class BatchExportEntry:
+    source: str
+    sheet_name: str
+    result: BoxListExportResult
+    po_number: str = ""
+    items_per_box: Optional[int] = None
+    output_sheet: str = ""
+    path: Optional[Path] = None
+
+    @property
+    def success(self) -> bool:
+        return self.result.success
+
+    @property
+    def filename(self) -> str:
+        return Path(self.source).stem
+
+
+@dataclass
+class BatchExportReport:
+    entries: List[BatchExportEntry] = field(default_factory=list)
+    output_paths: List[Path] = field(default_factory=list)
+
+    @property
+    def succeeded(self) -> List[BatchExportEntry]:
+        return [entry for entry in self.entries if entry.success]
+
+    @property
+    def failed(self) -> List[BatchExportEntry]:
+        return [entry for entry in self.entries if not entry.success]
+
+    @property
+    def total_boxes(self) -> int:
+        return sum(entry.result.total_boxes for entry in self.succeeded)
+
+    def get_summary(self) -> str:
+        summary = (
+            f"Đã xuất {len(self.succeeded)}/{len(self.entries)} sheet, "
+            f"tổng {self.total_boxes} thùng"
+        )
+        if self.failed:
+            summary = f"{summary}, {len(self.failed)} sheet lỗi"
+        return summary
+
+    def to_lines(self) -> List[str]:
+        lines = [self.get_summary(), ""]
+        for entry in self.entries:
+            target = f" → {entry.output_sheet}" if entry.output_sheet else ""
+            lines.append(f"{entry.source} / {entry.sheet_name}{target}: {entry.result.get_summary()}")
+        return lines
+
+    def to_text(self) -> str:
+        return "\n".join(self.to_lines())
+
+
+class BoxListBatchExporter:
+    """
+    Xuất box list cho mọi sheet packing list của workbook đang mở, hoặc mọi file trong thư mục.
+
+    Mỗi sheet chỉ đọc một snapshot; toàn bộ box list được dựng trong bộ nhớ rồi ghi một lượt,
+    kèm báo cáo tổng hợp (BatchExportReport).
+    """
+
+    def __init__(self, config: Optional[BoxListExportConfig] = None):
+        self.config = config or BoxListExportConfig()
+        self.manager = BoxListExportManager(self.config)
+        self.offline = OfflineBoxListExporter(self.config)
+
+    def build_workbook(self, workbook: Any) -> List[BatchExportEntry]:
+        """Dựng box list cho các sheet giống template của workbook COM; sheet khác bị bỏ qua."""
+        source = str(workbook.Name)
+        filename = self.manager.get_filename(workbook)
+        size_col = convert_column_letter_to_index(self.config.get_size_column())
+        po_col = convert_column_letter_to_index(self.config.get_po_cell_column())
+        entries: List[BatchExportEntry] = []
+
+        for sheet in workbook.Worksheets:
+            sheet_name = str(sheet.Name)
+            try:
+                profile = get_layout_profile(sheet)
+                if not profile.matches_template:
+                    logger.debug(f"Bỏ qua sheet '{sheet_name}': không giống template packing list")
+                    continue
+
+                snapshot = SheetSnapshot.capture(
+                    sheet,
+                    size_column=size_col,
+                    data_start_row=self.config.get_size_data_start_row(),
+                    end_row=self.config.get_size_data_end_row()
+                )
+                result = self.manager.build_from_values(
+                    snapshot.value, snapshot.column_count, filename, profile.items_per_box
+                )
+                po_number = self.manager.format_po_number(
+                    snapshot.value(self.config.get_po_cell_row(), po_col)
+                )
+            except Exception as e:
+                logger.error(f"Lỗi khi đọc sheet '{sheet_name}': {e}", exc_info=True)
+                entries.append(BatchExportEntry(
+                    source, sheet_name, BoxListExportResult(success=False, error_message=str(e))
+                ))
+                continue
+
+            entries.append(BatchExportEntry(source, sheet_name, result, po_number, profile.items_per_box))
+
+        return entries
+
+    def write_workbook(self, workbook: Any, entries: List[BatchExportEntry]) -> None:
+        """Thêm một sheet box list cho mỗi entry thành công; danh sách tên sheet chỉ đọc một lần."""
+        existing = {str(sheet.Name) for sheet in workbook.Worksheets}
+
+        for entry in entries:
+            if not entry.success:
+                continue
+
+            name = unique_sheet_name(existing, self.manager.build_sheet_name(entry.filename, entry.po_number))
+            try:
+                new_sheet = workbook.Worksheets.Add()
+                new_sheet.Name = name
+                existing.add(name)
+                if not self.manager.paste_and_format_to_excel(
+                    workbook, None, entry.result.box_ranges, new_sheet,
+                    items_per_box=entry.items_per_box, header=entry.result.header
+                ):
+                    raise RuntimeError("Không thể ghi dữ liệu vào sheet mới")
+                entry.output_sheet = name
+            except Exception as e:
+                logger.error(f"Lỗi khi ghi box list của sheet '{entry.sheet_name}': {e}", exc_info=True)
+                entry.result = BoxListExportResult(success=False, error_message=str(e))
+
+    def export_workbook(self, excel_app: Any, workbook: Any) -> BatchExportReport:
+        report = BatchExportReport(self.build_workbook(workbook))
+        logger.info(f"Đã dựng box list cho {len(report.succeeded)}/{len(report.entries)} sheet")
+
+        try:
+            set_screen_updating(excel_app, False)
+            self.write_workbook(workbook, report.entries)
+        finally:
+            set_screen_updating(excel_app, True)
+
+        logger.info(f"Xuất box list cả workbook: {report.get_summary()}")
+        return report
+
+    def list_files(self, folder: Union[str, Path], exclude: Optional[List[Path]] = None) -> List[Path]:
+        folder = Path(folder)
+        excluded = {path.resolve() for path in exclude or []}
+        files = set()
+        for pattern in EXCEL_FILE_PATTERNS:
+            for path in folder.glob(pattern):
+                if path.name.startswith("~$") or path.stem.endswith(BOX_LIST_SUFFIX):
+                    continue
+                if path.resolve() in excluded:
+                    continue
+                files.add(path)
+        return sorted(files)
+
+    def build_folder(self, folder: Union[str, Path],
+                     exclude: Optional[List[Path]] = None) -> List[BatchExportEntry]:
+        """Đọc offline (không mở Excel) mọi sheet packing list của các file trong thư mục."""
+        entries: List[BatchExportEntry] = []
+
+        for path in self.list_files(folder, exclude):
+            try:
+                sheets = load_workbook_data(path, config=self.config)
+            except Exception as e:
+                logger.error(f"Không đọc được file {path.name}: {e}", exc_info=True)
+                entries.append(BatchExportEntry(
+                    path.name, "", BoxListExportResult(success=False, error_message=str(e)), path=path
+                ))
+                continue
+
+            for data in sheets:
+                entries.append(BatchExportEntry(
+                    path.name, data.sheet_name, self.offline.build(data),
+                    self.offline.po_number(data), data.items_per_box, path=path
+                ))
+
+        return entries
+
+    def export_folder(self, folder: Union[str, Path], output: str = OUTPUT_XLSX,
+                      output_path: Optional[Union[str, Path]] = None) -> BatchExportReport:
+        """
+        Xuất box list cho cả thư mục.
+
+        "xlsx": một file gộp (mặc định <thư mục>/box_lists.xlsx) có sheet "Tổng hợp";
+        "text": một file .txt gộp có báo cáo ở đầu; "sheet": bản sao <tên>_box_list<đuôi> của từng
+        file nguồn kèm sheet box list (file nguồn không bị ghi lại, .xlsm giữ macro).
+        """
+        if output not in OUTPUT_MODES:
+            raise ValueError(f"Kiểu xuất không hợp lệ: {output}")
+
+        folder = Path(folder)
+        if output_path is None and output != OUTPUT_SHEET:
+            suffix = ".txt" if output == OUTPUT_TEXT else ".xlsx"
+            output_path = folder / f"{DEFAULT_OUTPUT_NAME}{suffix}"
+        output_path = Path(output_path) if output_path else None
+
+        report = BatchExportReport(self.build_folder(folder, [output_path] if output_path else None))
+        logger.info(f"Đã dựng box list cho {len(report.succeeded)}/{len(report.entries)} sheet trong {folder}")
+
+        if output == OUTPUT_XLSX:
+            self._write_combined_workbook(report, output_path)
+        elif output == OUTPUT_TEXT:
+            self._write_combined_text(report, output_path)
+        else:
+            self._write_source_copies(report)
+
+        logger.info(f"Xuất box list cả thư mục: {report.get_summary()}")
+        return report
+
+    def _write_combined_workbook(self, report: BatchExportReport, output_path: Path) -> None:
+        wb = Workbook()
+        summary_sheet = wb.active
+        summary_sheet.title = SUMMARY_SHEET_NAME
+        existing = {SUMMARY_SHEET_NAME}
+
+        for entry in report.succeeded:
+            name = unique_sheet_name(existing, self.manager.build_sheet_name(entry.filename, entry.po_number))
+            existing.add(name)
+            self.offline.write_sheet(wb.create_sheet(name), entry.result)
+            entry.output_sheet = name
+
+        for row, line in enumerate(report.to_lines(), start=1):
+            summary_sheet.cell(row, 1, line)
+        summary_sheet.cell(1, 1).font = Font(bold=True)
+
+        wb.save(str(output_path))
+        report.output_paths.append(output_path)
+
+    def _write_combined_text(self, report: BatchExportReport, output_path: Path) -> None:
+        parts = [report.to_text()]
+        for entry in report.succeeded:
+            parts.append(f"===== {entry.source} / {entry.sheet_name} =====\n{entry.result.text}")
+        output_path.write_text("\n\n".join(parts), encoding="utf-8")
+        report.output_paths.append(output_path)
+
+    def _write_source_copies(self, report: BatchExportReport) -> None:
+        by_path: Dict[Path, List[BatchExportEntry]] = {}
+        for entry in report.succeeded:
+            by_path.setdefault(entry.path, []).append(entry)
+
+        for path, entries in by_path.items():
+            try:
+                target = box_list_copy_path(path)
+                wb = load_source_workbook(path)
+                existing = set(wb.sheetnames)
+                for entry in entries:
+                    name = unique_sheet_name(existing, self.manager.build_sheet_name(entry.filename, entry.po_number))
+                    existing.add(name)
+                    self.offline.write_sheet(wb.create_sheet(name, 0), entry.result)
+                    entry.output_sheet = name
+                wb.save(str(target))
+                report.output_paths.append(target)
+            except Exception as e:
+                logger.error(f"Lỗi khi ghi bản sao box list của {path.name}: {e}", exc_info=True)
+                for entry in entries:
+                    entry.output_sheet = ""
+                    entry.result = BoxListExportResult(success=False, error_message=str(e))
@@ -8,6 +8,9 @@ from excel_automation.path_helper import get_config_path
 logger = logging.getLogger(__name__)
 
 
+OUTPUT_STYLES = ("expanded", "collapsed")
+
+
 class BoxListExportConfig:
 
     DEFAULT_CONFIG = {
@@ -23,7 +26,8 @@ class BoxListExportConfig:
             "po_cell_row": 19,
             "po_cell_column": "A",
             "max_rows_per_column": 45,
-            "header_rows": 2
+            "header_rows": 2,
+            "output_style": "expanded"
         }
     }
 
@@ -99,3 +103,8 @@ class BoxListExportConfig:
     def get_header_rows(self) -> int:
         return self.config['box_list_export_config'].get('header_rows', 2)
 
+    def get_output_style(self) -> str:
+        """Kiểu xuất: "expanded" mỗi số thùng một dòng, "collapsed" một dòng mỗi khoảng ("SIZE 38: 1-120")."""
+        style = self.config['box_list_export_config'].get('output_style', 'expanded')
+        return style if style in OUTPUT_STYLES else 'expanded'
+
@@ -1,11 +1,23 @@
 from dataclasses import dataclass, field
-from typing import List, Dict, Tuple, Optional
-from win32com.client import CDispatch
-import win32clipboard
+from typing import Any, Callable, Iterable, Iterator, List, Dict, Tuple, Optional
 import logging
 
+try:
+    from win32com.client import CDispatch
+except ImportError:
+    CDispatch = Any
+
 from excel_automation.box_list_export_config import BoxListExportConfig
-from excel_automation.utils import get_size_sort_key, normalize_size_value
+from excel_automation.utils import (
+    get_size_sort_key,
+    normalize_size_value,
+    normalize_range_values,
+    convert_index_to_column_letter,
+    group_consecutive_rows,
+    build_address_batches
+)
+from excel_automation.bulk_edit import set_screen_updating
+from excel_automation.sheet_layout_profile import get_layout_profile
 
 logger = logging.getLogger(__name__)
 
@@ -54,8 +66,20 @@ class BoxRange:
         except (ValueError, TypeError):
             return size
 
+    @property
+    def box_count(self) -> int:
+        return max(0, self.box_end - self.box_start + 1)
+
+    def iter_box_numbers(self) -> Iterator[int]:
+        return iter(range(self.box_start, self.box_end + 1))
+
     def get_box_numbers(self) -> List[int]:
-        return list(range(self.box_start, self.box_end + 1))
+        return list(self.iter_box_numbers())
+
+    def get_interval_label(self) -> str:
+        if self.box_start == self.box_end:
+            return str(self.box_start)
+        return f"{self.box_start}-{self.box_end}"
 
 
 @dataclass
@@ -87,6 +111,9 @@ class BoxListExportResult:
 
 
 class BoxListExportManager:
+
+    QUANTITY_START_COLUMN = 7
+    MIN_SCAN_COLUMN = 38
     
     def __init__(self, config: BoxListExportConfig):
         self.config = config
@@ -101,12 +128,8 @@ class BoxListExportManager:
         size_column = self.config.get_size_column()
         size_data_start_row = self.config.get_size_data_start_row()
 
-        size_column_number = self._column_letter_to_number(size_column)
-
         try:
-            used_range = worksheet.UsedRange
-            max_column = used_range.Column + used_range.Columns.Count - 1
-            scan_end_column = max(39, max_column + 1)
+            scan_end_column = max(39, get_layout_profile(worksheet).last_column + 1)
         except Exception:
             scan_end_column = 39
 
@@ -117,43 +140,60 @@ class BoxListExportManager:
         except Exception:
             raw_size_values = None
 
-        size_to_row: Dict[str, int] = {}
-        if raw_size_values is not None:
-            if not isinstance(raw_size_values, tuple):
-                raw_size_values = ((raw_size_values,),)
-            for row_offset, row_tuple in enumerate(raw_size_values):
-                cell_value = row_tuple[0] if isinstance(row_tuple, tuple) else row_tuple
-                if cell_value is not None and str(cell_value).strip() != "":
-                    size_str = normalize_size_value(cell_value)
-                    if size_str:
-                        size_to_row[size_str] = size_data_start_row + row_offset
-
-        start_col = 7
+        size_to_row = self.map_size_rows(raw_size_values)
+
+        start_col = self.QUANTITY_START_COLUMN
         end_col = scan_end_column - 1
 
-        try:
-            box_start_values_raw = worksheet.Range(
-                worksheet.Cells(box_start_row, start_col),
-                worksheet.Cells(box_start_row, end_col)
-            ).Value
-        except Exception:
-            box_start_values_raw = None
+        selected_rows = [size_to_row[size] for size in selected_sizes if size in size_to_row]
+        top_row = min([box_start_row, box_end_row] + selected_rows)
+        bottom_row = max([box_start_row, box_end_row] + selected_rows)
 
         try:
-            box_end_values_raw = worksheet.Range(
-                worksheet.Cells(box_end_row, start_col),
-                worksheet.Cells(box_end_row, end_col)
-            ).Value
-        except Exception:
-            box_end_values_raw = None
+            block = normalize_range_values(worksheet.Range(
+                f"{convert_index_to_column_letter(start_col)}{top_row}:"
+                f"{convert_index_to_column_letter(end_col)}{bottom_row}"
+            ).Value)
+        except Exception as e:
+            logger.error(f"Không đọc được vùng số lượng {top_row}-{bottom_row}: {e}")
+            block = ()
 
-        if box_start_values_raw is not None and not isinstance(box_start_values_raw, tuple):
-            box_start_values_raw = ((box_start_values_raw,),)
-        if box_end_values_raw is not None and not isinstance(box_end_values_raw, tuple):
-            box_end_values_raw = ((box_end_values_raw,),)
+        def block_row(row: int) -> Tuple[Any, ...]:
+            offset = row - top_row
+            return block[offset] if 0 <= offset < len(block) else ()
 
-        box_start_values = box_start_values_raw[0] if box_start_values_raw else ()
-        box_end_values = box_end_values_raw[0] if box_end_values_raw else ()
+        return self.parse_box_ranges(selected_sizes, size_to_row, block_row)
+
+    def map_size_rows(self, raw_size_values: Any) -> Dict[str, int]:
+        """Giá trị cột size (từ dòng size_data_start_row) → {size đã chuẩn hóa: số dòng}."""
+        size_data_start_row = self.config.get_size_data_start_row()
+        size_to_row: Dict[str, int] = {}
+        if raw_size_values is None:
+            return size_to_row
+
+        for row_offset, row_tuple in enumerate(normalize_range_values(raw_size_values)):
+            cell_value = row_tuple[0] if row_tuple else None
+            if cell_value is not None and str(cell_value).strip() != "":
+                size_str = normalize_size_value(cell_value)
+                if size_str:
+                    size_to_row[size_str] = size_data_start_row + row_offset
+        return size_to_row
+
+    def parse_box_ranges(
+        self,
+        selected_sizes: List[str],
+        size_to_row: Dict[str, int],
+        row_values: Callable[[int], Tuple[Any, ...]]
+    ) -> Dict[str, List[Tuple[int, int, int, int]]]:
+        """
+        Tách (box_start, box_end, cột, số lượng) của từng size từ các dòng đã đọc.
+
+        `row_values(row)` trả về giá trị của dòng đó tính từ cột G (QUANTITY_START_COLUMN).
+        """
+        start_col = self.QUANTITY_START_COLUMN
+        box_start_values = row_values(self.config.get_box_start_row())
+        box_end_values = row_values(self.config.get_box_end_row())
+        size_column = self.config.get_size_column()
 
         box_ranges: Dict[str, List[Tuple[int, int, int, int]]] = {}
 
@@ -163,21 +203,7 @@ class BoxListExportManager:
                 box_ranges[size] = []
                 continue
 
-            size_row = size_to_row[size]
-
-            try:
-                size_row_values_raw = worksheet.Range(
-                    worksheet.Cells(size_row, start_col),
-                    worksheet.Cells(size_row, end_col)
-                ).Value
-            except Exception:
-                box_ranges[size] = []
-                continue
-
-            if size_row_values_raw is not None and not isinstance(size_row_values_raw, tuple):
-                size_row_values_raw = ((size_row_values_raw,),)
-
-            size_row_values = size_row_values_raw[0] if size_row_values_raw else ()
+            size_row_values = row_values(size_to_row[size])
 
             size_box_ranges: List[Tuple[int, int, int, int]] = []
 
@@ -287,34 +313,42 @@ class BoxListExportManager:
             po_col = self.config.get_po_cell_column()
             col_num = self._column_letter_to_number(po_col)
 
-            cell_value = worksheet.Cells(po_row, col_num).Value
-            if cell_value is not None:
-                value_str = str(cell_value)
-                if value_str.endswith('.0'):
-                    return value_str[:-2]
-                return value_str
-            return ""
+            return self.format_po_number(worksheet.Cells(po_row, col_num).Value)
         except Exception as e:
             logger.warning(f"Không thể đọc PO number: {e}")
             return ""
 
+    @staticmethod
+    def format_po_number(cell_value: Any) -> str:
+        if cell_value is None:
+            return ""
+        value_str = str(cell_value)
+        if value_str.endswith('.0'):
+            return value_str[:-2]
+        return value_str
+
     def generate_header(
         self,
         workbook: CDispatch,
         worksheet: CDispatch,
         items_per_box: Optional[int] = None
     ) -> str:
-        filename = self.get_filename(workbook)
-        po_number = self.get_po_number(worksheet)
+        return self.build_header(
+            self.get_filename(workbook), self.get_po_number(worksheet), items_per_box
+        )
+
+    @staticmethod
+    def build_header(filename: str, po_number: str, items_per_box: Optional[int] = None) -> str:
         header = f"{filename}_PO:{po_number}"
         if items_per_box is not None:
             header = f"{header} / {items_per_box} PCS"
         return header
 
     def generate_sheet_name(self, workbook: CDispatch, worksheet: CDispatch) -> str:
-        filename = self.get_filename(workbook)
-        po_number = self.get_po_number(worksheet)
+        return self.build_sheet_name(self.get_filename(workbook), self.get_po_number(worksheet))
 
+    @staticmethod
+    def build_sheet_name(filename: str, po_number: str) -> str:
         if len(po_number) >= 4:
             po_suffix = po_number[-4:]
         else:
@@ -342,7 +376,7 @@ class BoxListExportManager:
             logger.error(f"Lỗi khi tạo sheet mới: {e}", exc_info=True)
             raise
 
-    def split_into_columns(self, lines: List[str]) -> List[List[str]]:
+    def split_into_columns(self, lines: Iterable[str]) -> List[List[str]]:
         max_rows = self.config.get_max_rows_per_column()
         header_rows = self.config.get_header_rows()
         max_content_rows = max_rows - header_rows
@@ -361,21 +395,28 @@ class BoxListExportManager:
 
         return columns
 
-    def generate_box_list_text(self, box_ranges: List[BoxRange]) -> str:
+    def iter_content_lines(self, box_ranges: Iterable[BoxRange]) -> Iterator[str]:
+        """Sinh từng dòng box list; kiểu "collapsed" gộp mỗi khoảng thành "SIZE 38: 1-120"."""
         separator = self.config.get_combined_size_separator()
-        lines = []
+        collapsed = self.config.get_output_style() == "collapsed"
 
         for box_range in box_ranges:
             size_label = box_range.get_size_label(separator)
-            lines.append(f"SIZE {size_label}")
+            if collapsed:
+                yield f"SIZE {size_label}: {box_range.get_interval_label()}"
+                continue
 
-            for box_number in box_range.get_box_numbers():
-                lines.append(str(box_number))
+            yield f"SIZE {size_label}"
+            for box_number in box_range.iter_box_numbers():
+                yield str(box_number)
 
-        return "\n".join(lines)
+    def generate_box_list_text(self, box_ranges: List[BoxRange]) -> str:
+        return "\n".join(self.iter_content_lines(box_ranges))
     
     def copy_to_clipboard(self, text: str) -> bool:
         try:
+            import win32clipboard
+
             win32clipboard.OpenClipboard()
             win32clipboard.EmptyClipboard()
             win32clipboard.SetClipboardText(text, win32clipboard.CF_UNICODETEXT)
@@ -394,22 +435,15 @@ class BoxListExportManager:
         new_sheet: CDispatch,
         start_column: str = "A",
         start_row: int = 1,
-        items_per_box: Optional[int] = None
+        items_per_box: Optional[int] = None,
+        header: Optional[str] = None
     ) -> bool:
         try:
-            header = self.generate_header(workbook, worksheet, items_per_box)
+            if header is None:
+                header = self.generate_header(workbook, worksheet, items_per_box)
             header_rows = self.config.get_header_rows()
 
-            content_lines = []
-            for box_range in box_ranges:
-                separator = self.config.get_combined_size_separator()
-                size_label = box_range.get_size_label(separator)
-                content_lines.append(f"SIZE {size_label}")
-
-                for box_number in box_range.get_box_numbers():
-                    content_lines.append(str(box_number))
-
-            columns = self.split_into_columns(content_lines)
+            columns = self.split_into_columns(self.iter_content_lines(box_ranges))
             start_col_num = self._column_letter_to_number(start_column)
 
             new_sheet.Cells(start_row, start_col_num).Value = header
@@ -424,38 +458,20 @@ class BoxListExportManager:
                 if column_lines:
                     data_array = [[line] for line in column_lines]
                     data_end_row = data_start_row + len(column_lines) - 1
-                    new_sheet.Range(
+                    data_range = new_sheet.Range(
                         new_sheet.Cells(data_start_row, col_num),
                         new_sheet.Cells(data_end_row, col_num)
-                    ).Value = data_array
+                    )
+                    data_range.Value = data_array
+                    data_range.HorizontalAlignment = -4108
+                    data_range.Font.Bold = False
 
-                    new_sheet.Range(
-                        new_sheet.Cells(data_start_row, col_num),
-                        new_sheet.Cells(data_end_row, col_num)
-                    ).HorizontalAlignment = -4108
-
-                    bold_rows = []
-                    non_bold_rows = []
-                    for line_idx, line in enumerate(column_lines):
-                        row_num = data_start_row + line_idx
-                        if line.startswith("SIZE "):
-                            bold_rows.append(row_num)
-                        else:
-                            non_bold_rows.append(row_num)
-
-                    if bold_rows:
-                        bold_range = self._build_union_range(
-                            new_sheet, bold_rows, col_num
-                        )
-                        if bold_range:
-                            bold_range.Font.Bold = True
-
-                    if non_bold_rows:
-                        non_bold_range = self._build_union_range(
-                            new_sheet, non_bold_rows, col_num
-                        )
-                        if non_bold_range:
-                            non_bold_range.Font.Bold = False
+                    bold_rows = [
+                        data_start_row + line_idx
+                        for line_idx, line in enumerate(column_lines)
+                        if line.startswith("SIZE ")
+                    ]
+                    self._set_rows_bold(new_sheet, bold_rows, col_num)
 
             logger.info(f"Đã paste và format {len(columns)} cột vào sheet mới: {new_sheet.Name}")
             return True
@@ -478,6 +494,58 @@ class BoxListExportManager:
         box_ranges_dict: Dict[str, List[Tuple[int, int, int, int]]],
         items_per_box: Optional[int] = None
     ) -> BoxListExportResult:
+        return self.build_result(
+            selected_sizes, box_ranges_dict,
+            lambda: self.generate_header(workbook, worksheet, items_per_box),
+            items_per_box
+        )
+
+    def build_from_values(
+        self,
+        value: Callable[[int, int], Any],
+        last_column: int,
+        filename: str,
+        items_per_box: Optional[int] = None,
+        selected_sizes: Optional[List[str]] = None
+    ) -> BoxListExportResult:
+        """
+        Dựng kết quả từ giá trị sheet đã đọc sẵn (snapshot COM hoặc file .xlsx), không gọi Excel.
+
+        `value(row, col)` trả về giá trị ô; không chọn size thì lấy mọi size trong cột size.
+        """
+        size_col = self._column_letter_to_number(self.config.get_size_column())
+        start_row = self.config.get_size_data_start_row()
+        end_row = self.config.get_size_data_end_row()
+        size_to_row = self.map_size_rows(
+            tuple((value(row, size_col),) for row in range(start_row, end_row + 1))
+        )
+        if selected_sizes is None:
+            selected_sizes = sorted(size_to_row, key=size_to_row.get)
+
+        start_col = self.QUANTITY_START_COLUMN
+        end_col = max(self.MIN_SCAN_COLUMN, last_column)
+        box_ranges = self.parse_box_ranges(
+            selected_sizes, size_to_row,
+            lambda row: tuple(value(row, col) for col in range(start_col, end_col + 1))
+        )
+
+        po_number = self.format_po_number(
+            value(self.config.get_po_cell_row(), self._column_letter_to_number(self.config.get_po_cell_column()))
+        )
+        return self.build_result(
+            selected_sizes, box_ranges,
+            lambda: self.build_header(filename, po_number, items_per_box),
+            items_per_box
+        )
+
+    def build_result(
+        self,
+        selected_sizes: List[str],
+        box_ranges_dict: Dict[str, List[Tuple[int, int, int, int]]],
+        header: Callable[[], str],
+        items_per_box: Optional[int] = None
+    ) -> BoxListExportResult:
+        """Gộp size, chia cột và dựng text kết quả; `header()` chỉ được gọi khi có dữ liệu hợp lệ."""
         valid_count = sum(
             1 for size_ranges in box_ranges_dict.values()
             if len(size_ranges) > 0
@@ -500,36 +568,27 @@ class BoxListExportManager:
             f"{partial_count} thùng lẻ)"
         )
 
-        header = self.generate_header(workbook, worksheet, items_per_box)
-
-        content_lines = []
-        for box_range in box_ranges:
-            separator = self.config.get_combined_size_separator()
-            size_label = box_range.get_size_label(separator)
-            content_lines.append(f"SIZE {size_label}")
-            for box_number in box_range.get_box_numbers():
-                content_lines.append(str(box_number))
-
-        columns = self.split_into_columns(content_lines)
+        header_text = header()
+        columns = self.split_into_columns(self.iter_content_lines(box_ranges))
         total_columns = len(columns)
 
         text_parts = []
         for col_idx, column_lines in enumerate(columns):
-            text_parts.append(header)
+            text_parts.append(header_text)
             text_parts.append("")
             text_parts.extend(column_lines)
             if col_idx < len(columns) - 1:
                 text_parts.append("")
 
         text = "\n".join(text_parts)
-        total_boxes = sum(len(br.get_box_numbers()) for br in box_ranges)
+        total_boxes = sum(br.box_count for br in box_ranges)
 
         return BoxListExportResult(
             success=True,
             text=text,
             box_ranges=box_ranges,
             total_boxes=total_boxes,
-            header=header,
+            header=header_text,
             total_columns=total_columns
         )
 
@@ -544,7 +603,7 @@ class BoxListExportManager:
         logger.info(f"Bắt đầu xuất danh sách thùng cho {len(selected_sizes)} sizes")
 
         try:
-            excel_app.ScreenUpdating = False
+            set_screen_updating(excel_app, False)
 
             box_ranges_dict = self.step_read_box_ranges(worksheet, selected_sizes)
 
@@ -567,33 +626,28 @@ class BoxListExportManager:
             logger.error(error_msg, exc_info=True)
             return BoxListExportResult(success=False, error_message=error_msg)
         finally:
-            excel_app.ScreenUpdating = True
+            set_screen_updating(excel_app, True)
     
-    def _build_union_range(
-        self,
-        sheet: CDispatch,
-        rows: List[int],
-        col_num: int
-    ) -> Optional[CDispatch]:
+    def _set_rows_bold(self, sheet: CDispatch, rows: List[int], col_num: int) -> None:
+        """In đậm các dòng của một cột bằng địa chỉ multi-area ("A3,A9:A12,..."), mỗi chuỗi một lần gọi Range."""
         if not rows:
-            return None
+            return
 
-        try:
-            excel_app = sheet.Application
-            result_range = sheet.Cells(rows[0], col_num)
-
-            batch_size = 30
-            for i in range(1, len(rows), batch_size):
-                batch = rows[i:i + batch_size]
-                for row in batch:
-                    result_range = excel_app.Union(
-                        result_range, sheet.Cells(row, col_num)
-                    )
+        col_letter = convert_index_to_column_letter(col_num)
+        runs = {
+            (f"{col_letter}{start}" if start == end else f"{col_letter}{start}:{col_letter}{end}"): (start, end)
+            for start, end in group_consecutive_rows(rows)
+        }
 
-            return result_range
-        except Exception as e:
-            logger.warning(f"Không thể tạo union range, fallback từng cell: {e}")
-            return None
+        for address in build_address_batches(runs):
+            try:
+                sheet.Range(address).Font.Bold = True
+            except Exception as e:
+                logger.warning(f"Không in đậm được vùng {address}, fallback từng cell: {e}")
+                for area in address.split(","):
+                    start, end = runs[area]
+                    for row in range(start, end + 1):
+                        sheet.Cells(row, col_num).Font.Bold = True
 
     def _column_letter_to_number(self, column: str) -> int:
         column = column.upper()
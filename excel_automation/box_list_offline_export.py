@@ -0,0 +1,288 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+import logging
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Alignment, Font
+
+from excel_automation.box_list_export_config import BoxListExportConfig
+from excel_automation.box_list_export_manager import BoxListExportManager, BoxListExportResult
+from excel_automation.sheet_layout_profile import SheetLayoutProfile
+from excel_automation.utils import convert_column_letter_to_index, convert_index_to_column_letter
+
+logger = logging.getLogger(__name__)
+
+
+OUTPUT_SHEET = "sheet"
+OUTPUT_XLSX = "xlsx"
+OUTPUT_TEXT = "text"
+OUTPUT_MODES = (OUTPUT_SHEET, OUTPUT_XLSX, OUTPUT_TEXT)
+
+MAX_SHEET_NAME_LENGTH = 31
+MACRO_ENABLED_SUFFIXES = (".xlsm",)
+BOX_LIST_SUFFIX = "_box_list"
+
+
+@dataclass
+class OfflineSheetData:
+    """Giá trị (đã tính) của các dòng cần cho box list, đọc thẳng từ file .xlsx."""
+    path: Path
+    sheet_name: str
+    rows: Dict[int, Tuple[Any, ...]]
+    last_column: int
+    items_per_box: Optional[int] = None
+
+    @property
+    def filename(self) -> str:
+        return self.path.stem
+
+    def value(self, row: int, col: int) -> Any:
+        row_values = self.rows.get(row, ())
+        return row_values[col - 1] if 0 < col <= len(row_values) else None
+
+
+@dataclass
+class OfflineExportResult:
+    result: BoxListExportResult
+    output_path: Optional[Path] = None
+    sheet_name: str = ""
+
+
+def load_sheet_data(path: Union[str, Path], sheet_name: Optional[str] = None,
+                    config: Optional[BoxListExportConfig] = None) -> OfflineSheetData:
+    """
+    Đọc sheet packing list ở chế độ read-only, không cần Excel.
+
+    Không chỉ định sheet thì lấy sheet đầu tiên có header giống template packing list.
+    Chỉ đọc tới dòng size cuối cùng; giá trị công thức lấy từ giá trị Excel đã lưu trong file,
+    riêng header 14-18 được đọc thêm dạng công thức để lấy số chia ở G18 (items/box).
+    """
+    sheets = load_workbook_data(path, [sheet_name] if sheet_name else None, config, first_only=True)
+    return sheets[0]
+
+
+def load_workbook_data(path: Union[str, Path], sheet_names: Optional[List[str]] = None,
+                       config: Optional[BoxListExportConfig] = None,
+                       first_only: bool = False) -> List[OfflineSheetData]:
+    """
+    Đọc các sheet packing list của một file (mặc định: mọi sheet có header giống template).
+
+    Mỗi file chỉ mở hai lần ở chế độ read-only: một lần lấy công thức header, một lần lấy giá trị.
+    Không có sheet nào giống template thì dùng sheet đầu tiên. Ô From/To là công thức nhưng file
+    không lưu giá trị đã tính (vd: file đã bị openpyxl ghi lại) thì báo lỗi thay vì coi là thùng rỗng.
+    """
+    config = config or BoxListExportConfig()
+    path = Path(path)
+    last_row = max(
+        config.get_size_data_end_row(), config.get_box_start_row(),
+        config.get_box_end_row(), config.get_po_cell_row()
+    )
+
+    box_rows = sorted({config.get_box_start_row(), config.get_box_end_row()})
+
+    formulas_wb = load_workbook(str(path), read_only=True)
+    try:
+        names = sheet_names or formulas_wb.sheetnames
+        profiles = [_read_header_profile(formulas_wb[name], path.name) for name in names]
+        formula_cells = {name: _find_formula_cells(formulas_wb[name], box_rows) for name in names}
+    finally:
+        formulas_wb.close()
+
+    if not sheet_names:
+        profiles = [profile for profile in profiles if profile.matches_template] or profiles[:1]
+    if first_only:
+        profiles = profiles[:1]
+
+    values_wb = load_workbook(str(path), read_only=True, data_only=True)
+    try:
+        sheets = []
+        for profile in profiles:
+            rows = {
+                row_idx: tuple(row_values)
+                for row_idx, row_values in enumerate(
+                    values_wb[profile.sheet_name].iter_rows(min_row=1, max_row=last_row, values_only=True),
+                    start=1
+                )
+            }
+            last_column = max((len(row_values) for row_values in rows.values()), default=0)
+            data = OfflineSheetData(path, profile.sheet_name, rows, last_column, profile.items_per_box)
+            _check_cached_values(data, formula_cells[profile.sheet_name])
+            sheets.append(data)
+    finally:
+        values_wb.close()
+
+    logger.info(f"Đã đọc offline '{path.name}': {', '.join(sheet.sheet_name for sheet in sheets)}")
+    return sheets
+
+
+def _read_header_profile(ws, workbook_name: str) -> SheetLayoutProfile:
+    header = tuple(
+        tuple(row_values)
+        for row_values in ws.iter_rows(
+            min_row=SheetLayoutProfile.HEADER_START_ROW,
+            max_row=SheetLayoutProfile.HEADER_END_ROW,
+            values_only=True
+        )
+    )
+    return SheetLayoutProfile(
+        workbook_name, ws.title, header, max((len(row) for row in header), default=0)
+    )
+
+
+def _find_formula_cells(ws, rows: List[int]) -> List[Tuple[int, int]]:
+    cells = []
+    for row in rows:
+        for row_values in ws.iter_rows(min_row=row, max_row=row, values_only=True):
+            cells.extend(
+                (row, col) for col, value in enumerate(row_values, start=1)
+                if isinstance(value, str) and value.startswith("=")
+            )
+    return cells
+
+
+def _check_cached_values(data: OfflineSheetData, formula_cells: List[Tuple[int, int]]) -> None:
+    missing = [
+        f"{convert_index_to_column_letter(col)}{row}"
+        for row, col in formula_cells if data.value(row, col) is None
+    ]
+    if missing:
+        raise ValueError(
+            f"Sheet '{data.sheet_name}' có ô From/To là công thức chưa có giá trị đã tính "
+            f"({', '.join(missing[:5])}{'...' if len(missing) > 5 else ''}); "
+            f"hãy mở file bằng Excel và lưu lại"
+        )
+
+
+def box_list_copy_path(path: Path) -> Path:
+    """Bản sao file nguồn kèm sheet box list: <tên>_box_list<đuôi> cạnh file nguồn."""
+    return path.with_name(f"{path.stem}{BOX_LIST_SUFFIX}{path.suffix}")
+
+
+def load_source_workbook(path: Path) -> Workbook:
+    """Mở file nguồn để thêm sheet; file .xlsm giữ lại macro (keep_vba)."""
+    return load_workbook(str(path), keep_vba=path.suffix.lower() in MACRO_ENABLED_SUFFIXES)
+
+
+def unique_sheet_name(existing: Set[str], name: str) -> str:
+    """Tên sheet chưa dùng (so sánh không phân biệt hoa thường như Excel), tối đa 31 ký tự."""
+    taken = {item.lower() for item in existing}
+    candidate = name[:MAX_SHEET_NAME_LENGTH]
+    counter = 1
+    while candidate.lower() in taken:
+        suffix = f"_{counter}"
+        candidate = f"{name[:MAX_SHEET_NAME_LENGTH - len(suffix)]}{suffix}"
+        counter += 1
+    return candidate
+
+
+class OfflineBoxListExporter:
+    """
+    Xuất danh sách thùng trực tiếp từ file .xlsx, không mở Excel, không dùng clipboard.
+
+    Dùng chung logic gộp size/chia cột với BoxListExportManager; kết quả ghi vào sheet mới
+    trong bản sao của file ("sheet"), một file .xlsx riêng ("xlsx") hoặc file text ("text").
+    """
+
+    def __init__(self, config: Optional[BoxListExportConfig] = None):
+        self.config = config or BoxListExportConfig()
+        self.manager = BoxListExportManager(self.config)
+
+    def list_sizes(self, data: OfflineSheetData) -> List[str]:
+        size_col = convert_column_letter_to_index(self.config.get_size_column())
+        start_row = self.config.get_size_data_start_row()
+        end_row = self.config.get_size_data_end_row()
+        size_to_row = self.manager.map_size_rows(
+            tuple((data.value(row, size_col),) for row in range(start_row, end_row + 1))
+        )
+        return sorted(size_to_row, key=size_to_row.get)
+
+    def po_number(self, data: OfflineSheetData) -> str:
+        po_col = convert_column_letter_to_index(self.config.get_po_cell_column())
+        return self.manager.format_po_number(data.value(self.config.get_po_cell_row(), po_col))
+
+    def build(self, data: OfflineSheetData, selected_sizes: Optional[List[str]] = None,
+              items_per_box: Optional[int] = None) -> BoxListExportResult:
+        return self.manager.build_from_values(
+            data.value, data.last_column, data.filename,
+            items_per_box if items_per_box is not None else data.items_per_box,
+            selected_sizes
+        )
+
+    def export(self, path: Union[str, Path], output: str = OUTPUT_XLSX,
+               output_path: Optional[Union[str, Path]] = None, sheet_name: Optional[str] = None,
+               selected_sizes: Optional[List[str]] = None,
+               items_per_box: Optional[int] = None) -> OfflineExportResult:
+        """
+        Xuất box list của một file.
+
+        output_path mặc định: "sheet" là bản sao <tên>_box_list<đuôi> kèm sheet box list,
+        "xlsx" là <tên>_box_list.xlsx, "text" là <tên>_box_list.txt cạnh file nguồn.
+
+        File nguồn chỉ bị ghi đè khi output_path trỏ tới chính nó. Khi đó openpyxl làm mất
+        hình ảnh, biểu đồ và giá trị đã tính của mọi công thức (lần xuất offline sau sẽ báo lỗi
+        cho tới khi file được mở và lưu lại bằng Excel); macro của file .xlsm được giữ lại.
+        """
+        if output not in OUTPUT_MODES:
+            raise ValueError(f"Kiểu xuất không hợp lệ: {output}")
+
+        path = Path(path)
+        try:
+            data = load_sheet_data(path, sheet_name, self.config)
+            result = self.build(data, selected_sizes, items_per_box)
+        except Exception as e:
+            error_msg = f"Lỗi khi đọc file {path.name}: {e}"
+            logger.error(error_msg, exc_info=True)
+            return OfflineExportResult(BoxListExportResult(success=False, error_message=error_msg))
+
+        if not result.success:
+            return OfflineExportResult(result)
+
+        box_sheet_name = self.manager.build_sheet_name(
+            data.filename, self.po_number(data)
+        )[:MAX_SHEET_NAME_LENGTH]
+
+        try:
+            if output == OUTPUT_TEXT:
+                target = Path(output_path) if output_path else path.with_name(f"{path.stem}{BOX_LIST_SUFFIX}.txt")
+                target.write_text(result.text, encoding="utf-8")
+            elif output == OUTPUT_XLSX:
+                target = Path(output_path) if output_path else path.with_name(f"{path.stem}{BOX_LIST_SUFFIX}.xlsx")
+                wb = Workbook()
+                wb.active.title = box_sheet_name
+                self.write_sheet(wb.active, result)
+                wb.save(str(target))
+            else:
+                target = Path(output_path) if output_path else box_list_copy_path(path)
+                wb = load_source_workbook(path)
+                box_sheet_name = unique_sheet_name(set(wb.sheetnames), box_sheet_name)
+                self.write_sheet(wb.create_sheet(box_sheet_name, 0), result)
+                wb.save(str(target))
+        except Exception as e:
+            error_msg = f"Lỗi khi ghi box list của {path.name}: {e}"
+            logger.error(error_msg, exc_info=True)
+            return OfflineExportResult(BoxListExportResult(success=False, error_message=error_msg))
+
+        logger.info(f"Đã xuất offline box list {path.name} → {target.name} ({result.total_boxes} thùng)")
+        return OfflineExportResult(result, target, box_sheet_name if output != OUTPUT_TEXT else "")
+
+    def write_sheet(self, sheet, result: BoxListExportResult,
+                    start_column: str = "A", start_row: int = 1) -> None:
+        """Ghi header và các cột box list giống paste_and_format_to_excel (SIZE in đậm, số căn giữa)."""
+        start_col = convert_column_letter_to_index(start_column)
+        header_cell = sheet.cell(start_row, start_col, result.header)
+        header_cell.font = Font(bold=True, size=20)
+        header_cell.alignment = Alignment(horizontal="left")
+
+        data_start_row = start_row + self.config.get_header_rows()
+        columns = self.manager.split_into_columns(self.manager.iter_content_lines(result.box_ranges))
+        center = Alignment(horizontal="center")
+        bold = Font(bold=True)
+
+        for col_idx, column_lines in enumerate(columns):
+            for line_idx, line in enumerate(column_lines):
+                value = int(line) if line.isdigit() else line
+                cell = sheet.cell(data_start_row + line_idx, start_col + col_idx, value)
+                cell.alignment = center
+                if line.startswith("SIZE "):
+                    cell.font = bold
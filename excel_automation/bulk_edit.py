@@ -0,0 +1,85 @@
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+XL_CALCULATION_MANUAL = -4135
+XL_CALCULATION_AUTOMATIC = -4105
+
+SUSPENDED_STATE = (
+    ("ScreenUpdating", False),
+    ("EnableEvents", False),
+    ("Calculation", XL_CALCULATION_MANUAL),
+)
+
+_sessions: Dict[int, Tuple[Any, int, List[Tuple[str, Any]]]] = {}
+
+
+def is_bulk_editing(excel_app: Any) -> bool:
+    session = _sessions.get(id(excel_app))
+    return session is not None and session[0] is excel_app
+
+
+def set_screen_updating(excel_app: Any, enabled: bool) -> None:
+    """Bật/tắt ScreenUpdating, nhưng không bật lại khi đang trong bulk_edit_session."""
+    if not excel_app:
+        return
+    if enabled and is_bulk_editing(excel_app):
+        return
+    excel_app.ScreenUpdating = enabled
+
+
+def _suspend(excel_app: Any) -> List[Tuple[str, Any]]:
+    saved: List[Tuple[str, Any]] = []
+    for name, value in SUSPENDED_STATE:
+        try:
+            previous = getattr(excel_app, name)
+            setattr(excel_app, name, value)
+            saved.append((name, previous))
+        except Exception as e:
+            logger.warning(f"Không tắt được {name}: {e}")
+    return saved
+
+
+def _restore(excel_app: Any, saved: List[Tuple[str, Any]]) -> None:
+    for name, previous in reversed(saved):
+        try:
+            setattr(excel_app, name, previous)
+        except Exception as e:
+            logger.warning(f"Không khôi phục được {name}: {e}")
+
+
+@contextmanager
+def bulk_edit_session(excel_app: Any) -> Iterator[None]:
+    """
+    Tắt ScreenUpdating, EnableEvents và chuyển Calculation sang manual cho cả khối ghi.
+
+    Có thể lồng nhau: chỉ lần vào ngoài cùng lưu trạng thái, và trạng thái chỉ
+    được khôi phục đúng một lần khi thoát khỏi lần ngoài cùng, kể cả khi có lỗi.
+    """
+    if not excel_app:
+        yield
+        return
+
+    key = id(excel_app)
+    session = _sessions.get(key)
+    if session is not None and session[0] is excel_app:
+        _sessions[key] = (excel_app, session[1] + 1, session[2])
+        try:
+            yield
+        finally:
+            current = _sessions[key]
+            _sessions[key] = (excel_app, current[1] - 1, current[2])
+        return
+
+    saved = _suspend(excel_app)
+    _sessions[key] = (excel_app, 1, saved)
+    logger.debug("Bắt đầu bulk edit: tạm tắt ScreenUpdating, EnableEvents, Calculation")
+    try:
+        yield
+    finally:
+        _sessions.pop(key, None)
+        _restore(excel_app, saved)
+        logger.debug("Kết thúc bulk edit: đã khôi phục trạng thái Excel")
@@ -0,0 +1,158 @@
+from typing import Any, Dict, List, Set, Tuple
+import logging
+
+from excel_automation.utils import normalize_range_values, convert_index_to_column_letter
+from excel_automation.com_retry import ExcelBusyError, call_with_retry
+
+logger = logging.getLogger(__name__)
+
+
+Block = Tuple[int, int, int, int]
+
+
+class CellWriteBuffer:
+
+    def __init__(self):
+        self._pending: Dict[Tuple[int, int], Any] = {}
+        self._formula_guarded: Set[Tuple[int, int]] = set()
+        self.skipped_formula_cells: List[Tuple[int, int]] = []
+        self.flushed_blocks: List[Block] = []
+
+    def set(self, row: int, col: int, value: Any, skip_if_formula: bool = False) -> None:
+        self._pending[(row, col)] = value
+        if skip_if_formula:
+            self._formula_guarded.add((row, col))
+        else:
+            self._formula_guarded.discard((row, col))
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def clear(self) -> None:
+        self._pending.clear()
+        self._formula_guarded.clear()
+
+    def take(self, block: Block) -> Dict[Tuple[int, int], Any]:
+        """Lấy ra (và bỏ khỏi buffer) các ô đang chờ không cần kiểm tra công thức nằm trong block."""
+        top, left, bottom, right = block
+        taken = {
+            cell: value for cell, value in self._pending.items()
+            if top <= cell[0] <= bottom and left <= cell[1] <= right
+            and cell not in self._formula_guarded
+        }
+        for cell in taken:
+            del self._pending[cell]
+        return taken
+
+    def flush(self, worksheet) -> int:
+        """Ghi toàn bộ ô đang chờ bằng số lần gán Range.Value ít nhất có thể."""
+        if not self._pending:
+            return 0
+
+        formula_cells = self._read_formula_cells(worksheet)
+        self.skipped_formula_cells = sorted(formula_cells)
+        for cell in formula_cells:
+            self._pending.pop(cell, None)
+
+        blocks = self.build_blocks(set(self._pending))
+        written = 0
+
+        for block in blocks:
+            top, left, bottom, right = block
+            values = tuple(
+                tuple(self._pending[(row, col)] for col in range(left, right + 1))
+                for row in range(top, bottom + 1)
+            )
+
+            address = self._block_address(block)
+            call_with_retry(
+                self._write_block, worksheet, address,
+                values[0][0] if top == bottom and left == right else values,
+                description=f"ghi {address}"
+            )
+
+            for row in range(top, bottom + 1):
+                for col in range(left, right + 1):
+                    self._pending.pop((row, col), None)
+                    self._formula_guarded.discard((row, col))
+
+            self.flushed_blocks.append(block)
+            written += (bottom - top + 1) * (right - left + 1)
+
+        self._formula_guarded.clear()
+        logger.info(
+            f"Đã flush {written} ô bằng {len(blocks)} lần ghi Range"
+            + (f", bỏ qua {len(formula_cells)} ô có công thức" if formula_cells else "")
+        )
+        return written
+
+    @staticmethod
+    def _write_block(worksheet, address: str, values: Any) -> None:
+        worksheet.Range(address).Value = values
+
+    def _read_formula_cells(self, worksheet) -> Set[Tuple[int, int]]:
+        guarded = [cell for cell in self._formula_guarded if cell in self._pending]
+        if not guarded:
+            return set()
+
+        top = min(row for row, _ in guarded)
+        bottom = max(row for row, _ in guarded)
+        left = min(col for _, col in guarded)
+        right = max(col for _, col in guarded)
+
+        try:
+            address = self._block_address((top, left, bottom, right))
+            formulas = normalize_range_values(
+                call_with_retry(lambda: worksheet.Range(address).Formula, description=f"đọc công thức {address}")
+            )
+        except ExcelBusyError:
+            raise
+        except Exception as e:
+            logger.warning(f"Không đọc được công thức, ghi đè toàn bộ ô: {e}")
+            return set()
+
+        formula_cells: Set[Tuple[int, int]] = set()
+        for row, col in guarded:
+            row_values = formulas[row - top] if row - top < len(formulas) else ()
+            cell_formula = row_values[col - left] if col - left < len(row_values) else None
+            if isinstance(cell_formula, str) and cell_formula.startswith("="):
+                formula_cells.add((row, col))
+
+        return formula_cells
+
+    @staticmethod
+    def build_blocks(cells: Set[Tuple[int, int]]) -> List[Block]:
+        columns_by_row: Dict[int, List[int]] = {}
+        for row, col in cells:
+            columns_by_row.setdefault(row, []).append(col)
+
+        row_runs: List[Tuple[int, int, int]] = []
+        for row in sorted(columns_by_row):
+            columns = sorted(columns_by_row[row])
+            run_start = columns[0]
+            previous = columns[0]
+            for col in columns[1:]:
+                if col != previous + 1:
+                    row_runs.append((row, run_start, previous))
+                    run_start = col
+                previous = col
+            row_runs.append((row, run_start, previous))
+
+        blocks: List[Block] = []
+        for row, left, right in sorted(row_runs, key=lambda run: (run[1], run[2], run[0])):
+            if blocks:
+                top, prev_left, bottom, prev_right = blocks[-1]
+                if prev_left == left and prev_right == right and bottom + 1 == row:
+                    blocks[-1] = (top, left, row, right)
+                    continue
+            blocks.append((row, left, row, right))
+
+        return sorted(blocks)
+
+    @staticmethod
+    def _block_address(block: Block) -> str:
+        top, left, bottom, right = block
+        start = f"{convert_index_to_column_letter(left)}{top}"
+        if top == bottom and left == right:
+            return start
+        return f"{start}:{convert_index_to_column_letter(right)}{bottom}"
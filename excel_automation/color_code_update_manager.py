@@ -1,7 +1,14 @@
-from typing import Tuple
+from typing import Optional, Tuple
 import logging
 
-from excel_automation.utils import find_last_data_row
+from excel_automation.sheet_snapshot import SheetSnapshot
+from excel_automation.cell_write_buffer import CellWriteBuffer
+from excel_automation.utils import (
+    find_last_data_row,
+    invalidate_last_row_cache,
+    normalize_range_values,
+    convert_index_to_column_letter
+)
 
 logger = logging.getLogger(__name__)
 
@@ -21,12 +28,20 @@ class ColorCodeUpdateManager:
         end_row = self._find_last_data_row(worksheet, reference_column)
         return (start_row, end_row)
     
-    def get_current_color_code(self, worksheet, column: str = 'E') -> str:
+    def get_current_color_code(
+        self,
+        worksheet,
+        column: str = 'E',
+        snapshot: Optional[SheetSnapshot] = None
+    ) -> str:
         start_row = 19
         col_num = self._column_to_number(column)
         
         try:
-            cell_value = worksheet.Cells(start_row, col_num).Value
+            if snapshot is not None and not snapshot.is_stale:
+                cell_value = snapshot.value(start_row, col_num)
+            else:
+                cell_value = worksheet.Cells(start_row, col_num).Value
             if cell_value is not None:
                 value_str = str(cell_value)
                 if value_str.startswith("'"):
@@ -37,27 +52,73 @@ class ColorCodeUpdateManager:
             logger.error(f"Lỗi khi đọc mã màu: {e}")
             return ""
     
-    def update_color_code_bulk(self, worksheet, new_color_code: str, column: str = 'E') -> int:
+    def update_color_code_bulk(self, worksheet, new_color_code: str, column: str = 'E',
+                               dry_run: bool = False) -> int:
+        """
+        Ghi mã màu (tiền tố ') cho toàn bộ cột bằng một lần gán Range; bỏ qua nếu cột đã đúng mã.
+
+        Với dry_run=True chỉ đọc cột và trả về số dòng sẽ thay đổi.
+        """
         start_row = 19
         end_row = self._find_last_data_row(worksheet, 'A')
         col_num = self._column_to_number(column)
-        
-        updated_count = 0
-        
+        updated_count = max(end_row - start_row + 1, 0)
+
         try:
-            prefixed_value = f"'{new_color_code}"
-            
-            for row in range(start_row, end_row + 1):
-                worksheet.Cells(row, col_num).Value = prefixed_value
-                updated_count += 1
-            
-            logger.info(f"Đã cập nhật {updated_count} dòng mã màu thành '{prefixed_value}'")
+            changed_count = self.count_changed_rows(worksheet, new_color_code, start_row, end_row, col_num)
+
+            if dry_run:
+                logger.info(
+                    f"[Dry-run] {changed_count}/{updated_count} dòng mã màu sẽ đổi thành '{new_color_code}'"
+                )
+                return changed_count
+
+            if changed_count == 0:
+                logger.info(f"Cột mã màu đã là '{new_color_code}', bỏ qua ghi {updated_count} dòng")
+                return updated_count
+
+            write_buffer = CellWriteBuffer()
+            self.stage_color_code(write_buffer, new_color_code, end_row, column)
+            try:
+                write_buffer.flush(worksheet)
+            finally:
+                invalidate_last_row_cache(worksheet)
+
+            logger.info(
+                f"Đã cập nhật {updated_count} dòng mã màu thành '{new_color_code}' ({changed_count} dòng thay đổi)"
+            )
             return updated_count
-            
+
         except Exception as e:
             logger.error(f"Lỗi khi cập nhật mã màu: {e}")
             raise RuntimeError(f"Không thể cập nhật mã màu: {str(e)}")
-    
+
+    def count_changed_rows(self, worksheet, new_color_code: str, start_row: int, end_row: int,
+                           col_num: int) -> int:
+        """Số dòng có giá trị khác mã màu mới; ô số (vd 1.0 thay vì '0001') luôn tính là khác."""
+        if end_row < start_row:
+            return 0
+
+        col_letter = convert_index_to_column_letter(col_num)
+        raw_values = worksheet.Range(f"{col_letter}{start_row}:{col_letter}{end_row}").Value
+
+        return sum(
+            1 for row_values in normalize_range_values(raw_values)
+            if not isinstance(row_values[0], str) or row_values[0].lstrip("'") != new_color_code
+        )
+
+    def stage_color_code(self, write_buffer: CellWriteBuffer, new_color_code: str, end_row: int,
+                         column: str = 'E') -> int:
+        """Đưa mã màu mới (có tiền tố ') của các dòng 19..end_row vào write_buffer, trả về số dòng."""
+        start_row = 19
+        col_num = self._column_to_number(column)
+        prefixed_value = f"'{new_color_code}"
+
+        for row in range(start_row, end_row + 1):
+            write_buffer.set(row, col_num, prefixed_value)
+
+        return max(end_row - start_row + 1, 0)
+
     def validate_color_code(self, color_code: str) -> Tuple[bool, str]:
         if not color_code or not color_code.strip():
             return False, "Mã màu không được để trống"
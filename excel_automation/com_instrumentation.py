@@ -0,0 +1,289 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+UNSCOPED_OPERATION = "unscoped"
+COM_STATS_ENV = "COM_STATS_FILE"
+
+
+class OperationStats:
+
+    def __init__(self, name: str):
+        self.name = name
+        self.runs = 0
+        self.gets = 0
+        self.sets = 0
+        self.calls = 0
+        self.seconds = 0.0
+        self.members: Dict[str, int] = {}
+
+    @property
+    def total(self) -> int:
+        return self.gets + self.sets + self.calls
+
+    def record(self, kind: str, member: str, elapsed: float) -> None:
+        if kind == "get":
+            self.gets += 1
+        elif kind == "set":
+            self.sets += 1
+        else:
+            self.calls += 1
+        self.seconds += elapsed
+        key = f"{member}:{kind}"
+        self.members[key] = self.members.get(key, 0) + 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "gets": self.gets,
+            "sets": self.sets,
+            "calls": self.calls,
+            "total": self.total,
+            "seconds": round(self.seconds, 6),
+            "members": dict(sorted(self.members.items(), key=lambda item: -item[1]))
+        }
+
+
+class ComInstrumentation:
+    """Đếm số lần get/set/call COM và thời gian, gom theo thao tác người dùng."""
+
+    def __init__(self, report_path: Optional[str] = None):
+        self.report_path = Path(report_path) if report_path else None
+        self.operations: Dict[str, OperationStats] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @classmethod
+    def from_env(cls) -> Optional['ComInstrumentation']:
+        report_path = os.getenv(COM_STATS_ENV)
+        if not report_path:
+            return None
+        logger.info(f"Bật đếm COM round-trip, báo cáo: {report_path}")
+        return cls(report_path)
+
+    def wrap(self, target: Any, name: str = "Application") -> Any:
+        if target is None or isinstance(target, ComProxy):
+            return target
+        return ComProxy(target, self, name)
+
+    def _stack(self) -> List[str]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = []
+            self._local.stack = stack
+        return stack
+
+    def current_operation(self) -> str:
+        stack = self._stack()
+        return stack[0] if stack else UNSCOPED_OPERATION
+
+    def _stats_for(self, name: str) -> OperationStats:
+        stats = self.operations.get(name)
+        if stats is None:
+            stats = OperationStats(name)
+            self.operations[name] = stats
+        return stats
+
+    def record(self, kind: str, member: str, elapsed: float) -> None:
+        with self._lock:
+            self._stats_for(self.current_operation()).record(kind, member, elapsed)
+
+    @contextmanager
+    def operation(self, name: str) -> Iterator[None]:
+        """Gom mọi lời gọi COM bên trong vào thao tác ngoài cùng đang chạy."""
+        stack = self._stack()
+        stack.append(name)
+        outermost = len(stack) == 1
+        if outermost:
+            with self._lock:
+                stats = self._stats_for(name)
+                stats.runs += 1
+                before = (stats.gets, stats.sets, stats.calls, stats.seconds)
+        try:
+            yield
+        finally:
+            stack.pop()
+            if outermost:
+                self._log_run(name, before)
+                self.write_report()
+
+    @contextmanager
+    def bind(self, name: str) -> Iterator[None]:
+        """Tiếp tục ghi vào thao tác `name` trên luồng khác (ví dụ luồng COM) mà không tính thêm lượt."""
+        stack = self._stack()
+        stack.append(name)
+        try:
+            yield
+        finally:
+            stack.pop()
+            if not stack:
+                self.write_report()
+
+    def _log_run(self, name: str, before) -> None:
+        stats = self.operations[name]
+        gets = stats.gets - before[0]
+        sets = stats.sets - before[1]
+        calls = stats.calls - before[2]
+        seconds = stats.seconds - before[3]
+        logger.info(
+            f"COM [{name}]: {gets + sets + calls} round-trip "
+            f"({gets} get, {sets} set, {calls} call) trong {seconds:.3f}s"
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "operations": {
+                    name: stats.to_dict()
+                    for name, stats in sorted(self.operations.items())
+                }
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.operations.clear()
+
+    def write_report(self) -> None:
+        if self.report_path is None:
+            return
+        try:
+            self.report_path.parent.mkdir(parents=True, exist_ok=True)
+            self.report_path.write_text(
+                json.dumps(self.snapshot(), ensure_ascii=False, indent=2),
+                encoding="utf-8"
+            )
+        except Exception as e:
+            logger.warning(f"Không ghi được báo cáo COM round-trip: {e}")
+
+
+def _is_com_object(value: Any) -> bool:
+    return hasattr(value, "_oleobj_")
+
+
+def _unwrap(value: Any) -> Any:
+    if isinstance(value, ComProxy):
+        return object.__getattribute__(value, "_com_target")
+    return value
+
+
+class ComProxy:
+    """Bọc một CDispatch, ghi nhận mỗi lần truy cập thuộc tính/phương thức."""
+
+    __slots__ = ("_com_target", "_com_stats", "_com_name")
+
+    def __init__(self, target: Any, stats: ComInstrumentation, name: str):
+        object.__setattr__(self, "_com_target", target)
+        object.__setattr__(self, "_com_stats", stats)
+        object.__setattr__(self, "_com_name", name)
+
+    def _wrap_result(self, value: Any, name: str) -> Any:
+        if _is_com_object(value):
+            return ComProxy(value, self._com_stats, name)
+        return value
+
+    def __getattr__(self, name: str) -> Any:
+        start = time.perf_counter()
+        value = getattr(self._com_target, name)
+        elapsed = time.perf_counter() - start
+
+        if _is_com_object(value):
+            self._com_stats.record("get", f"{self._com_name}.{name}", elapsed)
+            return ComProxy(value, self._com_stats, name)
+
+        if callable(value):
+            return _ComMethod(value, self, name)
+
+        self._com_stats.record("get", f"{self._com_name}.{name}", elapsed)
+        return value
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        start = time.perf_counter()
+        setattr(self._com_target, name, _unwrap(value))
+        self._com_stats.record("set", f"{self._com_name}.{name}", time.perf_counter() - start)
+
+    def __call__(self, *args, **kwargs) -> Any:
+        start = time.perf_counter()
+        result = self._com_target(
+            *[_unwrap(arg) for arg in args],
+            **{key: _unwrap(value) for key, value in kwargs.items()}
+        )
+        self._com_stats.record("call", f"{self._com_name}()", time.perf_counter() - start)
+        return self._wrap_result(result, self._com_name)
+
+    def __iter__(self):
+        start = time.perf_counter()
+        items = list(self._com_target)
+        self._com_stats.record("call", f"{self._com_name}.__iter__", time.perf_counter() - start)
+        for item in items:
+            yield self._wrap_result(item, self._com_name)
+
+    def __bool__(self) -> bool:
+        return self._com_target is not None
+
+    def __eq__(self, other: Any) -> bool:
+        return self._com_target == _unwrap(other)
+
+    def __hash__(self) -> int:
+        return hash(self._com_target)
+
+    def __repr__(self) -> str:
+        return f"<ComProxy {self._com_name}: {self._com_target!r}>"
+
+
+class _ComMethod:
+
+    __slots__ = ("_method", "_owner", "_name")
+
+    def __init__(self, method: Any, owner: ComProxy, name: str):
+        self._method = method
+        self._owner = owner
+        self._name = name
+
+    def __call__(self, *args, **kwargs) -> Any:
+        owner_name = self._owner._com_name
+        stats = self._owner._com_stats
+        start = time.perf_counter()
+        result = self._method(
+            *[_unwrap(arg) for arg in args],
+            **{key: _unwrap(value) for key, value in kwargs.items()}
+        )
+        stats.record("call", f"{owner_name}.{self._name}", time.perf_counter() - start)
+        return self._owner._wrap_result(result, self._name)
+
+
+def com_operation(name: str):
+    """Decorator cho method của controller: gom lời gọi COM vào thao tác `name`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            com_manager = getattr(self, "com_manager", None)
+            instrumentation = getattr(com_manager, "instrumentation", None)
+            if not isinstance(instrumentation, ComInstrumentation):
+                return func(self, *args, **kwargs)
+            with instrumentation.operation(name):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def bind_operation(instrumentation: Any, func):
+    """Bọc func để khi chạy ở luồng khác vẫn ghi vào thao tác hiện tại của luồng gọi."""
+    if not isinstance(instrumentation, ComInstrumentation):
+        return func
+
+    name = instrumentation.current_operation()
+
+    @functools.wraps(func)
+    def bound(*args, **kwargs):
+        with instrumentation.bind(name):
+            return func(*args, **kwargs)
+    return bound
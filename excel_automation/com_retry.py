@@ -0,0 +1,152 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+RPC_E_CALL_REJECTED = -2147418111
+RPC_E_SERVERCALL_RETRYLATER = -2147417846
+VBA_E_IGNORE = -2146777998
+
+BUSY_HRESULTS = {RPC_E_CALL_REJECTED, RPC_E_SERVERCALL_RETRYLATER, VBA_E_IGNORE}
+BUSY_MESSAGES = (
+    "call was rejected by callee",
+    "application is busy",
+    "retrylater",
+)
+
+
+def _to_hresult(value: Any) -> Optional[int]:
+    if not isinstance(value, int) or isinstance(value, bool):
+        return None
+    return value - (1 << 32) if value >= (1 << 31) else value
+
+
+def is_busy_error(error: BaseException) -> bool:
+    """Lỗi COM do Excel đang bận (đang sửa ô, mở hộp thoại), kể cả khi bị bọc trong RuntimeError."""
+    seen = set()
+    current: Optional[BaseException] = error
+
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        if isinstance(current, ExcelBusyError):
+            return False
+
+        args = getattr(current, "args", ())
+        codes = [getattr(current, "hresult", None)]
+        if args:
+            codes.append(args[0])
+        if len(args) > 2 and isinstance(args[2], tuple) and len(args[2]) > 5:
+            codes.append(args[2][5])
+        if any(_to_hresult(code) in BUSY_HRESULTS for code in codes):
+            return True
+
+        message = str(current).lower()
+        if any(text in message for text in BUSY_MESSAGES):
+            return True
+
+        current = current.__cause__ or current.__context__
+
+    return False
+
+
+class ExcelBusyError(RuntimeError):
+    """Excel vẫn bận sau khi đã chờ hết thời hạn."""
+
+
+@dataclass
+class BusyWait:
+    description: str
+    attempt: int
+    delay: float
+    elapsed: float
+    error: BaseException
+
+
+class ComRetryScheduler:
+    """
+    Thử lại lời gọi COM bị Excel từ chối vì bận, chờ tăng dần (backoff) trong giới hạn `deadline` giây.
+
+    Lời gọi lồng nhau (vd: ghi từng khối trong một job) dùng chung thời hạn của lời gọi ngoài cùng,
+    nên chỉ khối bị từ chối được thử lại, các khối đã ghi không chạy lại.
+    `on_wait(BusyWait)` báo UI đang chờ Excel; `on_resume(description)` báo Excel đã nhận lệnh trở lại.
+    """
+
+    def __init__(self, initial_delay: float = 0.25, max_delay: float = 4.0,
+                 backoff_factor: float = 2.0, deadline: float = 60.0,
+                 sleep: Callable[[float], None] = time.sleep,
+                 clock: Callable[[], float] = time.monotonic):
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff_factor = backoff_factor
+        self.deadline = deadline
+        self.sleep = sleep
+        self.clock = clock
+        self.on_wait: Optional[Callable[[BusyWait], None]] = None
+        self.on_resume: Optional[Callable[[str], None]] = None
+        self._local = threading.local()
+
+    def call(self, func: Callable, *args, description: str = "", **kwargs) -> Any:
+        started = self.clock()
+        outer_deadline = getattr(self._local, "deadline_at", None)
+        deadline_at = started + self.deadline
+        if outer_deadline is not None:
+            deadline_at = min(deadline_at, outer_deadline)
+
+        self._local.deadline_at = deadline_at
+        description = description or getattr(func, "__name__", "lệnh COM")
+        attempt = 0
+        delay = self.initial_delay
+
+        try:
+            while True:
+                try:
+                    result = func(*args, **kwargs)
+                except Exception as e:
+                    if not is_busy_error(e):
+                        raise
+                    attempt += 1
+                    now = self.clock()
+                    if now + delay > deadline_at:
+                        logger.error(f"Excel vẫn bận sau {now - started:.1f}s, dừng '{description}'")
+                        raise ExcelBusyError(
+                            f"Excel đang bận (đang sửa ô hoặc mở hộp thoại), "
+                            f"đã chờ {now - started:.0f}s: {description}"
+                        ) from e
+
+                    logger.warning(f"Excel đang bận, thử lại '{description}' sau {delay:.2f}s (lần {attempt})")
+                    self._notify(self.on_wait, BusyWait(description, attempt, delay, now - started, e))
+                    self.sleep(delay)
+                    delay = min(self.max_delay, delay * self.backoff_factor)
+                    continue
+
+                if attempt:
+                    logger.info(f"Excel đã nhận lệnh '{description}' sau {attempt} lần thử lại")
+                    self._notify(self.on_resume, description)
+                return result
+        finally:
+            self._local.deadline_at = outer_deadline
+
+    @staticmethod
+    def _notify(callback: Optional[Callable[[Any], None]], value: Any) -> None:
+        if callback is None:
+            return
+        try:
+            callback(value)
+        except Exception as e:
+            logger.error(f"Lỗi trong callback chờ Excel: {e}")
+
+
+_scheduler = ComRetryScheduler()
+
+
+def get_retry_scheduler() -> ComRetryScheduler:
+    return _scheduler
+
+
+def call_with_retry(func: Callable, *args, description: str = "", **kwargs) -> Any:
+    """Gọi func qua bộ lập lịch thử lại dùng chung của ứng dụng."""
+    return _scheduler.call(func, *args, description=description, **kwargs)
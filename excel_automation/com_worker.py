@@ -0,0 +1,232 @@
+from concurrent.futures import CancelledError, Future
+from typing import Any, Callable, Optional
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+Dispatch = Callable[[Callable[[], None]], None]
+
+
+class ComJob(Future):
+    """Future của một job COM, có thêm cờ hủy để job đang chạy tự kiểm tra."""
+
+    def __init__(self, name: str, func: Callable, args: tuple, kwargs: dict,
+                 on_success: Optional[Callable[[Any], None]] = None,
+                 on_error: Optional[Callable[[BaseException], None]] = None):
+        super().__init__()
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.on_success = on_success
+        self.on_error = on_error
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def cancel(self) -> bool:
+        self._cancel_event.set()
+        return super().cancel()
+
+    def raise_if_cancelled(self) -> None:
+        if self._cancel_event.is_set():
+            raise CancelledError(f"Job '{self.name}' đã bị hủy")
+
+
+def _com_initialize() -> bool:
+    try:
+        import pythoncom
+    except ImportError:
+        return False
+    pythoncom.CoInitialize()
+    return True
+
+
+def _com_uninitialize() -> None:
+    try:
+        import pythoncom
+        pythoncom.CoUninitialize()
+    except Exception:
+        pass
+
+
+class ComWorker:
+    """
+    Một luồng duy nhất sở hữu COM apartment, chạy job theo đúng thứ tự gửi vào.
+
+    Mọi đối tượng COM (Application/Workbook/Worksheet) phải được tạo và dùng trên
+    luồng này. Kết quả trả về dạng Future; callback on_success/on_error được chuyển
+    về luồng UI qua `dispatch` (ví dụ AfterDispatcher dùng root.after).
+    """
+
+    _STOP = object()
+
+    def __init__(self, dispatch: Optional[Dispatch] = None, name: str = "ComWorker"):
+        self.name = name
+        self._dispatch = dispatch
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._local = threading.local()
+        self._accepting = False
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._accepting = True
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        logger.info(f"Đã khởi động luồng COM: {self.name}")
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def is_worker_thread(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    @property
+    def current_job(self) -> Optional[ComJob]:
+        """Job đang chạy trên luồng worker (None nếu gọi từ luồng khác)."""
+        return getattr(self._local, "job", None)
+
+    def submit(self, func: Callable, *args,
+               on_success: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[BaseException], None]] = None,
+               name: Optional[str] = None, **kwargs) -> ComJob:
+        if not self._accepting:
+            raise RuntimeError("Luồng COM chưa khởi động hoặc đã dừng")
+
+        job = ComJob(name or getattr(func, "__name__", "job"), func, args, kwargs, on_success, on_error)
+        self._queue.put(job)
+        return job
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """Chạy func trên luồng COM và chờ kết quả; gọi trực tiếp nếu đang ở luồng COM."""
+        if self.is_worker_thread():
+            return func(*args, **kwargs)
+        return self.submit(func, *args, **kwargs).result()
+
+    def cancel_pending(self) -> int:
+        cancelled = 0
+        pending = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, ComJob):
+                if item.cancel():
+                    cancelled += 1
+            else:
+                pending.append(item)
+        for item in pending:
+            self._queue.put(item)
+        if cancelled:
+            logger.info(f"Đã hủy {cancelled} job COM đang chờ")
+        return cancelled
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False,
+                 timeout: Optional[float] = None) -> None:
+        if self._thread is None:
+            return
+        self._accepting = False
+        if cancel_pending:
+            self.cancel_pending()
+        self._queue.put(self._STOP)
+        if wait and not self.is_worker_thread():
+            self._thread.join(timeout)
+        logger.info(f"Đã dừng luồng COM: {self.name}")
+
+    def _run(self) -> None:
+        initialized = _com_initialize()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is self._STOP:
+                    break
+                self._execute(item)
+        finally:
+            if initialized:
+                _com_uninitialize()
+
+    def _execute(self, job: ComJob) -> None:
+        if not job.set_running_or_notify_cancel():
+            return
+
+        self._local.job = job
+        try:
+            result = job.func(*job.args, **job.kwargs)
+        except BaseException as e:
+            job.set_exception(e)
+            if isinstance(e, CancelledError):
+                logger.info(f"Job COM '{job.name}' dừng do bị hủy")
+            elif job.on_error is None:
+                logger.error(f"Lỗi trong job COM '{job.name}': {e}", exc_info=True)
+            self._deliver(job.on_error, e)
+        else:
+            job.set_result(result)
+            self._deliver(job.on_success, result)
+        finally:
+            self._local.job = None
+
+    def _deliver(self, callback: Optional[Callable[[Any], None]], value: Any) -> None:
+        if callback is None:
+            return
+        if self._dispatch is None:
+            self._invoke(callback, value)
+        else:
+            self._dispatch(lambda: self._invoke(callback, value))
+
+    @staticmethod
+    def _invoke(callback: Callable[[Any], None], value: Any) -> None:
+        try:
+            callback(value)
+        except Exception as e:
+            logger.error(f"Lỗi trong callback của job COM: {e}", exc_info=True)
+
+
+class AfterDispatcher:
+    """Chuyển callback từ luồng COM về luồng Tk bằng cách poll hàng đợi qua root.after."""
+
+    def __init__(self, root: Any, interval_ms: int = 15):
+        self._root = root
+        self._interval_ms = interval_ms
+        self._queue: "queue.SimpleQueue[Callable[[], None]]" = queue.SimpleQueue()
+        self._after_id: Optional[str] = None
+
+    def __call__(self, callback: Callable[[], None]) -> None:
+        self._queue.put(callback)
+
+    def start(self) -> None:
+        if self._after_id is None:
+            self._poll()
+
+    def stop(self) -> None:
+        if self._after_id is not None:
+            try:
+                self._root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def drain(self) -> int:
+        handled = 0
+        while True:
+            try:
+                callback = self._queue.get_nowait()
+            except queue.Empty:
+                return handled
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Lỗi khi chạy callback trên luồng UI: {e}", exc_info=True)
+            handled += 1
+
+    def _poll(self) -> None:
+        self.drain()
+        self._after_id = self._root.after(self._interval_ms, self._poll)
@@ -1,10 +1,22 @@
 from typing import Dict, List, Optional
 import logging
 
-from excel_automation.utils import normalize_size_value
+from excel_automation.utils import (
+    normalize_size_value,
+    normalize_range_values,
+    group_consecutive_rows,
+    build_address_batches,
+    get_used_range_bounds,
+    convert_index_to_column_letter
+)
+from excel_automation.bulk_edit import set_screen_updating
+from excel_automation.cell_write_buffer import CellWriteBuffer
+from excel_automation.com_retry import call_with_retry
 
 logger = logging.getLogger(__name__)
 
+QUANTITY_START_COLUMN = 7
+
 
 class DuplicateSizeDetector:
 
@@ -69,32 +81,120 @@ class DuplicateSizeDetector:
             raise RuntimeError(f"Không thể quét size trùng: {str(e)}")
 
     def delete_rows(self, rows_to_delete: List[int]) -> int:
+        """Xóa các dòng, gom dòng liên tiếp thành vùng multi-area để mỗi lệnh Delete xóa nhiều đoạn."""
         if not rows_to_delete:
             return 0
 
         worksheet = self.com_manager.worksheet
         excel_app = self.com_manager.excel_app
 
-        sorted_rows = sorted(rows_to_delete, reverse=True)
+        runs = group_consecutive_rows(rows_to_delete)
+        total_rows = sum(last - first + 1 for first, last in runs)
+        batches = build_address_batches(f"{first}:{last}" for first, last in runs)
+        batch_row_counts = []
+        run_index = 0
+        for address in batches:
+            area_count = address.count(",") + 1
+            batch_row_counts.append(
+                sum(last - first + 1 for first, last in runs[run_index:run_index + area_count])
+            )
+            run_index += area_count
         deleted_count = 0
 
         try:
-            if excel_app:
-                excel_app.ScreenUpdating = False
+            set_screen_updating(excel_app, False)
 
-            for row in sorted_rows:
-                worksheet.Rows(row).Delete()
-                deleted_count += 1
-                logger.info(f"Đã xóa dòng {row}")
+            for address, batch_rows in reversed(list(zip(batches, batch_row_counts))):
+                call_with_retry(lambda: worksheet.Range(address).Delete(), description=f"xóa {address}")
+                deleted_count += batch_rows
+                logger.info(f"Đã xóa {batch_rows} dòng: {address}")
 
-            logger.info(f"Đã xóa tổng cộng {deleted_count} dòng trùng")
+            logger.info(f"Đã xóa tổng cộng {deleted_count} dòng trùng bằng {len(batches)} lệnh Delete")
             return deleted_count
 
         except Exception as e:
-            logger.error(f"Lỗi khi xóa dòng (đã xóa {deleted_count}/{len(sorted_rows)}): {e}")
+            logger.error(f"Lỗi khi xóa dòng (đã xóa {deleted_count}/{total_rows}): {e}")
             raise RuntimeError(
-                f"Lỗi khi xóa dòng trùng (đã xóa {deleted_count}/{len(sorted_rows)}): {str(e)}"
+                f"Lỗi khi xóa dòng trùng (đã xóa {deleted_count}/{total_rows}): {str(e)}"
             )
         finally:
-            if excel_app:
-                excel_app.ScreenUpdating = True
+            self.com_manager.invalidate_snapshot()
+            set_screen_updating(excel_app, True)
+
+    def merge_duplicates(
+        self,
+        duplicates: Dict[str, List[int]],
+        quantity_start_column: int = QUANTITY_START_COLUMN
+    ) -> int:
+        """
+        Cộng số lượng của các dòng trùng vào dòng xuất hiện đầu tiên rồi xóa các dòng còn lại.
+
+        Đọc khối số lượng (từ cột G tới trước cột Tot QTY) một lần qua Range.Formula,
+        ô công thức và ô text được giữ nguyên.
+        Trả về số dòng đã xóa.
+        """
+        groups = {
+            min(rows): sorted(set(rows))[1:]
+            for rows in duplicates.values()
+            if len(set(rows)) >= 2
+        }
+        if not groups:
+            return 0
+
+        worksheet = self.com_manager.worksheet
+        source_rows = [row for sources in groups.values() for row in sources]
+        top = min(groups)
+        bottom = max(source_rows)
+        _, right = get_used_range_bounds(worksheet)
+        tot_qty_column = self.com_manager._detect_tot_qty_column()
+        right = min(right, (tot_qty_column - 1) if tot_qty_column else 39)
+
+        if right >= quantity_start_column:
+            address = (
+                f"{convert_index_to_column_letter(quantity_start_column)}{top}:"
+                f"{convert_index_to_column_letter(right)}{bottom}"
+            )
+            formulas = normalize_range_values(worksheet.Range(address).Formula)
+
+            def cell(row: int, col: int):
+                row_values = formulas[row - top] if row - top < len(formulas) else ()
+                offset = col - quantity_start_column
+                return row_values[offset] if offset < len(row_values) else None
+
+            write_buffer = CellWriteBuffer()
+            for target, sources in groups.items():
+                for col in range(quantity_start_column, right + 1):
+                    target_value = cell(target, col)
+                    total = _to_number(target_value)
+                    if total is None:
+                        if target_value not in (None, ""):
+                            continue
+                        total = 0
+
+                    source_values = [_to_number(cell(row, col)) for row in sources]
+                    source_values = [value for value in source_values if value]
+                    if source_values:
+                        total += sum(source_values)
+                        write_buffer.set(target, col, int(total) if total == int(total) else total)
+
+            try:
+                merged_cells = write_buffer.flush(worksheet)
+            finally:
+                self.com_manager.invalidate_snapshot()
+            logger.info(f"Đã gộp số lượng của {len(source_rows)} dòng trùng vào {len(groups)} dòng ({merged_cells} ô)")
+
+        return self.delete_rows(source_rows)
+
+
+def _to_number(value) -> Optional[float]:
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    text = str(value).strip()
+    if not text or text.startswith("="):
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return None
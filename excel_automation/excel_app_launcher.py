@@ -0,0 +1,135 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+EXCEL_PROG_ID = "Excel.Application"
+
+
+class Win32ExcelDispatcher:
+    """Các cách lấy Excel.Application qua pywin32; tách riêng để test dùng dispatcher giả."""
+
+    def get_active(self) -> Any:
+        import win32com.client
+        return win32com.client.GetActiveObject(EXCEL_PROG_ID)
+
+    def dispatch(self) -> Any:
+        import win32com.client
+        return win32com.client.Dispatch(EXCEL_PROG_ID)
+
+    def dispatch_ex(self) -> Any:
+        import pythoncom
+        import win32com.client
+        pythoncom.CoInitialize()
+        return win32com.client.DispatchEx(EXCEL_PROG_ID)
+
+
+@dataclass
+class ExcelStartupTiming:
+    mode: str
+    attach_seconds: float
+    start_seconds: float = 0.0
+
+    @property
+    def total_seconds(self) -> float:
+        return self.attach_seconds + self.start_seconds
+
+
+class ExcelAppLauncher:
+    """
+    Lấy Excel.Application: gắn vào Excel đang chạy nếu có, nếu không thì khởi động mới.
+
+    `warm_up()` chạy trên luồng COM ngay khi mở chương trình để lúc người dùng chọn file,
+    Excel đã sẵn sàng; `acquire()` trả về instance đã khởi động sẵn (nếu còn sống);
+    `release()` tắt instance khởi động sẵn nhưng chưa được dùng khi đóng chương trình.
+    """
+
+    def __init__(self, dispatcher: Optional[Any] = None,
+                 clock: Callable[[], float] = time.perf_counter):
+        self.dispatcher = dispatcher or Win32ExcelDispatcher()
+        self.clock = clock
+        self.timing: Optional[ExcelStartupTiming] = None
+        self._warm_app: Any = None
+        self._lock = threading.Lock()
+
+    @property
+    def attached(self) -> bool:
+        return self.timing is not None and self.timing.mode == "attach"
+
+    def warm_up(self) -> Optional[ExcelStartupTiming]:
+        """Khởi động sẵn Excel; lỗi chỉ ghi log, acquire() sẽ thử lại khi mở file."""
+        with self._lock:
+            if self._warm_app is not None:
+                return self.timing
+            try:
+                self._warm_app = self._launch()
+            except Exception as e:
+                logger.warning(f"Không khởi động sẵn được Excel: {e}")
+                return None
+        return self.timing
+
+    def acquire(self) -> Any:
+        with self._lock:
+            app = self._warm_app
+            self._warm_app = None
+            if app is not None and self._is_alive(app):
+                return app
+            return self._launch()
+
+    def release(self) -> bool:
+        """Quit Excel đã khởi động sẵn mà chưa acquire(); Excel gắn vào (attach) thì chỉ bỏ tham chiếu."""
+        with self._lock:
+            app = self._warm_app
+            self._warm_app = None
+            if app is None or self.attached:
+                return False
+            try:
+                app.Quit()
+                logger.info("Đã tắt Excel khởi động sẵn chưa được dùng")
+                return True
+            except Exception as e:
+                logger.warning(f"Không tắt được Excel khởi động sẵn: {e}")
+                return False
+
+    def _launch(self) -> Any:
+        started = self.clock()
+        try:
+            app = self.dispatcher.get_active()
+        except Exception:
+            app = None
+        attach_seconds = self.clock() - started
+
+        if app is not None:
+            self.timing = ExcelStartupTiming("attach", attach_seconds)
+            logger.info(f"Đã gắn vào Excel đang chạy trong {attach_seconds:.3f}s")
+            return app
+
+        started = self.clock()
+        try:
+            app = self.dispatcher.dispatch()
+            mode = "dispatch"
+        except Exception as e:
+            logger.warning(f"Lỗi khi khởi tạo Excel.Application: {e}, thử lại...")
+            app = self.dispatcher.dispatch_ex()
+            mode = "dispatch_ex"
+        start_seconds = self.clock() - started
+
+        self.timing = ExcelStartupTiming(mode, attach_seconds, start_seconds)
+        logger.info(
+            f"Đã khởi động Excel ({mode}) trong {start_seconds:.3f}s "
+            f"(thử gắn {attach_seconds:.3f}s)"
+        )
+        return app
+
+    @staticmethod
+    def _is_alive(app: Any) -> bool:
+        try:
+            _ = app.Version
+            return True
+        except Exception:
+            logger.warning("Excel khởi động sẵn không còn phản hồi, khởi động lại")
+            return False
@@ -1,24 +1,63 @@
-from typing import List, Optional, Set
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Set, Tuple
 from pathlib import Path
 import logging
-import win32com.client
-from win32com.client import CDispatch
+
+try:
+    from win32com.client import CDispatch
+except ImportError:
+    CDispatch = Any
 
 from excel_automation.size_filter_config import SizeFilterConfig
-from excel_automation.utils import get_size_sort_key, normalize_size_value, find_last_data_row
+from excel_automation.excel_app_launcher import ExcelAppLauncher
+from excel_automation.workbook_session_cache import WorkbookSession, WorkbookSessionCache
+from excel_automation.sheet_snapshot import SheetSnapshot
+from excel_automation.sheet_layout_profile import (
+    SheetLayoutProfile,
+    get_layout_profile,
+    invalidate_layout_profile
+)
+from excel_automation.sheet_event_sink import (
+    REGION_HEADER,
+    REGION_PO_COLOR,
+    REGION_QUANTITIES,
+    REGION_SIZES
+)
+from excel_automation.com_instrumentation import ComInstrumentation
+from excel_automation.bulk_edit import bulk_edit_session, set_screen_updating
+from excel_automation.utils import (
+    get_size_sort_key,
+    normalize_size_value,
+    normalize_range_values,
+    find_last_data_row,
+    invalidate_last_row_cache,
+    group_consecutive_rows,
+    build_address_batches
+)
 
 logger = logging.getLogger(__name__)
 
 
+PATCHABLE_REGIONS = frozenset({REGION_SIZES, REGION_QUANTITIES, REGION_PO_COLOR})
+
+
 class ExcelCOMManager:
     
-    def __init__(self, config: Optional[SizeFilterConfig] = None):
+    def __init__(self, config: Optional[SizeFilterConfig] = None,
+                 launcher: Optional[ExcelAppLauncher] = None):
         self.config = config or SizeFilterConfig()
+        self.launcher = launcher or ExcelAppLauncher()
         self.excel_app: Optional[CDispatch] = None
         self.workbook: Optional[CDispatch] = None
         self.worksheet: Optional[CDispatch] = None
         self.current_file: Optional[str] = None
         self.current_sheet: Optional[str] = None
+        self._snapshot: Optional[SheetSnapshot] = None
+        self._sheet_snapshots: Dict[str, SheetSnapshot] = {}
+        self.sessions = WorkbookSessionCache(
+            self.config.get_max_open_workbooks(), self.config.get_workbook_eviction()
+        )
+        self.instrumentation: Optional[ComInstrumentation] = ComInstrumentation.from_env()
         
         logger.info("Khởi tạo ExcelCOMManager")
     
@@ -33,45 +72,66 @@ class ExcelCOMManager:
             self.excel_app = None
             self.workbook = None
             self.worksheet = None
+            self._snapshot = None
             return False
 
     def _init_excel_app(self) -> None:
         try:
-            self.excel_app = win32com.client.Dispatch("Excel.Application")
+            self.excel_app = self.launcher.acquire()
             self.excel_app.Visible = True
         except Exception as e:
-            logger.warning(f"Lỗi khi khởi tạo Excel.Application: {e}, thử lại...")
-            try:
-                import pythoncom
-                pythoncom.CoInitialize()
-                self.excel_app = win32com.client.DispatchEx("Excel.Application")
-                self.excel_app.Visible = True
-            except Exception as e2:
-                logger.error(f"Không thể khởi tạo Excel: {e2}")
-                raise RuntimeError("Không thể mở Excel. Vui lòng kiểm tra:\n- File có tồn tại không\n- Excel có đang mở file này không\n- Bạn có quyền truy cập file không")
+            logger.error(f"Không thể khởi tạo Excel: {e}")
+            raise RuntimeError("Không thể mở Excel. Vui lòng kiểm tra:\n- File có tồn tại không\n- Excel có đang mở file này không\n- Bạn có quyền truy cập file không")
+
+        if self.instrumentation is not None:
+            self.excel_app = self.instrumentation.wrap(self.excel_app)
 
         self.excel_app.DisplayAlerts = False
         logger.info("Đã khởi tạo Excel Application")
 
+    def enable_instrumentation(self, report_path: Optional[str] = None) -> ComInstrumentation:
+        """Bật đếm COM round-trip cho excel_app/workbook/worksheet hiện tại và về sau."""
+        if self.instrumentation is None:
+            self.instrumentation = ComInstrumentation(report_path)
+
+        self.excel_app = self.instrumentation.wrap(self.excel_app, "Application")
+        self.workbook = self.instrumentation.wrap(self.workbook, "Workbook")
+        self.worksheet = self.instrumentation.wrap(self.worksheet, "Worksheet")
+        return self.instrumentation
+
+    def operation(self, name: str):
+        """Context manager gom lời gọi COM vào thao tác `name` khi đang bật đếm."""
+        if self.instrumentation is None:
+            return nullcontext()
+        return self.instrumentation.operation(name)
+
+    def bulk_edit(self):
+        """Phiên ghi hàng loạt: tắt ScreenUpdating/EnableEvents, Calculation manual, lồng được."""
+        return bulk_edit_session(self.excel_app)
+
     def open_excel_file(self, file_path: str) -> None:
+        """
+        Mở workbook, hoặc chuyển ngay sang workbook đã mở trước đó (giữ nguyên snapshot).
+
+        Tối đa `max_open_workbooks` workbook được giữ mở; workbook dùng lâu nhất bị đóng.
+        """
         file_path_obj = Path(file_path)
         if not file_path_obj.exists():
             raise FileNotFoundError(f"File không tồn tại: {file_path}")
 
         try:
             if not self._is_excel_alive():
+                self.sessions.clear()
                 self._init_excel_app()
 
-            if self.workbook is not None:
-                try:
-                    self.workbook.Close(SaveChanges=False)
-                    logger.info("Đã đóng workbook cũ trước khi mở file mới")
-                except Exception:
-                    pass
-                self.workbook = None
-                self.worksheet = None
-
             abs_path = str(file_path_obj.absolute())
+            self._remember_session()
+
+            session = self.sessions.get(abs_path)
+            if session is not None:
+                self._restore_session(session, file_path)
+                return
+
             logger.info(f"Đang mở workbook: {abs_path}")
             self.workbook = self.excel_app.Workbooks.Open(abs_path)
             self.current_file = file_path
@@ -93,13 +153,39 @@ class ExcelCOMManager:
             self.workbook.Activate()
             self.worksheet.Activate()
             self.excel_app.Visible = True
+            self.sessions.put(WorkbookSession(abs_path, self.workbook, self.worksheet, self.current_sheet))
             logger.info(f"Đã mở file: {file_path}, sheet: {self.current_sheet}")
 
         except Exception as e:
             logger.error(f"Lỗi khi mở file Excel qua COM: {e}")
             self._cleanup_on_error()
             raise RuntimeError(f"Không thể mở file Excel: {str(e)}")
-    
+
+    def _remember_session(self) -> None:
+        """Cất workbook hiện tại (kèm snapshot) vào cache trước khi chuyển sang workbook khác."""
+        if self.workbook is not None and self.current_file:
+            self.sessions.put(WorkbookSession(
+                str(Path(self.current_file).absolute()),
+                self.workbook, self.worksheet, self.current_sheet, self._fresh_snapshot()
+            ))
+        self.workbook = None
+        self.worksheet = None
+        self._snapshot = None
+        self.invalidate_prefetched()
+        invalidate_last_row_cache()
+
+    def _restore_session(self, session: WorkbookSession, file_path: str) -> None:
+        self.workbook = session.workbook
+        self.worksheet = session.worksheet
+        self.current_sheet = session.current_sheet
+        self.current_file = file_path
+        self._snapshot = session.snapshot
+        session.snapshot = None
+
+        self.workbook.Activate()
+        self.worksheet.Activate()
+        logger.info(f"Đã chuyển sang workbook đang mở: {file_path}, sheet: {self.current_sheet}")
+
     def get_sheet_names(self) -> List[str]:
         if self.workbook is None:
             raise RuntimeError("Chưa mở workbook nào")
@@ -116,20 +202,141 @@ class ExcelCOMManager:
             logger.error(f"Lỗi khi lấy danh sách sheets: {e}")
             raise RuntimeError(f"Không thể lấy danh sách sheets: {str(e)}")
     
-    def switch_sheet(self, sheet_name: str) -> None:
+    def switch_sheet(self, sheet_name: str, reuse_snapshot: bool = True) -> None:
+        """
+        Chuyển sang sheet khác, dùng snapshot đọc sẵn nếu có.
+
+        reuse_snapshot=False (không có sự kiện workbook để biết sheet bị sửa ngoài chương trình)
+        thì bỏ snapshot đọc sẵn và đọc lại từ Excel.
+        """
         if self.workbook is None:
             raise RuntimeError("Chưa mở workbook nào")
         
         try:
+            previous = self._fresh_snapshot()
+            previous_sheet = self.current_sheet
+
             self.worksheet = self.workbook.Sheets(sheet_name)
             self.worksheet.Activate()
             self.current_sheet = sheet_name
-            logger.info(f"Đã chuyển sang sheet: {sheet_name}")
+            self._snapshot = None
+            invalidate_last_row_cache()
+
+            if previous is not None and previous_sheet:
+                self._sheet_snapshots[previous_sheet] = previous
+            prefetched = self._sheet_snapshots.pop(sheet_name, None)
+            if prefetched is not None and not reuse_snapshot:
+                prefetched.invalidate()
+            if prefetched is not None and not prefetched.is_stale:
+                self._snapshot = prefetched
+                logger.info(f"Đã chuyển sang sheet: {sheet_name} (dùng snapshot đọc sẵn)")
+            else:
+                logger.info(f"Đã chuyển sang sheet: {sheet_name}")
             
         except Exception as e:
             logger.error(f"Lỗi khi chuyển sheet: {e}")
             raise RuntimeError(f"Không thể chuyển sang sheet '{sheet_name}': {str(e)}")
     
+    def get_snapshot(self, refresh: bool = False) -> SheetSnapshot:
+        """Lấy snapshot khối packing list, chỉ đọc lại từ Excel khi chưa có hoặc đã bị invalidate."""
+        if self.worksheet is None:
+            raise RuntimeError("Chưa chọn worksheet nào")
+
+        if refresh or self._snapshot is None or self._snapshot.is_stale:
+            invalidate_last_row_cache()
+            self._snapshot = SheetSnapshot.capture(
+                self.worksheet,
+                size_column=self._column_letter_to_number(self.config.get_column()),
+                data_start_row=self.config.get_start_row()
+            )
+
+        return self._snapshot
+
+    def invalidate_snapshot(self) -> None:
+        if self._snapshot is not None:
+            self._snapshot.invalidate()
+        self._snapshot = None
+        invalidate_last_row_cache()
+
+    def prefetch_sheet_snapshot(self, sheet_name: str) -> bool:
+        """
+        Chụp sẵn snapshot của một sheet khác (không kích hoạt sheet) để chuyển sheet tức thì.
+
+        Bỏ qua sheet không khớp template packing list; trả về True nếu sheet đã có snapshot.
+        """
+        if self.workbook is None or sheet_name == self.current_sheet:
+            return False
+
+        cached = self._sheet_snapshots.get(sheet_name)
+        if cached is not None and not cached.is_stale:
+            return True
+
+        worksheet = self.workbook.Sheets(sheet_name)
+        if not get_layout_profile(worksheet).matches_template:
+            logger.info(f"Sheet '{sheet_name}' không khớp template, bỏ qua đọc sẵn")
+            return False
+
+        self._sheet_snapshots[sheet_name] = SheetSnapshot.capture(
+            worksheet,
+            size_column=self._column_letter_to_number(self.config.get_column()),
+            data_start_row=self.config.get_start_row()
+        )
+        return True
+
+    def apply_dirty_regions(self, sheet_name: str, regions: Set[str],
+                            areas: Optional[List[Tuple[int, int, int, int]]] = None) -> None:
+        """
+        Cập nhật snapshot của sheet vừa bị sửa ngoài chương trình theo vùng bẩn.
+
+        Sửa trong cột size, khối số lượng hoặc PO/màu chỉ đọc lại đúng các ô trong `areas`
+        và vá vào snapshot; sửa header bỏ bố cục đã nhận diện và chụp lại cả snapshot,
+        cũng như khi vùng sửa nằm ngoài khối đã chụp (thêm dòng, sửa cả cột).
+        """
+        if not regions:
+            return
+
+        patchable = bool(areas) and regions <= PATCHABLE_REGIONS
+        if sheet_name != self.current_sheet:
+            if REGION_HEADER in regions and self.workbook is not None:
+                invalidate_layout_profile(self.workbook.Sheets(sheet_name))
+            prefetched = self._sheet_snapshots.get(sheet_name)
+            if (prefetched is not None and patchable
+                    and prefetched.refresh_areas(self.workbook.Sheets(sheet_name), areas)):
+                return
+            self.invalidate_prefetched(sheet_name)
+            return
+
+        if REGION_HEADER in regions and self.worksheet is not None:
+            invalidate_layout_profile(self.worksheet)
+        snapshot = self._fresh_snapshot()
+        if snapshot is not None and patchable and snapshot.refresh_areas(self.worksheet, areas):
+            invalidate_last_row_cache()
+            logger.info(f"Sheet '{sheet_name}' bị sửa ngoài chương trình: đọc lại {len(areas)} vùng "
+                        f"({', '.join(sorted(regions))})")
+            return
+        self.invalidate_snapshot()
+        logger.info(f"Sheet '{sheet_name}' bị sửa ngoài chương trình: {', '.join(sorted(regions))}")
+
+    def invalidate_prefetched(self, sheet_name: Optional[str] = None) -> None:
+        """Bỏ snapshot đọc sẵn của sheet_name (None để bỏ của mọi sheet khác)."""
+        if sheet_name is None:
+            snapshots = list(self._sheet_snapshots.values())
+            self._sheet_snapshots.clear()
+        else:
+            snapshot = self._sheet_snapshots.pop(sheet_name, None)
+            snapshots = [snapshot] if snapshot is not None else []
+        for snapshot in snapshots:
+            snapshot.invalidate()
+
+    def cached_snapshot(self) -> Optional[SheetSnapshot]:
+        """Snapshot của sheet hiện tại nếu còn hiệu lực, không đọc Excel."""
+        return self._fresh_snapshot()
+
+    def _fresh_snapshot(self) -> Optional[SheetSnapshot]:
+        if self._snapshot is None or self._snapshot.is_stale:
+            return None
+        return self._snapshot
+
     def detect_end_row(self, reference_column: str = 'A') -> int:
         """Tự nhận diện dòng cuối cùng có dữ liệu trong worksheet."""
         if self.worksheet is None:
@@ -137,42 +344,51 @@ class ExcelCOMManager:
 
         col_num = self._column_letter_to_number(reference_column)
         start_row = self.config.get_start_row()
+
+        snapshot = self._fresh_snapshot()
+        if (snapshot is not None and snapshot.reference_column == col_num
+                and snapshot.data_start_row == start_row):
+            return snapshot.last_data_row
+
         detected = find_last_data_row(self.worksheet, col_num, start_row)
         return detected
 
     def scan_sizes(self, column: Optional[str] = None, start_row: Optional[int] = None,
-                   end_row: Optional[int] = None) -> List[str]:
+                   end_row: Optional[int] = None, repair_decimals: bool = True,
+                   use_snapshot: bool = False) -> List[str]:
+        """Quét sizes của cột size; use_snapshot=True đọc từ snapshot còn hiệu lực (vd: đọc sẵn khi chuyển sheet)."""
         if self.worksheet is None:
             raise RuntimeError("Chưa chọn worksheet nào")
 
         column = column or self.config.get_column()
         start_row = start_row or self.config.get_start_row()
         end_row = end_row or self.detect_end_row()
+        col_num = self._column_letter_to_number(column)
+        snapshot = self._fresh_snapshot() if use_snapshot else None
 
         try:
-            col_num = self._column_letter_to_number(column)
-            range_str = f"{column}{start_row}:{column}{end_row}"
-            raw_values = self.worksheet.Range(range_str).Value
-
-            if raw_values is None:
-                return []
+            if (snapshot is not None and snapshot.size_column == col_num
+                    and snapshot.data_start_row == start_row and end_row <= snapshot.last_row):
+                column_values = snapshot.column_values(col_num, start_row, end_row)
+            else:
+                range_str = f"{column}{start_row}:{column}{end_row}"
+                raw_values = self.worksheet.Range(range_str).Value
 
-            if not isinstance(raw_values, tuple):
-                raw_values = ((raw_values,),)
+                if raw_values is None:
+                    return []
 
+                column_values = [row_values[0] for row_values in normalize_range_values(raw_values)]
             sizes: Set[str] = set()
 
-            for row_offset, row_tuple in enumerate(raw_values):
-                cell_value = row_tuple[0] if isinstance(row_tuple, tuple) else row_tuple
-
+            for cell_value in column_values:
                 if cell_value is not None:
                     size_str = normalize_size_value(cell_value)
-
                     if size_str:
-                        actual_row = start_row + row_offset
-                        self._fix_decimal_cell(actual_row, col_num, cell_value, size_str)
                         sizes.add(size_str)
 
+            if repair_decimals:
+                self.repair_size_decimals(column, start_row, column_values)
+
             sorted_sizes = sorted(sizes, key=get_size_sort_key)
             logger.info(f"Quét được {len(sorted_sizes)} size khác nhau trong {column}[{start_row}:{end_row}]")
             return sorted_sizes
@@ -181,76 +397,150 @@ class ExcelCOMManager:
             logger.error(f"Lỗi khi quét sizes: {e}")
             raise RuntimeError(f"Không thể quét sizes: {str(e)}")
 
-    def _fix_decimal_cell(self, row: int, col_num: int, original_value, normalized: str) -> None:
-        """Ghi lại giá trị đã làm tròn lên vào Excel nếu cell gốc là số lẻ."""
-        try:
-            needs_fix = False
+    def repair_size_decimals(self, column: str, start_row: int, column_values: List[Any]) -> int:
+        """
+        Làm tròn lên các size lẻ (0.5, "7,5") trong cột size bằng một lần ghi Range.
+
+        `column_values` là giá trị đã đọc từ start_row; không ghi gì nếu không có ô nào cần sửa.
+        """
+        repairs: Dict[int, int] = {}
+        for offset, cell_value in enumerate(column_values):
+            if cell_value is None:
+                continue
+            rounded = self._decimal_repair_value(cell_value, normalize_size_value(cell_value))
+            if rounded is not None:
+                repairs[start_row + offset] = rounded
+
+        if not repairs:
+            return 0
+
+        first_row, last_row = min(repairs), max(repairs)
+        span_values = column_values[first_row - start_row:last_row - start_row + 1]
+        coercible_text = any(
+            isinstance(value, str) and self._looks_numeric(value)
+            for offset, value in enumerate(span_values)
+            if first_row + offset not in repairs
+        )
 
-            if isinstance(original_value, float) and original_value != int(original_value):
-                needs_fix = True
-            elif isinstance(original_value, str):
-                raw = original_value.strip()
-                check = raw.replace(',', '.') if ',' in raw and '.' not in raw else raw
-                try:
-                    num = float(check)
-                    if num != int(num):
-                        needs_fix = True
-                except (ValueError, TypeError):
-                    pass
-
-            if needs_fix:
-                rounded = int(normalized)  # "008" → 8
-                self.worksheet.Cells(row, col_num).Value = rounded
-                logger.info(
-                    f"Đã làm tròn size lẻ: {original_value} → {rounded} "
-                    f"tại cell ({row}, {col_num})"
+        try:
+            if coercible_text:
+                runs = group_consecutive_rows(repairs)
+                for run_start, run_end in runs:
+                    values = tuple((repairs[row],) for row in range(run_start, run_end + 1))
+                    self.worksheet.Range(f"{column}{run_start}:{column}{run_end}").Value = values
+                write_calls = len(runs)
+            else:
+                span = self.worksheet.Range(f"{column}{first_row}:{column}{last_row}")
+                formulas = [row_values[0] for row_values in normalize_range_values(span.Formula)]
+                span.Formula = tuple(
+                    (repairs.get(first_row + offset, formula if formula != "" else None),)
+                    for offset, formula in enumerate(formulas)
                 )
+                write_calls = 1
         except Exception as e:
-            logger.warning(f"Không thể ghi lại cell ({row}, {col_num}): {e}")
-    
+            logger.warning(f"Không thể làm tròn size lẻ trong cột {column}: {e}")
+            return 0
+        finally:
+            self.invalidate_snapshot()
+
+        for row, rounded in sorted(repairs.items()):
+            logger.info(
+                f"Đã làm tròn size lẻ: {column_values[row - start_row]} → {rounded} tại cell {column}{row}"
+            )
+        logger.info(f"Đã sửa {len(repairs)} size lẻ bằng {write_calls} lần ghi Range")
+        return len(repairs)
+
+    @staticmethod
+    def _looks_numeric(value: str) -> bool:
+        raw = value.strip()
+        check = raw.replace(',', '.') if ',' in raw and '.' not in raw else raw
+        try:
+            float(check)
+            return True
+        except ValueError:
+            return False
+
+    @staticmethod
+    def _decimal_repair_value(original_value, normalized: str) -> Optional[int]:
+        """Giá trị làm tròn cần ghi lại nếu cell gốc là số lẻ, None nếu cell không cần sửa."""
+        needs_fix = False
+
+        if isinstance(original_value, float) and original_value != int(original_value):
+            needs_fix = True
+        elif isinstance(original_value, str):
+            raw = original_value.strip()
+            check = raw.replace(',', '.') if ',' in raw and '.' not in raw else raw
+            try:
+                num = float(check)
+                if num != int(num):
+                    needs_fix = True
+            except (ValueError, TypeError, OverflowError):
+                pass
+
+        if not needs_fix or not normalized.isdigit():
+            return None
+        return int(normalized)
+
     def hide_rows_realtime(self, selected_sizes: List[str], column: Optional[str] = None,
-                          start_row: Optional[int] = None, end_row: Optional[int] = None) -> int:
+                          start_row: Optional[int] = None, end_row: Optional[int] = None,
+                          snapshot: Optional[SheetSnapshot] = None) -> int:
         if self.worksheet is None:
             raise RuntimeError("Chưa chọn worksheet nào")
         
+        snapshot = snapshot or self.get_snapshot()
         column = column or self.config.get_column()
         start_row = start_row or self.config.get_start_row()
         end_row = end_row or self.detect_end_row()
 
         try:
-            if self.excel_app:
-                self.excel_app.ScreenUpdating = False
+            set_screen_updating(self.excel_app, False)
 
             selected_set = set(selected_sizes)
-            hidden_count = 0
             col_num = self._column_letter_to_number(column)
-            
-            for row in range(start_row, end_row + 1):
-                cell_value = self.worksheet.Cells(row, col_num).Value
-                
-                if cell_value is not None:
-                    size_str = normalize_size_value(cell_value)
-                    
-                    if size_str not in selected_set:
-                        self.worksheet.Rows(row).Hidden = True
-                        hidden_count += 1
-                    else:
-                        self.worksheet.Rows(row).Hidden = False
+            column_values = self._read_column_values(snapshot, column, col_num, start_row, end_row)
+
+            rows_to_hide = []
+            rows_to_show = []
+            for offset, cell_value in enumerate(column_values):
+                row = start_row + offset
+                if cell_value is not None and normalize_size_value(cell_value) in selected_set:
+                    rows_to_show.append(row)
                 else:
-                    self.worksheet.Rows(row).Hidden = True
-                    hidden_count += 1
+                    rows_to_hide.append(row)
+
+            hide_runs = group_consecutive_rows(rows_to_hide)
+            show_runs = group_consecutive_rows(rows_to_show)
+            range_calls = self._set_rows_hidden(show_runs, False)
+            range_calls += self._set_rows_hidden(hide_runs, True)
+            hidden_count = len(rows_to_hide)
             
-            if self.excel_app:
-                self.excel_app.ScreenUpdating = True
+            set_screen_updating(self.excel_app, True)
             
-            logger.info(f"Đã ẩn {hidden_count} dòng real-time")
+            logger.info(
+                f"Đã ẩn {hidden_count} dòng real-time "
+                f"({len(hide_runs)} đoạn ẩn, {len(show_runs)} đoạn hiện, {range_calls} lần gọi Range)"
+            )
             return hidden_count
             
         except Exception as e:
-            if self.excel_app:
-                self.excel_app.ScreenUpdating = True
+            set_screen_updating(self.excel_app, True)
             logger.error(f"Lỗi khi ẩn dòng: {e}")
             raise RuntimeError(f"Không thể ẩn dòng: {str(e)}")
+
+    def _read_column_values(self, snapshot: SheetSnapshot, column: str, col_num: int,
+                            start_row: int, end_row: int) -> List:
+        if snapshot.last_row >= end_row:
+            return snapshot.column_values(col_num, start_row, end_row)
+
+        raw_values = self.worksheet.Range(f"{column}{start_row}:{column}{end_row}").Value
+        return [row_values[0] for row_values in normalize_range_values(raw_values)]
+
+    def _set_rows_hidden(self, runs: List[Tuple[int, int]], hidden: bool) -> int:
+        """Ẩn/hiện các đoạn dòng bằng địa chỉ multi-area, trả về số lần gọi Range."""
+        batches = build_address_batches(f"{first}:{last}" for first, last in runs)
+        for address in batches:
+            self.worksheet.Range(address).EntireRow.Hidden = hidden
+        return len(batches)
     
     def show_all_rows(self, start_row: Optional[int] = None, end_row: Optional[int] = None) -> None:
         if self.worksheet is None:
@@ -260,20 +550,16 @@ class ExcelCOMManager:
         end_row = end_row or self.detect_end_row()
 
         try:
-            if self.excel_app:
-                self.excel_app.ScreenUpdating = False
+            set_screen_updating(self.excel_app, False)
 
-            range_str = f"{start_row}:{end_row}"
-            self.worksheet.Range(range_str).EntireRow.Hidden = False
+            self._set_rows_hidden([(start_row, end_row)], False)
 
-            if self.excel_app:
-                self.excel_app.ScreenUpdating = True
+            set_screen_updating(self.excel_app, True)
 
             logger.info(f"Đã hiện tất cả dòng từ {start_row} đến {end_row}")
 
         except Exception as e:
-            if self.excel_app:
-                self.excel_app.ScreenUpdating = True
+            set_screen_updating(self.excel_app, True)
             logger.error(f"Lỗi khi hiện dòng: {e}")
             raise RuntimeError(f"Không thể hiện dòng: {str(e)}")
     
@@ -311,6 +597,7 @@ class ExcelCOMManager:
 
         try:
             self.workbook.Sheets(old_name).Name = new_name
+            self.invalidate_prefetched(old_name)
             if self.current_sheet == old_name:
                 self.current_sheet = new_name
             logger.info(f"Đã đổi tên sheet '{old_name}' → '{new_name}'")
@@ -323,31 +610,26 @@ class ExcelCOMManager:
         if self.worksheet is None:
             return None
 
-        try:
-            for row in range(14, 19):
-                range_str = f"A{row}:AZ{row}"
-                row_values = self.worksheet.Range(range_str).Value
-
-                if row_values is None:
-                    continue
+        snapshot = self._fresh_snapshot()
+        if snapshot is not None:
+            return snapshot.tot_qty_column
 
-                cells = row_values[0] if isinstance(row_values[0], tuple) else row_values
-
-                for col_idx, cell_value in enumerate(cells):
-                    if cell_value is not None and isinstance(cell_value, str):
-                        cell_lower = cell_value.strip().lower()
-                        if "tot qty" in cell_lower or "total qty" in cell_lower:
-                            col_number = col_idx + 1
-                            logger.info(f"Tìm thấy Tot QTY tại row {row}, col {col_number}")
-                            return col_number
-
-            logger.warning("Không tìm thấy cột Tot QTY trong row 14-18")
-            return None
+        try:
+            profile = self.get_layout_profile()
+            if profile.tot_qty_column is None:
+                logger.warning("Không tìm thấy cột Tot QTY trong row 14-18")
+            return profile.tot_qty_column
 
         except Exception as e:
             logger.warning(f"Lỗi khi detect cột Tot QTY: {e}")
             return None
 
+    def get_layout_profile(self) -> SheetLayoutProfile:
+        """Bố cục template (Tot QTY, items/box, From/To) của sheet hiện tại, dùng lại giữa các thao tác."""
+        if self.worksheet is None:
+            raise RuntimeError("Chưa chọn worksheet nào")
+        return get_layout_profile(self.worksheet)
+
     def clear_quantity_columns(self, start_row: Optional[int] = None,
                                end_row: Optional[int] = None,
                                start_col: int = 7,
@@ -363,8 +645,7 @@ class ExcelCOMManager:
             end_col = (detected - 1) if detected else 39
 
         try:
-            if self.excel_app:
-                self.excel_app.ScreenUpdating = False
+            set_screen_updating(self.excel_app, False)
 
             start_col_letter = self._number_to_column_letter(start_col)
             end_col_letter = self._number_to_column_letter(end_col)
@@ -373,16 +654,15 @@ class ExcelCOMManager:
             target_range = self.worksheet.Range(range_str)
             cleared_count = int(self.excel_app.WorksheetFunction.CountA(target_range))
             target_range.ClearContents()
+            self.invalidate_snapshot()
 
-            if self.excel_app:
-                self.excel_app.ScreenUpdating = True
+            set_screen_updating(self.excel_app, True)
 
             logger.info(f"Đã xóa {cleared_count} ô số lượng ({range_str})")
             return cleared_count
 
         except Exception as e:
-            if self.excel_app:
-                self.excel_app.ScreenUpdating = True
+            set_screen_updating(self.excel_app, True)
             logger.error(f"Lỗi khi xóa số lượng: {e}")
             raise RuntimeError(f"Không thể xóa số lượng: {str(e)}")
 
@@ -404,27 +684,39 @@ class ExcelCOMManager:
     def _cleanup_on_error(self) -> None:
         try:
             if self.workbook:
+                if self.current_file:
+                    self.sessions.remove(self.current_file)
                 self.workbook.Close(SaveChanges=False)
         except Exception:
             pass
         
         try:
-            if self.excel_app:
+            if self.excel_app and not self.launcher.attached and not len(self.sessions):
                 self.excel_app.Quit()
         except Exception:
             pass
         
         self.workbook = None
         self.worksheet = None
-        self.excel_app = None
+        if not len(self.sessions):
+            self.excel_app = None
+        self._snapshot = None
     
     def detach(self, save_changes: bool = False) -> None:
-        try:
-            if self.workbook:
-                if save_changes:
+        """Bỏ mọi tham chiếu COM (Excel vẫn mở); save_changes lưu tất cả workbook đã mở, kể cả workbook đang dùng."""
+        self.invalidate_snapshot()
+        self.invalidate_prefetched()
+        if save_changes:
+            self.sessions.save_all()
+            if self.workbook is not None and not (self.current_file and self.current_file in self.sessions):
+                try:
                     self.workbook.Save()
                     logger.info("Đã lưu workbook")
-
+                except Exception as e:
+                    logger.error(f"Không lưu được workbook đang dùng: {e}")
+        self.sessions.clear()
+        try:
+            if self.workbook:
                 self.workbook = None
                 self.worksheet = None
                 logger.info("Đã detach khỏi workbook (Excel vẫn mở)")
@@ -440,6 +732,9 @@ class ExcelCOMManager:
             self.excel_app = None
 
     def close(self, save_changes: bool = False) -> None:
+        self.invalidate_snapshot()
+        self.invalidate_prefetched()
+        self.sessions.clear()
         try:
             if self.workbook:
                 self.workbook.Close(SaveChanges=save_changes)
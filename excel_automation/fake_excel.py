@@ -0,0 +1,883 @@
+"""
+Excel COM giả lập trên openpyxl.
+
+Cung cấp FakeExcelApplication/FakeWorkbook/FakeWorksheet/FakeRange với đúng phần
+COM mà các manager đang dùng, để chạy và đo các luồng COM trên máy không có Excel.
+"""
+
+from bisect import bisect_left
+from copy import copy
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import logging
+import re
+import time
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Alignment
+
+from excel_automation.utils import (
+    convert_column_letter_to_index,
+    convert_index_to_column_letter
+)
+
+logger = logging.getLogger(__name__)
+
+
+MAX_ROWS = 1048576
+MAX_COLUMNS = 16384
+
+XL_CENTER = -4108
+XL_LEFT = -4131
+XL_RIGHT = -4152
+XL_CALCULATION_AUTOMATIC = -4105
+
+_ALIGNMENTS = {XL_CENTER: "center", XL_LEFT: "left", XL_RIGHT: "right"}
+_ALIGNMENTS_REVERSE = {value: key for key, value in _ALIGNMENTS.items()}
+
+Area = Tuple[int, int, int, int]
+
+_CELL_REF = re.compile(r"^\$?([A-Za-z]{1,3})?\$?(\d+)?$")
+
+
+class FakeComError(Exception):
+    pass
+
+
+class LatencyInjector:
+    """Giả lập chi phí cross-process: chờ `per_call_seconds` mỗi lần truy cập COM."""
+
+    def __init__(self, per_call_seconds: float = 0.0):
+        self.per_call_seconds = per_call_seconds
+
+    def __call__(self) -> None:
+        if self.per_call_seconds <= 0:
+            return
+        deadline = time.perf_counter() + self.per_call_seconds
+        while time.perf_counter() < deadline:
+            pass
+
+
+class _FakeComObject:
+    """Mỗi lần đọc/ghi thành viên viết hoa (API COM) được tính là một round-trip."""
+
+    _oleobj_ = None
+
+    def __getattribute__(self, name: str) -> Any:
+        if name[:1].isupper():
+            object.__getattribute__(self, "_app")._tick()
+        return object.__getattribute__(self, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name[:1].isupper():
+            self._app._tick()
+            prop = getattr(type(self), name, None)
+            if isinstance(prop, property):
+                prop.__set__(self, value)
+                return
+            raise FakeComError(f"Không gán được thuộc tính COM '{name}'")
+        object.__setattr__(self, name, value)
+
+
+def _to_com_value(value: Any) -> Any:
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    return value
+
+
+def _to_cell_value(value: Any) -> Tuple[Any, bool]:
+    """Chuyển giá trị ghi qua COM thành giá trị lưu trong ô, kèm cờ quotePrefix."""
+    if not isinstance(value, str):
+        return value, False
+    if value.startswith("'"):
+        return value[1:], True
+    if value.startswith("="):
+        return value, False
+    stripped = value.strip()
+    if stripped:
+        try:
+            number = float(stripped)
+            return (int(number) if number.is_integer() else number), False
+        except ValueError:
+            pass
+    return value, False
+
+
+def _format_text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def parse_address(address: str) -> List[Area]:
+    """Tách địa chỉ Excel ("A1", "A1:B2", "19:25", "F:F", "A3,A9:A12") thành các vùng."""
+    areas: List[Area] = []
+    for part in address.replace(" ", "").split(","):
+        if not part:
+            continue
+        start, _, end = part.partition(":")
+        end = end or start
+        r1, c1 = _parse_ref(start, is_end=False)
+        r2, c2 = _parse_ref(end, is_end=True)
+        areas.append((min(r1, r2), min(c1, c2), max(r1, r2), max(c1, c2)))
+    if not areas:
+        raise FakeComError(f"Địa chỉ không hợp lệ: '{address}'")
+    return areas
+
+
+def _parse_ref(ref: str, is_end: bool) -> Tuple[int, int]:
+    match = _CELL_REF.match(ref)
+    if not match or not (match.group(1) or match.group(2)):
+        raise FakeComError(f"Địa chỉ không hợp lệ: '{ref}'")
+    letters, digits = match.groups()
+    row = int(digits) if digits else (MAX_ROWS if is_end else 1)
+    col = convert_column_letter_to_index(letters) if letters else (MAX_COLUMNS if is_end else 1)
+    return row, col
+
+
+def format_address(areas: Sequence[Area]) -> str:
+    parts = []
+    for top, left, bottom, right in areas:
+        start = f"${convert_index_to_column_letter(left)}${top}"
+        if (top, left) == (bottom, right):
+            parts.append(start)
+        else:
+            parts.append(f"{start}:${convert_index_to_column_letter(right)}${bottom}")
+    return ",".join(parts)
+
+
+class FakeFont(_FakeComObject):
+
+    def __init__(self, range_obj: 'FakeRange'):
+        object.__setattr__(self, "_app", range_obj._app)
+        object.__setattr__(self, "_range", range_obj)
+
+    def _update(self, **changes) -> None:
+        for cell in self._range._iter_cells(create=True):
+            font = copy(cell.font)
+            for key, value in changes.items():
+                setattr(font, key, value)
+            cell.font = font
+
+    @property
+    def Bold(self) -> bool:
+        return bool(self._range._first_cell().font.b)
+
+    @Bold.setter
+    def Bold(self, value: bool) -> None:
+        self._update(b=bool(value))
+
+    @property
+    def Size(self) -> float:
+        return self._range._first_cell().font.sz
+
+    @Size.setter
+    def Size(self, value: float) -> None:
+        self._update(sz=value)
+
+
+class FakeRange(_FakeComObject):
+
+    def __init__(self, sheet: 'FakeWorksheet', areas: List[Area], kind: str = "cells"):
+        object.__setattr__(self, "_app", sheet._app)
+        object.__setattr__(self, "_sheet", sheet)
+        object.__setattr__(self, "_areas", list(areas))
+        object.__setattr__(self, "_kind", kind)
+
+    @property
+    def _ws(self):
+        return self._sheet._ws
+
+    def _clip(self, area: Area) -> Area:
+        top, left, bottom, right = area
+        return (top, left, min(bottom, max(self._ws.max_row, top)),
+                min(right, max(self._ws.max_column, left)))
+
+    def _iter_coords(self, clip: bool = True) -> Iterator[Tuple[int, int]]:
+        for area in self._areas:
+            top, left, bottom, right = self._clip(area) if clip else area
+            for row in range(top, bottom + 1):
+                for col in range(left, right + 1):
+                    yield row, col
+
+    def _iter_cells(self, create: bool = False):
+        for row, col in self._iter_coords():
+            cell = self._ws._cells.get((row, col))
+            if cell is None and create:
+                cell = self._ws.cell(row=row, column=col)
+            if cell is not None:
+                yield cell
+
+    def _first_cell(self):
+        top, left = self._areas[0][0], self._areas[0][1]
+        return self._ws.cell(row=top, column=left)
+
+    def _raw(self, row: int, col: int) -> Any:
+        cell = self._ws._cells.get((row, col))
+        return None if cell is None else cell.value
+
+    def _read(self, row: int, col: int) -> Any:
+        value = self._raw(row, col)
+        if isinstance(value, str) and value.startswith("="):
+            return _to_com_value(self._sheet._cached_values.get((row, col)))
+        return _to_com_value(value)
+
+    def _formula(self, row: int, col: int) -> str:
+        value = self._raw(row, col)
+        if isinstance(value, str):
+            return value
+        return _format_text(value)
+
+    def _grid(self, reader) -> Any:
+        top, left, bottom, right = self._areas[0]
+        if top == bottom and left == right:
+            return reader(top, left)
+        return tuple(
+            tuple(reader(row, col) for col in range(left, right + 1))
+            for row in range(top, bottom + 1)
+        )
+
+    def _write(self, value: Any) -> None:
+        rows = None
+        if isinstance(value, (list, tuple)):
+            rows = [list(r) if isinstance(r, (list, tuple)) else [r] for r in value]
+
+        for area in self._areas:
+            top, left, bottom, right = area
+            for row in range(top, bottom + 1):
+                for col in range(left, right + 1):
+                    if rows is None:
+                        cell_value = value
+                    else:
+                        row_values = rows[row - top] if row - top < len(rows) else None
+                        if row_values is None or col - left >= len(row_values):
+                            cell_value = "#N/A"
+                        else:
+                            cell_value = row_values[col - left]
+                    self._sheet._set_cell(row, col, cell_value)
+
+    def __call__(self, row: Union[int, str], col: Optional[int] = None) -> 'FakeRange':
+        if isinstance(row, str):
+            areas = parse_address(row)
+            if self._kind == "rows":
+                return FakeRange(self._sheet, [(t, 1, b, MAX_COLUMNS) for t, _, b, _ in areas], "rows")
+            return FakeRange(self._sheet, areas, self._kind)
+        top, left = self._areas[0][0], self._areas[0][1]
+        if self._kind == "rows" and col is None:
+            target = top + row - 1
+            return FakeRange(self._sheet, [(target, 1, target, MAX_COLUMNS)], "rows")
+        if self._kind == "columns" and col is None:
+            target = left + row - 1
+            return FakeRange(self._sheet, [(1, target, MAX_ROWS, target)], "columns")
+        col = col or 1
+        return FakeRange(self._sheet, [(top + row - 1, left + col - 1,
+                                        top + row - 1, left + col - 1)])
+
+    def Item(self, row: int, col: Optional[int] = None) -> 'FakeRange':
+        return self(row, col)
+
+    @property
+    def Value(self) -> Any:
+        return self._grid(self._read)
+
+    @Value.setter
+    def Value(self, value: Any) -> None:
+        self._write(value)
+
+    Value2 = Value
+
+    @property
+    def Formula(self) -> Any:
+        return self._grid(self._formula)
+
+    @Formula.setter
+    def Formula(self, value: Any) -> None:
+        self._write(value)
+
+    @property
+    def Text(self) -> str:
+        top, left = self._areas[0][0], self._areas[0][1]
+        return _format_text(self._read(top, left))
+
+    @property
+    def HasFormula(self) -> Optional[bool]:
+        flags = {
+            isinstance(self._raw(row, col), str) and str(self._raw(row, col)).startswith("=")
+            for row, col in self._iter_coords()
+        }
+        if flags == {True}:
+            return True
+        if flags == {False} or not flags:
+            return False
+        return None
+
+    @property
+    def Row(self) -> int:
+        return self._areas[0][0]
+
+    @property
+    def Column(self) -> int:
+        return self._areas[0][1]
+
+    @property
+    def Count(self) -> int:
+        if self._kind == "rows":
+            return sum(bottom - top + 1 for top, _, bottom, _ in self._areas)
+        if self._kind == "columns":
+            return sum(right - left + 1 for _, left, _, right in self._areas)
+        return sum((b - t + 1) * (r - l + 1) for t, l, b, r in self._areas)
+
+    @property
+    def Rows(self) -> 'FakeRange':
+        return FakeRange(self._sheet, self._areas, "rows")
+
+    @property
+    def Columns(self) -> 'FakeRange':
+        return FakeRange(self._sheet, self._areas, "columns")
+
+    @property
+    def EntireRow(self) -> 'FakeRange':
+        return FakeRange(
+            self._sheet, [(t, 1, b, MAX_COLUMNS) for t, _, b, _ in self._areas], "rows"
+        )
+
+    @property
+    def EntireColumn(self) -> 'FakeRange':
+        return FakeRange(
+            self._sheet, [(1, l, MAX_ROWS, r) for _, l, _, r in self._areas], "columns"
+        )
+
+    @property
+    def Areas(self) -> 'FakeAreas':
+        return FakeAreas(self)
+
+    @property
+    def Address(self) -> str:
+        return format_address(self._areas)
+
+    @property
+    def Worksheet(self) -> 'FakeWorksheet':
+        return self._sheet
+
+    @property
+    def Parent(self) -> 'FakeWorksheet':
+        return self._sheet
+
+    @property
+    def Application(self) -> 'FakeExcelApplication':
+        return self._app
+
+    @property
+    def Font(self) -> FakeFont:
+        return FakeFont(self)
+
+    @property
+    def HorizontalAlignment(self) -> Optional[int]:
+        return _ALIGNMENTS_REVERSE.get(self._first_cell().alignment.horizontal)
+
+    @HorizontalAlignment.setter
+    def HorizontalAlignment(self, value: int) -> None:
+        horizontal = _ALIGNMENTS.get(value)
+        for cell in self._iter_cells(create=True):
+            cell.alignment = Alignment(horizontal=horizontal)
+
+    @property
+    def Hidden(self) -> bool:
+        dimensions = self._ws.row_dimensions
+        return all(
+            dimensions[row].hidden
+            for top, _, bottom, _ in self._areas
+            for row in range(top, bottom + 1)
+        )
+
+    @Hidden.setter
+    def Hidden(self, value: bool) -> None:
+        dimensions = self._ws.row_dimensions
+        for top, _, bottom, _ in self._areas:
+            for row in range(top, bottom + 1):
+                dimensions[row].hidden = bool(value)
+
+    def ClearContents(self) -> None:
+        for row, col in list(self._iter_coords()):
+            cell = self._ws._cells.get((row, col))
+            if cell is not None:
+                cell.value = None
+                self._sheet._cached_values.pop((row, col), None)
+
+    def Clear(self) -> None:
+        self.ClearContents()
+
+    def Delete(self, Shift: Optional[int] = None) -> None:
+        full_rows = all(left == 1 and right == MAX_COLUMNS for _, left, _, right in self._areas)
+        if self._kind != "rows" and not full_rows:
+            raise FakeComError("FakeRange.Delete chỉ hỗ trợ xóa cả dòng")
+        self._sheet._delete_rows(
+            row for top, _, bottom, _ in self._areas for row in range(top, bottom + 1)
+        )
+
+    def Select(self) -> None:
+        pass
+
+    def Activate(self) -> None:
+        pass
+
+
+class FakeAreas(_FakeComObject):
+
+    def __init__(self, range_obj: FakeRange):
+        object.__setattr__(self, "_app", range_obj._app)
+        object.__setattr__(self, "_range", range_obj)
+
+    @property
+    def Count(self) -> int:
+        return len(self._range._areas)
+
+    def __call__(self, index: int) -> FakeRange:
+        return FakeRange(self._range._sheet, [self._range._areas[index - 1]])
+
+    def Item(self, index: int) -> FakeRange:
+        return self(index)
+
+
+class FakeWorksheet(_FakeComObject):
+
+    def __init__(self, workbook: 'FakeWorkbook', ws, cached_values: Optional[Dict] = None):
+        object.__setattr__(self, "_app", workbook._app)
+        object.__setattr__(self, "_workbook", workbook)
+        object.__setattr__(self, "_ws", ws)
+        object.__setattr__(self, "_cached_values", cached_values or {})
+
+    def _set_cell(self, row: int, col: int, value: Any) -> None:
+        cell_value, quote_prefix = _to_cell_value(value)
+        cell = self._ws.cell(row=row, column=col)
+        cell.value = cell_value
+        if quote_prefix or cell.quotePrefix:
+            cell.quotePrefix = quote_prefix
+        self._cached_values.pop((row, col), None)
+
+    def _delete_rows(self, rows) -> None:
+        """Xóa các dòng và dồn dữ liệu, ẩn dòng, giá trị cache lên trên trong một lượt."""
+        deleted = sorted(set(rows))
+        deleted_set = set(deleted)
+
+        def target_row(row: int) -> int:
+            return row - bisect_left(deleted, row)
+
+        first_deleted = deleted[0] if deleted else 0
+        cells = {}
+        for key, cell in self._ws._cells.items():
+            row = key[0]
+            if row < first_deleted:
+                cells[key] = cell
+                continue
+            if row in deleted_set:
+                continue
+            col = key[1]
+            target = target_row(row)
+            if target != row:
+                cell.row = target
+            cells[(target, col)] = cell
+        self._ws._cells = cells
+
+        dimensions = self._ws.row_dimensions
+        hidden_rows = [row for row, dimension in dimensions.items() if dimension.hidden]
+        for row in hidden_rows:
+            dimensions[row].hidden = False
+        for row in hidden_rows:
+            if row not in deleted_set:
+                dimensions[target_row(row)].hidden = True
+
+        object.__setattr__(self, "_cached_values", {
+            (target_row(row), col): value
+            for (row, col), value in self._cached_values.items()
+            if row not in deleted_set
+        })
+
+    @property
+    def Name(self) -> str:
+        return self._ws.title
+
+    @Name.setter
+    def Name(self, value: str) -> None:
+        if value in self._workbook._wb.sheetnames and value != self._ws.title:
+            raise FakeComError(f"Tên sheet đã tồn tại: '{value}'")
+        self._ws.title = value
+
+    @property
+    def Index(self) -> int:
+        return self._workbook._wb.worksheets.index(self._ws) + 1
+
+    @property
+    def Parent(self) -> 'FakeWorkbook':
+        return self._workbook
+
+    @property
+    def Application(self) -> 'FakeExcelApplication':
+        return self._app
+
+    def Cells(self, row: int, col: int) -> FakeRange:
+        return FakeRange(self, [(row, col, row, col)])
+
+    def Range(self, cell1: Union[str, FakeRange], cell2: Optional[FakeRange] = None) -> FakeRange:
+        if isinstance(cell1, str):
+            areas = parse_address(cell1)
+            if cell2 is None:
+                return FakeRange(self, areas)
+            cell1 = FakeRange(self, areas)
+        if cell2 is None:
+            return FakeRange(self, cell1._areas)
+        corners = cell1._areas + cell2._areas
+        return FakeRange(self, [(
+            min(a[0] for a in corners), min(a[1] for a in corners),
+            max(a[2] for a in corners), max(a[3] for a in corners)
+        )])
+
+    @property
+    def Rows(self) -> FakeRange:
+        return FakeRange(self, [(1, 1, MAX_ROWS, MAX_COLUMNS)], "rows")
+
+    @property
+    def Columns(self) -> FakeRange:
+        return FakeRange(self, [(1, 1, MAX_ROWS, MAX_COLUMNS)], "columns")
+
+    @property
+    def UsedRange(self) -> FakeRange:
+        ws = self._ws
+        return FakeRange(self, [(ws.min_row, ws.min_column, ws.max_row, ws.max_column)])
+
+    def Activate(self) -> None:
+        self._workbook._wb.active = self._ws
+
+    def Select(self) -> None:
+        self.Activate()
+
+    def Copy(self, Before: Optional['FakeWorksheet'] = None,
+             After: Optional['FakeWorksheet'] = None) -> None:
+        wb = self._workbook._wb
+        new_ws = wb.copy_worksheet(self._ws)
+        new_ws.title = self._workbook._unique_name(f"{self._ws.title} (2)")
+        for row, dimension in self._ws.row_dimensions.items():
+            new_ws.row_dimensions[row].hidden = dimension.hidden
+
+        wb._sheets.remove(new_ws)
+        if Before is not None:
+            wb._sheets.insert(wb._sheets.index(Before._ws), new_ws)
+        elif After is not None:
+            wb._sheets.insert(wb._sheets.index(After._ws) + 1, new_ws)
+        else:
+            wb._sheets.append(new_ws)
+
+        self._workbook._sheet_objects[id(new_ws)] = FakeWorksheet(
+            self._workbook, new_ws, dict(self._cached_values)
+        )
+        wb.active = new_ws
+
+    def Delete(self) -> None:
+        wb = self._workbook._wb
+        if len(wb.worksheets) == 1:
+            raise FakeComError("Không thể xóa sheet duy nhất của workbook")
+        self._workbook._sheet_objects.pop(id(self._ws), None)
+        wb.remove(self._ws)
+
+
+class FakeSheets(_FakeComObject):
+
+    def __init__(self, workbook: 'FakeWorkbook'):
+        object.__setattr__(self, "_app", workbook._app)
+        object.__setattr__(self, "_workbook", workbook)
+
+    def __call__(self, key: Union[int, str]) -> FakeWorksheet:
+        wb = self._workbook._wb
+        try:
+            ws = wb.worksheets[key - 1] if isinstance(key, int) else wb[key]
+        except (IndexError, KeyError):
+            raise FakeComError(f"Không tìm thấy sheet: {key!r}")
+        if isinstance(key, int) and key < 1:
+            raise FakeComError(f"Không tìm thấy sheet: {key!r}")
+        return self._workbook._wrap_sheet(ws)
+
+    def Item(self, key: Union[int, str]) -> FakeWorksheet:
+        return self(key)
+
+    def __iter__(self) -> Iterator[FakeWorksheet]:
+        return iter([self._workbook._wrap_sheet(ws) for ws in self._workbook._wb.worksheets])
+
+    def __len__(self) -> int:
+        return len(self._workbook._wb.worksheets)
+
+    @property
+    def Count(self) -> int:
+        return len(self._workbook._wb.worksheets)
+
+    def Add(self, Before: Optional[FakeWorksheet] = None,
+            After: Optional[FakeWorksheet] = None) -> FakeWorksheet:
+        wb = self._workbook._wb
+        if After is not None:
+            index = wb.worksheets.index(After._ws) + 1
+        elif Before is not None:
+            index = wb.worksheets.index(Before._ws)
+        else:
+            index = wb.worksheets.index(wb.active)
+
+        number = 1
+        while f"Sheet{number}" in wb.sheetnames:
+            number += 1
+        ws = wb.create_sheet(f"Sheet{number}", index)
+        wb.active = ws
+        return self._workbook._wrap_sheet(ws)
+
+
+class FakeWorkbook(_FakeComObject):
+
+    def __init__(self, app: 'FakeExcelApplication', wb: Workbook, path: Optional[str] = None,
+                 name: Optional[str] = None, cached_values: Optional[Dict] = None):
+        object.__setattr__(self, "_app", app)
+        object.__setattr__(self, "_wb", wb)
+        object.__setattr__(self, "_path", path)
+        object.__setattr__(self, "_name", name or (Path(path).name if path else "Book1"))
+        object.__setattr__(self, "_sheet_objects", {})
+        object.__setattr__(self, "_initial_cached_values", cached_values or {})
+        object.__setattr__(self, "_saved", True)
+        object.__setattr__(self, "_closed", False)
+
+    def _wrap_sheet(self, ws) -> FakeWorksheet:
+        sheet = self._sheet_objects.get(id(ws))
+        if sheet is None:
+            sheet = FakeWorksheet(self, ws, self._initial_cached_values.get(ws.title, {}))
+            self._sheet_objects[id(ws)] = sheet
+        return sheet
+
+    def _unique_name(self, name: str) -> str:
+        candidate = name
+        counter = 2
+        base = name.rsplit(" (", 1)[0]
+        while candidate in self._wb.sheetnames:
+            counter += 1
+            candidate = f"{base} ({counter})"
+        return candidate
+
+    @property
+    def Name(self) -> str:
+        if self._closed:
+            raise FakeComError("Workbook đã bị đóng")
+        return self._name
+
+    @property
+    def Saved(self) -> bool:
+        return self._saved
+
+    @Saved.setter
+    def Saved(self, value: bool) -> None:
+        object.__setattr__(self, "_saved", bool(value))
+
+    @property
+    def FullName(self) -> str:
+        return str(Path(self._path).absolute()) if self._path else self._name
+
+    @property
+    def Path(self) -> str:
+        return str(Path(self._path).absolute().parent) if self._path else ""
+
+    @property
+    def Sheets(self) -> FakeSheets:
+        return FakeSheets(self)
+
+    Worksheets = Sheets
+
+    @property
+    def ActiveSheet(self) -> FakeWorksheet:
+        return self._wrap_sheet(self._wb.active)
+
+    @property
+    def Application(self) -> 'FakeExcelApplication':
+        return self._app
+
+    def Activate(self) -> None:
+        object.__setattr__(self._app, "_active_workbook", self)
+
+    def Save(self) -> None:
+        if not self._path:
+            raise FakeComError("Workbook chưa có đường dẫn, dùng SaveAs")
+        self._wb.save(self._path)
+        object.__setattr__(self, "_saved", True)
+
+    def SaveAs(self, Filename: str, *args, **kwargs) -> None:
+        object.__setattr__(self, "_path", str(Filename))
+        object.__setattr__(self, "_name", Path(Filename).name)
+        self._wb.save(str(Filename))
+        object.__setattr__(self, "_saved", True)
+
+    def Close(self, SaveChanges: bool = False) -> None:
+        if SaveChanges and self._path:
+            self._wb.save(self._path)
+        object.__setattr__(self, "_closed", True)
+        self._app._close_workbook(self)
+
+
+class FakeWorkbooks(_FakeComObject):
+
+    def __init__(self, app: 'FakeExcelApplication'):
+        object.__setattr__(self, "_app", app)
+
+    def Open(self, Filename: str, *args, **kwargs) -> FakeWorkbook:
+        path = Path(Filename)
+        if not path.exists():
+            raise FakeComError(f"Không tìm thấy file: {Filename}")
+
+        wb = load_workbook(str(path))
+        cached_values: Dict[str, Dict[Tuple[int, int], Any]] = {}
+        try:
+            values_wb = load_workbook(str(path), data_only=True)
+            for ws in wb.worksheets:
+                values_ws = values_wb[ws.title]
+                cached_values[ws.title] = {
+                    key: values_ws._cells[key].value if key in values_ws._cells else None
+                    for key, cell in ws._cells.items()
+                    if isinstance(cell.value, str) and cell.value.startswith("=")
+                }
+        except Exception as e:
+            logger.warning(f"Không đọc được giá trị cache của công thức: {e}")
+
+        return self._app.add_openpyxl_workbook(wb, str(path), cached_values=cached_values)
+
+    def Add(self) -> FakeWorkbook:
+        number = len(self._app._workbooks) + 1
+        return self._app.add_openpyxl_workbook(Workbook(), name=f"Book{number}")
+
+    def __call__(self, key: Union[int, str]) -> FakeWorkbook:
+        for index, workbook in enumerate(self._app._workbooks, start=1):
+            if key == index or key == workbook._name:
+                return workbook
+        raise FakeComError(f"Không tìm thấy workbook: {key!r}")
+
+    def Item(self, key: Union[int, str]) -> FakeWorkbook:
+        return self(key)
+
+    def __iter__(self) -> Iterator[FakeWorkbook]:
+        return iter(list(self._app._workbooks))
+
+    @property
+    def Count(self) -> int:
+        return len(self._app._workbooks)
+
+
+class FakeWorksheetFunction(_FakeComObject):
+
+    def __init__(self, app: 'FakeExcelApplication'):
+        object.__setattr__(self, "_app", app)
+
+    def CountA(self, *ranges: FakeRange) -> float:
+        count = 0
+        for range_obj in ranges:
+            for row, col in range_obj._iter_coords():
+                value = range_obj._raw(row, col)
+                if value is not None and value != "":
+                    count += 1
+        return float(count)
+
+
+class FakeExcelApplication(_FakeComObject):
+    """Thay thế win32com.client.Dispatch("Excel.Application") trong test và benchmark."""
+
+    def __init__(self, latency: Optional[LatencyInjector] = None):
+        object.__setattr__(self, "_app", self)
+        object.__setattr__(self, "_latency", latency or LatencyInjector())
+        object.__setattr__(self, "_workbooks", [])
+        object.__setattr__(self, "_active_workbook", None)
+        object.__setattr__(self, "call_count", 0)
+        object.__setattr__(self, "_state", {
+            "Visible": False,
+            "DisplayAlerts": True,
+            "ScreenUpdating": True,
+            "EnableEvents": True,
+            "Calculation": XL_CALCULATION_AUTOMATIC,
+        })
+        object.__setattr__(self, "is_running", True)
+
+    def _tick(self) -> None:
+        if not object.__getattribute__(self, "is_running"):
+            raise FakeComError("Excel Application đã thoát")
+        object.__setattr__(self, "call_count", object.__getattribute__(self, "call_count") + 1)
+        object.__getattribute__(self, "_latency")()
+
+    def reset_call_count(self) -> None:
+        object.__setattr__(self, "call_count", 0)
+
+    def add_openpyxl_workbook(self, wb: Workbook, path: Optional[str] = None,
+                              name: Optional[str] = None,
+                              cached_values: Optional[Dict] = None) -> FakeWorkbook:
+        """Đưa một workbook openpyxl có sẵn vào ứng dụng giả (không tính round-trip)."""
+        workbook = FakeWorkbook(self, wb, path, name, cached_values)
+        self._workbooks.append(workbook)
+        object.__setattr__(self, "_active_workbook", workbook)
+        return workbook
+
+    def _close_workbook(self, workbook: FakeWorkbook) -> None:
+        if workbook in self._workbooks:
+            self._workbooks.remove(workbook)
+        if self._active_workbook is workbook:
+            object.__setattr__(
+                self, "_active_workbook", self._workbooks[-1] if self._workbooks else None
+            )
+
+    def _get_state(name: str):
+        def getter(self):
+            return self._state[name]
+
+        def setter(self, value):
+            self._state[name] = value
+
+        return property(getter, setter)
+
+    Visible = _get_state("Visible")
+    DisplayAlerts = _get_state("DisplayAlerts")
+    ScreenUpdating = _get_state("ScreenUpdating")
+    EnableEvents = _get_state("EnableEvents")
+    Calculation = _get_state("Calculation")
+    del _get_state
+
+    @property
+    def Version(self) -> str:
+        return "16.0"
+
+    @property
+    def Workbooks(self) -> FakeWorkbooks:
+        return FakeWorkbooks(self)
+
+    @property
+    def ActiveWorkbook(self) -> Optional[FakeWorkbook]:
+        return self._active_workbook
+
+    @property
+    def ActiveSheet(self) -> Optional[FakeWorksheet]:
+        if self._active_workbook is None:
+            return None
+        return self._active_workbook._wrap_sheet(self._active_workbook._wb.active)
+
+    @property
+    def WorksheetFunction(self) -> FakeWorksheetFunction:
+        return FakeWorksheetFunction(self)
+
+    def Union(self, *ranges: FakeRange) -> FakeRange:
+        ranges = [r for r in ranges if r is not None]
+        if not ranges:
+            raise FakeComError("Union cần ít nhất một range")
+        sheet = ranges[0]._sheet
+        if any(r._sheet is not sheet for r in ranges):
+            raise FakeComError("Union chỉ hỗ trợ range cùng một sheet")
+        areas: List[Area] = []
+        for range_obj in ranges:
+            areas.extend(range_obj._areas)
+        return FakeRange(sheet, areas)
+
+    def Calculate(self) -> None:
+        pass
+
+    def Quit(self) -> None:
+        self._workbooks.clear()
+        object.__setattr__(self, "_active_workbook", None)
+        object.__setattr__(self, "is_running", False)
@@ -0,0 +1,157 @@
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from excel_automation.sheet_snapshot import SheetSnapshot
+from excel_automation.cell_write_buffer import CellWriteBuffer
+from excel_automation.carton_allocation_calculator import AllocationResult
+from excel_automation.po_update_manager import POUpdateManager
+from excel_automation.color_code_update_manager import ColorCodeUpdateManager
+from excel_automation.size_quantity_display_manager import SizeQuantityDisplayManager
+from excel_automation.utils import normalize_range_values, convert_index_to_column_letter
+from excel_automation.com_retry import call_with_retry
+
+logger = logging.getLogger(__name__)
+
+
+class ImportTransaction:
+    """
+    Ghi kết quả import PDF (PO, Color, số lượng, From/To Ctn, ẩn dòng) dựa trên một lần đọc sheet.
+
+    `begin()` chụp snapshot một lần; các bước `stage_*` chỉ tính trong bộ nhớ vào một
+    CellWriteBuffer; `commit()` ghi tất cả bằng vài lệnh Range, ma trận số lượng ghi một
+    khối qua Range.Formula để giữ nguyên các ô công thức xen giữa. Mỗi bước có thể chạy lại
+    độc lập để progress dialog retry từ bước bị lỗi.
+    """
+
+    QUANTITY_START_COLUMN = 7
+
+    def __init__(self, com_manager):
+        self.com_manager = com_manager
+        self.config = com_manager.config
+        self.write_buffer = CellWriteBuffer()
+        self.snapshot: Optional[SheetSnapshot] = None
+
+    @property
+    def end_row(self) -> int:
+        return self._require_snapshot().last_data_row
+
+    def _require_snapshot(self) -> SheetSnapshot:
+        if self.snapshot is None:
+            raise RuntimeError("Chưa bắt đầu transaction import (thiếu begin())")
+        return self.snapshot
+
+    def begin(self) -> SheetSnapshot:
+        self.write_buffer.clear()
+        self.snapshot = self.com_manager.get_snapshot(refresh=True)
+        logger.info(f"Bắt đầu transaction import: dòng {self.config.get_start_row()}-{self.end_row}")
+        return self.snapshot
+
+    def stage_po(self, po: str) -> int:
+        return POUpdateManager(self.config).stage_po(self.write_buffer, po, self.end_row)
+
+    def stage_color(self, color: str) -> int:
+        return ColorCodeUpdateManager(self.config).stage_color_code(self.write_buffer, color, self.end_row)
+
+    def stage_quantities(
+        self,
+        selected_sizes: List[str],
+        size_quantities: Dict[str, int],
+        allocation_result: Optional[AllocationResult] = None
+    ) -> int:
+        size_rows = self._require_snapshot().size_rows
+        display_manager = SizeQuantityDisplayManager(self.config)
+
+        if allocation_result:
+            written_count, _ = display_manager.stage_allocated_quantities(
+                self.write_buffer, size_rows, allocation_result, selected_sizes
+            )
+            return written_count
+
+        return display_manager.stage_quantities(
+            self.write_buffer, size_rows, selected_sizes, size_quantities, {}
+        )
+
+    def commit(self) -> int:
+        worksheet = self.com_manager.worksheet
+        try:
+            written = self._write_quantity_matrix(worksheet)
+            written += self.write_buffer.flush(worksheet)
+        finally:
+            self.com_manager.invalidate_snapshot()
+
+        logger.info(f"Transaction import đã ghi {written} ô")
+        return written
+
+    def apply_hidden_rows(self, selected_sizes: List[str]) -> int:
+        return self.com_manager.hide_rows_realtime(
+            selected_sizes,
+            end_row=self.end_row,
+            snapshot=self._require_snapshot()
+        )
+
+    def _write_quantity_matrix(self, worksheet) -> int:
+        snapshot = self._require_snapshot()
+        cells = self.write_buffer.take(
+            (snapshot.data_start_row, self.QUANTITY_START_COLUMN, self.end_row, snapshot.column_count)
+        )
+        if len(cells) < 2:
+            self._restage(cells)
+            return 0
+
+        top = min(row for row, _ in cells)
+        bottom = max(row for row, _ in cells)
+        left = min(col for _, col in cells)
+        right = max(col for _, col in cells)
+        address = (
+            f"{convert_index_to_column_letter(left)}{top}:"
+            f"{convert_index_to_column_letter(right)}{bottom}"
+        )
+
+        formulas = normalize_range_values(
+            call_with_retry(lambda: worksheet.Range(address).Formula, description=f"đọc ma trận {address}")
+        )
+        matrix = self._merge_matrix(cells, formulas, (top, left, bottom, right))
+        if matrix is None:
+            logger.info(f"Ma trận số lượng {address} có ô text, ghi theo từng khối")
+            self._restage(cells)
+            return 0
+
+        call_with_retry(self._write_matrix, worksheet, address, matrix, description=f"ghi ma trận {address}")
+        logger.info(f"Đã ghi ma trận số lượng {address} ({len(cells)} ô) bằng một lần ghi Range")
+        return len(cells)
+
+    @staticmethod
+    def _write_matrix(worksheet, address: str, matrix: Tuple[Tuple[Any, ...], ...]) -> None:
+        worksheet.Range(address).Formula = matrix
+
+    def _merge_matrix(
+        self,
+        cells: Dict[Tuple[int, int], Any],
+        formulas: Tuple[Tuple[Any, ...], ...],
+        block: Tuple[int, int, int, int]
+    ) -> Optional[Tuple[Tuple[Any, ...], ...]]:
+        top, left, bottom, right = block
+        rows = []
+
+        for row in range(top, bottom + 1):
+            row_formulas = formulas[row - top] if row - top < len(formulas) else ()
+            values = []
+            for col in range(left, right + 1):
+                if (row, col) in cells:
+                    values.append(cells[(row, col)])
+                    continue
+
+                existing = row_formulas[col - left] if col - left < len(row_formulas) else None
+                if existing in (None, ""):
+                    values.append(None)
+                elif str(existing).startswith("=") or not isinstance(self.snapshot.value(row, col), str):
+                    values.append(existing)
+                else:
+                    return None
+            rows.append(tuple(values))
+
+        return tuple(rows)
+
+    def _restage(self, cells: Dict[Tuple[int, int], Any]) -> None:
+        for (row, col), value in cells.items():
+            self.write_buffer.set(row, col, value)
@@ -2,7 +2,14 @@ import re
 from typing import Tuple, Optional
 import logging
 
-from excel_automation.utils import find_last_data_row
+from excel_automation.sheet_snapshot import SheetSnapshot
+from excel_automation.cell_write_buffer import CellWriteBuffer
+from excel_automation.utils import (
+    find_last_data_row,
+    invalidate_last_row_cache,
+    normalize_range_values,
+    convert_index_to_column_letter
+)
 
 logger = logging.getLogger(__name__)
 
@@ -22,12 +29,20 @@ class POUpdateManager:
         end_row = self._find_last_data_row(worksheet, column)
         return (start_row, end_row)
     
-    def get_current_po(self, worksheet, column: str = 'A') -> str:
+    def get_current_po(
+        self,
+        worksheet,
+        column: str = 'A',
+        snapshot: Optional[SheetSnapshot] = None
+    ) -> str:
         start_row = 19
         col_num = self._column_to_number(column)
 
         try:
-            cell_value = worksheet.Cells(start_row, col_num).Value
+            if snapshot is not None and not snapshot.is_stale:
+                cell_value = snapshot.value(start_row, col_num)
+            else:
+                cell_value = worksheet.Cells(start_row, col_num).Value
             if cell_value is not None:
                 value_str = str(cell_value)
                 if value_str.endswith('.0'):
@@ -38,25 +53,75 @@ class POUpdateManager:
             logger.error(f"Lỗi khi đọc PO: {e}")
             return ""
     
-    def update_po_bulk(self, worksheet, new_po: str, column: str = 'A') -> int:
+    def update_po_bulk(self, worksheet, new_po: str, column: str = 'A', dry_run: bool = False) -> int:
+        """
+        Ghi PO cho toàn bộ cột dữ liệu bằng một lần gán Range; bỏ qua nếu cột đã đúng PO.
+
+        Với dry_run=True chỉ đọc cột và trả về số dòng sẽ thay đổi.
+        """
         start_row = 19
         end_row = self._find_last_data_row(worksheet, column)
         col_num = self._column_to_number(column)
-        
-        updated_count = 0
-        
+        updated_count = max(end_row - start_row + 1, 0)
+
         try:
-            for row in range(start_row, end_row + 1):
-                worksheet.Cells(row, col_num).Value = new_po
-                updated_count += 1
-            
-            logger.info(f"Đã cập nhật {updated_count} dòng PO thành '{new_po}'")
+            changed_count = self.count_changed_rows(worksheet, new_po, start_row, end_row, col_num)
+
+            if dry_run:
+                logger.info(f"[Dry-run] {changed_count}/{updated_count} dòng PO sẽ đổi thành '{new_po}'")
+                return changed_count
+
+            if changed_count == 0:
+                logger.info(f"Cột PO đã là '{new_po}', bỏ qua ghi {updated_count} dòng")
+                return updated_count
+
+            write_buffer = CellWriteBuffer()
+            self.stage_po(write_buffer, new_po, end_row, column)
+            try:
+                write_buffer.flush(worksheet)
+            finally:
+                invalidate_last_row_cache(worksheet)
+
+            logger.info(f"Đã cập nhật {updated_count} dòng PO thành '{new_po}' ({changed_count} dòng thay đổi)")
             return updated_count
-            
+
         except Exception as e:
             logger.error(f"Lỗi khi cập nhật PO: {e}")
             raise RuntimeError(f"Không thể cập nhật PO: {str(e)}")
-    
+
+    def count_changed_rows(self, worksheet, new_po: str, start_row: int, end_row: int, col_num: int) -> int:
+        if end_row < start_row:
+            return 0
+
+        col_letter = convert_index_to_column_letter(col_num)
+        raw_values = worksheet.Range(f"{col_letter}{start_row}:{col_letter}{end_row}").Value
+        target = self._normalize_po(new_po)
+
+        return sum(
+            1 for row_values in normalize_range_values(raw_values)
+            if self._normalize_po(row_values[0]) != target
+        )
+
+    @staticmethod
+    def _normalize_po(value) -> str:
+        if value is None:
+            return ""
+        value_str = str(value).strip()
+        if value_str.endswith('.0'):
+            return value_str[:-2]
+        return value_str
+
+    def stage_po(self, write_buffer: CellWriteBuffer, new_po: str, end_row: int,
+                 column: str = 'A') -> int:
+        """Đưa PO mới của các dòng 19..end_row vào write_buffer, trả về số dòng."""
+        start_row = 19
+        col_num = self._column_to_number(column)
+
+        for row in range(start_row, end_row + 1):
+            write_buffer.set(row, col_num, new_po)
+
+        return max(end_row - start_row + 1, 0)
+
     def validate_po(self, po_value: str) -> Tuple[bool, str]:
         if not po_value or not po_value.strip():
             return False, "Giá trị không được để trống"
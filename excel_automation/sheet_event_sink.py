@@ -0,0 +1,192 @@
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import logging
+import re
+import threading
+
+from excel_automation.utils import convert_column_letter_to_index
+
+logger = logging.getLogger(__name__)
+
+
+REGION_HEADER = "header"
+REGION_SIZES = "sizes"
+REGION_QUANTITIES = "quantities"
+REGION_PO_COLOR = "po_color"
+
+MAX_ROWS = 1048576
+MAX_COLUMNS = 16384
+
+Area = Tuple[int, int, int, int]
+ChangeCallback = Callable[[str, str], None]
+ActivateCallback = Callable[[str], None]
+
+_AREA_PATTERN = re.compile(
+    r"^\$?([A-Z]+)?\$?(\d+)?(?::\$?([A-Z]+)?\$?(\d+)?)?$"
+)
+
+
+class SheetEventSource(ABC):
+    """Nguồn sự kiện SheetChange/SheetActivate của một workbook."""
+
+    @abstractmethod
+    def subscribe(self, on_change: ChangeCallback, on_activate: ActivateCallback) -> None:
+        pass
+
+    @abstractmethod
+    def unsubscribe(self) -> None:
+        pass
+
+    def pump(self) -> None:
+        """Xử lý các sự kiện đang chờ; nguồn COM cần pump message trên luồng COM."""
+
+
+class Win32WorkbookEventSource(SheetEventSource):
+
+    def __init__(self, workbook):
+        self.workbook = workbook
+        self._events = None
+
+    def subscribe(self, on_change: ChangeCallback, on_activate: ActivateCallback) -> None:
+        import win32com.client
+
+        class WorkbookEvents:
+            def OnSheetChange(self, sheet, target):
+                on_change(str(sheet.Name), str(target.Address))
+
+            def OnSheetActivate(self, sheet):
+                on_activate(str(sheet.Name))
+
+        self._events = win32com.client.WithEvents(self.workbook, WorkbookEvents)
+
+    def unsubscribe(self) -> None:
+        if self._events is not None:
+            try:
+                self._events.close()
+            except Exception:
+                pass
+            self._events = None
+
+    def pump(self) -> None:
+        import pythoncom
+        pythoncom.PumpWaitingMessages()
+
+
+def parse_area(address: str) -> Optional[Tuple[int, int, int, int]]:
+    """Địa chỉ "$F$19:$F$25", "$19:$25", "$F:$F" → (top, left, bottom, right); None nếu không đọc được."""
+    match = _AREA_PATTERN.match(address.strip().upper())
+    if not match or not any(match.groups()):
+        return None
+
+    col1, row1, col2, row2 = match.groups()
+    if col2 is None and row2 is None:
+        col2, row2 = col1, row1
+
+    top = int(row1) if row1 else 1
+    bottom = int(row2) if row2 else MAX_ROWS
+    left = convert_column_letter_to_index(col1) if col1 else 1
+    right = convert_column_letter_to_index(col2) if col2 else MAX_COLUMNS
+    return min(top, bottom), min(left, right), max(top, bottom), max(left, right)
+
+
+class SheetEventSink:
+    """
+    Gom sự kiện sửa sheet thành các vùng bẩn (header, cột size, khối số lượng, PO/màu) theo từng sheet.
+
+    Sự kiện đến trên luồng COM (trong `pump()`); `take_changes()` lấy và xóa các vùng đã ghi nhận,
+    kèm các ô (top, left, bottom, right) đã đổi để chỉ đọc lại đúng chỗ đó.
+    """
+
+    HEADER_ROWS = (14, 18)
+    PO_COLOR_COLUMNS = (1, 5)
+
+    def __init__(self, source: SheetEventSource, size_column: int = 6, data_start_row: int = 19,
+                 quantity_start_column: int = 7):
+        self.source = source
+        self.size_column = size_column
+        self.data_start_row = data_start_row
+        self.quantity_start_column = quantity_start_column
+        self.active = False
+        self.activated_sheet: Optional[str] = None
+        self._dirty: Dict[str, Set[str]] = {}
+        self._areas: Dict[str, List[Area]] = {}
+        self._lock = threading.Lock()
+
+    def start(self) -> bool:
+        try:
+            self.source.subscribe(self._on_change, self._on_activate)
+        except Exception as e:
+            logger.warning(f"Không đăng ký được sự kiện workbook, dùng poll: {e}")
+            self.active = False
+            return False
+        self.active = True
+        logger.info("Đã đăng ký sự kiện SheetChange/SheetActivate")
+        return True
+
+    def stop(self) -> None:
+        if self.active:
+            self.source.unsubscribe()
+        self.active = False
+        with self._lock:
+            self._dirty.clear()
+            self._areas.clear()
+
+    def pump(self) -> None:
+        if self.active:
+            self.source.pump()
+
+    def take_dirty(self, sheet_name: str) -> Set[str]:
+        return self.take_changes(sheet_name)[0]
+
+    def take_changes(self, sheet_name: str) -> Tuple[Set[str], List[Area]]:
+        with self._lock:
+            return self._dirty.pop(sheet_name, set()), self._areas.pop(sheet_name, [])
+
+    def take_activated(self) -> Optional[str]:
+        with self._lock:
+            sheet_name, self.activated_sheet = self.activated_sheet, None
+        return sheet_name
+
+    def dirty_sheets(self) -> List[str]:
+        with self._lock:
+            return [name for name, regions in self._dirty.items() if regions]
+
+    def classify(self, address: str) -> Set[str]:
+        regions: Set[str] = set()
+        for part in address.split(","):
+            area = parse_area(part)
+            if area is None:
+                logger.debug(f"Không đọc được địa chỉ sự kiện: {part}")
+                continue
+
+            top, left, bottom, right = area
+            if top <= self.HEADER_ROWS[1] and bottom >= self.HEADER_ROWS[0]:
+                regions.add(REGION_HEADER)
+            if bottom < self.data_start_row:
+                continue
+            if left <= self.size_column <= right:
+                regions.add(REGION_SIZES)
+            if any(left <= col <= right for col in self.PO_COLOR_COLUMNS):
+                regions.add(REGION_PO_COLOR)
+            if right >= self.quantity_start_column:
+                regions.add(REGION_QUANTITIES)
+        return regions
+
+    def _on_change(self, sheet_name: str, address: str) -> None:
+        regions: Set[str] = set()
+        areas: List[Area] = []
+        for part in address.split(","):
+            part_regions = self.classify(part)
+            if part_regions:
+                regions.update(part_regions)
+                areas.append(parse_area(part))
+        if not regions:
+            return
+        with self._lock:
+            self._dirty.setdefault(sheet_name, set()).update(regions)
+            self._areas.setdefault(sheet_name, []).extend(areas)
+        logger.debug(f"Sheet '{sheet_name}' đổi {address}: {sorted(regions)}")
+
+    def _on_activate(self, sheet_name: str) -> None:
+        with self._lock:
+            self.activated_sheet = sheet_name
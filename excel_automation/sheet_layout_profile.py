@@ -0,0 +1,209 @@
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import logging
+import re
+
+from excel_automation.utils import (
+    get_used_range_bounds,
+    normalize_range_values,
+    convert_index_to_column_letter
+)
+
+logger = logging.getLogger(__name__)
+
+
+class SheetLayoutProfile:
+    """
+    Bố cục template của một sheet packing list: cột Tot QTY, số chia ở G18,
+    dòng From/To Ctn. Nhận diện từ một lần đọc khối header (dòng 14-18).
+    """
+
+    HEADER_START_ROW = 14
+    HEADER_END_ROW = 18
+    MIN_SCAN_COLUMN = 52
+    DIVISOR_CELL = (18, 7)
+    DEFAULT_BOX_ROWS = (15, 16)
+
+    def __init__(
+        self,
+        workbook_name: str,
+        sheet_name: str,
+        formulas: Tuple[Tuple[Any, ...], ...],
+        last_column: int
+    ):
+        self.workbook_name = workbook_name
+        self.sheet_name = sheet_name
+        self.formulas = formulas
+        self.last_column = last_column
+        self.header_last_column = max((len(row) for row in formulas), default=0)
+        self.fingerprint = self.compute_fingerprint(formulas)
+
+        self.tot_qty_column = self._find_tot_qty_column()
+        self.tot_qty_rows = self._find_tot_qty_rows()
+        self.items_per_box = self._parse_divisor()
+        self.box_start_row, self.box_end_row = self._find_box_rows()
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return self.workbook_name, self.sheet_name
+
+    @property
+    def matches_template(self) -> bool:
+        """Sheet có nhãn Tot QTY hoặc công thức số chia ở G18 như template packing list."""
+        return self.tot_qty_column is not None or self.items_per_box is not None
+
+    @classmethod
+    def header_address(cls, last_column: int) -> str:
+        right = max(cls.MIN_SCAN_COLUMN, last_column)
+        return (
+            f"A{cls.HEADER_START_ROW}:"
+            f"{convert_index_to_column_letter(right)}{cls.HEADER_END_ROW}"
+        )
+
+    @classmethod
+    def detect(cls, worksheet, key: Optional[Tuple[str, str]] = None) -> 'SheetLayoutProfile':
+        _, used_right = get_used_range_bounds(worksheet)
+        formulas = normalize_range_values(worksheet.Range(cls.header_address(used_right)).Formula)
+        workbook_name, sheet_name = key or sheet_key(worksheet)
+
+        profile = cls(workbook_name, sheet_name, formulas, used_right)
+        logger.info(
+            f"Nhận diện bố cục sheet '{sheet_name}': Tot QTY cột {profile.tot_qty_column}, "
+            f"items/box {profile.items_per_box}, From/To dòng {profile.box_start_row}/{profile.box_end_row}"
+        )
+        return profile
+
+    @staticmethod
+    def compute_fingerprint(formulas: Tuple[Tuple[Any, ...], ...]) -> str:
+        """Băm nhãn và công thức của header; bỏ qua hằng số (số thùng From/To thay đổi thường xuyên)."""
+        digest = hashlib.sha1()
+        for row_offset, row_values in enumerate(formulas):
+            for col_offset, cell in enumerate(row_values):
+                if cell is None or cell == "" or _is_number(cell):
+                    continue
+                digest.update(f"{row_offset}:{col_offset}={cell}\x1f".encode("utf-8"))
+        return digest.hexdigest()
+
+    def cell(self, row: int, col: int) -> Any:
+        row_idx = row - self.HEADER_START_ROW
+        if row_idx < 0 or row_idx >= len(self.formulas):
+            return None
+        row_values = self.formulas[row_idx]
+        if col < 1 or col > len(row_values):
+            return None
+        return row_values[col - 1]
+
+    def read_total_qty(self, worksheet) -> Optional[int]:
+        """Đọc giá trị Tot QTY ở ô cuối của dòng nhãn 15/16 (chỉ đọc ô, không quét lại header)."""
+        for row in self.tot_qty_rows:
+            total_value = worksheet.Cells(row, self.last_column).Value
+            if total_value is None:
+                continue
+            try:
+                total_qty = int(total_value)
+                logger.info(f"Đọc được Tot QTY từ hàng {row}: {total_qty}")
+                return total_qty
+            except (ValueError, TypeError):
+                logger.warning(f"Giá trị Tot QTY không hợp lệ ở hàng {row}: {total_value}")
+
+        logger.warning("Không tìm thấy Tot QTY trong hàng 15/16")
+        return None
+
+    def _find_tot_qty_column(self) -> Optional[int]:
+        max_col = min(self.header_last_column, self.MIN_SCAN_COLUMN)
+        for row in range(self.HEADER_START_ROW, self.HEADER_END_ROW + 1):
+            for col in range(1, max_col + 1):
+                cell_value = self.cell(row, col)
+                if isinstance(cell_value, str):
+                    cell_lower = cell_value.strip().lower()
+                    if "tot qty" in cell_lower or "total qty" in cell_lower:
+                        return col
+        return None
+
+    def _find_tot_qty_rows(self) -> List[int]:
+        rows = []
+        for row in (15, 16):
+            for col in range(1, self.last_column + 1):
+                cell_value = self.cell(row, col)
+                if isinstance(cell_value, str) and ("Tot QTY" in cell_value or "Total QTY" in cell_value):
+                    rows.append(row)
+                    break
+        return rows
+
+    def _parse_divisor(self) -> Optional[int]:
+        formula = self.cell(*self.DIVISOR_CELL)
+        if not formula or not isinstance(formula, str):
+            return None
+        match = re.search(r'/\s*(\d+)\s*$', formula)
+        return int(match.group(1)) if match else None
+
+    def _find_box_rows(self) -> Tuple[int, int]:
+        start_row, end_row = self.DEFAULT_BOX_ROWS
+        for row in range(self.HEADER_START_ROW, self.HEADER_END_ROW + 1):
+            for col in range(1, self.header_last_column + 1):
+                label = self.cell(row, col)
+                if not isinstance(label, str) or "ctn" not in label.lower():
+                    continue
+                label = label.strip().lower()
+                if label.startswith("from"):
+                    start_row = row
+                elif label.startswith("to"):
+                    end_row = row
+        return start_row, end_row
+
+
+def _is_number(value: Any) -> bool:
+    if isinstance(value, (int, float)):
+        return True
+    try:
+        float(str(value))
+        return True
+    except ValueError:
+        return False
+
+
+def sheet_key(worksheet) -> Tuple[str, str]:
+    try:
+        return str(worksheet.Parent.Name), str(worksheet.Name)
+    except Exception:
+        return "", str(id(worksheet))
+
+
+_profile_cache: Dict[Tuple[str, str], SheetLayoutProfile] = {}
+
+
+def get_layout_profile(worksheet) -> SheetLayoutProfile:
+    """
+    Lấy bố cục đã nhận diện của worksheet, khóa theo (workbook, sheet) và dấu vân tay header.
+
+    Mỗi lần gọi chỉ đọc lại công thức khối header một lần để so dấu vân tay;
+    nhận diện lại toàn bộ khi header đổi.
+    """
+    key = sheet_key(worksheet)
+    cached = _profile_cache.get(key)
+
+    if cached is not None:
+        try:
+            formulas = normalize_range_values(
+                worksheet.Range(SheetLayoutProfile.header_address(cached.last_column)).Formula
+            )
+            if SheetLayoutProfile.compute_fingerprint(formulas) == cached.fingerprint:
+                return cached
+            logger.info(f"Header sheet '{key[1]}' đã thay đổi, nhận diện lại bố cục")
+        except Exception as e:
+            logger.warning(f"Không đọc được header để kiểm tra bố cục: {e}")
+
+    profile = SheetLayoutProfile.detect(worksheet, key)
+    _profile_cache[key] = profile
+    return profile
+
+
+def invalidate_layout_profile(worksheet=None, workbook_name: Optional[str] = None) -> None:
+    """Xóa bố cục đã ghi nhớ của worksheet, hoặc mọi sheet của workbook_name (không truyền gì để xóa toàn bộ)."""
+    if workbook_name is not None:
+        for key in [key for key in _profile_cache if key[0] == workbook_name]:
+            del _profile_cache[key]
+    elif worksheet is None:
+        _profile_cache.clear()
+    else:
+        _profile_cache.pop(sheet_key(worksheet), None)
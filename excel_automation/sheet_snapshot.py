@@ -0,0 +1,171 @@
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from excel_automation.utils import (
+    normalize_size_value,
+    normalize_range_values,
+    convert_index_to_column_letter,
+    get_used_range_bounds
+)
+
+logger = logging.getLogger(__name__)
+
+
+class SheetSnapshot:
+
+    HEADER_START_ROW = 14
+    HEADER_END_ROW = 18
+    MIN_SCAN_COLUMN = 52
+    MAX_REFRESH_AREAS = 8
+
+    def __init__(
+        self,
+        values: Tuple[Tuple[Any, ...], ...],
+        first_row: int = HEADER_START_ROW,
+        size_column: int = 6,
+        data_start_row: int = 19,
+        reference_column: int = 1
+    ):
+        self.values = values
+        self.first_row = first_row
+        self.last_row = first_row + len(values) - 1
+        self.column_count = max((len(row) for row in values), default=0)
+        self.size_column = size_column
+        self.data_start_row = data_start_row
+        self.reference_column = reference_column
+        self.is_stale = False
+        self._build_indexes()
+
+    def _build_indexes(self) -> None:
+        self.last_data_row = self._find_last_data_row()
+        self.size_rows = self.get_size_row_mapping(
+            self.size_column, self.data_start_row, self.last_data_row
+        )
+        self.tot_qty_column = self._find_tot_qty_column()
+
+    @classmethod
+    def capture(
+        cls,
+        worksheet,
+        size_column: int = 6,
+        data_start_row: int = 19,
+        end_row: Optional[int] = None,
+        reference_column: int = 1
+    ) -> 'SheetSnapshot':
+        used_bottom, used_right = get_used_range_bounds(worksheet)
+
+        bottom_row = max(end_row or used_bottom, data_start_row)
+        right_col = max(cls.MIN_SCAN_COLUMN, used_right)
+
+        address = (
+            f"A{cls.HEADER_START_ROW}:"
+            f"{convert_index_to_column_letter(right_col)}{bottom_row}"
+        )
+        values = normalize_range_values(worksheet.Range(address).Value2)
+
+        snapshot = cls(
+            values,
+            first_row=cls.HEADER_START_ROW,
+            size_column=size_column,
+            data_start_row=data_start_row,
+            reference_column=reference_column
+        )
+        logger.info(
+            f"Đã chụp snapshot {address}: {len(snapshot.size_rows)} sizes, "
+            f"dòng cuối {snapshot.last_data_row}"
+        )
+        return snapshot
+
+    def invalidate(self) -> None:
+        self.is_stale = True
+
+    def refresh_areas(self, worksheet, areas: List[Tuple[int, int, int, int]]) -> bool:
+        """
+        Đọc lại chỉ các vùng vừa bị sửa (top, left, bottom, right) và vá vào snapshot.
+
+        Trả về False (snapshot giữ nguyên) nếu vùng vượt ra ngoài khối đã chụp, vd: thêm dòng,
+        sửa cả cột/cả dòng; khi đó cần chụp lại toàn bộ.
+        """
+        if self.is_stale or not areas or len(areas) > self.MAX_REFRESH_AREAS:
+            return False
+
+        clipped = []
+        for top, left, bottom, right in areas:
+            top = max(top, self.first_row)
+            if bottom < top:
+                continue
+            if bottom > self.last_row or right > self.column_count:
+                return False
+            clipped.append((top, left, bottom, right))
+
+        rows = [list(row) + [None] * (self.column_count - len(row)) for row in self.values]
+        for top, left, bottom, right in clipped:
+            address = (
+                f"{convert_index_to_column_letter(left)}{top}:"
+                f"{convert_index_to_column_letter(right)}{bottom}"
+            )
+            block = normalize_range_values(worksheet.Range(address).Value2)
+            for row_offset, block_row in enumerate(block):
+                target = rows[top - self.first_row + row_offset]
+                target[left - 1:left - 1 + len(block_row)] = block_row
+
+        self.values = tuple(tuple(row) for row in rows)
+        self._build_indexes()
+        return True
+
+    def value(self, row: int, col: int) -> Any:
+        row_idx = row - self.first_row
+        col_idx = col - 1
+        if row_idx < 0 or row_idx >= len(self.values):
+            return None
+        row_values = self.values[row_idx]
+        if col_idx < 0 or col_idx >= len(row_values):
+            return None
+        return row_values[col_idx]
+
+    def row_values(self, row: int, start_col: int, end_col: int) -> List[Any]:
+        return [self.value(row, col) for col in range(start_col, end_col + 1)]
+
+    def column_values(self, col: int, start_row: int, end_row: int) -> List[Any]:
+        return [self.value(row, col) for row in range(start_row, end_row + 1)]
+
+    def get_size_row_mapping(
+        self,
+        col: int,
+        start_row: int,
+        end_row: int
+    ) -> Dict[str, List[int]]:
+        size_rows: Dict[str, List[int]] = {}
+
+        for offset, cell_value in enumerate(self.column_values(col, start_row, end_row)):
+            if cell_value is None:
+                continue
+
+            size_str = normalize_size_value(cell_value)
+            if size_str:
+                size_rows.setdefault(size_str, []).append(start_row + offset)
+
+        return size_rows
+
+    def _find_last_data_row(self) -> int:
+        row = self.data_start_row
+        while row <= self.last_row:
+            cell_value = self.value(row, self.reference_column)
+            if cell_value is None or str(cell_value).strip() == "":
+                break
+            row += 1
+
+        return max(row - 1, self.data_start_row)
+
+    def _find_tot_qty_column(self) -> Optional[int]:
+        max_col = min(self.column_count, self.MIN_SCAN_COLUMN)
+
+        for row in range(self.HEADER_START_ROW, self.HEADER_END_ROW + 1):
+            for col in range(1, max_col + 1):
+                cell_value = self.value(row, col)
+                if isinstance(cell_value, str):
+                    cell_lower = cell_value.strip().lower()
+                    if "tot qty" in cell_lower or "total qty" in cell_lower:
+                        return col
+
+        return None
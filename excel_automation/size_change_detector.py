@@ -0,0 +1,81 @@
+from typing import Any, List, Optional
+import logging
+
+from excel_automation.utils import (
+    get_used_range_bounds,
+    normalize_range_values,
+    convert_column_letter_to_index
+)
+from excel_automation.sheet_snapshot import SheetSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+class SizeChangeDetector:
+    """
+    Phát hiện thay đổi ở cột size bằng dấu vân tay của một lần đọc Range.
+
+    Chu kỳ poll giãn dần khi sheet không đổi và thu ngắn lại ngay sau khi có thay đổi.
+    """
+
+    def __init__(self, base_interval: int = 3000, min_interval: int = 1500,
+                 max_interval: int = 15000, backoff_factor: float = 1.5):
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.interval = base_interval
+        self._fingerprint: Optional[int] = None
+
+    def reset(self) -> None:
+        self._fingerprint = None
+        self.interval = self.base_interval
+
+    def read_fingerprint(self, worksheet: Any, column: str, start_row: int) -> int:
+        bottom, _ = get_used_range_bounds(worksheet)
+        if bottom < start_row:
+            return self._fingerprint_of(column, start_row, [])
+
+        values = normalize_range_values(worksheet.Range(f"{column}{start_row}:{column}{bottom}").Value2)
+        return self._fingerprint_of(column, start_row, [row[0] if row else None for row in values])
+
+    def snapshot_fingerprint(self, snapshot: SheetSnapshot, column: str, start_row: int) -> Optional[int]:
+        """Dấu vân tay cột size lấy từ snapshot; None nếu snapshot không chụp đúng cột/dòng bắt đầu."""
+        if snapshot.size_column != convert_column_letter_to_index(column) or snapshot.data_start_row != start_row:
+            return None
+        return self._fingerprint_of(
+            column, start_row, snapshot.column_values(snapshot.size_column, start_row, snapshot.last_row)
+        )
+
+    def prime(self, worksheet: Any, column: str, start_row: int,
+              snapshot: Optional[SheetSnapshot] = None) -> None:
+        """
+        Ghi nhận trạng thái hiện tại làm mốc, dùng ngay sau khi vừa quét sizes.
+
+        Có snapshot (dữ liệu vừa hiển thị) thì lấy mốc từ snapshot, để sửa đổi xảy ra sau
+        lúc chụp vẫn bị phát hiện ở lần poll kế tiếp.
+        """
+        fingerprint = self.snapshot_fingerprint(snapshot, column, start_row) if snapshot is not None else None
+        self._fingerprint = (
+            fingerprint if fingerprint is not None else self.read_fingerprint(worksheet, column, start_row)
+        )
+        self.interval = self.base_interval
+
+    @staticmethod
+    def _fingerprint_of(column: str, start_row: int, values: List[Any]) -> int:
+        end = len(values)
+        while end and values[end - 1] in (None, ""):
+            end -= 1
+        return hash((column, start_row, tuple(values[:end])))
+
+    def has_changed(self, worksheet: Any, column: str, start_row: int) -> bool:
+        fingerprint = self.read_fingerprint(worksheet, column, start_row)
+        changed = fingerprint != self._fingerprint
+        self._fingerprint = fingerprint
+
+        if changed:
+            self.interval = self.min_interval
+            logger.debug(f"Cột size thay đổi, poll lại sau {self.interval}ms")
+        else:
+            self.interval = min(self.max_interval, int(self.interval * self.backoff_factor))
+        return changed
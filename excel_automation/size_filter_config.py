@@ -15,7 +15,9 @@ class SizeFilterConfig:
             "column": "F",
             "start_row": 19,
             "end_row": 59,
-            "sheet_name": "Sheet1"
+            "sheet_name": "Sheet1",
+            "max_open_workbooks": 3,
+            "workbook_eviction": "prompt"
         }
     }
 
@@ -66,6 +68,12 @@ class SizeFilterConfig:
     
     def get_sheet_name(self) -> str:
         return self.config['size_filter_config'].get('sheet_name', 'Sheet1')
+
+    def get_max_open_workbooks(self) -> int:
+        return self.config['size_filter_config'].get('max_open_workbooks', 3)
+
+    def get_workbook_eviction(self) -> str:
+        return self.config['size_filter_config'].get('workbook_eviction', 'prompt')
     
     def set_column(self, column: str) -> None:
         if not column or len(column) > 3:
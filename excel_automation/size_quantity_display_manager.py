@@ -1,10 +1,22 @@
-from typing import Dict, List, Optional, Tuple
-from win32com.client import CDispatch
+from typing import Any, Dict, List, Optional, Tuple
 import logging
 
+try:
+    from win32com.client import CDispatch
+except ImportError:
+    CDispatch = Any
+
 from excel_automation.size_filter_config import SizeFilterConfig
 from excel_automation.carton_allocation_calculator import AllocationResult
-from excel_automation.utils import get_size_sort_key, normalize_size_value, find_last_data_row
+from excel_automation.sheet_snapshot import SheetSnapshot
+from excel_automation.cell_write_buffer import CellWriteBuffer
+from excel_automation.bulk_edit import set_screen_updating
+from excel_automation.utils import (
+    get_size_sort_key,
+    normalize_size_value,
+    find_last_data_row,
+    invalidate_last_row_cache
+)
 
 logger = logging.getLogger(__name__)
 
@@ -14,20 +26,37 @@ class SizeQuantityDisplayManager:
     def __init__(self, config: SizeFilterConfig):
         self.config = config
     
-    def _detect_end_row(self, worksheet: CDispatch, reference_column: str = 'A') -> int:
+    def _detect_end_row(
+        self,
+        worksheet: CDispatch,
+        reference_column: str = 'A',
+        snapshot: Optional[SheetSnapshot] = None
+    ) -> int:
         """Tự nhận diện dòng cuối cùng có dữ liệu."""
         col_num = self._column_letter_to_number(reference_column)
         start_row = self.config.get_start_row()
+        if self._is_usable(snapshot) and snapshot.reference_column == col_num:
+            return snapshot.last_data_row
         return find_last_data_row(worksheet, col_num, start_row)
 
+    def _is_usable(self, snapshot: Optional[SheetSnapshot]) -> bool:
+        return snapshot is not None and not snapshot.is_stale
+
     def _get_size_row_mapping(
         self,
         worksheet: CDispatch,
         column: str,
         start_row: int,
-        end_row: int
+        end_row: int,
+        snapshot: Optional[SheetSnapshot] = None
     ) -> Dict[str, List[int]]:
         col_num = self._column_letter_to_number(column)
+
+        if self._is_usable(snapshot):
+            size_rows = snapshot.get_size_row_mapping(col_num, start_row, end_row)
+            logger.info(f"Đã map {len(size_rows)} sizes với các dòng tương ứng (snapshot)")
+            return size_rows
+
         size_rows: Dict[str, List[int]] = {}
         
         for row in range(start_row, end_row + 1):
@@ -53,47 +82,34 @@ class SizeQuantityDisplayManager:
         current_quantities: Dict[str, Optional[int]],
         size_column: str,
         start_row: Optional[int] = None,
-        end_row: Optional[int] = None
+        end_row: Optional[int] = None,
+        snapshot: Optional[SheetSnapshot] = None
     ) -> int:
         start_row = start_row or self.config.get_start_row()
-        end_row = end_row or self._detect_end_row(worksheet)
+        end_row = end_row or self._detect_end_row(worksheet, snapshot=snapshot)
 
         size_row_mapping = self._get_size_row_mapping(
             worksheet,
             size_column,
             start_row,
-            end_row
+            end_row,
+            snapshot
         )
 
-        written_count = 0
+        write_buffer = CellWriteBuffer()
 
         try:
-            excel_app.ScreenUpdating = False
-
-            for position, size in enumerate(selected_sizes, start=1):
-                column_number = 6 + position
-
-                if size not in size_row_mapping:
-                    logger.warning(f"Size {size} không tìm thấy trong mapping")
-                    continue
-
-                row_number = size_row_mapping[size][0]
+            set_screen_updating(excel_app, False)
+
+            written_count = self.stage_quantities(
+                write_buffer,
+                size_row_mapping,
+                selected_sizes,
+                size_quantities,
+                current_quantities
+            )
 
-                if size in size_quantities:
-                    quantity = size_quantities[size]
-
-                    if quantity is not None:
-                        worksheet.Cells(row_number, column_number).Value = quantity
-                        logger.info(
-                            f"Đã ghi size {size}: {quantity} thùng vào cell "
-                            f"({row_number}, {column_number})"
-                        )
-                        written_count += 1
-                    elif size in current_quantities and current_quantities[size] is not None:
-                        worksheet.Cells(row_number, column_number).Value = None
-                        logger.info(
-                            f"Đã xóa size {size} tại cell ({row_number}, {column_number})"
-                        )
+            write_buffer.flush(worksheet)
 
             logger.info(f"Đã ghi {written_count} cells thành công")
             return written_count
@@ -102,7 +118,48 @@ class SizeQuantityDisplayManager:
             logger.error(f"Lỗi khi ghi số lượng vào Excel: {e}", exc_info=True)
             raise
         finally:
-            excel_app.ScreenUpdating = True
+            if snapshot is not None:
+                snapshot.invalidate()
+            invalidate_last_row_cache(worksheet)
+            set_screen_updating(excel_app, True)
+    
+    def stage_quantities(
+        self,
+        write_buffer: CellWriteBuffer,
+        size_row_mapping: Dict[str, List[int]],
+        selected_sizes: List[str],
+        size_quantities: Dict[str, Optional[int]],
+        current_quantities: Dict[str, Optional[int]]
+    ) -> int:
+        """Đưa số lượng từng size vào write_buffer (cột 6 + vị trí size), trả về số ô được ghi."""
+        written_count = 0
+
+        for position, size in enumerate(selected_sizes, start=1):
+            column_number = 6 + position
+
+            if size not in size_row_mapping:
+                logger.warning(f"Size {size} không tìm thấy trong mapping")
+                continue
+
+            row_number = size_row_mapping[size][0]
+
+            if size in size_quantities:
+                quantity = size_quantities[size]
+
+                if quantity is not None:
+                    write_buffer.set(row_number, column_number, quantity)
+                    logger.info(
+                        f"Đã ghi size {size}: {quantity} thùng vào cell "
+                        f"({row_number}, {column_number})"
+                    )
+                    written_count += 1
+                elif size in current_quantities and current_quantities[size] is not None:
+                    write_buffer.set(row_number, column_number, None)
+                    logger.info(
+                        f"Đã xóa size {size} tại cell ({row_number}, {column_number})"
+                    )
+
+        return written_count
     
     def get_current_quantities(
         self,
@@ -110,17 +167,20 @@ class SizeQuantityDisplayManager:
         selected_sizes: List[str],
         size_column: str,
         start_row: Optional[int] = None,
-        end_row: Optional[int] = None
+        end_row: Optional[int] = None,
+        snapshot: Optional[SheetSnapshot] = None
     ) -> Dict[str, Optional[int]]:
         start_row = start_row or self.config.get_start_row()
-        end_row = end_row or self._detect_end_row(worksheet)
+        end_row = end_row or self._detect_end_row(worksheet, snapshot=snapshot)
 
         size_row_mapping = self._get_size_row_mapping(
             worksheet,
             size_column,
             start_row,
-            end_row
+            end_row,
+            snapshot
         )
+        use_snapshot = self._is_usable(snapshot)
 
         current_quantities: Dict[str, Optional[int]] = {}
 
@@ -131,7 +191,10 @@ class SizeQuantityDisplayManager:
                 row_number = size_row_mapping[size][0]
 
                 try:
-                    cell_value = worksheet.Cells(row_number, column_number).Value
+                    if use_snapshot:
+                        cell_value = snapshot.value(row_number, column_number)
+                    else:
+                        cell_value = worksheet.Cells(row_number, column_number).Value
 
                     if cell_value is not None:
                         try:
@@ -169,15 +232,6 @@ class SizeQuantityDisplayManager:
             result = result * 26 + (ord(char) - ord('A') + 1)
         return result
 
-    def _has_formula(self, worksheet: CDispatch, row: int, column: int) -> bool:
-        try:
-            cell = worksheet.Cells(row, column)
-            if cell.HasFormula:
-                return True
-            return False
-        except Exception:
-            return False
-
     def write_allocated_quantities_to_excel(
         self,
         excel_app: CDispatch,
@@ -188,18 +242,64 @@ class SizeQuantityDisplayManager:
         start_row: Optional[int] = None,
         end_row: Optional[int] = None,
         box_start_row: int = 15,
-        box_end_row: int = 16
+        box_end_row: int = 16,
+        snapshot: Optional[SheetSnapshot] = None
     ) -> Tuple[int, int]:
         start_row = start_row or self.config.get_start_row()
-        end_row = end_row or self._detect_end_row(worksheet)
+        end_row = end_row or self._detect_end_row(worksheet, snapshot=snapshot)
 
         size_row_mapping = self._get_size_row_mapping(
             worksheet,
             size_column,
             start_row,
-            end_row
+            end_row,
+            snapshot
         )
 
+        write_buffer = CellWriteBuffer()
+
+        try:
+            set_screen_updating(excel_app, False)
+
+            written_count, columns_used = self.stage_allocated_quantities(
+                write_buffer,
+                size_row_mapping,
+                allocation_result,
+                selected_sizes,
+                box_start_row,
+                box_end_row
+            )
+
+            write_buffer.flush(worksheet)
+
+            for row, column in write_buffer.skipped_formula_cells:
+                logger.info(f"Bo qua ghi dong {row} cot {column} vi co cong thuc")
+
+            logger.info(
+                f"Da ghi {written_count} cells, {columns_used} cot, "
+                f"tong {allocation_result.total_boxes} thung"
+            )
+            return written_count, columns_used
+
+        except Exception as e:
+            logger.error(f"Loi khi ghi so luong vao Excel: {e}", exc_info=True)
+            raise
+        finally:
+            if snapshot is not None:
+                snapshot.invalidate()
+            invalidate_last_row_cache(worksheet)
+            set_screen_updating(excel_app, True)
+
+    def stage_allocated_quantities(
+        self,
+        write_buffer: CellWriteBuffer,
+        size_row_mapping: Dict[str, List[int]],
+        allocation_result: AllocationResult,
+        selected_sizes: List[str],
+        box_start_row: int = 15,
+        box_end_row: int = 16
+    ) -> Tuple[int, int]:
+        """Đưa số lượng đã phân bổ và From/To Ctn vào write_buffer, trả về (số ô, số cột)."""
         sorted_sizes = sorted(selected_sizes, key=get_size_sort_key)
 
         column_assignments: List[Dict] = []
@@ -249,71 +349,36 @@ class SizeQuantityDisplayManager:
         written_count = 0
         columns_used = 0
 
-        try:
-            excel_app.ScreenUpdating = False
+        processed_columns = set()
 
-            processed_columns = set()
+        for assignment in column_assignments:
+            size = assignment['size']
+            column_number = assignment['column']
+            quantity = assignment['quantity']
+            box_start = assignment['box_start']
+            box_end = assignment['box_end']
 
-            for assignment in column_assignments:
-                size = assignment['size']
-                column_number = assignment['column']
-                quantity = assignment['quantity']
-                box_start = assignment['box_start']
-                box_end = assignment['box_end']
+            if size not in size_row_mapping:
+                logger.warning(f"Size {size} khong tim thay trong mapping")
+                continue
 
-                if size not in size_row_mapping:
-                    logger.warning(f"Size {size} khong tim thay trong mapping")
-                    continue
+            row_number = size_row_mapping[size][0]
 
-                row_number = size_row_mapping[size][0]
+            write_buffer.set(row_number, column_number, quantity)
+            logger.info(
+                f"Da ghi size {size}: {quantity} pcs vao cell "
+                f"({row_number}, {column_number})"
+            )
+            written_count += 1
 
-                worksheet.Cells(row_number, column_number).Value = quantity
+            if column_number not in processed_columns:
+                write_buffer.set(box_start_row, column_number, box_start, skip_if_formula=True)
+                write_buffer.set(box_end_row, column_number, box_end, skip_if_formula=True)
                 logger.info(
-                    f"Da ghi size {size}: {quantity} pcs vao cell "
-                    f"({row_number}, {column_number})"
+                    f"Da ghi From/To Ctn: {box_start}-{box_end} vao cot {column_number}"
                 )
-                written_count += 1
-
-                if column_number not in processed_columns:
-                    start_has_formula = self._has_formula(
-                        worksheet, box_start_row, column_number
-                    )
-                    end_has_formula = self._has_formula(
-                        worksheet, box_end_row, column_number
-                    )
-
-                    if not start_has_formula:
-                        worksheet.Cells(box_start_row, column_number).Value = box_start
-                    else:
-                        logger.info(
-                            f"Bo qua ghi dong {box_start_row} cot {column_number} "
-                            f"vi co cong thuc"
-                        )
-
-                    if not end_has_formula:
-                        worksheet.Cells(box_end_row, column_number).Value = box_end
-                    else:
-                        logger.info(
-                            f"Bo qua ghi dong {box_end_row} cot {column_number} "
-                            f"vi co cong thuc"
-                        )
-
-                    if not start_has_formula or not end_has_formula:
-                        logger.info(
-                            f"Da ghi From/To Ctn: {box_start}-{box_end} vao cot {column_number}"
-                        )
 
-                    processed_columns.add(column_number)
-                    columns_used += 1
+                processed_columns.add(column_number)
+                columns_used += 1
 
-            logger.info(
-                f"Da ghi {written_count} cells, {columns_used} cot, "
-                f"tong {allocation_result.total_boxes} thung"
-            )
-            return written_count, columns_used
-
-        except Exception as e:
-            logger.error(f"Loi khi ghi so luong vao Excel: {e}", exc_info=True)
-            raise
-        finally:
-            excel_app.ScreenUpdating = True
+        return written_count, columns_used
@@ -6,11 +6,13 @@ import os
 import shutil
 from pathlib import Path
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+EXCEL_ADDRESS_MAX_LENGTH = 255
+
 
 def setup_logging(
     log_file: Optional[str] = None,
@@ -41,10 +43,47 @@ def setup_logging(
     logger.info("Logging đã được cấu hình")
 
 
+_last_row_cache: Dict[int, Tuple[Any, Dict[Tuple[int, int], int]]] = {}
+
+
+def get_used_range_bounds(worksheet) -> Tuple[int, int]:
+    """
+    Lấy dòng cuối và cột cuối của UsedRange.
+
+    Args:
+        worksheet: COM worksheet object
+
+    Returns:
+        (dòng cuối, cột cuối), hoặc (0, 0) nếu không đọc được
+    """
+    try:
+        used_range = worksheet.UsedRange
+        bottom = used_range.Row + used_range.Rows.Count - 1
+        right = used_range.Column + used_range.Columns.Count - 1
+        return int(bottom), int(right)
+    except Exception as e:
+        logger.warning(f"Không đọc được UsedRange, dùng giới hạn mặc định: {e}")
+        return 0, 0
+
+
+def invalidate_last_row_cache(worksheet=None) -> None:
+    """
+    Xóa kết quả dòng cuối đã ghi nhớ, gọi sau mỗi lần ghi vào worksheet.
+
+    Args:
+        worksheet: COM worksheet object, None để xóa toàn bộ
+    """
+    if worksheet is None:
+        _last_row_cache.clear()
+    else:
+        _last_row_cache.pop(id(worksheet), None)
+
+
 def find_last_data_row(worksheet, col_num: int, start_row: int = 19, max_scan: int = 10000) -> int:
     """
     Tìm dòng cuối cùng có dữ liệu trong worksheet (COM automation).
-    Quét từ start_row xuống cho đến khi gặp ô trống.
+    Đọc một lần cả cửa sổ cột từ start_row đến cuối UsedRange rồi tìm ô trống đầu tiên.
+    Kết quả được ghi nhớ theo worksheet cho đến khi invalidate_last_row_cache được gọi.
 
     Args:
         worksheet: COM worksheet object
@@ -55,15 +94,37 @@ def find_last_data_row(worksheet, col_num: int, start_row: int = 19, max_scan: i
     Returns:
         Số dòng cuối cùng có dữ liệu, hoặc start_row nếu không tìm thấy
     """
+    cached = _last_row_cache.get(id(worksheet))
+    if cached is not None and cached[0] is worksheet and (col_num, start_row) in cached[1]:
+        return cached[1][(col_num, start_row)]
+
+    result = _scan_last_data_row(worksheet, col_num, start_row, max_scan)
+
+    if cached is None or cached[0] is not worksheet:
+        cached = (worksheet, {})
+        _last_row_cache[id(worksheet)] = cached
+    cached[1][(col_num, start_row)] = result
+    return result
+
+
+def _scan_last_data_row(worksheet, col_num: int, start_row: int, max_scan: int) -> int:
+    used_bottom, _ = get_used_range_bounds(worksheet)
+    window_end = start_row + max_scan
+    if used_bottom > 0:
+        window_end = min(used_bottom, window_end)
+
     row = start_row
-    while row <= start_row + max_scan:
+    if window_end >= start_row:
+        column = convert_index_to_column_letter(col_num)
         try:
-            cell_value = worksheet.Cells(row, col_num).Value
-            if cell_value is None or str(cell_value).strip() == "":
-                break
-            row += 1
-        except Exception:
-            break
+            raw_values = worksheet.Range(f"{column}{start_row}:{column}{window_end}").Value
+            for row_values in normalize_range_values(raw_values):
+                cell_value = row_values[0]
+                if cell_value is None or str(cell_value).strip() == "":
+                    break
+                row += 1
+        except Exception as e:
+            logger.warning(f"Không đọc được cột {column} để tìm dòng cuối: {e}")
 
     result = row - 1
     if result < start_row:
@@ -74,6 +135,78 @@ def find_last_data_row(worksheet, col_num: int, start_row: int = 19, max_scan: i
     return result
 
 
+def normalize_range_values(raw_values) -> Tuple[Tuple[Any, ...], ...]:
+    """
+    Chuẩn hóa kết quả Range.Value/Value2 của COM thành tuple 2 chiều.
+
+    COM trả về giá trị đơn (không phải tuple) khi range chỉ có 1 ô.
+
+    Args:
+        raw_values: Giá trị đọc từ Range.Value hoặc Range.Value2
+
+    Returns:
+        Tuple các dòng, mỗi dòng là tuple giá trị theo cột
+    """
+    if raw_values is None:
+        return ((None,),)
+
+    if not isinstance(raw_values, tuple):
+        return ((raw_values,),)
+
+    return tuple(
+        row if isinstance(row, tuple) else (row,)
+        for row in raw_values
+    )
+
+
+def group_consecutive_rows(rows: Iterable[int]) -> List[Tuple[int, int]]:
+    """
+    Gom các dòng liên tiếp thành các đoạn (start, end).
+
+    Args:
+        rows: Danh sách số dòng (không cần sắp xếp, có thể trùng)
+
+    Returns:
+        Danh sách đoạn (dòng đầu, dòng cuối) theo thứ tự tăng dần
+    """
+    runs: List[Tuple[int, int]] = []
+    for row in sorted(set(rows)):
+        if runs and row == runs[-1][1] + 1:
+            runs[-1] = (runs[-1][0], row)
+        else:
+            runs.append((row, row))
+    return runs
+
+
+def build_address_batches(
+    areas: Iterable[str],
+    max_length: int = EXCEL_ADDRESS_MAX_LENGTH
+) -> List[str]:
+    """
+    Nối các vùng địa chỉ thành chuỗi multi-area ("19:25,30:30,...").
+
+    Mỗi chuỗi không vượt quá giới hạn độ dài địa chỉ mà Range() chấp nhận.
+
+    Args:
+        areas: Các địa chỉ vùng đơn lẻ (vd: "19:25", "A3", "A9:A12")
+        max_length: Độ dài tối đa của một chuỗi địa chỉ
+
+    Returns:
+        Danh sách chuỗi địa chỉ, mỗi chuỗi dùng cho một lần gọi Range()
+    """
+    batches: List[str] = []
+    current = ""
+    for area in areas:
+        if current and len(current) + 1 + len(area) > max_length:
+            batches.append(current)
+            current = area
+        else:
+            current = f"{current},{area}" if current else area
+    if current:
+        batches.append(current)
+    return batches
+
+
 def normalize_size_value(cell_value) -> str:
     """
     Chuẩn hóa giá trị size từ Excel cell thành string nhất quán.
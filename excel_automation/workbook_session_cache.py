@@ -0,0 +1,148 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+import logging
+import os
+
+from excel_automation.sheet_snapshot import SheetSnapshot
+from excel_automation.sheet_layout_profile import invalidate_layout_profile
+
+logger = logging.getLogger(__name__)
+
+
+EVICTION_POLICIES = ("save", "discard", "prompt")
+
+
+@dataclass
+class WorkbookSession:
+    path: str
+    workbook: Any
+    worksheet: Any = None
+    current_sheet: Optional[str] = None
+    snapshot: Optional[SheetSnapshot] = None
+
+    @property
+    def is_alive(self) -> bool:
+        try:
+            _ = self.workbook.Name
+            return True
+        except Exception:
+            return False
+
+
+def session_key(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+class WorkbookSessionCache:
+    """
+    Các workbook đang mở trong cùng một Excel, kèm worksheet và snapshot đang dùng.
+
+    Giữ tối đa `max_sessions` workbook; khi vượt, đóng workbook dùng lâu nhất theo
+    `eviction`: "save" lưu rồi đóng, "discard" đóng không lưu, "prompt" hỏi qua
+    `prompt(session)` (True lưu, False không lưu, None giữ lại workbook).
+    """
+
+    def __init__(self, max_sessions: int = 3, eviction: str = "prompt",
+                 prompt: Optional[Callable[[WorkbookSession], Optional[bool]]] = None):
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f"Chính sách đóng workbook không hợp lệ: {eviction}")
+        self.max_sessions = max(1, max_sessions)
+        self.eviction = eviction
+        self.prompt = prompt
+        self._sessions: "OrderedDict[str, WorkbookSession]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, path: str) -> bool:
+        return session_key(path) in self._sessions
+
+    def paths(self) -> List[str]:
+        return [session.path for session in self._sessions.values()]
+
+    def get(self, path: str) -> Optional[WorkbookSession]:
+        """Lấy session còn sống và đánh dấu vừa dùng; session của workbook đã bị đóng bị loại."""
+        key = session_key(path)
+        session = self._sessions.get(key)
+        if session is None:
+            return None
+        if not session.is_alive:
+            logger.info(f"Workbook '{session.path}' đã bị đóng ngoài chương trình, bỏ khỏi cache")
+            self._forget(key)
+            return None
+        self._sessions.move_to_end(key)
+        return session
+
+    def put(self, session: WorkbookSession) -> List[WorkbookSession]:
+        """Thêm/cập nhật session thành mới dùng nhất, đóng bớt workbook cũ; trả về các session đã đóng."""
+        key = session_key(session.path)
+        self._sessions[key] = session
+        self._sessions.move_to_end(key)
+        return self._evict_overflow()
+
+    def remove(self, path: str) -> Optional[WorkbookSession]:
+        return self._forget(session_key(path))
+
+    def save_all(self) -> List[str]:
+        """Lưu mọi workbook trong cache; lỗi từng file chỉ ghi log. Trả về các file lưu lỗi."""
+        failed: List[str] = []
+        for session in list(self._sessions.values()):
+            try:
+                session.workbook.Save()
+                logger.info(f"Đã lưu workbook: {session.path}")
+            except Exception as e:
+                logger.error(f"Không lưu được workbook '{session.path}': {e}")
+                failed.append(session.path)
+        return failed
+
+    def clear(self) -> None:
+        """Bỏ toàn bộ session mà không đóng workbook (Excel vẫn giữ các file)."""
+        for key in list(self._sessions):
+            self._forget(key)
+
+    def _evict_overflow(self) -> List[WorkbookSession]:
+        evicted: List[WorkbookSession] = []
+        candidates = list(self._sessions)[:-1]
+
+        for key in candidates:
+            if len(self._sessions) <= self.max_sessions:
+                break
+            session = self._sessions[key]
+            if self._close(session):
+                self._forget(key)
+                evicted.append(session)
+
+        return evicted
+
+    def _close(self, session: WorkbookSession) -> bool:
+        save_changes = False
+        try:
+            unsaved = not session.workbook.Saved
+        except Exception:
+            unsaved = True
+
+        if unsaved:
+            if self.eviction == "save":
+                save_changes = True
+            elif self.eviction == "prompt" and self.prompt is not None:
+                answer = self.prompt(session)
+                if answer is None:
+                    logger.info(f"Giữ lại workbook '{session.path}' theo lựa chọn người dùng")
+                    return False
+                save_changes = bool(answer)
+
+        try:
+            session.workbook.Close(SaveChanges=save_changes)
+            logger.info(f"Đã đóng workbook ít dùng nhất: {session.path} (save={save_changes})")
+        except Exception as e:
+            logger.warning(f"Không đóng được workbook '{session.path}': {e}")
+        return True
+
+    def _forget(self, key: str) -> Optional[WorkbookSession]:
+        session = self._sessions.pop(key, None)
+        if session is not None:
+            if session.snapshot is not None:
+                session.snapshot.invalidate()
+            invalidate_layout_profile(workbook_name=os.path.basename(session.path))
+        return session
@@ -49,6 +49,20 @@ a = Analysis(
         'ui.excel_viewer_window',
         'ui.ui_config',
         'excel_automation.excel_com_manager',
+        'excel_automation.sheet_snapshot',
+        'excel_automation.cell_write_buffer',
+        'excel_automation.com_instrumentation',
+        'excel_automation.com_worker',
+        'excel_automation.import_transaction',
+        'excel_automation.sheet_layout_profile',
+        'excel_automation.bulk_edit',
+        'excel_automation.size_change_detector',
+        'excel_automation.excel_app_launcher',
+        'excel_automation.workbook_session_cache',
+        'excel_automation.sheet_event_sink',
+        'excel_automation.com_retry',
+        'excel_automation.box_list_offline_export',
+        'excel_automation.box_list_batch_export',
         'excel_automation.size_filter_config',
         'excel_automation.size_filter',
         'excel_automation.dialog_config_manager',
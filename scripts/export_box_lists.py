@@ -0,0 +1,50 @@
+"""
+Script xuất danh sách thùng cho mọi file packing list trong một thư mục, không cần mở Excel.
+
+Cách dùng:
+    python scripts/export_box_lists.py <thư mục> [xlsx|text|sheet]
+
+"sheet" ghi bản sao <tên>_box_list của từng file nguồn, không ghi lại file nguồn.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from excel_automation.box_list_batch_export import BoxListBatchExporter
+from excel_automation.box_list_offline_export import OUTPUT_MODES, OUTPUT_XLSX
+from excel_automation.utils import setup_logging
+from config import settings
+import logging
+
+setup_logging(settings.LOG_FILE, getattr(logging, settings.LOG_LEVEL))
+logger = logging.getLogger(__name__)
+
+
+def export_box_lists(folder: str, output: str = OUTPUT_XLSX) -> bool:
+    """
+    Xuất box list cho cả thư mục và ghi báo cáo tổng hợp vào log.
+
+    Returns:
+        True nếu mọi sheet đều xuất thành công
+    """
+    logger.info(f"=== BẮT ĐẦU XUẤT DANH SÁCH THÙNG: {folder} ({output}) ===")
+
+    report = BoxListBatchExporter().export_folder(folder, output=output)
+
+    for line in report.to_lines():
+        logger.info(line)
+    for path in report.output_paths:
+        logger.info(f"📄 Đã ghi: {path}")
+
+    logger.info("=== KẾT THÚC XUẤT DANH SÁCH THÙNG ===")
+    return not report.failed
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or (len(sys.argv) > 2 and sys.argv[2] not in OUTPUT_MODES):
+        print(__doc__)
+        sys.exit(2)
+
+    sys.exit(0 if export_box_lists(sys.argv[1], *sys.argv[2:3]) else 1)
@@ -0,0 +1,183 @@
+import unittest
+import re
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from openpyxl import Workbook, load_workbook
+
+from excel_automation.box_list_batch_export import BoxListBatchExporter
+from excel_automation.box_list_export_config import BoxListExportConfig
+from excel_automation.fake_excel import FakeExcelApplication
+from excel_automation.sheet_layout_profile import invalidate_layout_profile
+
+
+def fill_packing_list(ws, po: str, size_count: int = 3) -> None:
+    """Sheet giống template: From/To dòng 15/16, số chia ở G18, size cột F, mỗi size một thùng riêng."""
+    ws.cell(15, 6, "From ( Ctn )")
+    ws.cell(16, 6, "To ( Ctn )")
+    ws.cell(18, 7, "=G44/20")
+    ws.cell(19, 1, po)
+    for offset in range(size_count):
+        col = 7 + offset
+        ws.cell(15, col, offset * 2 + 1)
+        ws.cell(16, col, offset * 2 + 2)
+        ws.cell(19 + offset, 6, f"{38 + offset * 2:03d}")
+        ws.cell(19 + offset, col, 40)
+
+
+def build_workbook(sheets) -> Workbook:
+    wb = Workbook()
+    wb.remove(wb.active)
+    for title, po in sheets:
+        ws = wb.create_sheet(title)
+        if po is not None:
+            fill_packing_list(ws, po)
+        else:
+            ws.cell(1, 1, "Ghi chú")
+    return wb
+
+
+def cache_box_formulas(path: Path) -> None:
+    """Đổi From/To thành công thức kèm giá trị đã tính (như file Excel đã lưu) ở sheet đầu tiên."""
+    with zipfile.ZipFile(path) as source:
+        parts = {name: source.read(name) for name in source.namelist()}
+    xml = parts["xl/worksheets/sheet1.xml"].decode("utf-8")
+    xml = re.sub(
+        r'<c r="([G-Z]1[56])"([^>]*)><v>([0-9.]+)</v></c>',
+        lambda match: f'<c r="{match[1]}"><f>{match[3]}+0</f><v>{match[3]}</v></c>',
+        xml
+    )
+    parts["xl/worksheets/sheet1.xml"] = xml.encode("utf-8")
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as target:
+        for name, data in parts.items():
+            target.writestr(name, data)
+
+
+def make_config() -> BoxListExportConfig:
+    config = BoxListExportConfig()
+    config.config['box_list_export_config']['size_data_end_row'] = 40
+    return config
+
+
+class TestWorkbookBatchExport(unittest.TestCase):
+
+    def setUp(self):
+        invalidate_layout_profile()
+        self.app = FakeExcelApplication()
+        self.workbook = self.app.add_openpyxl_workbook(
+            build_workbook([("PO1", "4500001111"), ("Notes", None), ("PO2", "4500002222")]),
+            name="SHIP.xlsx"
+        )
+        self.exporter = BoxListBatchExporter(make_config())
+
+    def tearDown(self):
+        invalidate_layout_profile()
+
+    def test_exports_every_packing_list_sheet(self):
+        report = self.exporter.export_workbook(self.app, self.workbook)
+
+        self.assertEqual([entry.sheet_name for entry in report.entries], ["PO1", "PO2"])
+        self.assertEqual([entry.output_sheet for entry in report.entries], ["SHIP_1111", "SHIP_2222"])
+        self.assertEqual(report.total_boxes, 12)
+        self.assertEqual(report.get_summary(), "Đã xuất 2/2 sheet, tổng 12 thùng")
+
+        sheet = self.workbook.Sheets("SHIP_2222")
+        self.assertEqual(sheet.Cells(1, 1).Value, "SHIP_PO:4500002222 / 20 PCS")
+        self.assertEqual(sheet.Cells(3, 1).Value, "SIZE 38")
+        self.assertTrue(sheet.Cells(3, 1).Font.Bold)
+
+    def test_existing_names_are_not_reused(self):
+        self.exporter.export_workbook(self.app, self.workbook)
+        report = self.exporter.export_workbook(self.app, self.workbook)
+
+        self.assertEqual([entry.output_sheet for entry in report.entries], ["SHIP_1111_1", "SHIP_2222_1"])
+
+    def test_read_cost_per_sheet_is_flat_in_size_count(self):
+        self.exporter.build_workbook(self.workbook)
+        self.app.reset_call_count()
+        invalidate_layout_profile()
+        self.exporter.build_workbook(self.workbook)
+        small = self.app.call_count
+
+        wb = build_workbook([("PO1", None), ("Notes", None), ("PO2", None)])
+        fill_packing_list(wb["PO1"], "4500001111", size_count=15)
+        fill_packing_list(wb["PO2"], "4500002222", size_count=15)
+        large_workbook = self.app.add_openpyxl_workbook(wb, name="BIG.xlsx")
+        self.app.reset_call_count()
+        entries = self.exporter.build_workbook(large_workbook)
+
+        self.assertEqual(self.app.call_count, small)
+        self.assertEqual(sum(entry.result.total_boxes for entry in entries), 60)
+
+
+class TestFolderBatchExport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = Path(self.tmp.name)
+        build_workbook([("PO1", "4500001111"), ("PO2", "4500002222")]).save(str(self.folder / "A.xlsx"))
+        build_workbook([("Notes", None), ("PL", "4500003333")]).save(str(self.folder / "B.xlsx"))
+        (self.folder / "broken.xlsx").write_bytes(b"not a workbook")
+        (self.folder / "~$A.xlsx").write_bytes(b"lock")
+        self.exporter = BoxListBatchExporter(make_config())
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_combined_workbook_with_summary(self):
+        report = self.exporter.export_folder(self.folder)
+
+        output = self.folder / "box_lists.xlsx"
+        self.assertEqual(report.output_paths, [output])
+        self.assertEqual(len(report.succeeded), 3)
+        self.assertEqual([entry.source for entry in report.failed], ["broken.xlsx"])
+
+        wb = load_workbook(str(output))
+        self.assertEqual(wb.sheetnames, ["Tổng hợp", "A_1111", "A_2222", "B_3333"])
+        self.assertEqual(wb["Tổng hợp"].cell(1, 1).value, report.get_summary())
+        self.assertEqual(wb["B_3333"].cell(3, 1).value, "SIZE 38")
+
+    def test_rerun_skips_previous_output(self):
+        self.exporter.export_folder(self.folder)
+        report = self.exporter.export_folder(self.folder)
+
+        self.assertNotIn("box_lists.xlsx", [entry.source for entry in report.entries])
+
+    def test_combined_text(self):
+        report = self.exporter.export_folder(self.folder, output="text")
+
+        text = (self.folder / "box_lists.txt").read_text(encoding="utf-8")
+        self.assertTrue(text.startswith(report.get_summary()))
+        self.assertIn("===== B.xlsx / PL =====\nB_PO:4500003333 / 20 PCS", text)
+
+    def test_sheet_mode_writes_copies_and_keeps_sources(self):
+        cache_box_formulas(self.folder / "A.xlsx")
+        build_workbook([("PL", "4500004444")]).save(str(self.folder / "C.xlsm"))
+        cache_box_formulas(self.folder / "C.xlsm")
+        with zipfile.ZipFile(self.folder / "C.xlsm", "a") as archive:
+            archive.writestr("xl/vbaProject.bin", b"VBA")
+        sources = {path.name: path.read_bytes() for path in self.folder.glob("*.xls*")}
+
+        first = self.exporter.export_folder(self.folder, output="sheet")
+        second = self.exporter.export_folder(self.folder, output="sheet")
+
+        self.assertEqual(
+            sorted(path.name for path in second.output_paths),
+            ["A_box_list.xlsx", "B_box_list.xlsx", "C_box_list.xlsm"]
+        )
+        self.assertEqual({path.name: path.read_bytes() for path in self.folder.glob("*.xls*")
+                          if path.name in sources}, sources)
+        self.assertEqual(second.total_boxes, first.total_boxes)
+        self.assertEqual(len(second.succeeded), 4)
+        self.assertEqual(
+            load_workbook(str(self.folder / "A_box_list.xlsx")).sheetnames, ["A_2222", "A_1111", "PO1", "PO2"]
+        )
+        with zipfile.ZipFile(self.folder / "C_box_list.xlsm") as archive:
+            self.assertEqual(archive.read("xl/vbaProject.bin"), b"VBA")
+
+if __name__ == '__main__':
+    unittest.main()
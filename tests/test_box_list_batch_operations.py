@@ -196,6 +196,35 @@ class TestExportStepMethods(unittest.TestCase):
         for col in columns:
             self.assertLessEqual(len(col), max_content)
 
+    def test_box_count_is_arithmetic(self):
+        from excel_automation.box_list_export_manager import BoxRange
+        br = BoxRange(sizes=["038"], box_start=1, box_end=100000, column_number=7)
+        self.assertEqual(br.box_count, 100000)
+        self.assertEqual(BoxRange(sizes=["038"], box_start=5, box_end=4, column_number=7).box_count, 0)
+
+    def test_collapsed_style_writes_one_line_per_range(self):
+        from excel_automation.box_list_export_manager import BoxRange
+        self.config.config['box_list_export_config']['output_style'] = "collapsed"
+        box_ranges = [
+            BoxRange(sizes=["038"], box_start=1, box_end=120, column_number=7),
+            BoxRange(sizes=["040", "042"], box_start=121, box_end=121, column_number=8),
+        ]
+        self.assertEqual(
+            self.manager.generate_box_list_text(box_ranges),
+            "SIZE 38: 1-120\nSIZE 40/42: 121"
+        )
+
+    def test_build_result_counts_without_expanding_ranges(self):
+        from excel_automation.box_list_export_manager import BoxRange
+        self.config.config['box_list_export_config']['output_style'] = "collapsed"
+        with patch.object(BoxRange, "get_box_numbers", side_effect=AssertionError("không được mở rộng")):
+            result = self.manager.build_result(
+                ["038"], {"038": [(1, 5000, 7, 20)]}, lambda: "HEADER", 20
+            )
+        self.assertEqual(result.total_boxes, 5000)
+        self.assertEqual(result.total_columns, 1)
+        self.assertEqual(result.text, "HEADER\n\nSIZE 38: 1-5000")
+
     def test_build_export_result_success(self):
         from excel_automation.box_list_export_manager import BoxRange, BoxListExportResult
         box_ranges = [
@@ -215,5 +244,68 @@ class TestExportStepMethods(unittest.TestCase):
         self.assertIn("3 thùng", summary)
 
 
+class MultiAreaRejectingSheet:
+    """Bọc sheet giả, từ chối địa chỉ multi-area để kiểm tra đường fallback từng cell."""
+
+    def __init__(self, sheet):
+        self._sheet = sheet
+
+    def __getattr__(self, name):
+        return getattr(self._sheet, name)
+
+    def Range(self, cell1, cell2=None):
+        if isinstance(cell1, str) and "," in cell1:
+            raise RuntimeError("Range multi-area bị từ chối")
+        return self._sheet.Range(cell1, cell2)
+
+
+class TestPasteBoldFormatting(unittest.TestCase):
+
+    def setUp(self):
+        from openpyxl import Workbook
+        from excel_automation.fake_excel import FakeExcelApplication
+        from excel_automation.box_list_export_config import BoxListExportConfig
+        from excel_automation.box_list_export_manager import BoxListExportManager, BoxRange
+
+        self.app = FakeExcelApplication()
+        wb = Workbook()
+        wb.active.title = "Box List"
+        self.sheet = self.app.add_openpyxl_workbook(wb, name="Out.xlsx").Sheets("Box List")
+        self.manager = BoxListExportManager(BoxListExportConfig())
+        self.box_ranges = [
+            BoxRange(sizes=[size], box_start=start, box_end=start + 29, column_number=7)
+            for size, start in (("038", 1), ("040", 31), ("042", 61), ("044", 91))
+        ]
+
+    def paste(self, sheet):
+        with patch.object(self.manager, "generate_header", return_value="HEADER"):
+            return self.manager.paste_and_format_to_excel(MagicMock(), MagicMock(), self.box_ranges, sheet)
+
+    def bold_cells(self):
+        header_rows = self.manager.config.get_header_rows()
+        cells = []
+        for col in range(1, 5):
+            for row in range(1 + header_rows, 60):
+                cell = self.sheet.Cells(row, col)
+                if cell.Value is not None and cell.Font.Bold:
+                    cells.append(cell.Value)
+        return cells
+
+    def test_size_rows_bold_with_few_range_calls(self):
+        self.app.reset_call_count()
+
+        self.assertTrue(self.paste(self.sheet))
+        calls = self.app.call_count
+
+        self.assertEqual(self.bold_cells(), ["SIZE 38", "SIZE 40", "SIZE 42", "SIZE 44"])
+        self.assertLess(calls, 60)
+
+    def test_falls_back_to_cells_when_multi_area_rejected(self):
+        with self.assertLogs("excel_automation.box_list_export_manager", level="WARNING"):
+            self.assertTrue(self.paste(MultiAreaRejectingSheet(self.sheet)))
+
+        self.assertEqual(self.bold_cells(), ["SIZE 38", "SIZE 40", "SIZE 42", "SIZE 44"])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,161 @@
+import unittest
+from unittest.mock import patch
+import re
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from openpyxl import Workbook, load_workbook
+
+from excel_automation.box_list_export_config import BoxListExportConfig
+from excel_automation.box_list_offline_export import (
+    OfflineBoxListExporter,
+    load_sheet_data
+)
+
+
+def set_cached_values(path: Path, values) -> None:
+    """Ghi giá trị đã tính cho các ô công thức của sheet đầu tiên, như file vừa được Excel lưu."""
+    with zipfile.ZipFile(path) as source:
+        parts = {name: source.read(name) for name in source.namelist()}
+    xml = parts["xl/worksheets/sheet1.xml"].decode("utf-8")
+    for address, value in values.items():
+        xml = re.sub(rf'(<c r="{address}"[^>]*><f>[^<]*</f>)<v\s*/>', rf"\g<1><v>{value}</v>", xml)
+    parts["xl/worksheets/sheet1.xml"] = xml.encode("utf-8")
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as target:
+        for name, data in parts.items():
+            target.writestr(name, data)
+
+
+def build_packing_list(path: Path) -> None:
+    """Packing list đã được Excel tính: From/To ở dòng 15/16, size ở cột F, PO ở A19."""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "PL"
+    ws.cell(15, 6, "From ( Ctn )")
+    ws.cell(16, 6, "To ( Ctn )")
+    ws.cell(18, 7, "=G44/20")
+    for col, (start, end) in enumerate([(1, 3), (4, 4), (5, 6)], start=7):
+        ws.cell(15, col, start)
+        ws.cell(16, col, end)
+    ws.cell(19, 1, 4512345678.0)
+    ws.cell(19, 6, "038")
+    ws.cell(19, 7, 20)
+    ws.cell(20, 6, "040")
+    ws.cell(20, 8, 12)
+    ws.cell(20, 9, 20)
+    ws.cell(21, 6, "042")
+    ws.cell(21, 8, 8)
+    wb.save(str(path))
+
+
+class TestOfflineBoxListExport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "SHIP01.xlsx"
+        build_packing_list(self.path)
+        config = BoxListExportConfig()
+        config.config['box_list_export_config']['size_data_end_row'] = 25
+        self.exporter = OfflineBoxListExporter(config)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_reads_sheet_without_excel(self):
+        data = load_sheet_data(self.path, config=self.exporter.config)
+
+        self.assertEqual(data.sheet_name, "PL")
+        self.assertEqual(data.items_per_box, 20)
+        self.assertEqual(self.exporter.list_sizes(data), ["038", "040", "042"])
+        self.assertEqual(self.exporter.po_number(data), "4512345678")
+
+    def test_build_matches_com_logic(self):
+        result = self.exporter.build(load_sheet_data(self.path, config=self.exporter.config))
+
+        self.assertTrue(result.success)
+        self.assertEqual(result.header, "SHIP01_PO:4512345678 / 20 PCS")
+        labels = [(br.get_size_label(), br.box_start, br.box_end) for br in result.box_ranges]
+        self.assertEqual(labels, [("38", 1, 3), ("40/42", 4, 4), ("40", 5, 6)])
+
+    def test_exports_text_file(self):
+        exported = self.exporter.export(self.path, output="text")
+
+        self.assertTrue(exported.result.success)
+        self.assertEqual(exported.output_path.read_text(encoding="utf-8"), exported.result.text)
+        self.assertIn("SIZE 38\n1\n2\n3", exported.result.text)
+
+    def test_exports_standalone_workbook(self):
+        exported = self.exporter.export(self.path, output="xlsx")
+
+        ws = load_workbook(str(exported.output_path))[exported.sheet_name]
+        self.assertEqual(exported.sheet_name, "SHIP01_5678")
+        self.assertEqual(ws.cell(1, 1).value, "SHIP01_PO:4512345678 / 20 PCS")
+        self.assertEqual(ws.cell(3, 1).value, "SIZE 38")
+        self.assertTrue(ws.cell(3, 1).font.bold)
+        self.assertEqual(ws.cell(4, 1).value, 1)
+        self.assertFalse(ws.cell(4, 1).font.bold)
+
+    def test_sheet_mode_writes_copy_and_keeps_source(self):
+        self.exporter.export(self.path, output="sheet")
+        exported = self.exporter.export(self.path, output="sheet")
+
+        self.assertEqual(exported.output_path, self.path.with_name("SHIP01_box_list.xlsx"))
+        self.assertEqual(load_workbook(str(self.path)).sheetnames, ["PL"])
+        self.assertEqual(load_workbook(str(exported.output_path)).sheetnames, ["SHIP01_5678", "PL"])
+
+    def test_sheet_mode_into_source_only_when_asked(self):
+        self.exporter.export(self.path, output="sheet", output_path=self.path)
+        exported = self.exporter.export(self.path, output="sheet", output_path=self.path)
+
+        self.assertEqual(exported.sheet_name, "SHIP01_5678_1")
+        self.assertEqual(load_workbook(str(self.path)).sheetnames, ["SHIP01_5678_1", "SHIP01_5678", "PL"])
+
+    def test_formula_box_rows_use_cached_values(self):
+        wb = load_workbook(str(self.path))
+        wb["PL"]["G16"] = "=G15+2"
+        wb.save(str(self.path))
+        set_cached_values(self.path, {"G16": 3})
+
+        result = self.exporter.export(self.path, output="sheet").result
+        self.assertTrue(result.success)
+        self.assertEqual(result.box_ranges[0].box_end, 3)
+
+        self.exporter.export(self.path, output="sheet", output_path=self.path)
+        broken = self.exporter.export(self.path, output="text")
+
+        self.assertFalse(broken.result.success)
+        self.assertIn("G16", broken.result.error_message)
+
+    def test_macro_enabled_source_keeps_vba(self):
+        xlsm = self.path.with_suffix(".xlsm")
+        self.path.rename(xlsm)
+        with zipfile.ZipFile(xlsm, "a") as archive:
+            archive.writestr("xl/vbaProject.bin", b"VBA")
+
+        exported = self.exporter.export(xlsm, output="sheet", output_path=xlsm)
+
+        self.assertTrue(exported.result.success)
+        with zipfile.ZipFile(xlsm) as archive:
+            self.assertEqual(archive.read("xl/vbaProject.bin"), b"VBA")
+
+    def test_never_touches_com_or_clipboard(self):
+        with patch("excel_automation.box_list_export_manager.BoxListExportManager.copy_to_clipboard") as clip:
+            exported = self.exporter.export(self.path, output="text")
+
+        self.assertTrue(exported.result.success)
+        clip.assert_not_called()
+        self.assertNotIn("win32com.client", sys.modules)
+
+    def test_missing_file_reports_error(self):
+        exported = self.exporter.export(Path(self.tmp.name) / "missing.xlsx")
+
+        self.assertFalse(exported.result.success)
+        self.assertIn("missing.xlsx", exported.result.error_message)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+from unittest.mock import MagicMock
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from excel_automation.bulk_edit import (
+    bulk_edit_session,
+    is_bulk_editing,
+    set_screen_updating,
+    XL_CALCULATION_MANUAL,
+    XL_CALCULATION_AUTOMATIC
+)
+from excel_automation.excel_com_manager import ExcelCOMManager
+from excel_automation.fake_excel import FakeExcelApplication
+
+
+class TestBulkEditSession(unittest.TestCase):
+
+    def setUp(self):
+        self.app = FakeExcelApplication()
+
+    def assert_restored(self):
+        self.assertTrue(self.app.ScreenUpdating)
+        self.assertTrue(self.app.EnableEvents)
+        self.assertEqual(self.app.Calculation, XL_CALCULATION_AUTOMATIC)
+
+    def test_suspends_and_restores(self):
+        with bulk_edit_session(self.app):
+            self.assertFalse(self.app.ScreenUpdating)
+            self.assertFalse(self.app.EnableEvents)
+            self.assertEqual(self.app.Calculation, XL_CALCULATION_MANUAL)
+            self.assertTrue(is_bulk_editing(self.app))
+
+        self.assertFalse(is_bulk_editing(self.app))
+        self.assert_restored()
+
+    def test_nested_sessions_restore_once_at_outermost_exit(self):
+        app = MagicMock()
+        app.ScreenUpdating = True
+        app.EnableEvents = True
+        app.Calculation = XL_CALCULATION_AUTOMATIC
+
+        with bulk_edit_session(app):
+            with bulk_edit_session(app):
+                set_screen_updating(app, True)
+            self.assertFalse(app.ScreenUpdating)
+            self.assertEqual(app.Calculation, XL_CALCULATION_MANUAL)
+
+        self.assertTrue(app.ScreenUpdating)
+        self.assertEqual(app.Calculation, XL_CALCULATION_AUTOMATIC)
+
+    def test_restores_when_body_raises(self):
+        with self.assertRaises(ValueError):
+            with bulk_edit_session(self.app):
+                with bulk_edit_session(self.app):
+                    raise ValueError("boom")
+
+        self.assertFalse(is_bulk_editing(self.app))
+        self.assert_restored()
+
+    def test_keeps_previous_state(self):
+        self.app.Calculation = XL_CALCULATION_MANUAL
+        self.app.ScreenUpdating = False
+
+        with bulk_edit_session(self.app):
+            pass
+
+        self.assertEqual(self.app.Calculation, XL_CALCULATION_MANUAL)
+        self.assertFalse(self.app.ScreenUpdating)
+        self.assertTrue(self.app.EnableEvents)
+
+    def test_none_app_is_noop(self):
+        with bulk_edit_session(None):
+            set_screen_updating(None, True)
+
+
+class TestManagerBulkEdit(unittest.TestCase):
+
+    def test_manager_toggles_do_not_reenable_screen_inside_session(self):
+        manager = ExcelCOMManager()
+        manager.excel_app = FakeExcelApplication()
+        manager.worksheet = MagicMock()
+
+        with manager.bulk_edit():
+            manager.show_all_rows(19, 30)
+            self.assertFalse(manager.excel_app.ScreenUpdating)
+
+        self.assertTrue(manager.excel_app.ScreenUpdating)
+
+
+if __name__ == "__main__":
+    unittest.main()
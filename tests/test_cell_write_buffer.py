@@ -0,0 +1,112 @@
+import unittest
+from unittest.mock import MagicMock
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from excel_automation.cell_write_buffer import CellWriteBuffer
+
+
+def make_worksheet(formulas=None):
+    worksheet = MagicMock()
+    ranges = {}
+
+    def range_side_effect(address):
+        if address not in ranges:
+            range_obj = MagicMock()
+            range_obj.Formula = formulas.get(address) if formulas else None
+            ranges[address] = range_obj
+        return ranges[address]
+
+    worksheet.Range.side_effect = range_side_effect
+    worksheet.ranges = ranges
+    return worksheet
+
+
+class TestBuildBlocks(unittest.TestCase):
+
+    def test_row_run_becomes_single_block(self):
+        blocks = CellWriteBuffer.build_blocks({(19, 7), (19, 8), (19, 9)})
+        self.assertEqual(blocks, [(19, 7, 19, 9)])
+
+    def test_stacked_runs_merge_into_rectangle(self):
+        cells = {(15, 7), (15, 8), (16, 7), (16, 8)}
+        self.assertEqual(CellWriteBuffer.build_blocks(cells), [(15, 7, 16, 8)])
+
+    def test_gaps_split_blocks(self):
+        cells = {(19, 7), (19, 9), (21, 7)}
+        self.assertEqual(
+            CellWriteBuffer.build_blocks(cells),
+            [(19, 7, 19, 7), (19, 9, 19, 9), (21, 7, 21, 7)]
+        )
+
+
+class TestFlush(unittest.TestCase):
+
+    def test_flush_assigns_each_block_once(self):
+        worksheet = make_worksheet()
+        buffer = CellWriteBuffer()
+        buffer.set(15, 7, 1)
+        buffer.set(15, 8, 4)
+        buffer.set(16, 7, 3)
+        buffer.set(16, 8, 6)
+        buffer.set(20, 7, 60)
+
+        written = buffer.flush(worksheet)
+
+        self.assertEqual(written, 5)
+        self.assertEqual(worksheet.ranges["G15:H16"].Value, ((1, 4), (3, 6)))
+        self.assertEqual(worksheet.ranges["G20"].Value, 60)
+        self.assertEqual(len(buffer), 0)
+
+    def test_formula_cells_are_skipped_with_one_read(self):
+        worksheet = make_worksheet({"G15:H16": (("=F15+1", 4.0), (3.0, "=G16"))})
+        buffer = CellWriteBuffer()
+        buffer.set(15, 7, 1, skip_if_formula=True)
+        buffer.set(15, 8, 4, skip_if_formula=True)
+        buffer.set(16, 7, 3, skip_if_formula=True)
+        buffer.set(16, 8, 6, skip_if_formula=True)
+
+        written = buffer.flush(worksheet)
+
+        self.assertEqual(written, 2)
+        self.assertEqual(buffer.skipped_formula_cells, [(15, 7), (16, 8)])
+        self.assertEqual(worksheet.ranges["H15"].Value, 4)
+        self.assertEqual(worksheet.ranges["G16"].Value, 3)
+
+    def test_empty_buffer_makes_no_calls(self):
+        worksheet = make_worksheet()
+        self.assertEqual(CellWriteBuffer().flush(worksheet), 0)
+        worksheet.Range.assert_not_called()
+
+
+class TestDisplayManagerUsesBuffer(unittest.TestCase):
+
+    def test_allocated_write_uses_block_assignments(self):
+        from excel_automation.size_quantity_display_manager import SizeQuantityDisplayManager
+        from excel_automation.carton_allocation_calculator import CartonAllocationCalculator
+        from excel_automation.sheet_snapshot import SheetSnapshot
+
+        header = tuple((None,) * 8 for _ in range(5))
+        data = ((None,) * 5 + (38.0,), (None,) * 5 + (40.0,))
+        snapshot = SheetSnapshot(header + data)
+
+        allocation = CartonAllocationCalculator(10).get_full_result({"038": 30, "040": 20})
+        worksheet = make_worksheet()
+        manager = SizeQuantityDisplayManager(MagicMock(get_start_row=MagicMock(return_value=19)))
+
+        written, columns = manager.write_allocated_quantities_to_excel(
+            MagicMock(), worksheet, allocation, ["038", "040"], "F",
+            end_row=20, snapshot=snapshot
+        )
+
+        self.assertEqual((written, columns), (2, 2))
+        worksheet.Cells.assert_not_called()
+        self.assertEqual(worksheet.ranges["G15:H16"].Value, ((1, 4), (3, 5)))
+        self.assertEqual(worksheet.ranges["G19"].Value, 30)
+        self.assertEqual(worksheet.ranges["H20"].Value, 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
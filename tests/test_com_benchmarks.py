@@ -0,0 +1,303 @@
+"""
+Benchmark số round-trip COM của các luồng chính trên FakeExcelApplication.
+
+Mỗi thao tác chạy trên packing list giả 40/400/4000 dòng size, ghi lại thời gian
+và số lần truy cập COM, rồi fail nếu vượt ngân sách round-trip trong ROUND_TRIP_BUDGETS.
+Đặt COM_BENCHMARK_REPORT=<file.json> để lưu kết quả.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from openpyxl import Workbook
+
+from excel_automation.fake_excel import FakeExcelApplication
+from excel_automation.excel_com_manager import ExcelCOMManager
+from excel_automation.size_quantity_display_manager import SizeQuantityDisplayManager
+from excel_automation.carton_allocation_calculator import CartonAllocationCalculator
+from excel_automation.box_list_export_config import BoxListExportConfig
+from excel_automation.box_list_export_manager import BoxListExportManager
+from excel_automation.po_update_manager import POUpdateManager
+from excel_automation.color_code_update_manager import ColorCodeUpdateManager
+from excel_automation.duplicate_size_detector import DuplicateSizeDetector
+from excel_automation.import_transaction import ImportTransaction
+
+logger = logging.getLogger(__name__)
+
+
+ROW_COUNTS = (40, 400, 4000)
+DATA_START_ROW = 19
+QUANTITY_COLUMNS = 13
+TOT_QTY_COLUMN = 7 + QUANTITY_COLUMNS
+BOXES_PER_COLUMN = 100
+EXPORT_SIZE_COUNT = 20
+ALLOCATED_SIZE_COUNT = 12
+DUPLICATE_RATIO = 20
+
+
+class RoundTripBudget:
+
+    def __init__(self, base: int, per_row: float = 0.0):
+        self.base = base
+        self.per_row = per_row
+
+    def limit(self, rows: int) -> int:
+        return int(self.base + self.per_row * rows)
+
+    def __repr__(self) -> str:
+        return f"{self.base} + {self.per_row}/dòng" if self.per_row else str(self.base)
+
+
+ROUND_TRIP_BUDGETS = {
+    "scan_sizes": RoundTripBudget(15),
+    "hide_rows_realtime": RoundTripBudget(60, 0.12),
+    "clear_quantity_columns": RoundTripBudget(40),
+    "write_allocated_quantities_to_excel": RoundTripBudget(60),
+    "export_box_list": RoundTripBudget(40),
+    "paste_box_list": RoundTripBudget(300),
+    "update_po_bulk": RoundTripBudget(20),
+    "update_color_code_bulk": RoundTripBudget(20),
+    "import_transaction": RoundTripBudget(60),
+    "detect_duplicates": RoundTripBudget(30),
+    "delete_rows": RoundTripBudget(30),
+}
+
+RESULTS = []
+
+
+def size_for_row(index: int) -> int:
+    return 100 + index
+
+
+def build_packing_list(path: Path, size_rows: int) -> None:
+    """Tạo packing list giả: header 14-18, From/To ở dòng 15/16, size ở cột F từ dòng 19."""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Sheet1"
+
+    ws.cell(14, 1, "PO")
+    ws.cell(14, 5, "Color")
+    ws.cell(14, 6, "Size")
+    ws.cell(16, TOT_QTY_COLUMN, "Tot QTY")
+    ws.cell(18, 7, "=G17/24")
+
+    for offset in range(QUANTITY_COLUMNS):
+        col = 7 + offset
+        ws.cell(15, col, 1 + offset * BOXES_PER_COLUMN)
+        ws.cell(16, col, (offset + 1) * BOXES_PER_COLUMN)
+
+    unique_rows = size_rows - size_rows // DUPLICATE_RATIO
+    for index in range(size_rows):
+        row = DATA_START_ROW + index
+        size_index = index if index < unique_rows else index - unique_rows
+        ws.cell(row, 1, 4500123)
+        ws.cell(row, 5, "RED")
+        ws.cell(row, 6, size_for_row(size_index))
+        ws.cell(row, 7 + index % QUANTITY_COLUMNS, 24)
+
+    wb.save(path)
+
+
+class ComBenchmarkCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.files = {}
+        for rows in ROW_COUNTS:
+            path = Path(cls.tmp.name) / f"packing_{rows}.xlsx"
+            build_packing_list(path, rows)
+            cls.files[rows] = path
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def open_manager(self, rows: int) -> ExcelCOMManager:
+        manager = ExcelCOMManager()
+        manager.config.config['size_filter_config'].update(
+            {"column": "F", "start_row": DATA_START_ROW, "sheet_name": "Sheet1"}
+        )
+        manager.excel_app = FakeExcelApplication()
+        manager.open_excel_file(str(self.files[rows]))
+        manager.excel_app.reset_call_count()
+        return manager
+
+    def measure(self, operation: str, rows: int, manager: ExcelCOMManager, func):
+        manager.excel_app.reset_call_count()
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        calls = manager.excel_app.call_count
+
+        budget = ROUND_TRIP_BUDGETS[operation]
+        RESULTS.append({
+            "operation": operation,
+            "rows": rows,
+            "com_calls": calls,
+            "budget": budget.limit(rows),
+            "seconds": round(elapsed, 4),
+        })
+        logger.info(f"[benchmark] {operation} @ {rows} dòng: {calls} COM call, {elapsed:.3f}s")
+
+        self.assertLessEqual(
+            calls, budget.limit(rows),
+            f"{operation} @ {rows} dòng dùng {calls} round-trip, vượt ngân sách {budget}"
+        )
+        return result
+
+    def test_scan_sizes(self):
+        for rows in ROW_COUNTS:
+            with self.subTest(rows=rows):
+                manager = self.open_manager(rows)
+                sizes = self.measure("scan_sizes", rows, manager, manager.scan_sizes)
+                self.assertEqual(len(sizes), rows - rows // DUPLICATE_RATIO)
+
+    def test_hide_rows_realtime(self):
+        for rows in ROW_COUNTS:
+            with self.subTest(rows=rows):
+                manager = self.open_manager(rows)
+                selected = [f"{size_for_row(i)}" for i in range(0, rows, 2)]
+                hidden = self.measure(
+                    "hide_rows_realtime", rows, manager,
+                    lambda: manager.hide_rows_realtime(selected)
+                )
+                self.assertGreater(hidden, 0)
+
+    def test_clear_quantity_columns(self):
+        for rows in ROW_COUNTS:
+            with self.subTest(rows=rows):
+                manager = self.open_manager(rows)
+                cleared = self.measure(
+                    "clear_quantity_columns", rows, manager, manager.clear_quantity_columns
+                )
+                self.assertEqual(cleared, rows)
+
+    def test_write_allocated_quantities(self):
+        for rows in ROW_COUNTS:
+            with self.subTest(rows=rows):
+                manager = self.open_manager(rows)
+                sizes = [f"{size_for_row(i)}" for i in range(ALLOCATED_SIZE_COUNT)]
+                allocation = CartonAllocationCalculator(24).get_full_result(
+                    {size: 24 * (index + 2) for index, size in enumerate(sizes)}
+                )
+                display = SizeQuantityDisplayManager(manager.config)
+                written, _ = self.measure(
+                    "write_allocated_quantities_to_excel", rows, manager,
+                    lambda: display.write_allocated_quantities_to_excel(
+                        manager.excel_app, manager.worksheet, allocation, sizes, "F",
+                        snapshot=manager.get_snapshot()
+                    )
+                )
+                self.assertGreater(written, 0)
+
+    def test_export_box_list(self):
+        for rows in ROW_COUNTS:
+            with self.subTest(rows=rows):
+                manager = self.open_manager(rows)
+                config = BoxListExportConfig()
+                config.config['box_list_export_config']['size_data_end_row'] = DATA_START_ROW + rows - 1
+                export = BoxListExportManager(config)
+                sizes = [f"{size_for_row(i)}" for i in range(EXPORT_SIZE_COUNT)]
+
+                with patch.object(BoxListExportManager, 'copy_to_clipboard', return_value=True):
+                    result = self.measure(
+                        "export_box_list", rows, manager,
+                        lambda: export.export_box_list(
+                            manager.excel_app, manager.workbook, manager.worksheet, sizes, 24
+                        )
+                    )
+                self.assertTrue(result.success)
+
+                new_sheet = export.create_new_sheet(manager.workbook, manager.worksheet)
+                pasted = self.measure(
+                    "paste_box_list", rows, manager,
+                    lambda: export.paste_and_format_to_excel(
+                        manager.workbook, manager.worksheet, result.box_ranges, new_sheet,
+                        items_per_box=24
+                    )
+                )
+                self.assertTrue(pasted)
+
+    def test_update_po_and_color_bulk(self):
+        for rows in ROW_COUNTS:
+            with self.subTest(rows=rows):
+                manager = self.open_manager(rows)
+                po_updated = self.measure(
+                    "update_po_bulk", rows, manager,
+                    lambda: POUpdateManager(manager.config).update_po_bulk(manager.worksheet, "4500999")
+                )
+                color_updated = self.measure(
+                    "update_color_code_bulk", rows, manager,
+                    lambda: ColorCodeUpdateManager(manager.config).update_color_code_bulk(
+                        manager.worksheet, "BLUE"
+                    )
+                )
+                self.assertEqual((po_updated, color_updated), (rows, rows))
+
+    def test_import_transaction(self):
+        for rows in ROW_COUNTS:
+            with self.subTest(rows=rows):
+                manager = self.open_manager(rows)
+                sizes = [f"{size_for_row(i)}" for i in range(ALLOCATED_SIZE_COUNT)]
+                quantities = {size: 24 * (index + 2) for index, size in enumerate(sizes)}
+                allocation = CartonAllocationCalculator(24).get_full_result(quantities)
+
+                def run_import():
+                    transaction = ImportTransaction(manager)
+                    transaction.begin()
+                    transaction.stage_po("4500999")
+                    transaction.stage_color("BLUE")
+                    written = transaction.stage_quantities(sizes, quantities, allocation)
+                    transaction.commit()
+                    return written, transaction.apply_hidden_rows(sizes)
+
+                written, hidden = self.measure("import_transaction", rows, manager, run_import)
+                self.assertGreater(written, 0)
+                self.assertGreater(hidden, 0)
+
+    def test_detect_and_delete_duplicates(self):
+        for rows in ROW_COUNTS:
+            with self.subTest(rows=rows):
+                manager = self.open_manager(rows)
+                detector = DuplicateSizeDetector(manager)
+                duplicates = self.measure("detect_duplicates", rows, manager, detector.detect_duplicates)
+                self.assertEqual(len(duplicates), rows // DUPLICATE_RATIO)
+
+                rows_to_delete = [row for size_rows in duplicates.values() for row in size_rows[1:]]
+                deleted = self.measure(
+                    "delete_rows", rows, manager, lambda: detector.delete_rows(rows_to_delete)
+                )
+                self.assertEqual(deleted, len(rows_to_delete))
+
+
+def tearDownModule():
+    if not RESULTS:
+        return
+
+    lines = [f"{'operation':<38}{'rows':>6}{'COM calls':>11}{'budget':>9}{'seconds':>10}"]
+    for item in RESULTS:
+        lines.append(
+            f"{item['operation']:<38}{item['rows']:>6}{item['com_calls']:>11}"
+            f"{item['budget']:>9}{item['seconds']:>10.3f}"
+        )
+    logger.info("Kết quả benchmark COM:\n" + "\n".join(lines))
+
+    report_path = os.getenv("COM_BENCHMARK_REPORT")
+    if report_path:
+        Path(report_path).write_text(json.dumps(RESULTS, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    logger.setLevel(logging.INFO)
+    unittest.main()
@@ -0,0 +1,100 @@
+import json
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from excel_automation.com_instrumentation import ComInstrumentation, ComProxy, com_operation
+
+
+class TestComProxyCounting(unittest.TestCase):
+
+    def setUp(self):
+        self.instrumentation = ComInstrumentation()
+        self.excel_app = MagicMock()
+        self.app = self.instrumentation.wrap(self.excel_app)
+
+    def test_counts_gets_sets_and_calls_per_operation(self):
+        with self.instrumentation.operation("scan_sizes"):
+            worksheet = self.app.ActiveSheet
+            worksheet.Range("F19:F40").Value = 5
+            self.app.ScreenUpdating = False
+
+        stats = self.instrumentation.operations["scan_sizes"]
+        self.assertEqual((stats.gets, stats.sets, stats.calls), (2, 2, 1))
+        self.assertEqual(stats.members["Range():call"], 1)
+        self.assertEqual(stats.members["Range.Value:set"], 1)
+        self.excel_app.ActiveSheet.Range.assert_called_once_with("F19:F40")
+        self.assertFalse(self.excel_app.ScreenUpdating)
+
+    def test_nested_operations_count_towards_outermost(self):
+        with self.instrumentation.operation("auto-save"):
+            with self.instrumentation.operation("write_quantities"):
+                self.app.Calculate()
+
+        self.assertIn("auto-save", self.instrumentation.operations)
+        self.assertNotIn("write_quantities", self.instrumentation.operations)
+        self.assertEqual(self.instrumentation.operations["auto-save"].calls, 1)
+
+    def test_proxies_are_unwrapped_when_passed_back(self):
+        worksheet = self.app.ActiveSheet
+        self.app.WorksheetFunction.CountA(worksheet)
+
+        args = self.excel_app.WorksheetFunction.CountA.call_args.args
+        self.assertIs(args[0], self.excel_app.ActiveSheet)
+        self.assertIsInstance(worksheet, ComProxy)
+
+    def test_report_written_as_json(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            report = Path(tmp) / "com_stats.json"
+            instrumentation = ComInstrumentation(str(report))
+            app = instrumentation.wrap(MagicMock())
+
+            with instrumentation.operation("export_box_list"):
+                app.Workbooks.Count
+
+            data = json.loads(report.read_text(encoding="utf-8"))
+            self.assertEqual(data["operations"]["export_box_list"]["runs"], 1)
+            self.assertEqual(data["operations"]["export_box_list"]["gets"], 2)
+
+
+class TestComOperationDecorator(unittest.TestCase):
+
+    def test_noop_without_instrumentation(self):
+        class Controller:
+            com_manager = MagicMock()
+
+            @com_operation("scan_sizes")
+            def action(self):
+                return 42
+
+        self.assertEqual(Controller().action(), 42)
+
+    def test_groups_calls_when_enabled(self):
+        from excel_automation.excel_com_manager import ExcelCOMManager
+
+        with patch.object(ExcelCOMManager, '__init__', lambda self, *a, **kw: None):
+            manager = ExcelCOMManager()
+        manager.instrumentation = None
+        manager.excel_app = MagicMock()
+        manager.workbook = None
+        manager.worksheet = MagicMock()
+        manager.enable_instrumentation()
+
+        class Controller:
+            com_manager = manager
+
+            @com_operation("hide_rows_realtime")
+            def action(self):
+                self.com_manager.worksheet.Range("19:20").EntireRow.Hidden = True
+
+        Controller().action()
+        stats = manager.instrumentation.operations["hide_rows_realtime"]
+        self.assertEqual((stats.gets, stats.sets, stats.calls), (2, 1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,195 @@
+import unittest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from excel_automation.com_retry import (
+    ComRetryScheduler,
+    ExcelBusyError,
+    RPC_E_CALL_REJECTED,
+    get_retry_scheduler,
+    is_busy_error
+)
+from excel_automation.cell_write_buffer import CellWriteBuffer
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def busy_error():
+    return Exception(RPC_E_CALL_REJECTED, "Call was rejected by callee.", None, None)
+
+
+class BusyRange:
+
+    def __init__(self, sheet, address):
+        self._sheet = sheet
+        self._address = address
+
+    @property
+    def Value(self):
+        return self._sheet.values.get(self._address)
+
+    @Value.setter
+    def Value(self, value):
+        if self._sheet.busy_left.get(self._address, 0) > 0:
+            self._sheet.busy_left[self._address] -= 1
+            raise busy_error()
+        self._sheet.writes.append(self._address)
+        self._sheet.values[self._address] = value
+
+
+class BusySheet:
+    """Worksheet giả: các địa chỉ trong `busy` từ chối ghi một số lần trước khi nhận."""
+
+    def __init__(self, busy=None):
+        self.busy_left = dict(busy or {})
+        self.values = {}
+        self.writes = []
+
+    def Range(self, address):
+        return BusyRange(self, address)
+
+
+class TestIsBusyError(unittest.TestCase):
+
+    def test_detects_hresult_and_unsigned_form(self):
+        self.assertTrue(is_busy_error(busy_error()))
+        self.assertTrue(is_busy_error(Exception(0x800AC472, "Exception occurred.", None, None)))
+
+    def test_detects_rejection_in_excepinfo(self):
+        error = Exception(-2147352567, "Exception occurred.", (0, None, None, None, 0, -2147417846), None)
+        self.assertTrue(is_busy_error(error))
+
+    def test_detects_wrapped_error(self):
+        try:
+            try:
+                raise busy_error()
+            except Exception as e:
+                raise RuntimeError("Không thể ghi") from e
+        except RuntimeError as wrapped:
+            self.assertTrue(is_busy_error(wrapped))
+
+    def test_ignores_other_errors(self):
+        self.assertFalse(is_busy_error(ValueError("Sheet 'PL' không tồn tại")))
+        self.assertFalse(is_busy_error(ExcelBusyError("Excel đang bận")))
+
+
+class TestComRetryScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scheduler = ComRetryScheduler(
+            initial_delay=0.25, max_delay=1.0, deadline=5.0,
+            sleep=self.clock.sleep, clock=self.clock
+        )
+        self.waits = []
+        self.scheduler.on_wait = self.waits.append
+
+    def flaky(self, failures, result="ok"):
+        state = {"left": failures, "calls": 0}
+
+        def func():
+            state["calls"] += 1
+            if state["left"] > 0:
+                state["left"] -= 1
+                raise busy_error()
+            return result
+        return func, state
+
+    def test_retries_with_bounded_backoff(self):
+        func, state = self.flaky(4)
+
+        self.assertEqual(self.scheduler.call(func, description="ghi G19"), "ok")
+
+        self.assertEqual(state["calls"], 5)
+        self.assertEqual(self.clock.sleeps, [0.25, 0.5, 1.0, 1.0])
+        self.assertEqual([wait.attempt for wait in self.waits], [1, 2, 3, 4])
+        self.assertEqual(self.waits[0].description, "ghi G19")
+
+    def test_deadline_raises_excel_busy_error(self):
+        func, _ = self.flaky(100)
+
+        with self.assertRaises(ExcelBusyError) as context:
+            self.scheduler.call(func)
+
+        self.assertTrue(is_busy_error(context.exception.__cause__))
+        self.assertLessEqual(self.clock.now, 5.0)
+
+    def test_non_busy_error_is_not_retried(self):
+        def func():
+            raise ValueError("lỗi khác")
+
+        with self.assertRaises(ValueError):
+            self.scheduler.call(func)
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_nested_calls_share_outer_deadline(self):
+        inner, _ = self.flaky(100)
+
+        def outer():
+            self.clock.now += 4.0
+            return self.scheduler.call(inner)
+
+        with self.assertRaises(ExcelBusyError):
+            self.scheduler.call(outer)
+        self.assertLessEqual(self.clock.now, 5.0)
+
+
+class TestBufferResumesAfterBusy(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scheduler = get_retry_scheduler()
+        self._saved = (self.scheduler.sleep, self.scheduler.clock, self.scheduler.deadline)
+        self.scheduler.sleep = self.clock.sleep
+        self.scheduler.clock = self.clock
+        self.scheduler.deadline = 5.0
+
+    def tearDown(self):
+        self.scheduler.sleep, self.scheduler.clock, self.scheduler.deadline = self._saved
+
+    def stage(self):
+        buffer = CellWriteBuffer()
+        buffer.set(19, 7, 10)
+        buffer.set(21, 7, 20)
+        buffer.set(23, 7, 30)
+        return buffer
+
+    def test_busy_block_is_retried_without_rewriting_earlier_blocks(self):
+        sheet = BusySheet(busy={"G21": 2})
+
+        written = self.stage().flush(sheet)
+
+        self.assertEqual(written, 3)
+        self.assertEqual(sheet.writes, ["G19", "G21", "G23"])
+        self.assertEqual(len(self.clock.sleeps), 2)
+
+    def test_reflush_after_deadline_resumes_from_failed_block(self):
+        sheet = BusySheet(busy={"G21": 100})
+        buffer = self.stage()
+
+        with self.assertRaises(ExcelBusyError):
+            buffer.flush(sheet)
+        self.assertEqual(sheet.writes, ["G19"])
+        self.assertEqual(len(buffer), 2)
+
+        sheet.busy_left.clear()
+        self.assertEqual(buffer.flush(sheet), 2)
+        self.assertEqual(sheet.writes, ["G19", "G21", "G23"])
+
+
+if __name__ == '__main__':
+    unittest.main()
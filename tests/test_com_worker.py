@@ -0,0 +1,194 @@
+import unittest
+from concurrent.futures import CancelledError
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from excel_automation.com_worker import ComWorker, AfterDispatcher
+from excel_automation.com_instrumentation import ComInstrumentation, bind_operation
+from excel_automation.fake_excel import FakeExcelApplication
+
+
+class FakeRoot:
+    """Giả lập root.after: giữ callback lại cho tới khi test gọi run_after()."""
+
+    def __init__(self):
+        self.scheduled = []
+        self.cancelled = []
+        self.counter = 0
+
+    def after(self, ms, callback):
+        self.scheduled.append(callback)
+        self.counter += 1
+        return f"after#{self.counter}"
+
+    def after_cancel(self, after_id):
+        self.cancelled.append(after_id)
+
+    def run_after(self):
+        pending, self.scheduled = self.scheduled, []
+        for callback in pending:
+            callback()
+
+
+class TestComWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.worker = ComWorker()
+        self.worker.start()
+
+    def tearDown(self):
+        self.worker.shutdown(wait=True, cancel_pending=True, timeout=5)
+
+    def test_jobs_run_in_submission_order_on_one_thread(self):
+        order = []
+        threads = set()
+
+        def work(i):
+            order.append(i)
+            threads.add(threading.current_thread())
+
+        jobs = [self.worker.submit(work, i) for i in range(20)]
+        for job in jobs:
+            job.result(timeout=5)
+
+        self.assertEqual(order, list(range(20)))
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads.pop(), threading.current_thread())
+
+    def test_result_and_exception_through_future(self):
+        ok = self.worker.submit(lambda a, b: a + b, 2, 3)
+        self.assertEqual(ok.result(timeout=5), 5)
+
+        def boom():
+            raise ValueError("hỏng")
+
+        failed = self.worker.submit(boom, on_error=lambda e: None)
+        with self.assertRaises(ValueError):
+            failed.result(timeout=5)
+
+    def test_callbacks_without_dispatcher_run_on_worker(self):
+        received = []
+        done = threading.Event()
+
+        def on_success(value):
+            received.append((value, self.worker.is_worker_thread()))
+            done.set()
+
+        self.worker.submit(lambda: 7, on_success=on_success)
+        self.assertTrue(done.wait(5))
+        self.assertEqual(received, [(7, True)])
+
+    def test_cancel_pending_skips_queued_jobs(self):
+        gate = threading.Event()
+        started = threading.Event()
+        ran = []
+
+        def block():
+            started.set()
+            gate.wait(5)
+
+        blocker = self.worker.submit(block)
+        self.assertTrue(started.wait(5))
+        queued = [self.worker.submit(ran.append, i) for i in range(3)]
+
+        self.assertEqual(self.worker.cancel_pending(), 3)
+        gate.set()
+        blocker.result(timeout=5)
+        after = self.worker.submit(ran.append, "sau")
+        after.result(timeout=5)
+
+        self.assertTrue(all(job.cancelled() for job in queued))
+        self.assertEqual(ran, ["sau"])
+
+    def test_running_job_can_observe_cancel(self):
+        started = threading.Event()
+
+        def long_job():
+            job = self.worker.current_job
+            started.set()
+            while True:
+                job.raise_if_cancelled()
+
+        job = self.worker.submit(long_job)
+        self.assertTrue(started.wait(5))
+        self.assertFalse(job.cancel())
+        with self.assertRaises(CancelledError):
+            job.result(timeout=5)
+
+    def test_call_from_worker_runs_inline(self):
+        def outer():
+            return self.worker.call(lambda: "inner")
+
+        self.assertEqual(self.worker.call(outer), "inner")
+
+    def test_submit_after_shutdown_raises(self):
+        self.worker.shutdown(wait=True, timeout=5)
+        with self.assertRaises(RuntimeError):
+            self.worker.submit(lambda: None)
+
+
+class TestAfterDispatcher(unittest.TestCase):
+
+    def test_callbacks_delivered_on_ui_poll_in_order(self):
+        root = FakeRoot()
+        dispatcher = AfterDispatcher(root)
+        worker = ComWorker(dispatch=dispatcher)
+        worker.start()
+        dispatcher.start()
+        try:
+            delivered = []
+            ui_thread = threading.current_thread()
+
+            def on_success(value):
+                delivered.append((value, threading.current_thread() is ui_thread))
+
+            jobs = [worker.submit(lambda i=i: i * 10, on_success=on_success) for i in range(5)]
+            jobs.append(worker.submit(lambda: 1 / 0, on_error=lambda e: delivered.append(type(e).__name__)))
+            for job in jobs:
+                job.exception(timeout=5)
+
+            self.assertEqual(delivered, [])
+            root.run_after()
+
+            self.assertEqual(
+                delivered,
+                [(0, True), (10, True), (20, True), (30, True), (40, True), "ZeroDivisionError"]
+            )
+            self.assertEqual(len(root.scheduled), 1)
+        finally:
+            worker.shutdown(wait=True, timeout=5)
+            dispatcher.stop()
+
+        self.assertEqual(root.cancelled, ["after#2"])
+
+
+class TestBindOperation(unittest.TestCase):
+
+    def test_worker_calls_count_towards_caller_operation(self):
+        instrumentation = ComInstrumentation()
+        app = instrumentation.wrap(FakeExcelApplication())
+        worker = ComWorker()
+        worker.start()
+        try:
+            with instrumentation.operation("write_quantities"):
+                job = worker.submit(bind_operation(instrumentation, lambda: app.ScreenUpdating))
+            job.result(timeout=5)
+            worker.submit(lambda: app.ScreenUpdating).result(timeout=5)
+        finally:
+            worker.shutdown(wait=True, timeout=5)
+
+        operations = instrumentation.snapshot()["operations"]
+        self.assertEqual(operations["write_quantities"]["runs"], 1)
+        self.assertEqual(operations["write_quantities"]["gets"], 1)
+        self.assertEqual(operations["unscoped"]["gets"], 1)
+
+    def test_returns_func_unchanged_without_instrumentation(self):
+        func = lambda: None
+        self.assertIs(bind_operation(None, func), func)
+
+
+if __name__ == '__main__':
+    unittest.main()
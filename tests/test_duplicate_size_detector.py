@@ -61,15 +61,36 @@ class TestDeleteRows(unittest.TestCase):
         type(self.com_manager.excel_app).ScreenUpdating = self.screen_updating
         self.detector = DuplicateSizeDetector(self.com_manager)
 
-    def test_deletes_rows_bottom_up(self):
-        rows_to_delete = [19, 25, 31]
+    def test_deletes_rows_in_one_multi_area_range(self):
+        rows_to_delete = [31, 19, 25, 26, 27]
         result = self.detector.delete_rows(rows_to_delete)
 
-        self.assertEqual(result, 3)
+        self.assertEqual(result, 5)
+        self.com_manager.worksheet.Range.assert_called_once_with("19:19,25:27,31:31")
+        self.com_manager.worksheet.Range.return_value.Delete.assert_called_once()
 
-        calls = self.com_manager.worksheet.Rows.call_args_list
-        deleted_rows = [call[0][0] for call in calls]
-        self.assertEqual(deleted_rows, [31, 25, 19])
+    def test_long_address_deleted_bottom_up_in_batches(self):
+        rows_to_delete = list(range(1000, 3000, 2))
+        result = self.detector.delete_rows(rows_to_delete)
+
+        addresses = [call[0][0] for call in self.com_manager.worksheet.Range.call_args_list]
+        self.assertEqual(result, 1000)
+        self.assertGreater(len(addresses), 1)
+        self.assertTrue(all(len(address) <= 255 for address in addresses))
+        first_rows = [int(address.split(":")[0]) for address in addresses]
+        self.assertEqual(first_rows, sorted(first_rows, reverse=True))
+
+    def test_partial_failure_reports_deleted_rows(self):
+        rows_to_delete = list(range(1000, 3000, 2))
+        delete = self.com_manager.worksheet.Range.return_value.Delete
+        delete.side_effect = [None, Exception("COM error")]
+
+        with self.assertRaises(RuntimeError) as ctx:
+            self.detector.delete_rows(rows_to_delete)
+
+        deleted = int(str(ctx.exception).split("đã xóa ")[1].split("/")[0])
+        self.assertGreater(deleted, 0)
+        self.assertIn("/1000", str(ctx.exception))
 
     def test_screen_updating_toggled(self):
         self.detector.delete_rows([19, 25])
@@ -82,7 +103,7 @@ class TestDeleteRows(unittest.TestCase):
         self.assertEqual(result, 0)
 
     def test_screen_updating_restored_on_error(self):
-        self.com_manager.worksheet.Rows.return_value.Delete.side_effect = Exception("COM error")
+        self.com_manager.worksheet.Range.return_value.Delete.side_effect = Exception("COM error")
 
         with self.assertRaises(RuntimeError):
             self.detector.delete_rows([19])
@@ -90,5 +111,61 @@ class TestDeleteRows(unittest.TestCase):
         self.screen_updating.assert_called_with(True)
 
 
+
+class TestMergeDuplicates(unittest.TestCase):
+
+    def setUp(self):
+        from openpyxl import Workbook
+        from excel_automation.excel_com_manager import ExcelCOMManager
+        from excel_automation.fake_excel import FakeExcelApplication
+
+        self.wb = Workbook()
+        self.ws = self.wb.active
+        self.ws.title = "PL"
+        rows = [("038", 10, None), ("040", 5, 1), ("038", 3, 2), ("042", 7, None), ("038", None, 4)]
+        for offset, (size, first_qty, second_qty) in enumerate(rows):
+            row = 19 + offset
+            self.ws.cell(row, 1, 4500123)
+            self.ws.cell(row, 6, size)
+            self.ws.cell(row, 7, first_qty)
+            self.ws.cell(row, 8, second_qty)
+            self.ws.cell(row, 9, f"=SUM(G{row}:H{row})")
+
+        self.manager = ExcelCOMManager()
+        self.manager.config.config['size_filter_config'].update({"column": "F", "start_row": 19})
+        self.manager.excel_app = FakeExcelApplication()
+        self.manager.workbook = self.manager.excel_app.add_openpyxl_workbook(self.wb, name="PL.xlsx")
+        self.manager.worksheet = self.manager.workbook.Sheets("PL")
+        self.detector = DuplicateSizeDetector(self.manager)
+
+    def test_sums_quantities_into_first_occurrence(self):
+        duplicates = self.detector.detect_duplicates(end_row=23)
+
+        deleted = self.detector.merge_duplicates(duplicates)
+
+        self.assertEqual(deleted, 2)
+        self.assertEqual(
+            [self.ws.cell(row, 6).value for row in range(19, 22)], ["038", "040", "042"]
+        )
+        self.assertEqual((self.ws.cell(19, 7).value, self.ws.cell(19, 8).value), (13, 6))
+        self.assertEqual(self.ws.cell(19, 9).value, "=SUM(G19:H19)")
+        self.assertEqual((self.ws.cell(20, 7).value, self.ws.cell(20, 8).value), (5, 1))
+
+    def test_columns_after_tot_qty_are_not_summed(self):
+        self.ws.cell(15, 10, "Tot QTY")
+        for row in range(19, 24):
+            self.ws.cell(row, 10, 99)
+            self.ws.cell(row, 11, 12.5)
+
+        self.detector.merge_duplicates(self.detector.detect_duplicates(end_row=23))
+
+        self.assertEqual((self.ws.cell(19, 7).value, self.ws.cell(19, 8).value), (13, 6))
+        self.assertEqual((self.ws.cell(19, 10).value, self.ws.cell(19, 11).value), (99, 12.5))
+
+    def test_no_duplicates_does_nothing(self):
+        self.assertEqual(self.detector.merge_duplicates({"040": [20]}), 0)
+        self.assertEqual(self.ws.cell(23, 6).value, "038")
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,173 @@
+import unittest
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from openpyxl import Workbook
+
+from excel_automation.excel_app_launcher import ExcelAppLauncher
+from excel_automation.excel_com_manager import ExcelCOMManager
+from excel_automation.fake_excel import FakeExcelApplication
+
+
+class StandInDispatcher:
+    """Dispatcher giả: ghi lại cách lấy Excel, mỗi lần gọi tốn `cost` giây trên đồng hồ giả."""
+
+    def __init__(self, clock, running=None, dispatch_fails=False):
+        self.clock = clock
+        self.running = running
+        self.dispatch_fails = dispatch_fails
+        self.calls = []
+
+    def get_active(self):
+        self.calls.append("get_active")
+        self.clock.advance(0.01)
+        if self.running is None:
+            raise OSError("Operation unavailable")
+        return self.running
+
+    def dispatch(self):
+        self.calls.append("dispatch")
+        self.clock.advance(2.5)
+        if self.dispatch_fails:
+            raise OSError("Server execution failed")
+        return FakeExcelApplication()
+
+    def dispatch_ex(self):
+        self.calls.append("dispatch_ex")
+        self.clock.advance(3.0)
+        return FakeExcelApplication()
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def advance(self, seconds):
+        self.now += seconds
+
+    def __call__(self):
+        return self.now
+
+
+class TestExcelAppLauncher(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_attaches_to_running_instance(self):
+        running = FakeExcelApplication()
+        dispatcher = StandInDispatcher(self.clock, running=running)
+        launcher = ExcelAppLauncher(dispatcher, clock=self.clock)
+
+        self.assertIs(launcher.acquire(), running)
+        self.assertEqual(dispatcher.calls, ["get_active"])
+        self.assertTrue(launcher.attached)
+        self.assertAlmostEqual(launcher.timing.attach_seconds, 0.01)
+
+    def test_cold_start_when_nothing_running(self):
+        dispatcher = StandInDispatcher(self.clock)
+        launcher = ExcelAppLauncher(dispatcher, clock=self.clock)
+
+        launcher.acquire()
+
+        self.assertEqual(dispatcher.calls, ["get_active", "dispatch"])
+        self.assertEqual(launcher.timing.mode, "dispatch")
+        self.assertAlmostEqual(launcher.timing.start_seconds, 2.5)
+        self.assertFalse(launcher.attached)
+
+    def test_falls_back_to_dispatch_ex(self):
+        dispatcher = StandInDispatcher(self.clock, dispatch_fails=True)
+        launcher = ExcelAppLauncher(dispatcher, clock=self.clock)
+
+        launcher.acquire()
+
+        self.assertEqual(launcher.timing.mode, "dispatch_ex")
+        self.assertAlmostEqual(launcher.timing.total_seconds, 5.51)
+
+    def test_acquire_reuses_warm_instance(self):
+        dispatcher = StandInDispatcher(self.clock)
+        launcher = ExcelAppLauncher(dispatcher, clock=self.clock)
+
+        launcher.warm_up()
+        warmed_calls = list(dispatcher.calls)
+        launcher.acquire()
+
+        self.assertEqual(dispatcher.calls, warmed_calls)
+
+    def test_dead_warm_instance_is_replaced(self):
+        class DeadApp:
+            @property
+            def Version(self):
+                raise OSError("RPC server unavailable")
+
+        dispatcher = StandInDispatcher(self.clock, running=DeadApp())
+        launcher = ExcelAppLauncher(dispatcher, clock=self.clock)
+        launcher.warm_up()
+        dispatcher.running = None
+
+        app = launcher.acquire()
+
+        self.assertIsInstance(app, FakeExcelApplication)
+        self.assertEqual(dispatcher.calls[-1], "dispatch")
+
+    def test_release_quits_unused_warm_instance(self):
+        dispatcher = StandInDispatcher(self.clock)
+        launcher = ExcelAppLauncher(dispatcher, clock=self.clock)
+        launcher.warm_up()
+        app = launcher._warm_app
+
+        self.assertTrue(launcher.release())
+        self.assertFalse(app.is_running)
+        self.assertFalse(launcher.release())
+
+    def test_release_keeps_attached_and_acquired_instances(self):
+        running = FakeExcelApplication()
+        launcher = ExcelAppLauncher(StandInDispatcher(self.clock, running=running), clock=self.clock)
+        launcher.warm_up()
+
+        self.assertFalse(launcher.release())
+        self.assertTrue(running.is_running)
+
+        launcher = ExcelAppLauncher(StandInDispatcher(self.clock), clock=self.clock)
+        launcher.warm_up()
+        app = launcher.acquire()
+
+        self.assertFalse(launcher.release())
+        self.assertTrue(app.is_running)
+
+    def test_warm_up_failure_is_not_raised(self):
+        class BrokenDispatcher:
+            def get_active(self):
+                raise OSError("no Excel")
+
+            def dispatch(self):
+                raise OSError("no Excel")
+
+            def dispatch_ex(self):
+                raise OSError("no Excel")
+
+        self.assertIsNone(ExcelAppLauncher(BrokenDispatcher(), clock=self.clock).warm_up())
+
+    def test_manager_opens_file_with_warm_instance(self):
+        dispatcher = StandInDispatcher(self.clock)
+        launcher = ExcelAppLauncher(dispatcher, clock=self.clock)
+        launcher.warm_up()
+        manager = ExcelCOMManager(launcher=launcher)
+
+        wb = Workbook()
+        wb.active.title = manager.config.get_sheet_name()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "PL.xlsx"
+            wb.save(path)
+            manager.open_excel_file(str(path))
+
+        self.assertEqual(dispatcher.calls, ["get_active", "dispatch"])
+        self.assertEqual(manager.current_sheet, manager.config.get_sheet_name())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,6 +6,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from excel_automation.excel_com_manager import ExcelCOMManager
+from excel_automation.sheet_layout_profile import invalidate_layout_profile
 
 
 class TestNumberToColumnLetter(unittest.TestCase):
@@ -42,6 +43,7 @@ class TestClearQuantityColumnsBulk(unittest.TestCase):
             self.screen_updating_mock = PropertyMock()
             type(self.manager.excel_app).ScreenUpdating = self.screen_updating_mock
             self.manager.worksheet = MagicMock()
+            self.manager._snapshot = None
 
     def test_calls_clear_contents_on_range(self):
         self.manager.clear_quantity_columns(start_row=19, end_row=59, start_col=7, end_col=39)
@@ -126,6 +128,111 @@ class TestShowAllRowsBulk(unittest.TestCase):
             self.manager.show_all_rows(start_row=19, end_row=59)
 
 
+class TestHideRowsRealtimeRuns(unittest.TestCase):
+
+    def setUp(self):
+        from excel_automation.sheet_snapshot import SheetSnapshot
+
+        with patch.object(ExcelCOMManager, '__init__', lambda self, *a, **kw: None):
+            self.manager = ExcelCOMManager()
+            self.manager.config = MagicMock()
+            self.manager.config.get_column.return_value = "F"
+            self.manager.config.get_start_row.return_value = 19
+            self.manager.excel_app = MagicMock()
+            self.manager.worksheet = MagicMock()
+
+        sizes = [38.0, 38.0, 40.0, 40.0, None, 38.0, 42.0, 38.0]
+        header = tuple((None,) * 6 for _ in range(5))
+        data = tuple(("PO", None, None, None, None, size) for size in sizes)
+        self.manager._snapshot = SheetSnapshot(header + data)
+
+    def test_hides_runs_with_one_range_call_per_state(self):
+        hidden = self.manager.hide_rows_realtime(["038"], end_row=26)
+
+        self.assertEqual(hidden, 4)
+        self.manager.worksheet.Rows.assert_not_called()
+        self.manager.worksheet.Cells.assert_not_called()
+        addresses = [c.args[0] for c in self.manager.worksheet.Range.call_args_list]
+        self.assertEqual(addresses, ["19:20,24:24,26:26", "21:23,25:25"])
+
+    def test_batches_stay_under_address_limit(self):
+        from excel_automation.sheet_snapshot import SheetSnapshot
+
+        sizes = [38.0 if i % 2 == 0 else 40.0 for i in range(400)]
+        header = tuple((None,) * 6 for _ in range(5))
+        data = tuple(("PO", None, None, None, None, size) for size in sizes)
+        self.manager._snapshot = SheetSnapshot(header + data)
+
+        hidden = self.manager.hide_rows_realtime(["038"], end_row=418)
+
+        self.assertEqual(hidden, 200)
+        addresses = [c.args[0] for c in self.manager.worksheet.Range.call_args_list]
+        self.assertTrue(all(len(address) <= 255 for address in addresses))
+        self.assertLess(len(addresses), 40)
+        hidden_rows = set()
+        for address in addresses[len(addresses) // 2:]:
+            for area in address.split(","):
+                first, last = area.split(":")
+                hidden_rows.update(range(int(first), int(last) + 1))
+        self.assertEqual(hidden_rows, set(range(20, 419, 2)))
+
+
+class TestAddressHelpers(unittest.TestCase):
+
+    def test_group_consecutive_rows(self):
+        from excel_automation.utils import group_consecutive_rows
+
+        self.assertEqual(group_consecutive_rows([5, 3, 4, 9, 10, 12]), [(3, 5), (9, 10), (12, 12)])
+        self.assertEqual(group_consecutive_rows([]), [])
+
+    def test_build_address_batches_splits_on_length(self):
+        from excel_automation.utils import build_address_batches
+
+        self.assertEqual(build_address_batches(["1:2", "4:4"]), ["1:2,4:4"])
+        self.assertEqual(build_address_batches(["A1", "A3", "A5"], max_length=5), ["A1,A3", "A5"])
+
+
+class TestFindLastDataRow(unittest.TestCase):
+
+    def setUp(self):
+        from excel_automation.utils import invalidate_last_row_cache
+
+        invalidate_last_row_cache()
+        self.worksheet = MagicMock()
+        used_range = self.worksheet.UsedRange
+        used_range.Row = 1
+        used_range.Rows.Count = 30
+        used_range.Column = 1
+        used_range.Columns.Count = 10
+        self.worksheet.Range.return_value.Value = (
+            ("PO",), ("PO",), ("PO",), (None,), ("PO",),
+        ) + ((None,),) * 7
+
+    def test_single_window_read_without_cell_loop(self):
+        from excel_automation.utils import find_last_data_row
+
+        self.assertEqual(find_last_data_row(self.worksheet, 1, 19), 21)
+        self.worksheet.Range.assert_called_once_with("A19:A30")
+        self.worksheet.Cells.assert_not_called()
+
+    def test_result_memoized_until_invalidated(self):
+        from excel_automation.utils import find_last_data_row, invalidate_last_row_cache
+
+        find_last_data_row(self.worksheet, 1, 19)
+        find_last_data_row(self.worksheet, 1, 19)
+        self.assertEqual(self.worksheet.Range.call_count, 1)
+
+        invalidate_last_row_cache(self.worksheet)
+        find_last_data_row(self.worksheet, 1, 19)
+        self.assertEqual(self.worksheet.Range.call_count, 2)
+
+    def test_empty_column_returns_start_row(self):
+        from excel_automation.utils import find_last_data_row
+
+        self.worksheet.Range.return_value.Value = None
+        self.assertEqual(find_last_data_row(self.worksheet, 1, 19), 19)
+
+
 class TestScanSizesBulk(unittest.TestCase):
 
     def setUp(self):
@@ -164,12 +271,12 @@ class TestScanSizesBulk(unittest.TestCase):
         )
 
         with patch.object(self.manager, 'detect_end_row', return_value=21):
-            with patch.object(self.manager, '_fix_decimal_cell'):
-                result = self.manager.scan_sizes(column="F", start_row=19, end_row=21)
+            result = self.manager.scan_sizes(column="F", start_row=19, end_row=21)
 
         self.assertIn("044", result)
         self.assertIn("045", result)
         self.assertIn("046", result)
+        self.manager.worksheet.Range.assert_called_once_with("F19:F21")
 
     def test_skips_none_values(self):
         self.manager.worksheet.Range.return_value.Value = (
@@ -195,12 +302,82 @@ class TestScanSizesBulk(unittest.TestCase):
             self.manager.scan_sizes()
 
 
+class TestRepairSizeDecimals(unittest.TestCase):
+
+    def setUp(self):
+        from openpyxl import Workbook
+        from excel_automation.fake_excel import FakeExcelApplication
+
+        self.wb = Workbook()
+        self.ws = self.wb.active
+        self.ws.title = "PL"
+        for offset, size in enumerate([38, 7.5, 40, "7,5", 42, 0.5]):
+            self.ws.cell(19 + offset, 6, size)
+        self.ws.cell(24, 1, 1)
+
+        self.manager = ExcelCOMManager()
+        self.manager.config.config['size_filter_config'].update({"column": "F", "start_row": 19})
+        self.manager.excel_app = FakeExcelApplication()
+        self.manager.workbook = self.manager.excel_app.add_openpyxl_workbook(self.wb, name="PL.xlsx")
+        self.manager.worksheet = self.manager.workbook.Sheets("PL")
+
+    def column(self):
+        return [self.ws.cell(row, 6).value for row in range(19, 25)]
+
+    def test_repairs_fractions_in_one_write(self):
+        self.manager.excel_app.reset_call_count()
+
+        sizes = self.manager.scan_sizes(column="F", start_row=19, end_row=24)
+
+        self.assertEqual(sizes, ["001", "008", "038", "040", "042"])
+        self.assertEqual(self.column(), [38, 8, 40, 8, 42, 1])
+        self.assertLessEqual(self.manager.excel_app.call_count, 6)
+
+    def test_clean_column_stays_read_only(self):
+        for offset in (1, 3, 5):
+            self.ws.cell(19 + offset, 6, 44)
+        self.manager.excel_app.reset_call_count()
+
+        with patch.object(self.manager, 'invalidate_snapshot') as invalidate:
+            self.manager.scan_sizes(column="F", start_row=19, end_row=24)
+
+        invalidate.assert_not_called()
+        self.assertLessEqual(self.manager.excel_app.call_count, 2)
+
+    def test_keeps_formula_between_repairs(self):
+        self.ws.cell(21, 6, "=F19+2")
+
+        self.manager.scan_sizes(column="F", start_row=19, end_row=24, repair_decimals=True)
+
+        self.assertEqual(self.ws.cell(21, 6).value, "=F19+2")
+        self.assertEqual(self.column()[1], 8)
+
+    def test_numeric_text_between_repairs_falls_back_to_runs(self):
+        self.ws.cell(21, 6, "040")
+        self.ws.cell(21, 6).quotePrefix = True
+
+        repaired = self.manager.repair_size_decimals(
+            "F", 19, [38, 7.5, "040", "7,5", 42, 0.5]
+        )
+
+        self.assertEqual(repaired, 3)
+        self.assertEqual(self.ws.cell(21, 6).value, "040")
+        self.assertEqual(self.column()[3], 8)
+
+    def test_scan_without_repair_does_not_write(self):
+        self.manager.scan_sizes(column="F", start_row=19, end_row=24, repair_decimals=False)
+
+        self.assertEqual(self.column()[1], 7.5)
+
+
 class TestDetectTotQtyColumn(unittest.TestCase):
 
     def setUp(self):
         with patch.object(ExcelCOMManager, '__init__', lambda self, *a, **kw: None):
             self.manager = ExcelCOMManager()
             self.manager.worksheet = MagicMock()
+            self.manager._snapshot = None
+        invalidate_layout_profile()
 
     def _make_row_values(self, col_count: int, tot_qty_col: int = None, text: str = "Tot QTY"):
         row = [None] * col_count
@@ -210,31 +387,31 @@ class TestDetectTotQtyColumn(unittest.TestCase):
 
     def test_finds_tot_qty_at_column_14(self):
         row_data = self._make_row_values(52, tot_qty_col=14)
-        self.manager.worksheet.Range.return_value.Value = (row_data,)
+        self.manager.worksheet.Range.return_value.Formula = (row_data,)
         result = self.manager._detect_tot_qty_column()
         self.assertEqual(result, 14)
 
     def test_finds_tot_qty_at_column_40(self):
         row_data = self._make_row_values(52, tot_qty_col=40)
-        self.manager.worksheet.Range.return_value.Value = (row_data,)
+        self.manager.worksheet.Range.return_value.Formula = (row_data,)
         result = self.manager._detect_tot_qty_column()
         self.assertEqual(result, 40)
 
     def test_finds_total_qty_variant(self):
         row_data = self._make_row_values(52, tot_qty_col=20, text="Total QTY")
-        self.manager.worksheet.Range.return_value.Value = (row_data,)
+        self.manager.worksheet.Range.return_value.Formula = (row_data,)
         result = self.manager._detect_tot_qty_column()
         self.assertEqual(result, 20)
 
     def test_case_insensitive(self):
         row_data = self._make_row_values(52, tot_qty_col=14, text="tot qty")
-        self.manager.worksheet.Range.return_value.Value = (row_data,)
+        self.manager.worksheet.Range.return_value.Formula = (row_data,)
         result = self.manager._detect_tot_qty_column()
         self.assertEqual(result, 14)
 
     def test_returns_none_when_not_found(self):
         row_data = self._make_row_values(52)
-        self.manager.worksheet.Range.return_value.Value = (row_data,)
+        self.manager.worksheet.Range.return_value.Formula = (row_data,)
         result = self.manager._detect_tot_qty_column()
         self.assertIsNone(result)
 
@@ -0,0 +1,137 @@
+import tempfile
+import time
+import unittest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from openpyxl import Workbook
+
+from excel_automation.fake_excel import FakeExcelApplication, LatencyInjector, FakeComError
+
+
+def build_packing_list(path: Path, sizes):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "PL"
+    ws.cell(16, 20, "Tot QTY")
+    ws.cell(18, 7, "=G17/10")
+    for offset, size in enumerate(sizes):
+        row = 19 + offset
+        ws.cell(row, 1, "4500123")
+        ws.cell(row, 5, "RED")
+        ws.cell(row, 6, size)
+    wb.save(path)
+
+
+class TestFakeRangeSurface(unittest.TestCase):
+
+    def setUp(self):
+        wb = Workbook()
+        wb.active.title = "PL"
+        self.app = FakeExcelApplication()
+        self.book = self.app.add_openpyxl_workbook(wb, name="PL.xlsx")
+        self.sheet = self.book.Sheets("PL")
+
+    def test_values_come_back_like_com(self):
+        self.sheet.Range("A1:B2").Value = ((1, "x"), (None, 2.5))
+        self.assertEqual(self.sheet.Range("A1:B2").Value, ((1.0, "x"), (None, 2.5)))
+        self.assertEqual(self.sheet.Cells(1, 1).Value, 1.0)
+
+        self.sheet.Cells(3, 1).Value = "'RED"
+        self.sheet.Cells(4, 1).Value = "038"
+        self.assertEqual(self.sheet.Cells(3, 1).Value, "RED")
+        self.assertEqual(self.sheet.Cells(4, 1).Value, 38.0)
+
+    def test_formula_and_clear_contents(self):
+        self.sheet.Range("G18").Formula = "=G17/10"
+        self.sheet.Range("G19").Value = 5
+        self.assertTrue(self.sheet.Range("G18").HasFormula)
+        self.assertIsNone(self.sheet.Range("G18:G19").HasFormula)
+        self.assertEqual(self.sheet.Range("G18:G19").Formula, (("=G17/10",), ("5",)))
+
+        self.sheet.Range("G18:G19").ClearContents()
+        self.assertEqual(self.app.WorksheetFunction.CountA(self.sheet.Range("G18:G19")), 0)
+
+    def test_row_hiding_and_deletion(self):
+        for row in range(1, 6):
+            self.sheet.Cells(row, 1).Value = row
+        self.sheet.Range("2:2,4:4").EntireRow.Hidden = True
+        self.assertTrue(self.sheet.Rows(4).Hidden)
+        self.assertFalse(self.sheet.Rows(3).Hidden)
+
+        self.sheet.Rows(3).Delete()
+        self.assertEqual(self.sheet.Range("A1:A4").Value, ((1.0,), (2.0,), (4.0,), (5.0,)))
+        self.assertTrue(self.sheet.Rows(3).Hidden)
+
+    def test_union_font_and_used_range(self):
+        self.sheet.Range("B3:C10").Value = 1
+        union = self.app.Union(self.sheet.Cells(3, 2), self.sheet.Range("B5:B6"))
+        union.Font.Bold = True
+        self.assertEqual(union.Address, "$B$3,$B$5:$B$6")
+        self.assertTrue(self.sheet.Cells(5, 2).Font.Bold)
+        self.assertFalse(self.sheet.Cells(4, 2).Font.Bold)
+
+        used = self.sheet.UsedRange
+        self.assertEqual((used.Row, used.Rows.Count, used.Column, used.Columns.Count), (3, 8, 2, 2))
+
+    def test_sheet_copy_and_add(self):
+        self.sheet.Copy(None, self.book.Sheets(self.book.Sheets.Count))
+        added = self.book.Worksheets.Add()
+        added.Name = "Box"
+
+        self.assertEqual([sheet.Name for sheet in self.book.Worksheets], ["PL", "Box", "PL (2)"])
+        with self.assertRaises(FakeComError):
+            self.book.Sheets("Missing")
+
+    def test_calls_are_counted_and_latency_applied(self):
+        app = FakeExcelApplication(LatencyInjector(0.0005))
+        sheet = app.add_openpyxl_workbook(Workbook()).Sheets(1)
+        app.reset_call_count()
+
+        start = time.perf_counter()
+        sheet.Cells(1, 1).Value = 1
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(app.call_count, 2)
+        self.assertGreaterEqual(elapsed, 0.001)
+
+
+class TestManagersAgainstFakeExcel(unittest.TestCase):
+
+    def setUp(self):
+        from excel_automation.excel_com_manager import ExcelCOMManager
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "packing.xlsx"
+        build_packing_list(self.path, [38, 38, 40, 42, 40, 38])
+
+        self.manager = ExcelCOMManager()
+        self.manager.excel_app = FakeExcelApplication()
+        self.manager.open_excel_file(str(self.path))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_scan_hide_and_clear(self):
+        self.assertEqual(self.manager.scan_sizes(), ["038", "040", "042"])
+        self.assertEqual(self.manager.detect_end_row(), 24)
+
+        hidden = self.manager.hide_rows_realtime(["040"])
+        self.assertEqual(hidden, 4)
+        self.assertTrue(self.manager.worksheet.Rows(19).Hidden)
+        self.assertFalse(self.manager.worksheet.Rows(21).Hidden)
+
+        self.manager.show_all_rows()
+        self.assertFalse(self.manager.worksheet.Rows(19).Hidden)
+        self.assertEqual(self.manager._detect_tot_qty_column(), 20)
+
+    def test_close_quits_fake_application(self):
+        app = self.manager.excel_app
+        self.manager.close()
+        self.assertFalse(app.is_running)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+import unittest
+from unittest.mock import patch
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from openpyxl import Workbook
+
+from excel_automation.bulk_edit import XL_CALCULATION_AUTOMATIC, XL_CALCULATION_MANUAL, is_bulk_editing
+from excel_automation.excel_com_manager import ExcelCOMManager
+from excel_automation.fake_excel import FakeExcelApplication
+from excel_automation.import_transaction import ImportTransaction
+from excel_automation.carton_allocation_calculator import CartonAllocationCalculator
+
+
+SIZES = ["038", "040", "042", "044", "046", "048"]
+
+
+def build_sheet(rows: int = 60) -> Workbook:
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "PL"
+    ws.cell(14, 6, "Size")
+    ws.cell(15, 7, 1)
+    ws.cell(16, 7, "=G15+9")
+    for index in range(rows):
+        row = 19 + index
+        ws.cell(row, 1, 4500123)
+        ws.cell(row, 5, "RED")
+        ws.cell(row, 6, SIZES[index % len(SIZES)] if index < len(SIZES) else 200 + index)
+    return wb
+
+
+class TestImportTransaction(unittest.TestCase):
+
+    def setUp(self):
+        self.wb = build_sheet()
+        self.manager = ExcelCOMManager()
+        self.manager.config.config['size_filter_config'].update(
+            {"column": "F", "start_row": 19, "sheet_name": "PL"}
+        )
+        self.manager.excel_app = FakeExcelApplication()
+        self.manager.workbook = self.manager.excel_app.add_openpyxl_workbook(self.wb, name="PL.xlsx")
+        self.manager.worksheet = self.manager.workbook.Sheets("PL")
+        self.ws = self.wb["PL"]
+
+    def run_import(self, sizes, quantities, allocation=None):
+        transaction = ImportTransaction(self.manager)
+        transaction.begin()
+        transaction.stage_po("4500999")
+        transaction.stage_color("0001")
+        written = transaction.stage_quantities(sizes, quantities, allocation)
+        transaction.commit()
+        hidden = transaction.apply_hidden_rows(sizes)
+        return written, hidden
+
+    def test_writes_po_color_quantities_and_hides_rows(self):
+        sizes = ["038", "042", "046"]
+        written, hidden = self.run_import(sizes, {"038": 10, "042": 20, "046": 30})
+
+        self.assertEqual(written, 3)
+        self.assertEqual(hidden, 60 - 3)
+        self.assertTrue(all(self.ws.cell(row, 1).value == 4500999 for row in range(19, 79)))
+        self.assertTrue(all(self.ws.cell(row, 5).value == "0001" for row in range(19, 79)))
+        self.assertTrue(self.ws.cell(19, 5).quotePrefix)
+        self.assertEqual(
+            [self.ws.cell(19, 7).value, self.ws.cell(21, 8).value, self.ws.cell(23, 9).value],
+            [10, 20, 30]
+        )
+        self.assertEqual(self.ws.cell(16, 7).value, "=G15+9")
+        self.assertFalse(self.ws.row_dimensions[19].hidden)
+        self.assertTrue(self.ws.row_dimensions[20].hidden)
+
+    def test_whole_import_runs_in_one_bulk_edit_session(self):
+        app = self.manager.excel_app
+        states = []
+        commit = ImportTransaction.commit
+
+        def recording_commit(transaction):
+            states.append((app.Calculation, app.EnableEvents, app.ScreenUpdating))
+            return commit(transaction)
+
+        with self.manager.bulk_edit():
+            with patch.object(ImportTransaction, "commit", recording_commit):
+                self.run_import(["038"], {"038": 10})
+            states.append((app.Calculation, app.EnableEvents, app.ScreenUpdating))
+
+        self.assertEqual(states, [(XL_CALCULATION_MANUAL, False, False)] * 2)
+        self.assertEqual((app.Calculation, app.EnableEvents, app.ScreenUpdating),
+                         (XL_CALCULATION_AUTOMATIC, True, True))
+        self.assertFalse(is_bulk_editing(app))
+
+    def test_allocated_import_keeps_from_to_formula(self):
+        sizes = ["038", "040"]
+        allocation = CartonAllocationCalculator(10).get_full_result({"038": 25, "040": 10})
+
+        written, _ = self.run_import(sizes, {"038": 25, "040": 10}, allocation)
+
+        self.assertGreater(written, 0)
+        self.assertEqual(self.ws.cell(16, 7).value, "=G15+9")
+        self.assertEqual(self.ws.cell(15, 8).value, 3)
+
+    def test_round_trips_do_not_grow_with_rows(self):
+        counts = []
+        for rows in (60, 600):
+            self.wb = build_sheet(rows)
+            self.manager.workbook = self.manager.excel_app.add_openpyxl_workbook(self.wb, name=f"PL{rows}.xlsx")
+            self.manager.worksheet = self.manager.workbook.Sheets("PL")
+            self.manager.invalidate_snapshot()
+            self.manager.excel_app.reset_call_count()
+
+            self.run_import(["038", "042"], {"038": 10, "042": 20})
+            counts.append(self.manager.excel_app.call_count)
+
+        self.assertEqual(counts[0], counts[1])
+        self.assertLessEqual(counts[1], 40)
+
+    def test_formula_inside_quantity_matrix_is_preserved(self):
+        self.ws.cell(20, 7, "=SUM(G19:G19)")
+
+        self.run_import(["038", "040"], {"038": 5, "040": 6})
+
+        self.assertEqual(self.ws.cell(20, 7).value, "=SUM(G19:G19)")
+        self.assertEqual(self.ws.cell(19, 7).value, 5)
+        self.assertEqual(self.ws.cell(20, 8).value, 6)
+
+    def test_text_inside_quantity_matrix_falls_back_to_block_writes(self):
+        self.ws.cell(20, 7, "08")
+        self.ws.cell(20, 7).quotePrefix = True
+
+        self.run_import(["038", "040"], {"038": 5, "040": 6})
+
+        self.assertEqual(self.ws.cell(20, 7).value, "08")
+        self.assertEqual(self.ws.cell(19, 7).value, 5)
+        self.assertEqual(self.ws.cell(20, 8).value, 6)
+
+    def test_retry_after_failed_commit_rewrites_everything(self):
+        transaction = ImportTransaction(self.manager)
+        transaction.begin()
+        transaction.stage_po("4500999")
+        transaction.stage_quantities(["038", "040"], {"038": 5, "040": 6})
+        transaction.write_buffer.take((19, 7, 78, 60))
+
+        transaction.stage_quantities(["038", "040"], {"038": 5, "040": 6})
+        transaction.commit()
+
+        self.assertEqual(self.ws.cell(78, 1).value, 4500999)
+        self.assertEqual((self.ws.cell(19, 7).value, self.ws.cell(20, 8).value), (5, 6))
+
+    def test_stage_before_begin_raises(self):
+        with self.assertRaises(RuntimeError):
+            ImportTransaction(self.manager).stage_po("4500999")
+
+
+if __name__ == '__main__':
+    unittest.main()
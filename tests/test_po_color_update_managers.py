@@ -0,0 +1,92 @@
+import unittest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from openpyxl import Workbook
+
+from excel_automation.fake_excel import FakeExcelApplication
+from excel_automation.po_update_manager import POUpdateManager
+from excel_automation.color_code_update_manager import ColorCodeUpdateManager
+from excel_automation.utils import invalidate_last_row_cache
+
+
+ROWS = 200
+
+
+class TestBulkColumnUpdates(unittest.TestCase):
+
+    def setUp(self):
+        self.wb = Workbook()
+        self.ws = self.wb.active
+        self.ws.title = "PL"
+        for row in range(19, 19 + ROWS):
+            self.ws.cell(row, 1, 4500123)
+            self.ws.cell(row, 5, "RED")
+            self.ws.cell(row, 6, "038")
+        self.app = FakeExcelApplication()
+        self.sheet = self.app.add_openpyxl_workbook(self.wb, name="PL.xlsx").Sheets("PL")
+        invalidate_last_row_cache()
+
+    def measure(self, func):
+        self.app.reset_call_count()
+        result = func()
+        return result, self.app.call_count
+
+    def column(self, col):
+        return [self.ws.cell(row, col).value for row in range(19, 19 + ROWS)]
+
+    def test_po_update_writes_column_in_one_range(self):
+        updated, calls = self.measure(
+            lambda: POUpdateManager(None).update_po_bulk(self.sheet, "4500999")
+        )
+
+        self.assertEqual(updated, ROWS)
+        self.assertTrue(all(value == 4500999 for value in self.column(1)))
+        self.assertLessEqual(calls, 16)
+
+    def test_color_update_keeps_text_prefix(self):
+        updated = ColorCodeUpdateManager(None).update_color_code_bulk(self.sheet, "0001")
+
+        self.assertEqual(updated, ROWS)
+        self.assertTrue(all(value == "0001" for value in self.column(5)))
+        self.assertTrue(self.ws.cell(19 + ROWS - 1, 5).quotePrefix)
+
+    def test_dry_run_counts_changes_without_writing(self):
+        for row in range(19, 29):
+            self.ws.cell(row, 1, 4500999)
+
+        changed = POUpdateManager(None).update_po_bulk(self.sheet, "4500999", dry_run=True)
+
+        self.assertEqual(changed, ROWS - 10)
+        self.assertEqual(self.ws.cell(40, 1).value, 4500123)
+
+    def test_unchanged_column_skips_write(self):
+        _, write_calls = self.measure(
+            lambda: ColorCodeUpdateManager(None).update_color_code_bulk(self.sheet, "0001")
+        )
+
+        updated, calls = self.measure(
+            lambda: ColorCodeUpdateManager(None).update_color_code_bulk(self.sheet, "0001")
+        )
+        repeated_po, _ = self.measure(
+            lambda: POUpdateManager(None).update_po_bulk(self.sheet, "4500123")
+        )
+
+        self.assertEqual((updated, repeated_po), (ROWS, ROWS))
+        self.assertEqual(
+            ColorCodeUpdateManager(None).update_color_code_bulk(self.sheet, "0001", dry_run=True), 0
+        )
+        self.assertLess(calls, write_calls)
+
+    def test_numeric_color_is_not_treated_as_text_code(self):
+        self.ws.cell(19, 5, 1)
+
+        changed = ColorCodeUpdateManager(None).update_color_code_bulk(self.sheet, "1", dry_run=True)
+
+        self.assertEqual(changed, ROWS)
+
+
+if __name__ == '__main__':
+    unittest.main()
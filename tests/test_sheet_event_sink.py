@@ -0,0 +1,225 @@
+import unittest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from openpyxl import Workbook
+
+from excel_automation.excel_com_manager import ExcelCOMManager
+from excel_automation.fake_excel import FakeExcelApplication
+from excel_automation.sheet_event_sink import (
+    SheetEventSink,
+    SheetEventSource,
+    parse_area,
+    REGION_HEADER,
+    REGION_SIZES,
+    REGION_QUANTITIES,
+    REGION_PO_COLOR
+)
+from excel_automation.sheet_layout_profile import get_layout_profile, invalidate_layout_profile
+
+
+class LocalEventSource(SheetEventSource):
+    """Giữ sự kiện trong hàng đợi đến khi pump(), giống sự kiện COM trên luồng STA."""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.pending = []
+        self.on_change = None
+        self.on_activate = None
+
+    def subscribe(self, on_change, on_activate):
+        if self.fail:
+            raise OSError("Không hỗ trợ sự kiện")
+        self.on_change = on_change
+        self.on_activate = on_activate
+
+    def unsubscribe(self):
+        self.on_change = None
+        self.on_activate = None
+
+    def change(self, sheet_name, address):
+        self.pending.append(lambda: self.on_change(sheet_name, address))
+
+    def activate(self, sheet_name):
+        self.pending.append(lambda: self.on_activate(sheet_name))
+
+    def pump(self):
+        pending, self.pending = self.pending, []
+        for event in pending:
+            event()
+
+
+class TestSheetEventSink(unittest.TestCase):
+
+    def setUp(self):
+        self.source = LocalEventSource()
+        self.sink = SheetEventSink(self.source)
+        self.assertTrue(self.sink.start())
+
+    def test_parse_area(self):
+        self.assertEqual(parse_area("$F$19:$F$25"), (19, 6, 25, 6))
+        self.assertEqual(parse_area("$G$20"), (20, 7, 20, 7))
+        self.assertEqual(parse_area("$19:$21")[:3], (19, 1, 21))
+        self.assertEqual(parse_area("$E:$E")[1::2], (5, 5))
+        self.assertIsNone(parse_area("không phải địa chỉ"))
+
+    def test_classifies_regions(self):
+        self.assertEqual(self.sink.classify("$F$19:$F$25"), {REGION_SIZES})
+        self.assertEqual(self.sink.classify("$H$30"), {REGION_QUANTITIES})
+        self.assertEqual(self.sink.classify("$A$19:$A$80,$E$19"), {REGION_PO_COLOR})
+        self.assertEqual(self.sink.classify("$G$18"), {REGION_HEADER})
+        self.assertEqual(self.sink.classify("$B$2"), set())
+        self.assertEqual(
+            self.sink.classify("$25:$25"),
+            {REGION_SIZES, REGION_QUANTITIES, REGION_PO_COLOR}
+        )
+
+    def test_events_arrive_on_pump_and_are_taken_once(self):
+        self.source.change("PL", "$F$20")
+        self.source.change("PL", "$H$20")
+        self.source.change("PL2", "$A$19")
+        self.assertEqual(self.sink.dirty_sheets(), [])
+
+        self.sink.pump()
+
+        self.assertEqual(self.sink.take_dirty("PL"), {REGION_SIZES, REGION_QUANTITIES})
+        self.assertEqual(self.sink.take_dirty("PL"), set())
+        self.assertEqual(self.sink.dirty_sheets(), ["PL2"])
+
+    def test_changed_areas_are_taken_with_regions(self):
+        self.source.change("PL", "$G$20:$H$21,$B$2")
+        self.source.change("PL", "$F$22")
+        self.sink.pump()
+
+        regions, areas = self.sink.take_changes("PL")
+
+        self.assertEqual(regions, {REGION_SIZES, REGION_QUANTITIES})
+        self.assertEqual(areas, [(20, 7, 21, 8), (22, 6, 22, 6)])
+        self.assertEqual(self.sink.take_changes("PL"), (set(), []))
+
+    def test_activation_is_reported(self):
+        self.source.activate("PL2")
+        self.sink.pump()
+
+        self.assertEqual(self.sink.take_activated(), "PL2")
+        self.assertIsNone(self.sink.take_activated())
+
+    def test_subscribe_failure_leaves_sink_inactive(self):
+        sink = SheetEventSink(LocalEventSource(fail=True))
+
+        self.assertFalse(sink.start())
+        self.assertFalse(sink.active)
+
+    def test_stop_unsubscribes(self):
+        self.sink.stop()
+
+        self.assertIsNone(self.source.on_change)
+        self.assertFalse(self.sink.active)
+
+
+class TestApplyDirtyRegions(unittest.TestCase):
+
+    def setUp(self):
+        invalidate_layout_profile()
+        wb = Workbook()
+        wb.active.title = "PL"
+        wb.create_sheet("PL2")
+        for ws in wb.worksheets:
+            ws.cell(15, 30, "Tot QTY")
+            ws.cell(18, 7, "=G44/20")
+            ws.cell(19, 1, 4500001)
+            ws.cell(19, 6, "038")
+
+        self.manager = ExcelCOMManager()
+        self.manager.config.config['size_filter_config'].update({"column": "F", "start_row": 19})
+        self.manager.excel_app = FakeExcelApplication()
+        self.manager.workbook = self.manager.excel_app.add_openpyxl_workbook(wb, name="PL.xlsx")
+        self.manager.worksheet = self.manager.workbook.Sheets("PL")
+        self.manager.current_sheet = "PL"
+
+    def tearDown(self):
+        invalidate_layout_profile()
+
+    def test_current_sheet_edit_invalidates_snapshot(self):
+        snapshot = self.manager.get_snapshot()
+
+        self.manager.apply_dirty_regions("PL", {REGION_QUANTITIES})
+
+        self.assertTrue(snapshot.is_stale)
+        self.assertIsNot(self.manager.get_snapshot(), snapshot)
+
+    def test_other_sheet_edit_drops_prefetched_snapshot(self):
+        self.manager.prefetch_sheet_snapshot("PL2")
+        prefetched = self.manager._sheet_snapshots["PL2"]
+        current = self.manager.get_snapshot()
+
+        self.manager.apply_dirty_regions("PL2", {REGION_SIZES})
+
+        self.assertTrue(prefetched.is_stale)
+        self.assertFalse(current.is_stale)
+
+    def test_header_edit_redetects_layout(self):
+        profile = get_layout_profile(self.manager.worksheet)
+
+        self.manager.apply_dirty_regions("PL", {REGION_HEADER})
+
+        self.assertIsNot(get_layout_profile(self.manager.worksheet), profile)
+
+    def test_quantity_edit_rereads_only_changed_cells(self):
+        snapshot = self.manager.get_snapshot()
+        self.manager.worksheet.Cells(19, 7).Value = 12
+        self.manager.excel_app.reset_call_count()
+
+        self.manager.apply_dirty_regions("PL", {REGION_QUANTITIES}, [(19, 7, 19, 7)])
+
+        self.assertIs(self.manager.get_snapshot(), snapshot)
+        self.assertFalse(snapshot.is_stale)
+        self.assertEqual(snapshot.value(19, 7), 12)
+        self.assertLessEqual(self.manager.excel_app.call_count, 2)
+
+    def test_size_edit_patches_size_rows(self):
+        snapshot = self.manager.get_snapshot()
+        self.manager.worksheet.Cells(19, 6).Value = "040"
+
+        self.manager.apply_dirty_regions("PL", {REGION_SIZES}, [(19, 6, 19, 6)])
+
+        self.assertIs(self.manager.get_snapshot(), snapshot)
+        self.assertEqual(snapshot.size_rows, {"040": [19]})
+        self.assertEqual(self.manager.scan_sizes(use_snapshot=True), ["040"])
+
+    def test_edit_outside_captured_block_invalidates_snapshot(self):
+        snapshot = self.manager.get_snapshot()
+
+        self.manager.apply_dirty_regions("PL", {REGION_SIZES, REGION_QUANTITIES}, [(25, 1, 25, 16384)])
+
+        self.assertTrue(snapshot.is_stale)
+
+    def test_header_edit_recaptures_snapshot(self):
+        snapshot = self.manager.get_snapshot()
+
+        self.manager.apply_dirty_regions("PL", {REGION_HEADER, REGION_QUANTITIES}, [(18, 7, 18, 7)])
+
+        self.assertTrue(snapshot.is_stale)
+
+    def test_other_sheet_edit_patches_prefetched_snapshot(self):
+        self.manager.prefetch_sheet_snapshot("PL2")
+        prefetched = self.manager._sheet_snapshots["PL2"]
+        self.manager.workbook.Sheets("PL2").Cells(19, 1).Value = 4500002
+
+        self.manager.apply_dirty_regions("PL2", {REGION_PO_COLOR}, [(19, 1, 19, 1)])
+
+        self.assertIs(self.manager._sheet_snapshots["PL2"], prefetched)
+        self.assertEqual(prefetched.value(19, 1), 4500002)
+
+    def test_no_regions_keeps_snapshot(self):
+        snapshot = self.manager.get_snapshot()
+
+        self.manager.apply_dirty_regions("PL", set())
+
+        self.assertIs(self.manager.get_snapshot(), snapshot)
+
+
+if __name__ == '__main__':
+    unittest.main()
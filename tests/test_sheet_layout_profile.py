@@ -0,0 +1,150 @@
+import unittest
+from unittest.mock import patch
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from openpyxl import Workbook
+
+from excel_automation.fake_excel import FakeExcelApplication
+from excel_automation.sheet_layout_profile import (
+    get_layout_profile,
+    invalidate_layout_profile
+)
+from excel_automation.box_list_export_config import BoxListExportConfig
+from excel_automation.box_list_export_manager import BoxListExportManager
+from ui.size_quantity_input_dialog import SizeQuantityInputDialog
+
+
+def build_template() -> Workbook:
+    """Header giống template thật: From/To ở dòng 15/16, Tot QTY ở AD15, số chia ở G18."""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "PL"
+    ws.cell(15, 6, "From ( Ctn )")
+    ws.cell(16, 6, "To ( Ctn )")
+    ws.cell(18, 4, "   Carton.No")
+    ws.cell(15, 7, 1)
+    ws.cell(16, 7, 1)
+    ws.cell(15, 8, "=G16+1")
+    ws.cell(16, 8, "=H15+H18-1")
+    ws.cell(18, 7, "=G44/20")
+    ws.cell(18, 8, "=H44/20")
+    ws.cell(15, 30, "Tot QTY")
+    ws.cell(15, 32, 480)
+    for offset, size in enumerate(["038", "040", "042"]):
+        ws.cell(19 + offset, 6, size)
+        ws.cell(19 + offset, 7, 20)
+    return wb
+
+
+class TestSheetLayoutProfile(unittest.TestCase):
+
+    def setUp(self):
+        invalidate_layout_profile()
+        self.wb = build_template()
+        self.app = FakeExcelApplication()
+        self.sheet = self.app.add_openpyxl_workbook(self.wb, name="PL.xlsx").Sheets("PL")
+
+    def tearDown(self):
+        invalidate_layout_profile()
+
+    def test_detects_layout_from_header(self):
+        profile = get_layout_profile(self.sheet)
+
+        self.assertEqual(profile.key, ("PL.xlsx", "PL"))
+        self.assertEqual(profile.tot_qty_column, 30)
+        self.assertEqual(profile.items_per_box, 20)
+        self.assertEqual((profile.box_start_row, profile.box_end_row), (15, 16))
+        self.assertEqual(profile.last_column, 32)
+        self.assertEqual(profile.read_total_qty(self.sheet), 480)
+
+    def test_reuses_profile_with_one_header_read(self):
+        first = get_layout_profile(self.sheet)
+        self.app.reset_call_count()
+
+        second = get_layout_profile(self.sheet)
+
+        self.assertIs(first, second)
+        self.assertLessEqual(self.app.call_count, 6)
+
+    def test_box_number_edits_keep_profile(self):
+        first = get_layout_profile(self.sheet)
+        self.sheet.Cells(15, 7).Value = 101
+
+        self.assertIs(get_layout_profile(self.sheet), first)
+
+    def test_header_change_redetects(self):
+        first = get_layout_profile(self.sheet)
+        self.sheet.Cells(18, 7).Formula = "=G44/12"
+
+        second = get_layout_profile(self.sheet)
+
+        self.assertIsNot(first, second)
+        self.assertEqual(second.items_per_box, 12)
+
+    def test_profiles_are_keyed_per_sheet(self):
+        other = self.app.add_openpyxl_workbook(build_template(), name="Other.xlsx").Sheets("PL")
+        other.Cells(18, 7).Formula = "=G44/30"
+
+        self.assertEqual(get_layout_profile(self.sheet).items_per_box, 20)
+        self.assertEqual(get_layout_profile(other).items_per_box, 30)
+
+    def test_missing_labels_fall_back_to_defaults(self):
+        wb = Workbook()
+        wb.active.title = "Blank"
+        sheet = self.app.add_openpyxl_workbook(wb, name="Blank.xlsx").Sheets("Blank")
+
+        profile = get_layout_profile(sheet)
+
+        self.assertIsNone(profile.tot_qty_column)
+        self.assertIsNone(profile.items_per_box)
+        self.assertEqual((profile.box_start_row, profile.box_end_row), (15, 16))
+        self.assertIsNone(profile.read_total_qty(sheet))
+
+
+class TestLayoutProfileConsumers(unittest.TestCase):
+
+    def setUp(self):
+        invalidate_layout_profile()
+        self.app = FakeExcelApplication()
+        self.sheet = self.app.add_openpyxl_workbook(build_template(), name="PL.xlsx").Sheets("PL")
+        get_layout_profile(self.sheet)
+        self.app.reset_call_count()
+
+    def tearDown(self):
+        invalidate_layout_profile()
+
+    def test_quantity_dialog_info_uses_cached_profile(self):
+        with patch("excel_automation.sheet_layout_profile.get_used_range_bounds") as detect:
+            self.assertEqual(SizeQuantityInputDialog.read_excel_info(self.sheet), (480, 20))
+        detect.assert_not_called()
+        self.assertLessEqual(self.app.call_count, 16)
+
+    def test_read_box_ranges_uses_cached_profile(self):
+        config = BoxListExportConfig()
+        config.config['box_list_export_config']['size_data_end_row'] = 21
+
+        with patch("excel_automation.sheet_layout_profile.get_used_range_bounds") as detect:
+            ranges = BoxListExportManager(config).read_box_ranges(self.sheet, ["038", "040"])
+
+        detect.assert_not_called()
+        self.assertEqual(ranges["038"], [(1, 1, 7, 20)])
+
+    def test_read_box_ranges_cost_is_flat_in_size_count(self):
+        config = BoxListExportConfig()
+        config.config['box_list_export_config']['size_data_end_row'] = 21
+        manager = BoxListExportManager(config)
+
+        manager.read_box_ranges(self.sheet, ["038"])
+        one_size_calls = self.app.call_count
+        self.app.reset_call_count()
+        ranges = manager.read_box_ranges(self.sheet, ["038", "040", "042"])
+
+        self.assertEqual(self.app.call_count, one_size_calls)
+        self.assertEqual(ranges["042"], [(1, 1, 7, 20)])
+
+
+if __name__ == '__main__':
+    unittest.main()
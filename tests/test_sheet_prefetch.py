@@ -0,0 +1,117 @@
+import unittest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from openpyxl import Workbook
+
+from excel_automation.excel_com_manager import ExcelCOMManager
+from excel_automation.fake_excel import FakeExcelApplication
+from excel_automation.sheet_layout_profile import invalidate_layout_profile
+from excel_automation.size_change_detector import SizeChangeDetector
+
+
+def fill_packing_list(ws, sizes, po):
+    ws.cell(15, 30, "Tot QTY")
+    ws.cell(18, 7, "=G44/20")
+    for offset, size in enumerate(sizes):
+        row = 19 + offset
+        ws.cell(row, 1, po)
+        ws.cell(row, 5, "'RED")
+        ws.cell(row, 6, size)
+
+
+class TestSheetPrefetch(unittest.TestCase):
+
+    def setUp(self):
+        invalidate_layout_profile()
+        wb = Workbook()
+        fill_packing_list(wb.active, ["038", "040"], 4500001)
+        wb.active.title = "PL1"
+        fill_packing_list(wb.create_sheet("PL2"), ["042", "044", "046"], 4500002)
+        notes = wb.create_sheet("Notes")
+        notes.cell(1, 1, "ghi chú")
+
+        self.manager = ExcelCOMManager()
+        self.manager.config.config['size_filter_config'].update(
+            {"column": "F", "start_row": 19, "sheet_name": "PL1"}
+        )
+        self.app = FakeExcelApplication()
+        self.manager.excel_app = self.app
+        self.manager.workbook = self.app.add_openpyxl_workbook(wb, name="PL.xlsx")
+        self.manager.worksheet = self.manager.workbook.Sheets("PL1")
+        self.manager.current_sheet = "PL1"
+
+    def tearDown(self):
+        invalidate_layout_profile()
+
+    def test_prefetch_skips_sheets_outside_template(self):
+        self.assertTrue(self.manager.prefetch_sheet_snapshot("PL2"))
+        self.assertFalse(self.manager.prefetch_sheet_snapshot("Notes"))
+        self.assertFalse(self.manager.prefetch_sheet_snapshot("PL1"))
+
+    def test_switch_to_prefetched_sheet_reads_nothing_new(self):
+        self.manager.prefetch_sheet_snapshot("PL2")
+        self.app.reset_call_count()
+
+        self.manager.switch_sheet("PL2")
+        sizes = self.manager.scan_sizes(use_snapshot=True)
+        po = self.manager.get_snapshot().value(19, 1)
+
+        self.assertEqual(sizes, ["042", "044", "046"])
+        self.assertEqual(po, 4500002)
+        self.assertLessEqual(self.app.call_count, 4)
+
+    def test_switch_back_keeps_previous_sheet_snapshot(self):
+        first = self.manager.get_snapshot()
+        self.manager.switch_sheet("PL2")
+
+        self.manager.switch_sheet("PL1")
+
+        self.assertIs(self.manager.get_snapshot(), first)
+
+    def test_edits_invalidate_prefetched_snapshot(self):
+        self.manager.prefetch_sheet_snapshot("PL2")
+        self.manager.workbook.Sheets("PL2").Cells(19, 6).Value = "050"
+        self.manager.invalidate_prefetched("PL2")
+
+        self.manager.switch_sheet("PL2")
+
+        self.assertEqual(self.manager.scan_sizes(use_snapshot=True), ["044", "046", "050"])
+
+    def test_external_edit_while_polling_is_not_hidden_by_prefetch(self):
+        self.manager.prefetch_sheet_snapshot("PL2")
+        self.manager.workbook.Sheets("PL2").Cells(19, 6).Value = "050"
+
+        self.manager.switch_sheet("PL2", reuse_snapshot=False)
+        sizes = self.manager.scan_sizes(use_snapshot=True)
+        detector = SizeChangeDetector()
+        detector.prime(self.manager.worksheet, "F", 19, snapshot=self.manager.cached_snapshot())
+
+        self.assertEqual(sizes, ["044", "046", "050"])
+        self.assertFalse(detector.has_changed(self.manager.worksheet, "F", 19))
+        self.manager.worksheet.Cells(20, 6).Value = "052"
+        self.assertTrue(detector.has_changed(self.manager.worksheet, "F", 19))
+
+    def test_detector_primed_from_displayed_snapshot_sees_missed_edit(self):
+        self.manager.prefetch_sheet_snapshot("PL2")
+        self.manager.workbook.Sheets("PL2").Cells(19, 6).Value = "050"
+
+        self.manager.switch_sheet("PL2")
+        detector = SizeChangeDetector()
+        detector.prime(self.manager.worksheet, "F", 19, snapshot=self.manager.cached_snapshot())
+
+        self.assertEqual(self.manager.scan_sizes(use_snapshot=True), ["042", "044", "046"])
+        self.assertTrue(detector.has_changed(self.manager.worksheet, "F", 19))
+
+    def test_rename_drops_prefetched_snapshot(self):
+        self.manager.prefetch_sheet_snapshot("PL2")
+
+        self.manager.rename_sheet("PL2", "PL2 new")
+
+        self.assertNotIn("PL2", self.manager._sheet_snapshots)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from excel_automation.sheet_snapshot import SheetSnapshot
+
+
+def make_block(data_rows, width=52, tot_qty_col=None, header_row=16):
+    header = [[None] * width for _ in range(5)]
+    if tot_qty_col is not None:
+        header[header_row - 14][tot_qty_col - 1] = "Tot QTY"
+    rows = [tuple(r) for r in header]
+    for row in data_rows:
+        padded = list(row) + [None] * (width - len(row))
+        rows.append(tuple(padded))
+    return tuple(rows)
+
+
+def make_worksheet(block):
+    worksheet = MagicMock()
+    used_range = MagicMock()
+    used_range.Row = 1
+    used_range.Rows.Count = 13 + len(block)
+    used_range.Column = 1
+    used_range.Columns.Count = 40
+    worksheet.UsedRange = used_range
+    worksheet.Range.return_value.Value2 = block
+    return worksheet
+
+
+class TestSheetSnapshotCapture(unittest.TestCase):
+
+    def setUp(self):
+        self.block = make_block([
+            ("PO1", None, None, None, "'RED", 38.0, 10.0),
+            ("PO1", None, None, None, "'RED", 40.0, None, 5.0),
+            ("PO1", None, None, None, "'RED", 38.0),
+            (None,),
+        ], tot_qty_col=20)
+        self.worksheet = make_worksheet(self.block)
+
+    def test_reads_whole_block_in_one_call(self):
+        SheetSnapshot.capture(self.worksheet)
+        self.worksheet.Range.assert_called_once_with("A14:AZ22")
+
+    def test_builds_size_row_index(self):
+        snapshot = SheetSnapshot.capture(self.worksheet)
+        self.assertEqual(snapshot.size_rows, {"038": [19, 21], "040": [20]})
+
+    def test_last_data_row_stops_at_empty_reference_cell(self):
+        snapshot = SheetSnapshot.capture(self.worksheet)
+        self.assertEqual(snapshot.last_data_row, 21)
+
+    def test_detects_tot_qty_column(self):
+        snapshot = SheetSnapshot.capture(self.worksheet)
+        self.assertEqual(snapshot.tot_qty_column, 20)
+
+    def test_value_lookup_and_out_of_block(self):
+        snapshot = SheetSnapshot.capture(self.worksheet)
+        self.assertEqual(snapshot.value(19, 7), 10.0)
+        self.assertEqual(snapshot.value(20, 8), 5.0)
+        self.assertIsNone(snapshot.value(500, 7))
+        self.assertIsNone(snapshot.value(19, 200))
+
+    def test_invalidate_marks_stale(self):
+        snapshot = SheetSnapshot.capture(self.worksheet)
+        self.assertFalse(snapshot.is_stale)
+        snapshot.invalidate()
+        self.assertTrue(snapshot.is_stale)
+
+
+class TestManagersReadFromSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        block = make_block([
+            (4500123.0, None, None, None, "'RED", 38.0, 10.0),
+            (4500123.0, None, None, None, "'RED", 40.0, None, 5.0),
+        ])
+        self.snapshot = SheetSnapshot(block)
+        self.worksheet = MagicMock()
+
+    def test_current_quantities_without_cell_reads(self):
+        from excel_automation.size_quantity_display_manager import SizeQuantityDisplayManager
+
+        manager = SizeQuantityDisplayManager(MagicMock(get_start_row=MagicMock(return_value=19)))
+        result = manager.get_current_quantities(
+            self.worksheet, ["038", "040"], "F", snapshot=self.snapshot
+        )
+
+        self.assertEqual(result, {"038": 10, "040": 5})
+        self.worksheet.Cells.assert_not_called()
+
+    def test_current_po_and_color_from_snapshot(self):
+        from excel_automation.po_update_manager import POUpdateManager
+        from excel_automation.color_code_update_manager import ColorCodeUpdateManager
+
+        po = POUpdateManager(MagicMock()).get_current_po(self.worksheet, snapshot=self.snapshot)
+        color = ColorCodeUpdateManager(MagicMock()).get_current_color_code(
+            self.worksheet, snapshot=self.snapshot
+        )
+
+        self.assertEqual(po, "4500123")
+        self.assertEqual(color, "RED")
+        self.worksheet.Cells.assert_not_called()
+
+    def test_write_invalidates_snapshot(self):
+        from excel_automation.size_quantity_display_manager import SizeQuantityDisplayManager
+
+        manager = SizeQuantityDisplayManager(MagicMock(get_start_row=MagicMock(return_value=19)))
+        manager.write_quantities_to_excel(
+            MagicMock(), self.worksheet, ["038"], {"038": 12}, {}, "F",
+            snapshot=self.snapshot
+        )
+
+        self.assertTrue(self.snapshot.is_stale)
+
+
+class TestComManagerSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        from excel_automation.excel_com_manager import ExcelCOMManager
+        with patch.object(ExcelCOMManager, '__init__', lambda self, *a, **kw: None):
+            self.manager = ExcelCOMManager()
+        self.manager.config = MagicMock()
+        self.manager.config.get_column.return_value = "F"
+        self.manager.config.get_start_row.return_value = 19
+        self.manager._snapshot = None
+        self.manager.worksheet = make_worksheet(make_block([
+            ("PO1", None, None, None, None, 38.0),
+        ], tot_qty_col=14))
+
+    def test_snapshot_is_cached_until_invalidated(self):
+        first = self.manager.get_snapshot()
+        second = self.manager.get_snapshot()
+        self.assertIs(first, second)
+
+        self.manager.invalidate_snapshot()
+        third = self.manager.get_snapshot()
+        self.assertIsNot(first, third)
+        self.assertTrue(first.is_stale)
+
+    def test_tot_qty_and_end_row_use_cached_snapshot(self):
+        self.manager.get_snapshot()
+        self.manager.worksheet.Range.reset_mock()
+
+        self.assertEqual(self.manager._detect_tot_qty_column(), 14)
+        self.assertEqual(self.manager.detect_end_row(), 19)
+        self.manager.worksheet.Range.assert_not_called()
+        self.manager.worksheet.Cells.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from openpyxl import Workbook
+
+from excel_automation.fake_excel import FakeExcelApplication
+from excel_automation.size_change_detector import SizeChangeDetector
+
+
+class TestSizeChangeDetector(unittest.TestCase):
+
+    def setUp(self):
+        wb = Workbook()
+        wb.active.title = "PL"
+        for offset, size in enumerate(["038", "040", "042"]):
+            wb.active.cell(19 + offset, 6, size)
+        self.app = FakeExcelApplication()
+        self.sheet = self.app.add_openpyxl_workbook(wb, name="PL.xlsx").Sheets("PL")
+        self.detector = SizeChangeDetector(
+            base_interval=3000, min_interval=1000, max_interval=6000, backoff_factor=2
+        )
+
+    def test_unchanged_column_backs_off(self):
+        self.detector.prime(self.sheet, "F", 19)
+
+        self.assertFalse(self.detector.has_changed(self.sheet, "F", 19))
+        self.assertEqual(self.detector.interval, 6000)
+        self.assertFalse(self.detector.has_changed(self.sheet, "F", 19))
+        self.assertEqual(self.detector.interval, 6000)
+
+    def test_edit_is_detected_and_tightens_interval(self):
+        self.detector.prime(self.sheet, "F", 19)
+        self.sheet.Cells(20, 6).Value = 41
+
+        self.assertTrue(self.detector.has_changed(self.sheet, "F", 19))
+        self.assertEqual(self.detector.interval, 1000)
+        self.assertFalse(self.detector.has_changed(self.sheet, "F", 19))
+
+    def test_appended_row_is_detected(self):
+        self.detector.prime(self.sheet, "F", 19)
+        self.sheet.Cells(22, 6).Value = 44
+        self.assertTrue(self.detector.has_changed(self.sheet, "F", 19))
+
+    def test_check_uses_constant_round_trips(self):
+        self.detector.prime(self.sheet, "F", 19)
+        self.app.reset_call_count()
+
+        self.detector.has_changed(self.sheet, "F", 19)
+
+        self.assertLessEqual(self.app.call_count, 10)
+
+    def test_reset_forces_change(self):
+        self.detector.prime(self.sheet, "F", 19)
+        self.detector.reset()
+        self.assertEqual(self.detector.interval, 3000)
+        self.assertTrue(self.detector.has_changed(self.sheet, "F", 19))
+
+
+if __name__ == "__main__":
+    unittest.main()
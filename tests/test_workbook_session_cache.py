@@ -0,0 +1,146 @@
+import unittest
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from openpyxl import Workbook, load_workbook
+
+from excel_automation.excel_app_launcher import ExcelAppLauncher
+from excel_automation.excel_com_manager import ExcelCOMManager
+from excel_automation.fake_excel import FakeExcelApplication
+
+
+class FakeDispatcher:
+
+    def __init__(self):
+        self.app = FakeExcelApplication()
+
+    def get_active(self):
+        return self.app
+
+    def dispatch(self):
+        return self.app
+
+    def dispatch_ex(self):
+        return self.app
+
+
+class TestWorkbookSessionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = []
+        for index in range(4):
+            wb = Workbook()
+            ws = wb.active
+            ws.title = "PL"
+            ws.cell(19, 1, 4500100 + index)
+            ws.cell(19, 6, "038")
+            path = Path(self.tmp.name) / f"PO{index}.xlsx"
+            wb.save(path)
+            self.paths.append(str(path))
+
+        self.dispatcher = FakeDispatcher()
+        self.app = self.dispatcher.app
+        self.manager = ExcelCOMManager(launcher=ExcelAppLauncher(self.dispatcher))
+        self.manager.config.config['size_filter_config'].update(
+            {"sheet_name": "PL", "max_open_workbooks": 2, "workbook_eviction": "save"}
+        )
+        self.manager.sessions.max_sessions = 2
+        self.manager.sessions.eviction = "save"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def open_names(self):
+        return sorted(workbook.Name for workbook in self.app.Workbooks)
+
+    def test_switching_back_reuses_open_workbook(self):
+        self.manager.open_excel_file(self.paths[0])
+        first_workbook = self.manager.workbook
+        snapshot = self.manager.get_snapshot()
+        self.manager.open_excel_file(self.paths[1])
+        self.app.reset_call_count()
+
+        self.manager.open_excel_file(self.paths[0])
+        calls = self.app.call_count
+
+        self.assertIs(self.manager.workbook, first_workbook)
+        self.assertIs(self.manager.get_snapshot(), snapshot)
+        self.assertEqual(self.open_names(), ["PO0.xlsx", "PO1.xlsx"])
+        self.assertLessEqual(calls, 6)
+
+    def test_least_recently_used_workbook_is_saved_and_closed(self):
+        self.manager.open_excel_file(self.paths[0])
+        self.manager.worksheet.Cells(19, 1).Value = 4509999
+        self.manager.workbook.Saved = False
+        self.manager.open_excel_file(self.paths[1])
+        self.manager.open_excel_file(self.paths[0])
+
+        self.manager.open_excel_file(self.paths[2])
+
+        self.assertEqual(self.open_names(), ["PO0.xlsx", "PO2.xlsx"])
+        self.manager.open_excel_file(self.paths[3])
+        self.assertEqual(self.open_names(), ["PO2.xlsx", "PO3.xlsx"])
+        self.assertEqual(load_workbook(self.paths[0])["PL"].cell(19, 1).value, 4509999)
+
+    def test_prompt_can_keep_or_discard(self):
+        answers = [None, False]
+        asked = []
+
+        def prompt(session):
+            asked.append(Path(session.path).name)
+            return answers.pop(0)
+
+        self.manager.sessions.eviction = "prompt"
+        self.manager.sessions.prompt = prompt
+        self.manager.open_excel_file(self.paths[0])
+        self.manager.workbook.Saved = False
+        self.manager.open_excel_file(self.paths[1])
+
+        self.manager.open_excel_file(self.paths[2])
+        self.assertEqual(self.open_names(), ["PO0.xlsx", "PO2.xlsx"])
+
+        self.manager.open_excel_file(self.paths[3])
+        self.assertEqual(asked, ["PO0.xlsx", "PO0.xlsx"])
+        self.assertEqual(self.open_names(), ["PO2.xlsx", "PO3.xlsx"])
+
+    def test_workbook_closed_outside_is_reopened(self):
+        self.manager.open_excel_file(self.paths[0])
+        stale = self.manager.workbook
+        self.manager.open_excel_file(self.paths[1])
+        stale.Close(SaveChanges=False)
+
+        self.manager.open_excel_file(self.paths[0])
+
+        self.assertIsNot(self.manager.workbook, stale)
+        self.assertEqual(self.manager.worksheet.Cells(19, 1).Value, 4500100)
+
+    def test_detach_with_save_saves_every_open_workbook(self):
+        self.manager.open_excel_file(self.paths[0])
+        self.manager.worksheet.Cells(19, 1).Value = 4509990
+        self.manager.open_excel_file(self.paths[1])
+        self.manager.worksheet.Cells(19, 1).Value = 4509991
+
+        self.manager.detach(save_changes=True)
+
+        self.assertEqual(len(self.manager.sessions), 0)
+        self.assertIsNone(self.manager.workbook)
+        self.assertEqual(load_workbook(self.paths[0])["PL"].cell(19, 1).value, 4509990)
+        self.assertEqual(load_workbook(self.paths[1])["PL"].cell(19, 1).value, 4509991)
+
+    def test_detach_without_save_keeps_files_untouched(self):
+        self.manager.open_excel_file(self.paths[0])
+        self.manager.worksheet.Cells(19, 1).Value = 4509990
+        self.manager.open_excel_file(self.paths[1])
+
+        self.manager.detach(save_changes=False)
+
+        self.assertEqual(load_workbook(self.paths[0])["PL"].cell(19, 1).value, 4500100)
+        self.assertEqual(self.open_names(), ["PO0.xlsx", "PO1.xlsx"])
+
+
+if __name__ == '__main__':
+    unittest.main()
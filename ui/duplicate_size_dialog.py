@@ -20,6 +20,7 @@ class DuplicateSizeDialog:
         self.duplicate_sizes = duplicate_sizes
         self.group_checkboxes: Dict[str, Dict[int, tk.BooleanVar]] = {}
         self.rows_to_delete: List[int] = []
+        self.merge_requested = False
 
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("Phát hiện Size trùng")
@@ -136,6 +137,13 @@ class DuplicateSizeDialog:
             width=18
         ).pack(side=tk.RIGHT, padx=(5, 0))
 
+        ttk.Button(
+            action_frame,
+            text="Gộp dòng trùng",
+            command=self._on_merge,
+            width=16
+        ).pack(side=tk.RIGHT, padx=(5, 0))
+
         ttk.Button(
             action_frame,
             text="Bỏ qua",
@@ -182,8 +190,24 @@ class DuplicateSizeDialog:
             self.rows_to_delete = rows_to_delete
             self.dialog.destroy()
 
+    def _on_merge(self) -> None:
+        total_rows = sum(len(rows) - 1 for rows in self.duplicate_sizes.values())
+        confirm = messagebox.askyesno(
+            "Xác nhận gộp",
+            f"Cộng số lượng của {total_rows} dòng trùng vào dòng đầu tiên của mỗi size "
+            f"rồi XÓA các dòng đó?\n\n"
+            f"Hành động này không thể hoàn tác!",
+            parent=self.dialog
+        )
+
+        if confirm:
+            self.rows_to_delete = []
+            self.merge_requested = True
+            self.dialog.destroy()
+
     def _on_skip(self) -> None:
         self.rows_to_delete = []
+        self.merge_requested = False
         self.dialog.destroy()
 
     def get_rows_to_delete(self) -> List[int]:
@@ -1,18 +1,33 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from typing import List, Dict, Optional, Callable, Tuple, TypeVar, Any
+from typing import List, Dict, Optional, Callable, Set, Tuple, TypeVar, Any
 from pathlib import Path
 import logging
 import math
 import re
+import threading
 import time
 
 from excel_automation.excel_com_manager import ExcelCOMManager
+from excel_automation.excel_app_launcher import ExcelAppLauncher
+from excel_automation.workbook_session_cache import WorkbookSession
+from excel_automation.sheet_event_sink import (
+    SheetEventSink,
+    Win32WorkbookEventSource,
+    REGION_SIZES,
+    REGION_PO_COLOR
+)
+from excel_automation.sheet_snapshot import SheetSnapshot
+from excel_automation.com_instrumentation import com_operation, bind_operation
+from excel_automation.com_worker import ComWorker, ComJob, AfterDispatcher
+from excel_automation.com_retry import BusyWait, get_retry_scheduler, is_busy_error
+from excel_automation.size_change_detector import SizeChangeDetector
 from excel_automation.size_filter_config import SizeFilterConfig
 from excel_automation.dialog_config_manager import DialogConfigManager
 from excel_automation.size_quantity_display_manager import SizeQuantityDisplayManager
 from excel_automation.box_list_export_config import BoxListExportConfig
 from excel_automation.box_list_export_manager import BoxListExportManager
+from excel_automation.box_list_batch_export import BoxListBatchExporter, BatchExportReport
 from ui.box_list_export_progress_dialog import BoxListExportProgressDialog
 from excel_automation.carton_allocation_calculator import (
     CartonAllocationCalculator,
@@ -22,6 +37,7 @@ from excel_automation.po_update_manager import POUpdateManager
 from excel_automation.color_code_update_manager import ColorCodeUpdateManager
 from ui.size_quantity_input_dialog import SizeQuantityInputDialog
 from excel_automation.pdf_po_parser import PDFPOParser
+from excel_automation.import_transaction import ImportTransaction
 from ui.ui_config import UIConfig
 from ui.sheet_rename_dialog import SheetRenameDialog
 from ui.copy_sheet_progress_dialog import CopySheetProgressDialog
@@ -32,6 +48,8 @@ logger = logging.getLogger(__name__)
 class ExcelRealtimeController:
 
     AUTO_SAVE_DELAY_MS = 10000
+    EVENT_PUMP_INTERVAL_MS = 1000
+    EVENT_FALLBACK_POLL_TICKS = 15
 
     def __init__(self, root: tk.Tk):
         self.root = root
@@ -60,7 +78,23 @@ class ExcelRealtimeController:
 
         self._auto_refresh_sizes_timer_id: Optional[str] = None
         self._auto_refresh_interval: int = 3000
+        self._size_change_detector = SizeChangeDetector(base_interval=self._auto_refresh_interval)
         self._cached_sizes: List[str] = []
+        self._auto_refresh_active: bool = False
+        self._size_refresh_job: Optional[ComJob] = None
+        self._auto_save_job: Optional[ComJob] = None
+        self._prefetch_generation: int = 0
+        self._event_sink: Optional[SheetEventSink] = None
+        self._event_ticks: int = 0
+
+        self._com_dispatcher = AfterDispatcher(root)
+        self.com_worker = ComWorker(dispatch=self._com_dispatcher)
+        self._excel_launcher = ExcelAppLauncher()
+        self.com_worker.start()
+        self.com_worker.submit(self._excel_launcher.warm_up, name="excel_warm_start")
+        self._retry_scheduler = get_retry_scheduler()
+        self._retry_scheduler.on_wait = self._on_excel_busy
+        self._retry_scheduler.on_resume = self._on_excel_resumed
 
         self.po_updated: bool = False
         self.color_updated: bool = False
@@ -72,6 +106,8 @@ class ExcelRealtimeController:
 
         self._setup_window()
         self._create_widgets()
+
+        self._com_dispatcher.start()
     
     def _setup_window(self) -> None:
         self.root.title("Nhập Packing List - by Chồng Thi")
@@ -191,6 +227,7 @@ class ExcelRealtimeController:
             ("📝 Nhập Số Lượng Size", self._input_size_quantities),
             ("💾 Ghi vào Excel", self._write_quantities_to_excel),
             ("📦 Xuất Danh Sách Thùng", self._export_box_list),
+            ("📦 Xuất Thùng Cả File", self._export_box_list_workbook),
             ("📄 Đọc PDF", self._open_pdf_reader),
         ]
 
@@ -343,68 +380,165 @@ class ExcelRealtimeController:
             return
 
         self.ui_config.set_last_directory("excel_open", file_path)
+        self.status_label.config(text=f"Đang mở file: {Path(file_path).name}...")
 
-        try:
-            self.status_label.config(text=f"Đang mở file: {Path(file_path).name}...")
-            self.root.update()
-            
-            if self.com_manager is None:
-                self.com_manager = ExcelCOMManager(self.config)
-            
-            self.com_manager.open_excel_file(file_path)
-            self.current_file = file_path
-            
-            self.sheet_names = self.com_manager.get_sheet_names()
-            self.sheet_combobox['values'] = self.sheet_names
-            
-            if self.sheet_names:
-                self.current_sheet = self.com_manager.current_sheet
-                self.sheet_combobox.set(self.current_sheet)
-                self.sheet_status_label.config(
-                    text=f"({len(self.sheet_names)} sheets)",
-                    foreground="blue"
+        if self.com_manager is None:
+            self.com_manager = ExcelCOMManager(self.config, self._excel_launcher)
+            self.com_manager.sessions.prompt = self._ask_save_evicted_workbook
+        com_manager = self.com_manager
+
+        def open_workbook() -> Tuple[List[str], Optional[str]]:
+            com_manager.open_excel_file(file_path)
+            return com_manager.get_sheet_names(), com_manager.current_sheet
+
+        self._run_com(
+            open_workbook,
+            on_success=lambda result: self._on_file_opened(file_path, *result),
+            on_error=self._on_open_file_error
+        )
+
+    def _ask_save_evicted_workbook(self, session: WorkbookSession) -> Optional[bool]:
+        """Chạy trên luồng COM: hỏi người dùng trên luồng UI và chờ câu trả lời."""
+        answer: Dict[str, Optional[bool]] = {}
+        answered = threading.Event()
+
+        def ask() -> None:
+            try:
+                answer["value"] = messagebox.askyesnocancel(
+                    "Đóng workbook cũ",
+                    f"Workbook '{Path(session.path).name}' có thay đổi chưa lưu.\n\n"
+                    f"Lưu trước khi đóng?\n(Cancel để giữ workbook này mở)"
                 )
-            
-            self.file_label.config(
-                text=f"📄 {Path(file_path).name}",
-                foreground="black"
+            finally:
+                answered.set()
+
+        self._com_dispatcher(ask)
+        answered.wait()
+        return answer.get("value")
+
+    def _on_file_opened(self, file_path: str, sheet_names: List[str],
+                        current_sheet: Optional[str]) -> None:
+        self.current_file = file_path
+        self.sheet_names = sheet_names
+        self.sheet_combobox['values'] = self.sheet_names
+
+        if self.sheet_names:
+            self.current_sheet = current_sheet
+            self.sheet_combobox.set(self.current_sheet)
+            self.sheet_status_label.config(
+                text=f"({len(self.sheet_names)} sheets)",
+                foreground="blue"
             )
-            
-            self.status_label.config(
-                text=f"Đã mở file: {Path(file_path).name} - Sheet: {self.current_sheet}"
+
+        self.file_label.config(
+            text=f"📄 {Path(file_path).name}",
+            foreground="black"
+        )
+
+        self.status_label.config(
+            text=f"Đã mở file: {Path(file_path).name} - Sheet: {self.current_sheet}"
+        )
+
+        self._scan_sizes()
+
+        self._update_po_color_display()
+        self._highlight_update_buttons()
+
+        self._attach_event_sink()
+        self._start_auto_refresh_sizes()
+
+        logger.info(f"Đã mở file qua COM: {file_path}")
+
+    def _on_open_file_error(self, error: BaseException) -> None:
+        logger.error(f"Lỗi khi mở file: {error}")
+        messagebox.showerror(
+            "Lỗi",
+            f"Không thể mở file Excel:\n\n{str(error)}\n\n"
+            "Vui lòng kiểm tra:\n"
+            "- File có tồn tại không\n"
+            "- Excel có đang mở file này không\n"
+            "- Bạn có quyền truy cập file không"
+        )
+        self.status_label.config(text="Lỗi khi mở file")
+    
+    def _attach_event_sink(self) -> None:
+        """Đăng ký sự kiện SheetChange/SheetActivate của workbook vừa mở; lỗi thì chỉ dùng poll."""
+        com_manager = self.com_manager
+        previous = self._event_sink
+        self._event_sink = None
+
+        def attach() -> Optional[SheetEventSink]:
+            if previous is not None:
+                previous.stop()
+            sink = SheetEventSink(
+                Win32WorkbookEventSource(com_manager.workbook),
+                size_column=com_manager._column_letter_to_number(self.config.get_column()),
+                data_start_row=self.config.get_start_row()
             )
-            
-            self._scan_sizes()
+            return sink if sink.start() else None
+
+        def on_attached(sink: Optional[SheetEventSink]) -> None:
+            if self.com_manager is com_manager:
+                self._event_sink = sink
+                self._start_sheet_prefetch()
+            elif sink is not None:
+                self.com_worker.submit(sink.stop, name="stop_event_sink")
+
+        self.com_worker.submit(
+            attach,
+            on_success=on_attached,
+            on_error=lambda e: logger.warning(f"Không đăng ký được sự kiện workbook: {e}"),
+            name="attach_event_sink"
+        )
 
-            self._update_po_color_display()
-            self._highlight_update_buttons()
+    def _events_active(self) -> bool:
+        return self._event_sink is not None and self._event_sink.active
 
-            self._start_auto_refresh_sizes()
-            
-            logger.info(f"Đã mở file qua COM: {file_path}")
-            
-        except Exception as e:
-            logger.error(f"Lỗi khi mở file: {e}")
-            messagebox.showerror(
-                "Lỗi",
-                f"Không thể mở file Excel:\n\n{str(e)}\n\n"
-                "Vui lòng kiểm tra:\n"
-                "- File có tồn tại không\n"
-                "- Excel có đang mở file này không\n"
-                "- Bạn có quyền truy cập file không"
+    def _start_sheet_prefetch(self, invalidate: bool = False) -> None:
+        """
+        Đọc sẵn snapshot các sheet khác trong nền, mỗi sheet một job để không chặn thao tác của người dùng.
+
+        Chỉ chạy khi đã đăng ký được sự kiện workbook: không có sự kiện thì switch_sheet
+        không dùng lại snapshot đọc sẵn, đọc trước chỉ làm bận luồng COM.
+        """
+        if not self.com_manager or not self._events_active():
+            return
+
+        com_manager = self.com_manager
+        sheet_names = [name for name in self.sheet_names if name != self.current_sheet]
+        self._prefetch_generation += 1
+        generation = self._prefetch_generation
+
+        if invalidate:
+            self.com_worker.submit(com_manager.invalidate_prefetched, name="invalidate_prefetch")
+
+        def prefetch(index: int) -> None:
+            if (generation != self._prefetch_generation or self.com_manager is not com_manager
+                    or index >= len(sheet_names)):
+                return
+
+            def on_error(error: BaseException) -> None:
+                logger.warning(f"Không đọc sẵn được sheet '{sheet_names[index]}': {error}")
+                prefetch(index + 1)
+
+            self.com_worker.submit(
+                com_manager.prefetch_sheet_snapshot, sheet_names[index],
+                on_success=lambda _: prefetch(index + 1),
+                on_error=on_error,
+                name="prefetch_sheet"
             )
-            self.status_label.config(text="Lỗi khi mở file")
-    
+
+        prefetch(0)
+
     def _reload_sheets(self) -> None:
         if not self.com_manager:
             messagebox.showwarning("Cảnh báo", "Vui lòng mở file Excel trước!")
             return
 
-        try:
-            self.status_label.config(text="Đang tải lại danh sách sheets...")
-            self.root.update()
+        self.status_label.config(text="Đang tải lại danh sách sheets...")
 
-            self.sheet_names = self.com_manager.get_sheet_names()
+        def on_loaded(sheet_names: List[str]) -> None:
+            self.sheet_names = sheet_names
             self.sheet_combobox['values'] = self.sheet_names
 
             if self.current_sheet in self.sheet_names:
@@ -419,35 +553,44 @@ class ExcelRealtimeController:
 
             self.status_label.config(text=f"Đã tải lại {len(self.sheet_names)} sheets")
             logger.info(f"Đã reload {len(self.sheet_names)} sheets")
+            self._start_sheet_prefetch(invalidate=True)
 
-        except Exception as e:
-            logger.error(f"Lỗi khi reload sheets: {e}")
-            messagebox.showerror("Lỗi", f"Không thể tải lại sheets:\n{str(e)}")
+        def on_error(error: BaseException) -> None:
+            logger.error(f"Lỗi khi reload sheets: {error}")
+            messagebox.showerror("Lỗi", f"Không thể tải lại sheets:\n{str(error)}")
             self.status_label.config(text="Lỗi khi tải lại sheets")
 
+        self._run_com(self.com_manager.get_sheet_names, on_success=on_loaded, on_error=on_error)
+
+    @com_operation("copy_sheet")
     def _copy_sheet(self) -> None:
         if not self.com_manager:
             messagebox.showwarning("Cảnh báo", "Vui lòng mở file Excel trước!")
             return
 
         progress = CopySheetProgressDialog(self.root)
+        progress.start_step(0)
 
-        try:
-            progress.start_step(0)
+        def copy() -> Tuple[str, List[str]]:
             new_sheet_name = self.com_manager.copy_sheet()
-            progress.complete_step(0)
-        except Exception as e:
-            logger.error(f"Lỗi khi copy sheet: {e}")
-            progress.show_error(0, str(e), lambda: self._copy_sheet_retry(progress, None))
-            return
+            return new_sheet_name, self.com_manager.get_sheet_names()
 
-        progress.dialog.withdraw()
+        def on_error(error: BaseException) -> None:
+            logger.error(f"Lỗi khi copy sheet: {error}")
+            progress.show_error(0, str(error), lambda: self._copy_sheet_retry(progress, None))
 
-        dialog = SheetRenameDialog(
-            self.root,
-            new_sheet_name,
-            self.com_manager.get_sheet_names()
+        self._run_com(
+            copy,
+            on_success=lambda result: self._rename_copied_sheet(progress, *result),
+            on_error=on_error
         )
+
+    def _rename_copied_sheet(self, progress: 'CopySheetProgressDialog', new_sheet_name: str,
+                             sheet_names: List[str]) -> None:
+        progress.complete_step(0)
+        progress.dialog.withdraw()
+
+        dialog = SheetRenameDialog(self.root, new_sheet_name, sheet_names)
         user_name = dialog.show()
 
         if user_name is None:
@@ -456,40 +599,72 @@ class ExcelRealtimeController:
             progress.close()
             return
 
-        if user_name != new_sheet_name:
-            try:
-                self.com_manager.rename_sheet(new_sheet_name, user_name)
-                new_sheet_name = user_name
-            except ValueError as ve:
-                messagebox.showwarning("Cảnh báo", str(ve), parent=self.root)
+        def resume(sheet_name: str) -> None:
+            progress.dialog.deiconify()
+            progress.dialog.grab_set()
+            self._copy_sheet_continue(progress, sheet_name)
+
+        if user_name == new_sheet_name:
+            resume(new_sheet_name)
+            return
 
-        progress.dialog.deiconify()
-        progress.dialog.grab_set()
+        def on_rename_error(error: BaseException) -> None:
+            if not isinstance(error, ValueError):
+                logger.error(f"Lỗi khi đổi tên sheet: {error}")
+            messagebox.showwarning("Cảnh báo", str(error), parent=self.root)
+            resume(new_sheet_name)
 
-        self._copy_sheet_continue(progress, new_sheet_name)
+        self._run_com(
+            lambda: self.com_manager.rename_sheet(new_sheet_name, user_name),
+            on_success=lambda _: resume(user_name),
+            on_error=on_rename_error
+        )
 
     def _copy_sheet_continue(self, progress: 'CopySheetProgressDialog', new_sheet_name: str) -> None:
-        try:
+        cleared = 0
+
+        def on_error(error: BaseException) -> None:
+            step = progress.current_step
+            logger.error(f"Lỗi khi copy sheet tại bước {step}: {error}")
+            progress.show_error(
+                step, str(error),
+                lambda: self._copy_sheet_continue(progress, new_sheet_name)
+            )
+
+        def switch_and_clear() -> int:
             self.com_manager.switch_sheet(new_sheet_name)
-            self.current_sheet = new_sheet_name
+            return self.com_manager.clear_quantity_columns()
 
-            progress.start_step(1)
-            cleared = self.com_manager.clear_quantity_columns()
+        def on_cleared(cleared_count: int) -> None:
+            nonlocal cleared
+            cleared = cleared_count
+            self.current_sheet = new_sheet_name
             progress.complete_step(1)
 
             progress.start_step(2)
-            self._scan_sizes()
+            self._scan_sizes(on_done=on_scanned)
+
+        def on_scanned() -> None:
             self._deselect_all_sizes()
             progress.complete_step(2)
 
             progress.dialog.withdraw()
-            self._check_and_remove_duplicate_sizes()
+            self._check_and_remove_duplicate_sizes(on_done=on_duplicates_checked)
+
+        def on_duplicates_checked() -> None:
             progress.dialog.deiconify()
             progress.dialog.grab_set()
 
             progress.start_step(3)
-            self.com_manager.show_all_rows()
-            self.sheet_names = self.com_manager.get_sheet_names()
+
+            def show_rows() -> List[str]:
+                self.com_manager.show_all_rows()
+                return self.com_manager.get_sheet_names()
+
+            self._run_com(show_rows, on_success=on_finished, on_error=on_error)
+
+        def on_finished(sheet_names: List[str]) -> None:
+            self.sheet_names = sheet_names
             self.sheet_combobox['values'] = self.sheet_names
             self.sheet_combobox.set(new_sheet_name)
             self.sheet_status_label.config(
@@ -508,28 +683,36 @@ class ExcelRealtimeController:
             )
             logger.info(f"Đã copy sheet thành công: '{new_sheet_name}', xóa {cleared} ô")
 
-        except Exception as e:
-            step = progress.current_step
-            logger.error(f"Lỗi khi copy sheet tại bước {step}: {e}")
-            progress.show_error(
-                step, str(e),
-                lambda: self._copy_sheet_continue(progress, new_sheet_name)
-            )
+        progress.start_step(1)
+        self._run_com(switch_and_clear, on_success=on_cleared, on_error=on_error)
 
     def _copy_sheet_retry(self, progress: 'CopySheetProgressDialog', _) -> None:
         progress.close()
         self._copy_sheet()
 
-    def _check_and_remove_duplicate_sizes(self) -> None:
-        try:
-            from excel_automation.duplicate_size_detector import DuplicateSizeDetector
-            from ui.duplicate_size_dialog import DuplicateSizeDialog
+    @com_operation("remove_duplicates")
+    def _check_and_remove_duplicate_sizes(self, on_done: Optional[Callable[[], None]] = None) -> None:
+        from excel_automation.duplicate_size_detector import DuplicateSizeDetector
+        from ui.duplicate_size_dialog import DuplicateSizeDialog
+
+        detector = DuplicateSizeDetector(self.com_manager)
 
-            detector = DuplicateSizeDetector(self.com_manager)
-            duplicates = detector.detect_duplicates()
+        def finish() -> None:
+            if on_done:
+                on_done()
+
+        def on_error(error: BaseException) -> None:
+            logger.error(f"Lỗi khi xử lý size trùng: {error}")
+            messagebox.showerror(
+                "Lỗi",
+                f"Lỗi khi xóa dòng trùng:\n{str(error)}"
+            )
+            finish()
 
+        def on_detected(duplicates: Dict[str, List[int]]) -> None:
             if not duplicates:
                 logger.info("Không có size trùng sau copy sheet")
+                finish()
                 return
 
             total_dup_rows = sum(len(rows) for rows in duplicates.values())
@@ -538,28 +721,39 @@ class ExcelRealtimeController:
             dialog = DuplicateSizeDialog(self.root, duplicates)
             dialog.show()
 
+            if dialog.merge_requested:
+                self._run_com(
+                    lambda: detector.merge_duplicates(duplicates),
+                    on_success=on_deleted,
+                    on_error=on_error
+                )
+                return
+
             rows_to_delete = dialog.get_rows_to_delete()
 
             if not rows_to_delete:
                 logger.info("User bỏ qua xóa size trùng")
+                finish()
                 return
 
-            deleted = detector.delete_rows(rows_to_delete)
+            self._run_com(
+                lambda: detector.delete_rows(rows_to_delete),
+                on_success=on_deleted,
+                on_error=on_error
+            )
 
-            self._scan_sizes()
-            self._deselect_all_sizes()
+        def on_deleted(deleted: int) -> None:
+            def after_scan() -> None:
+                self._deselect_all_sizes()
+                self.status_label.config(
+                    text=f"Đã xóa {deleted} dòng size trùng"
+                )
+                logger.info(f"Đã xóa {deleted} dòng size trùng sau copy sheet")
+                finish()
 
-            self.status_label.config(
-                text=f"Đã xóa {deleted} dòng size trùng"
-            )
-            logger.info(f"Đã xóa {deleted} dòng size trùng sau copy sheet")
+            self._scan_sizes(on_done=after_scan)
 
-        except Exception as e:
-            logger.error(f"Lỗi khi xử lý size trùng: {e}")
-            messagebox.showerror(
-                "Lỗi",
-                f"Lỗi khi xóa dòng trùng:\n{str(e)}"
-            )
+        self._run_com(detector.detect_duplicates, on_success=on_detected, on_error=on_error)
 
     def _rearrange_buttons(self, event: Optional[tk.Event] = None) -> None:
         if not self.action_frame or not self.action_buttons:
@@ -609,6 +803,7 @@ class ExcelRealtimeController:
             logger.error(f"Lỗi khi mở settings: {e}")
             messagebox.showerror("Lỗi", f"Không thể mở cấu hình:\n{str(e)}")
 
+    @com_operation("switch_sheet")
     def _on_sheet_changed(self, event) -> None:
         if not self.com_manager:
             return
@@ -617,16 +812,14 @@ class ExcelRealtimeController:
         if not selected_sheet or selected_sheet == self.current_sheet:
             return
 
-        try:
-            self.status_label.config(text=f"Đang chuyển sang sheet: {selected_sheet}...")
-            self.root.update()
+        self.status_label.config(text=f"Đang chuyển sang sheet: {selected_sheet}...")
 
-            self.com_manager.switch_sheet(selected_sheet)
+        def on_switched(_) -> None:
             self.current_sheet = selected_sheet
 
             self.status_label.config(text=f"Đã chuyển sang sheet: {selected_sheet}")
 
-            self._scan_sizes()
+            self._scan_sizes(use_snapshot=True)
 
             self._update_po_color_display()
             self._highlight_update_buttons()
@@ -635,137 +828,184 @@ class ExcelRealtimeController:
 
             logger.info(f"Đã chuyển sang sheet: {selected_sheet}")
 
-        except Exception as e:
-            logger.error(f"Lỗi khi chuyển sheet: {e}")
-            messagebox.showerror("Lỗi", f"Không thể chuyển sheet:\n{str(e)}")
+        def on_error(error: BaseException) -> None:
+            logger.error(f"Lỗi khi chuyển sheet: {error}")
+            messagebox.showerror("Lỗi", f"Không thể chuyển sheet:\n{str(error)}")
             self.status_label.config(text="Lỗi khi chuyển sheet")
+
+        reuse_snapshot = self._events_active()
+        self._run_com(
+            lambda: self.com_manager.switch_sheet(selected_sheet, reuse_snapshot=reuse_snapshot),
+            on_success=on_switched,
+            on_error=on_error
+        )
     
-    def _scan_sizes(self) -> None:
+    @com_operation("scan_sizes")
+    def _scan_sizes(self, on_done: Optional[Callable[[], None]] = None, use_snapshot: bool = False) -> None:
         if not self.com_manager:
             messagebox.showwarning("Cảnh báo", "Vui lòng mở file Excel trước!")
             return
 
-        try:
-            self.status_label.config(text="Đang quét sizes...")
-            self.root.update()
+        self.status_label.config(text="Đang quét sizes...")
 
-            self.available_sizes = self.com_manager.scan_sizes()
+        def on_error(error: BaseException) -> None:
+            logger.error(f"Lỗi khi quét sizes: {error}")
+            messagebox.showerror("Lỗi", f"Không thể quét sizes:\n{str(error)}")
+            self.status_label.config(text="Lỗi khi quét sizes")
+            if on_done:
+                on_done()
+
+        self._run_com(
+            lambda: self._collect_sizes(use_snapshot),
+            on_success=lambda result: self._show_scanned_sizes(
+                *result, on_done=on_done, use_snapshot=use_snapshot
+            ),
+            on_error=on_error
+        )
 
-            for widget in self.scrollable_frame.winfo_children():
-                widget.destroy()
-            self.checkboxes.clear()
-            self.quantity_entries.clear()
+    def _collect_sizes(self, use_snapshot: bool = False) -> Tuple[List[str], Optional[int], int]:
+        """Chạy trên luồng COM: quét sizes, items per box và dòng cuối."""
+        sizes = self.com_manager.scan_sizes(use_snapshot=use_snapshot)
+        items_per_box = self._extract_items_per_box()
+        detected_end = self.com_manager.detect_end_row()
+        self._prime_size_change_detector(self.com_manager.cached_snapshot() if use_snapshot else None)
+        return sizes, items_per_box, detected_end
 
-            self.items_per_box = self._extract_items_per_box()
-            logger.info(f"Items per box: {self.items_per_box}")
+    def _show_scanned_sizes(self, sizes: List[str], items_per_box: Optional[int], detected_end: int,
+                            load_quantities: bool = True,
+                            on_done: Optional[Callable[[], None]] = None,
+                            use_snapshot: bool = False) -> None:
+        self.available_sizes = sizes
 
-            if not self.available_sizes:
-                ttk.Label(
-                    self.scrollable_frame,
-                    text="Không tìm thấy size nào",
-                    foreground="red"
-                ).pack(pady=20)
+        for widget in self.scrollable_frame.winfo_children():
+            widget.destroy()
+        self.checkboxes.clear()
+        self.quantity_entries.clear()
 
-                self.sizes_count_label.config(
-                    text="0 sizes",
-                    foreground="red"
-                )
-                self.status_label.config(text="Không tìm thấy size nào")
-                return
+        self.items_per_box = items_per_box
+        logger.info(f"Items per box: {self.items_per_box}")
 
-            num_columns = 5
-            for col in range(num_columns):
-                self.scrollable_frame.columnconfigure(col, weight=1, uniform="size_col")
+        if not self.available_sizes:
+            ttk.Label(
+                self.scrollable_frame,
+                text="Không tìm thấy size nào",
+                foreground="red"
+            ).pack(pady=20)
 
-            for idx, size in enumerate(self.available_sizes):
-                row = idx // num_columns
-                col = idx % num_columns
+            self.sizes_count_label.config(
+                text="0 sizes",
+                foreground="red"
+            )
+            self.status_label.config(text="Không tìm thấy size nào")
+            self._cached_sizes = []
+            if on_done:
+                on_done()
+            return
 
-                size_frame = ttk.Frame(self.scrollable_frame)
-                size_frame.grid(row=row, column=col, sticky=tk.EW, padx=2, pady=2)
+        num_columns = 5
+        for col in range(num_columns):
+            self.scrollable_frame.columnconfigure(col, weight=1, uniform="size_col")
 
-                var = tk.BooleanVar(value=False)
-                self.checkboxes[size] = var
+        for idx, size in enumerate(self.available_sizes):
+            row = idx // num_columns
+            col = idx % num_columns
 
-                cb = ttk.Checkbutton(
-                    size_frame,
-                    text=size,
-                    variable=var,
-                    width=8,
-                    command=lambda s=size: self._on_checkbox_changed(s)
-                )
-                cb.pack(side=tk.LEFT)
+            size_frame = ttk.Frame(self.scrollable_frame)
+            size_frame.grid(row=row, column=col, sticky=tk.EW, padx=2, pady=2)
 
-                entry = ttk.Entry(size_frame, width=5)
-                entry.pack(side=tk.LEFT, padx=(2, 0))
-                entry.bind('<KeyRelease>', lambda e, s=size: self._on_quantity_changed(s, e))
-                entry.bind('<MouseWheel>', lambda e: self.sizes_canvas.yview_scroll(int(-1 * (e.delta / 120)), "units"))
-                self.quantity_entries[size] = entry
+            var = tk.BooleanVar(value=False)
+            self.checkboxes[size] = var
 
-            self.sizes_count_label.config(
-                text=f"Tìm thấy {len(self.available_sizes)} sizes",
-                foreground="green"
+            cb = ttk.Checkbutton(
+                size_frame,
+                text=size,
+                variable=var,
+                width=8,
+                command=lambda s=size: self._on_checkbox_changed(s)
             )
+            cb.pack(side=tk.LEFT)
 
-            detected_end = self.com_manager.detect_end_row()
+            entry = ttk.Entry(size_frame, width=5)
+            entry.pack(side=tk.LEFT, padx=(2, 0))
+            entry.bind('<KeyRelease>', lambda e, s=size: self._on_quantity_changed(s, e))
+            entry.bind('<MouseWheel>', lambda e: self.sizes_canvas.yview_scroll(int(-1 * (e.delta / 120)), "units"))
+            self.quantity_entries[size] = entry
 
-            self.status_label.config(
-                text=f"Đã quét {len(self.available_sizes)} sizes - "
-                f"Cột {self.config.get_column()} "
-                f"[{self.config.get_start_row()}:{detected_end}]"
-            )
-            
-            self._cached_sizes = self.available_sizes.copy()
+        self.sizes_count_label.config(
+            text=f"Tìm thấy {len(self.available_sizes)} sizes",
+            foreground="green"
+        )
 
-            logger.info(f"Đã quét {len(self.available_sizes)} sizes")
+        self.status_label.config(
+            text=f"Đã quét {len(self.available_sizes)} sizes - "
+            f"Cột {self.config.get_column()} "
+            f"[{self.config.get_start_row()}:{detected_end}]"
+        )
 
-            self._load_quantities_from_excel()
-            
-        except Exception as e:
-            logger.error(f"Lỗi khi quét sizes: {e}")
-            messagebox.showerror("Lỗi", f"Không thể quét sizes:\n{str(e)}")
-            self.status_label.config(text="Lỗi khi quét sizes")
+        self._cached_sizes = self.available_sizes.copy()
+
+        logger.info(f"Đã quét {len(self.available_sizes)} sizes")
 
-    def _load_quantities_from_excel(self) -> None:
+        if load_quantities:
+            self._load_quantities_from_excel(on_done=on_done, use_snapshot=use_snapshot)
+        elif on_done:
+            on_done()
+
+    @com_operation("load_quantities")
+    def _load_quantities_from_excel(self, on_done: Optional[Callable[[], None]] = None,
+                                    use_snapshot: bool = False) -> None:
         if not self.com_manager or not self.available_sizes:
+            if on_done:
+                on_done()
             return
 
-        try:
-            self.status_label.config(text="Đang đọc số liệu từ Excel...")
-            self.root.update()
+        self.status_label.config(text="Đang đọc số liệu từ Excel...")
 
-            display_manager = SizeQuantityDisplayManager(self.config)
+        sizes = list(self.available_sizes)
+        column = self.config.get_column()
 
-            current_quantities = display_manager.get_current_quantities(
+        def read() -> Dict[str, Optional[int]]:
+            display_manager = SizeQuantityDisplayManager(self.config)
+            return display_manager.get_current_quantities(
                 self.com_manager.worksheet,
-                self.available_sizes,
-                self.config.get_column()
+                sizes,
+                column,
+                snapshot=self._get_snapshot(refresh=not use_snapshot)
             )
 
-            loaded_count = 0
-            for size, quantity in current_quantities.items():
-                if size in self.quantity_entries and quantity is not None:
-                    entry = self.quantity_entries[size]
-                    entry.delete(0, tk.END)
-                    entry.insert(0, str(quantity))
-                    self.checkboxes[size].set(True)
-                    loaded_count += 1
-
-            if loaded_count > 0:
-                self.status_label.config(
-                    text=f"Đã load {loaded_count} số liệu từ Excel"
-                )
-                self._update_box_count_display()
-            else:
-                self.status_label.config(
-                    text=f"Đã quét {len(self.available_sizes)} sizes - Chưa có số liệu"
-                )
+        def on_loaded(current_quantities: Dict[str, Optional[int]]) -> None:
+            try:
+                loaded_count = 0
+                for size, quantity in current_quantities.items():
+                    if size in self.quantity_entries and quantity is not None:
+                        entry = self.quantity_entries[size]
+                        entry.delete(0, tk.END)
+                        entry.insert(0, str(quantity))
+                        self.checkboxes[size].set(True)
+                        loaded_count += 1
+
+                if loaded_count > 0:
+                    self.status_label.config(
+                        text=f"Đã load {loaded_count} số liệu từ Excel"
+                    )
+                    self._update_box_count_display()
+                else:
+                    self.status_label.config(
+                        text=f"Đã quét {len(self.available_sizes)} sizes - Chưa có số liệu"
+                    )
 
-            logger.info(f"Đã load {loaded_count} số liệu từ Excel")
+                logger.info(f"Đã load {loaded_count} số liệu từ Excel")
+            finally:
+                if on_done:
+                    on_done()
 
-        except Exception as e:
-            logger.error(f"Lỗi khi load số liệu từ Excel: {e}")
+        def on_error(error: BaseException) -> None:
+            logger.error(f"Lỗi khi load số liệu từ Excel: {error}")
             self.status_label.config(text="Lỗi khi đọc số liệu từ Excel")
+            if on_done:
+                on_done()
+
+        self._run_com(read, on_success=on_loaded, on_error=on_error, retry=True)
     
     def _select_all_sizes(self) -> None:
         for var in self.checkboxes.values():
@@ -831,6 +1071,7 @@ class ExcelRealtimeController:
             self._perform_auto_save
         )
 
+    @com_operation("auto-save")
     def _perform_auto_save(self) -> None:
         self._auto_save_timer_id = None
 
@@ -859,48 +1100,58 @@ class ExcelRealtimeController:
         if not selected_sizes:
             return
 
-        try:
-            self.status_label.config(text="Đang tự động lưu...")
-            self.root.update()
+        self.status_label.config(text="Đang tự động lưu...")
 
-            display_manager = SizeQuantityDisplayManager(self.config)
+        allocation_result = self.allocation_result if self.items_per_box else None
+        column = self.config.get_column()
 
-            current_quantities = display_manager.get_current_quantities(
-                self.com_manager.worksheet,
-                selected_sizes,
-                self.config.get_column()
-            )
+        def save() -> int:
+            with self.com_manager.bulk_edit():
+                display_manager = SizeQuantityDisplayManager(self.config)
+                snapshot = self._get_snapshot(refresh=True)
 
-            if self.allocation_result and self.items_per_box:
-                written_count, columns_used = display_manager.write_allocated_quantities_to_excel(
-                    self.com_manager.excel_app,
+                current_quantities = display_manager.get_current_quantities(
                     self.com_manager.worksheet,
-                    self.allocation_result,
                     selected_sizes,
-                    self.config.get_column()
+                    column,
+                    snapshot=snapshot
                 )
-                self.status_label.config(
-                    text=f"✓ Đã tự động lưu {written_count} cells vào Excel"
-                )
-                logger.info(f"Auto-save: Đã ghi {written_count} cells thành công")
-            else:
-                written_count = display_manager.write_quantities_to_excel(
+
+                if allocation_result:
+                    written_count, _ = display_manager.write_allocated_quantities_to_excel(
+                        self.com_manager.excel_app,
+                        self.com_manager.worksheet,
+                        allocation_result,
+                        selected_sizes,
+                        column,
+                        snapshot=snapshot
+                    )
+                    return written_count
+
+                return display_manager.write_quantities_to_excel(
                     self.com_manager.excel_app,
                     self.com_manager.worksheet,
                     selected_sizes,
                     size_quantities,
                     current_quantities,
-                    self.config.get_column()
-                )
-                self.status_label.config(
-                    text=f"✓ Đã tự động lưu {written_count} cells vào Excel"
+                    column,
+                    snapshot=snapshot
                 )
-                logger.info(f"Auto-save: Đã ghi {written_count} cells thành công")
 
-        except Exception as e:
-            logger.error(f"Lỗi khi auto-save: {e}")
+        def on_saved(written_count: int) -> None:
+            self.status_label.config(
+                text=f"✓ Đã tự động lưu {written_count} cells vào Excel"
+            )
+            logger.info(f"Auto-save: Đã ghi {written_count} cells thành công")
+
+        def on_error(error: BaseException) -> None:
+            logger.error(f"Lỗi khi auto-save: {error}")
             self.status_label.config(text="Lỗi khi tự động lưu")
 
+        if self._auto_save_job is not None and not self._auto_save_job.running():
+            self._auto_save_job.cancel()
+        self._auto_save_job = self._run_com(save, on_success=on_saved, on_error=on_error, retry=True)
+
     def _update_box_count_display(self) -> None:
         try:
             size_quantities: Dict[str, int] = {}
@@ -1026,6 +1277,7 @@ class ExcelRealtimeController:
 
         return True
 
+    @com_operation("write_quantities")
     def _write_quantities_to_excel(self) -> None:
         if not self.com_manager:
             messagebox.showwarning("Cảnh báo", "Vui lòng mở file Excel trước!")
@@ -1060,28 +1312,48 @@ class ExcelRealtimeController:
             )
             return
 
-        try:
-            self.status_label.config(text="Đang ghi số lượng vào Excel...")
-            self.root.update()
+        self.status_label.config(text="Đang ghi số lượng vào Excel...")
+
+        allocation_result = self.allocation_result if self.items_per_box else None
+        column = self.config.get_column()
 
+        def write() -> Tuple[int, Optional[int]]:
             display_manager = SizeQuantityDisplayManager(self.config)
+            snapshot = self._get_snapshot(refresh=True)
 
             current_quantities = display_manager.get_current_quantities(
                 self.com_manager.worksheet,
                 selected_sizes,
-                self.config.get_column()
+                column,
+                snapshot=snapshot
             )
 
-            if self.allocation_result and self.items_per_box:
-                written_count, columns_used = display_manager.write_allocated_quantities_to_excel(
+            if allocation_result:
+                return display_manager.write_allocated_quantities_to_excel(
                     self.com_manager.excel_app,
                     self.com_manager.worksheet,
-                    self.allocation_result,
+                    allocation_result,
                     selected_sizes,
-                    self.config.get_column()
+                    column,
+                    snapshot=snapshot
                 )
 
-                result = self.allocation_result
+            written_count = display_manager.write_quantities_to_excel(
+                self.com_manager.excel_app,
+                self.com_manager.worksheet,
+                selected_sizes,
+                size_quantities,
+                current_quantities,
+                column,
+                snapshot=snapshot
+            )
+            return written_count, None
+
+        def on_written(outcome: Tuple[int, Optional[int]]) -> None:
+            written_count, columns_used = outcome
+
+            if allocation_result:
+                result = allocation_result
                 details_lines = []
                 for size, alloc in result.allocations.items():
                     if alloc.remainder > 0:
@@ -1115,15 +1387,6 @@ class ExcelRealtimeController:
                 logger.info(f"Đã ghi {written_count} cells, {result.total_boxes} thùng thành công")
 
             else:
-                written_count = display_manager.write_quantities_to_excel(
-                    self.com_manager.excel_app,
-                    self.com_manager.worksheet,
-                    selected_sizes,
-                    size_quantities,
-                    current_quantities,
-                    self.config.get_column()
-                )
-
                 details = "\n".join([
                     f"  Size {size}: {qty} pcs"
                     for size, qty in size_quantities.items()
@@ -1138,24 +1401,27 @@ class ExcelRealtimeController:
                 self.status_label.config(text=f"Đã ghi {written_count} cells số lượng")
                 logger.info(f"Đã ghi {written_count} cells số lượng thành công")
 
-        except Exception as e:
-            logger.error(f"Lỗi khi ghi số lượng vào Excel: {e}", exc_info=True)
+        def on_error(error: BaseException) -> None:
+            logger.error(f"Lỗi khi ghi số lượng vào Excel: {error}", exc_info=error)
             messagebox.showerror(
                 "Lỗi",
-                f"Không thể ghi số lượng vào Excel:\n\n{str(e)}"
+                f"Không thể ghi số lượng vào Excel:\n\n{str(error)}"
             )
             self.status_label.config(text="Lỗi khi ghi số lượng")
 
+        self._run_com(write, on_success=on_written, on_error=on_error)
+
+    @com_operation("hide_rows_realtime")
     def _hide_rows_realtime(self) -> None:
         if not self.com_manager:
             messagebox.showwarning("Cảnh báo", "Vui lòng mở file Excel trước!")
             return
-        
+
         selected_sizes = [
             size for size, var in self.checkboxes.items()
             if var.get()
         ]
-        
+
         if not selected_sizes:
             response = messagebox.askyesno(
                 "Cảnh báo",
@@ -1165,13 +1431,10 @@ class ExcelRealtimeController:
             )
             if not response:
                 return
-        
-        try:
-            self.status_label.config(text="Đang ẩn dòng real-time...")
-            self.root.update()
-            
-            hidden_count = self.com_manager.hide_rows_realtime(selected_sizes)
-            
+
+        self.status_label.config(text="Đang ẩn dòng real-time...")
+
+        def on_hidden(hidden_count: int) -> None:
             messagebox.showinfo(
                 "Thành công",
                 f"Đã ẩn {hidden_count} dòng real-time!\n\n"
@@ -1179,148 +1442,172 @@ class ExcelRealtimeController:
                 f"Số dòng bị ẩn: {hidden_count}\n\n"
                 "Thay đổi đã được áp dụng trực tiếp trong Excel."
             )
-            
+
             self.status_label.config(
                 text=f"Đã ẩn {hidden_count} dòng - {len(selected_sizes)} sizes được chọn"
             )
-            
+
             logger.info(f"Đã ẩn {hidden_count} dòng real-time")
-            
-        except Exception as e:
-            logger.error(f"Lỗi khi ẩn dòng: {e}")
+
+        def on_error(error: BaseException) -> None:
+            logger.error(f"Lỗi khi ẩn dòng: {error}")
             messagebox.showerror(
                 "Lỗi",
-                f"Không thể ẩn dòng:\n\n{str(e)}\n\n"
+                f"Không thể ẩn dòng:\n\n{str(error)}\n\n"
                 "Vui lòng kiểm tra:\n"
                 "- Excel có đang mở không\n"
                 "- File có bị đóng không\n"
                 "- Có lỗi COM automation không"
             )
             self.status_label.config(text="Lỗi khi ẩn dòng")
+
+        self._run_com(
+            lambda: self.com_manager.hide_rows_realtime(selected_sizes),
+            on_success=on_hidden,
+            on_error=on_error
+        )
     
+    @com_operation("show_all_rows")
     def _show_all_rows(self) -> None:
         if not self.com_manager:
             messagebox.showwarning("Cảnh báo", "Vui lòng mở file Excel trước!")
             return
-        
+
         if not messagebox.askyesno(
             "Xác nhận",
             "Bạn có chắc muốn hiện lại tất cả các dòng?"
         ):
             return
-        
-        try:
-            self.status_label.config(text="Đang hiện tất cả dòng...")
-            self.root.update()
-            
-            self.com_manager.show_all_rows()
-            
+
+        self.status_label.config(text="Đang hiện tất cả dòng...")
+
+        def on_shown(_) -> None:
             messagebox.showinfo(
                 "Thành công",
                 f"Đã hiện lại tất cả dòng từ {self.config.get_start_row()} "
                 f"đến {self.config.get_end_row()}!"
             )
-            
+
             self.status_label.config(text="Đã hiện tất cả dòng")
-            
+
             logger.info("Đã hiện tất cả dòng")
-            
-        except Exception as e:
-            logger.error(f"Lỗi khi hiện dòng: {e}")
-            messagebox.showerror("Lỗi", f"Không thể hiện dòng:\n{str(e)}")
+
+        def on_error(error: BaseException) -> None:
+            logger.error(f"Lỗi khi hiện dòng: {error}")
+            messagebox.showerror("Lỗi", f"Không thể hiện dòng:\n{str(error)}")
             self.status_label.config(text="Lỗi khi hiện dòng")
+
+        self._run_com(self.com_manager.show_all_rows, on_success=on_shown, on_error=on_error)
     
     def _update_color_code(self) -> None:
         if not self.com_manager:
             messagebox.showwarning("Cảnh báo", "Vui lòng mở file Excel trước!")
             return
 
-        try:
-            from excel_automation.color_code_update_manager import ColorCodeUpdateManager
-            from ui.color_code_update_dialog import ColorCodeUpdateDialog
+        from excel_automation.color_code_update_manager import ColorCodeUpdateManager
+        from ui.color_code_update_dialog import ColorCodeUpdateDialog
 
-            color_manager = ColorCodeUpdateManager(self.config)
+        color_manager = ColorCodeUpdateManager(self.config)
+
+        def read_current() -> Tuple[Optional[str], int]:
             current_color = color_manager.get_current_color_code(self.com_manager.worksheet)
-            
-            start_row, end_row = color_manager.get_data_range(self.com_manager.worksheet)
+            _, end_row = color_manager.get_data_range(self.com_manager.worksheet)
+            return current_color, end_row
 
-            def on_save(new_color: str) -> None:
-                try:
-                    self.status_label.config(text=f"Đang cập nhật mã màu thành '{new_color}'...")
-                    self.root.update()
+        def on_save(new_color: str) -> None:
+            self.status_label.config(text=f"Đang cập nhật mã màu thành '{new_color}'...")
 
-                    updated_count = color_manager.update_color_code_bulk(
-                        self.com_manager.worksheet,
-                        new_color
-                    )
+            def update() -> int:
+                updated_count = color_manager.update_color_code_bulk(
+                    self.com_manager.worksheet,
+                    new_color
+                )
+                self.com_manager.invalidate_snapshot()
+                return updated_count
 
-                    messagebox.showinfo(
-                        "Thành Công",
-                        f"Đã cập nhật {updated_count} dòng mã màu thành:\n\n'{new_color}"
-                    )
+            def on_updated(updated_count: int) -> None:
+                messagebox.showinfo(
+                    "Thành Công",
+                    f"Đã cập nhật {updated_count} dòng mã màu thành:\n\n'{new_color}"
+                )
 
-                    self.status_label.config(text=f"Đã cập nhật mã màu: '{new_color}")
-                    logger.info(f"Đã cập nhật {updated_count} dòng mã màu thành '{new_color}'")
+                self.status_label.config(text=f"Đã cập nhật mã màu: '{new_color}")
+                logger.info(f"Đã cập nhật {updated_count} dòng mã màu thành '{new_color}'")
 
-                    self._update_po_color_display()
-                    self._reset_color_button_highlight()
+                self._update_po_color_display()
+                self._reset_color_button_highlight()
 
-                except Exception as e:
-                    logger.error(f"Lỗi khi cập nhật mã màu: {e}")
-                    messagebox.showerror("Lỗi", f"Không thể cập nhật mã màu:\n{str(e)}")
-                    self.status_label.config(text="Lỗi khi cập nhật mã màu")
+            def on_update_error(error: BaseException) -> None:
+                logger.error(f"Lỗi khi cập nhật mã màu: {error}")
+                messagebox.showerror("Lỗi", f"Không thể cập nhật mã màu:\n{str(error)}")
+                self.status_label.config(text="Lỗi khi cập nhật mã màu")
+
+            self._run_com(update, on_success=on_updated, on_error=on_update_error)
 
+        def on_read(result: Tuple[Optional[str], int]) -> None:
+            current_color, end_row = result
             ColorCodeUpdateDialog(self.root, current_color, on_save, self.config, end_row)
 
-        except Exception as e:
-            logger.error(f"Lỗi khi mở dialog Update Color Code: {e}")
-            messagebox.showerror("Lỗi", f"Không thể mở dialog Update Color Code:\n{str(e)}")
+        def on_error(error: BaseException) -> None:
+            logger.error(f"Lỗi khi mở dialog Update Color Code: {error}")
+            messagebox.showerror("Lỗi", f"Không thể mở dialog Update Color Code:\n{str(error)}")
+
+        self._run_com(read_current, on_success=on_read, on_error=on_error, retry=True)
 
     def _update_po(self) -> None:
         if not self.com_manager:
             messagebox.showwarning("Cảnh báo", "Vui lòng mở file Excel trước!")
             return
 
-        try:
-            from excel_automation.po_update_manager import POUpdateManager
-            from ui.po_update_dialog import POUpdateDialog
+        from excel_automation.po_update_manager import POUpdateManager
+        from ui.po_update_dialog import POUpdateDialog
 
-            po_manager = POUpdateManager(self.config)
+        po_manager = POUpdateManager(self.config)
+
+        def read_current() -> Tuple[Optional[str], int]:
             current_po = po_manager.get_current_po(self.com_manager.worksheet)
-            
-            start_row, end_row = po_manager.get_data_range(self.com_manager.worksheet)
+            _, end_row = po_manager.get_data_range(self.com_manager.worksheet)
+            return current_po, end_row
 
-            def on_save(new_po: str) -> None:
-                try:
-                    self.status_label.config(text=f"Đang cập nhật PO thành '{new_po}'...")
-                    self.root.update()
+        def on_save(new_po: str) -> None:
+            self.status_label.config(text=f"Đang cập nhật PO thành '{new_po}'...")
 
-                    updated_count = po_manager.update_po_bulk(
-                        self.com_manager.worksheet,
-                        new_po
-                    )
+            def update() -> int:
+                updated_count = po_manager.update_po_bulk(
+                    self.com_manager.worksheet,
+                    new_po
+                )
+                self.com_manager.invalidate_snapshot()
+                return updated_count
 
-                    messagebox.showinfo(
-                        "Thành Công",
-                        f"Đã cập nhật {updated_count} dòng PO thành:\n\n{new_po}"
-                    )
+            def on_updated(updated_count: int) -> None:
+                messagebox.showinfo(
+                    "Thành Công",
+                    f"Đã cập nhật {updated_count} dòng PO thành:\n\n{new_po}"
+                )
 
-                    self.status_label.config(text=f"Đã cập nhật PO: {new_po}")
-                    logger.info(f"Đã cập nhật {updated_count} dòng PO thành '{new_po}'")
+                self.status_label.config(text=f"Đã cập nhật PO: {new_po}")
+                logger.info(f"Đã cập nhật {updated_count} dòng PO thành '{new_po}'")
 
-                    self._update_po_color_display()
-                    self._reset_po_button_highlight()
+                self._update_po_color_display()
+                self._reset_po_button_highlight()
 
-                except Exception as e:
-                    logger.error(f"Lỗi khi cập nhật PO: {e}")
-                    messagebox.showerror("Lỗi", f"Không thể cập nhật PO:\n{str(e)}")
-                    self.status_label.config(text="Lỗi khi cập nhật PO")
+            def on_update_error(error: BaseException) -> None:
+                logger.error(f"Lỗi khi cập nhật PO: {error}")
+                messagebox.showerror("Lỗi", f"Không thể cập nhật PO:\n{str(error)}")
+                self.status_label.config(text="Lỗi khi cập nhật PO")
+
+            self._run_com(update, on_success=on_updated, on_error=on_update_error)
 
+        def on_read(result: Tuple[Optional[str], int]) -> None:
+            current_po, end_row = result
             POUpdateDialog(self.root, current_po, on_save, self.config, end_row)
 
-        except Exception as e:
-            logger.error(f"Lỗi khi mở dialog Update PO: {e}")
-            messagebox.showerror("Lỗi", f"Không thể mở dialog Update PO:\n{str(e)}")
+        def on_error(error: BaseException) -> None:
+            logger.error(f"Lỗi khi mở dialog Update PO: {error}")
+            messagebox.showerror("Lỗi", f"Không thể mở dialog Update PO:\n{str(error)}")
+
+        self._run_com(read_current, on_success=on_read, on_error=on_error, retry=True)
 
     def _import_po_from_pdf(self) -> None:
         if not self.com_manager:
@@ -1343,38 +1630,45 @@ class ExcelRealtimeController:
         pdf_data = None
         available_sizes = []
 
-        def run_parse_steps():
-            nonlocal pdf_data, available_sizes
-
-            try:
-                progress.start_step(0)
-                progress.complete_step(0)
-
-                progress.start_step(1)
-                pdf_data = PDFPOParser.parse(file_path)
-                progress.complete_step(1)
+        def store_pdf_data(result) -> None:
+            nonlocal pdf_data
+            pdf_data = result
 
-                progress.start_step(2)
-                available_sizes = self.com_manager.scan_sizes()
-                self.available_sizes = available_sizes
-                progress.complete_step(2)
+        def store_sizes(result: List[str]) -> None:
+            nonlocal available_sizes
+            available_sizes = result
+            self.available_sizes = available_sizes
 
-                progress.dialog.destroy()
+        def on_parsed() -> None:
+            progress.dialog.destroy()
 
-                PDFImportDialog(
-                    self.root,
-                    pdf_data,
-                    available_sizes,
-                    lambda po, color, sizes: self._execute_import(po, color, sizes)
-                )
+            PDFImportDialog(
+                self.root,
+                pdf_data,
+                available_sizes,
+                lambda po, color, sizes: self._execute_import(po, color, sizes)
+            )
 
-            except Exception as e:
-                step = progress.current_step
-                logger.error(f"Lỗi tại bước {step}: {e}")
-                progress.show_error(step, str(e), run_parse_steps)
+        def on_error(step: int, error: BaseException) -> None:
+            logger.error(f"Lỗi tại bước {step}: {error}")
+            progress.show_error(step, str(error), run_parse_steps)
+
+        def run_parse_steps() -> None:
+            self._run_com_steps(
+                progress,
+                [
+                    (0, None, None),
+                    (1, lambda: lambda: PDFPOParser.parse(file_path), store_pdf_data),
+                    (2, lambda: self.com_manager.scan_sizes, store_sizes),
+                ],
+                0,
+                on_parsed,
+                on_error
+            )
 
         run_parse_steps()
 
+    @com_operation("import_pdf")
     def _execute_import(self, po: str, color: str, size_quantities: Dict[str, int]) -> None:
         from ui.pdf_import_dialog import ImportProgressDialog
 
@@ -1383,111 +1677,92 @@ class ExcelRealtimeController:
         for i in range(3):
             progress.complete_step(i)
 
-        written_count = 0
-        hidden_count = 0
-        selected_sizes = []
-
-        def run_write_steps(start_from: int = 3):
-            nonlocal written_count, hidden_count, selected_sizes
-            try:
-                if start_from <= 3:
-                    progress.start_step(3)
-                    po_manager = POUpdateManager(self.config)
-                    po_manager.update_po_bulk(self.com_manager.worksheet, po)
-                    progress.complete_step(3)
-
-                if start_from <= 4:
-                    progress.start_step(4)
-                    color_manager = ColorCodeUpdateManager(self.config)
-                    color_manager.update_color_code_bulk(self.com_manager.worksheet, color)
-                    progress.complete_step(4)
-
-                if start_from <= 5:
-                    progress.start_step(5)
-                    self._apply_imported_sizes(size_quantities)
-                    progress.complete_step(5)
-
-                if start_from <= 6:
-                    progress.start_step(6)
-                    selected_sizes = [
-                        size for size in size_quantities.keys()
-                        if size in self.checkboxes
-                    ]
-                    display_manager = SizeQuantityDisplayManager(self.config)
-
-                    if self.allocation_result and self.items_per_box:
-                        written_count, _ = display_manager.write_allocated_quantities_to_excel(
-                            self.com_manager.excel_app,
-                            self.com_manager.worksheet,
-                            self.allocation_result,
-                            selected_sizes,
-                            self.config.get_column()
-                        )
-                    else:
-                        current_quantities = display_manager.get_current_quantities(
-                            self.com_manager.worksheet,
-                            selected_sizes,
-                            self.config.get_column()
-                        )
-                        written_count = display_manager.write_quantities_to_excel(
-                            self.com_manager.excel_app,
-                            self.com_manager.worksheet,
-                            selected_sizes,
-                            size_quantities,
-                            current_quantities,
-                            self.config.get_column()
-                        )
+        transaction = ImportTransaction(self.com_manager)
+
+        def write_transaction(sizes: List[str], allocation_result) -> Tuple[int, int]:
+            """Chạy trên luồng COM: cả transaction trong một phiên bulk_edit, tiến độ báo qua dispatcher."""
+            def enter(step: int) -> None:
+                nonlocal current_step
+                current_step = step
+                self._com_dispatcher(lambda: progress.start_step(step))
+
+            with self.com_manager.bulk_edit():
+                enter(3)
+                transaction.begin()
+                transaction.stage_po(po)
+                enter(4)
+                transaction.stage_color(color)
+                enter(6)
+                transaction.stage_quantities(sizes, size_quantities, allocation_result)
+                written = transaction.commit()
+                enter(7)
+                hidden = transaction.apply_hidden_rows(sizes)
+            return written, hidden
+
+        def on_written(counts: Tuple[int, int]) -> None:
+            written_count, hidden_count = counts
+
+            if self._auto_save_timer_id is not None:
+                self.root.after_cancel(self._auto_save_timer_id)
+                self._auto_save_timer_id = None
+                self._auto_save_pending = False
 
-                    if self._auto_save_timer_id is not None:
-                        self.root.after_cancel(self._auto_save_timer_id)
-                        self._auto_save_timer_id = None
-                        self._auto_save_pending = False
-                    progress.complete_step(6)
-
-                if start_from <= 7:
-                    progress.start_step(7)
-                    if not selected_sizes:
-                        selected_sizes = [
-                            size for size in size_quantities.keys()
-                            if size in self.checkboxes
-                        ]
-                    hidden_count = self.com_manager.hide_rows_realtime(selected_sizes)
-                    progress.complete_step(7)
-
-                progress.start_step(8)
-                self._update_po_color_display()
-                self._update_box_count_display()
-                progress.complete_step(8)
+            progress.start_step(8)
+            self._update_po_color_display()
+            self._update_box_count_display()
+            progress.finish()
 
-                progress.finish()
+            self.status_label.config(
+                text=f"Import thành công: PO={po}, Color={color}, {len(size_quantities)} sizes"
+            )
+            messagebox.showinfo(
+                "Thành Công",
+                f"Đã import PO từ PDF:\n\n"
+                f"PO: {po}\n"
+                f"Color: {color}\n"
+                f"Sizes: {len(size_quantities)}\n"
+                f"Total Qty: {sum(size_quantities.values()):,}\n"
+                f"Đã ghi {written_count} cells vào Excel\n"
+                f"Đã ẩn {hidden_count} dòng"
+            )
 
-                self.status_label.config(
-                    text=f"Import thành công: PO={po}, Color={color}, {len(size_quantities)} sizes"
-                )
-                messagebox.showinfo(
-                    "Thành Công",
-                    f"Đã import PO từ PDF:\n\n"
-                    f"PO: {po}\n"
-                    f"Color: {color}\n"
-                    f"Sizes: {len(size_quantities)}\n"
-                    f"Total Qty: {sum(size_quantities.values()):,}\n"
-                    f"Đã ghi {written_count} cells vào Excel\n"
-                    f"Đã ẩn {hidden_count} dòng"
-                )
+        def on_error(step: int, error: BaseException) -> None:
+            logger.error(f"Lỗi tại bước {step}: {error}")
+            progress.show_error(step, str(error), run_import)
+
+        def write() -> None:
+            selected_sizes = [size for size in size_quantities.keys() if size in self.checkboxes]
+            allocation_result = self.allocation_result if self.items_per_box else None
+            self._run_com(
+                lambda: write_transaction(selected_sizes, allocation_result),
+                on_success=on_written,
+                on_error=lambda e: on_error(current_step, e)
+            )
 
+        def on_sizes_scanned(scan_result) -> None:
+            try:
+                self._apply_imported_sizes(size_quantities, scan_result)
             except Exception as e:
-                step = progress.current_step
-                logger.error(f"Lỗi tại bước {step}: {e}")
-                progress.show_error(step, str(e), lambda: run_write_steps(step))
+                on_error(5, e)
+                return
+            write()
 
-        run_write_steps()
+        def run_import() -> None:
+            nonlocal current_step
+            current_step = 5
+            progress.start_step(3)
+            if self.checkboxes:
+                on_sizes_scanned(None)
+            else:
+                self._run_com(self._collect_sizes, on_success=on_sizes_scanned, on_error=lambda e: on_error(5, e))
 
-    def _apply_imported_sizes(self, size_quantities: Dict[str, int]) -> None:
-        if not self.available_sizes:
-            self.available_sizes = self.com_manager.scan_sizes()
+        current_step = 3
+        run_import()
 
-        if not self.checkboxes:
-            self._scan_sizes()
+    def _apply_imported_sizes(self, size_quantities: Dict[str, int],
+                              scan_result: Optional[Tuple[List[str], Optional[int], int]] = None) -> None:
+        if scan_result is not None:
+            self._show_scanned_sizes(*scan_result, load_quantities=False)
 
         for size, qty in size_quantities.items():
             if size in self.checkboxes:
@@ -1500,6 +1775,7 @@ class ExcelRealtimeController:
         self._update_box_count_display()
         self._reset_auto_save_timer()
 
+    @com_operation("input_size_quantities")
     def _input_size_quantities(self) -> None:
         if not self.com_manager:
             messagebox.showwarning("Canh bao", "Vui long mo file Excel truoc!")
@@ -1517,20 +1793,35 @@ class ExcelRealtimeController:
             )
             return
 
-        try:
-            display_manager = SizeQuantityDisplayManager(self.config)
+        column = self.config.get_column()
 
+        def read_current():
+            display_manager = SizeQuantityDisplayManager(self.config)
             current_quantities = display_manager.get_current_quantities(
                 self.com_manager.worksheet,
                 selected_sizes,
-                self.config.get_column()
+                column,
+                snapshot=self._get_snapshot(refresh=True)
+            )
+            excel_info = SizeQuantityInputDialog.read_excel_info(self.com_manager.worksheet)
+            return current_quantities, excel_info
+
+        def on_error(error: BaseException) -> None:
+            logger.error(f"Loi khi nhap so luong size: {error}", exc_info=error)
+            messagebox.showerror(
+                "Loi",
+                f"Khong the ghi so luong vao Excel:\n\n{str(error)}"
             )
+            self.status_label.config(text="Loi khi ghi so luong")
+
+        def on_read(result) -> None:
+            current_quantities, excel_info = result
 
             dialog = SizeQuantityInputDialog(
                 self.root,
                 selected_sizes,
                 current_quantities,
-                self.com_manager.worksheet
+                excel_info=excel_info
             )
             dialog.show()
 
@@ -1541,101 +1832,102 @@ class ExcelRealtimeController:
                 return
 
             self.status_label.config(text="Dang ghi so luong vao Excel...")
-            self.root.update()
 
             allocation_result = dialog.get_allocation_result()
             items_per_box = dialog.get_items_per_box()
+            use_allocation = bool(allocation_result and items_per_box)
 
-            if allocation_result and items_per_box:
-                written_count, columns_used = display_manager.write_allocated_quantities_to_excel(
-                    self.com_manager.excel_app,
-                    self.com_manager.worksheet,
-                    allocation_result,
-                    selected_sizes,
-                    self.config.get_column()
-                )
+            def write() -> Tuple[int, Optional[int]]:
+                display_manager = SizeQuantityDisplayManager(self.config)
+                snapshot = self._get_snapshot(refresh=True)
 
-                result = allocation_result
-                details_lines = []
-                for size, alloc in result.allocations.items():
-                    if alloc.remainder > 0:
-                        details_lines.append(
-                            f"  {size}: {alloc.total_pcs} pcs -> {alloc.full_boxes} thung + {alloc.remainder} du"
-                        )
-                    else:
-                        details_lines.append(
-                            f"  {size}: {alloc.total_pcs} pcs -> {alloc.full_boxes} thung"
-                        )
-
-                if result.combined_cartons:
-                    details_lines.append("\nThung ghep:")
-                    for i, carton in enumerate(result.combined_cartons, 1):
-                        detail = ' + '.join([f'{s}({q})' for s, q in carton.quantities.items()])
-                        details_lines.append(f"  Thung {i}: {detail} = {carton.total_pcs} pcs")
-
-                details = "\n".join(details_lines)
-
-                messagebox.showinfo(
-                    "Thanh Cong",
-                    f"Da ghi {written_count} cells, {columns_used} cot!\n"
-                    f"Tong: {result.total_boxes} thung "
-                    f"({result.total_full_boxes} nguyen + {result.total_combined_boxes} ghep)\n\n"
-                    f"Chi tiet:\n{details}"
-                )
-
-                self.status_label.config(
-                    text=f"Da ghi {result.total_boxes} thung ({result.total_full_boxes} nguyen + {result.total_combined_boxes} ghep)"
-                )
-                logger.info(f"Da ghi {written_count} cells, {result.total_boxes} thung thanh cong")
+                if use_allocation:
+                    return display_manager.write_allocated_quantities_to_excel(
+                        self.com_manager.excel_app,
+                        self.com_manager.worksheet,
+                        allocation_result,
+                        selected_sizes,
+                        column,
+                        snapshot=snapshot
+                    )
 
-            else:
                 written_count = display_manager.write_quantities_to_excel(
                     self.com_manager.excel_app,
                     self.com_manager.worksheet,
                     selected_sizes,
                     quantities,
                     current_quantities,
-                    self.config.get_column()
+                    column,
+                    snapshot=snapshot
                 )
+                return written_count, None
+
+            def on_written(outcome: Tuple[int, Optional[int]]) -> None:
+                written_count, columns_used = outcome
+
+                if use_allocation:
+                    result = allocation_result
+                    details_lines = []
+                    for size, alloc in result.allocations.items():
+                        if alloc.remainder > 0:
+                            details_lines.append(
+                                f"  {size}: {alloc.total_pcs} pcs -> {alloc.full_boxes} thung + {alloc.remainder} du"
+                            )
+                        else:
+                            details_lines.append(
+                                f"  {size}: {alloc.total_pcs} pcs -> {alloc.full_boxes} thung"
+                            )
+
+                    if result.combined_cartons:
+                        details_lines.append("\nThung ghep:")
+                        for i, carton in enumerate(result.combined_cartons, 1):
+                            detail = ' + '.join([f'{s}({q})' for s, q in carton.quantities.items()])
+                            details_lines.append(f"  Thung {i}: {detail} = {carton.total_pcs} pcs")
+
+                    details = "\n".join(details_lines)
 
-                details = "\n".join([
-                    f"  Size {size}: {qty if qty is not None else 'Da xoa'} pcs"
-                    for size, qty in quantities.items()
-                ])
+                    messagebox.showinfo(
+                        "Thanh Cong",
+                        f"Da ghi {written_count} cells, {columns_used} cot!\n"
+                        f"Tong: {result.total_boxes} thung "
+                        f"({result.total_full_boxes} nguyen + {result.total_combined_boxes} ghep)\n\n"
+                        f"Chi tiet:\n{details}"
+                    )
 
-                messagebox.showinfo(
-                    "Thanh Cong",
-                    f"Da ghi {written_count} cells so luong vao Excel!\n\n"
-                    f"Chi tiet:\n{details}"
-                )
+                    self.status_label.config(
+                        text=f"Da ghi {result.total_boxes} thung ({result.total_full_boxes} nguyen + {result.total_combined_boxes} ghep)"
+                    )
+                    logger.info(f"Da ghi {written_count} cells, {result.total_boxes} thung thanh cong")
 
-                self.status_label.config(text=f"Da ghi {written_count} cells so luong")
-                logger.info(f"Da ghi {written_count} cells so luong thanh cong")
+                else:
+                    details = "\n".join([
+                        f"  Size {size}: {qty if qty is not None else 'Da xoa'} pcs"
+                        for size, qty in quantities.items()
+                    ])
 
-        except Exception as e:
-            logger.error(f"Loi khi nhap so luong size: {e}", exc_info=True)
-            messagebox.showerror(
-                "Loi",
-                f"Khong the ghi so luong vao Excel:\n\n{str(e)}"
-            )
-            self.status_label.config(text="Loi khi ghi so luong")
+                    messagebox.showinfo(
+                        "Thanh Cong",
+                        f"Da ghi {written_count} cells so luong vao Excel!\n\n"
+                        f"Chi tiet:\n{details}"
+                    )
+
+                    self.status_label.config(text=f"Da ghi {written_count} cells so luong")
+                    logger.info(f"Da ghi {written_count} cells so luong thanh cong")
+
+            self._run_com(write, on_success=on_written, on_error=on_error)
+
+        self._run_com(read_current, on_success=on_read, on_error=on_error, retry=True)
 
     def _extract_items_per_box(self) -> Optional[int]:
         try:
             if not self.com_manager:
                 return None
-            formula = self.com_manager.worksheet.Cells(18, 7).Formula
-            if not formula or not isinstance(formula, str):
-                return None
-            import re
-            match = re.search(r'/\s*(\d+)\s*$', formula)
-            if match:
-                return int(match.group(1))
-            return None
+            return self.com_manager.get_layout_profile().items_per_box
         except Exception as e:
             logger.warning(f"Không thể đọc items_per_box từ G18: {e}")
             return None
 
+    @com_operation("export_box_list")
     def _export_box_list(self) -> None:
         if not self.com_manager:
             messagebox.showwarning("Cảnh báo", "Vui lòng mở file Excel trước!")
@@ -1655,123 +1947,166 @@ class ExcelRealtimeController:
 
         config = BoxListExportConfig()
         manager = BoxListExportManager(config)
-        items_per_box = self._extract_items_per_box()
-
-        def restore_screen_updating():
-            try:
-                self.com_manager.excel_app.ScreenUpdating = True
-            except Exception:
-                pass
 
         progress = BoxListExportProgressDialog(self.root)
 
+        items_per_box = None
         box_ranges_dict = None
         result = None
         new_sheet = None
+        new_sheet_name = None
 
-        def on_close_without_retry():
-            restore_screen_updating()
-            progress.close()
+        def read_box_ranges():
+            return (
+                self._extract_items_per_box(),
+                manager.step_read_box_ranges(self.com_manager.worksheet, selected_sizes)
+            )
 
-        def run_export_steps(start_from: int = 0):
-            nonlocal box_ranges_dict, result, new_sheet
+        def store_box_ranges(outcome) -> None:
+            nonlocal items_per_box, box_ranges_dict
+            items_per_box, box_ranges_dict = outcome
 
-            try:
-                if start_from <= 0:
-                    progress.start_step(0)
-                    self.com_manager.excel_app.ScreenUpdating = False
-                    box_ranges_dict = manager.step_read_box_ranges(
-                        self.com_manager.worksheet, selected_sizes
-                    )
-                    progress.complete_step(0)
+        def prepare_analyze():
+            ranges = box_ranges_dict
+            per_box = items_per_box
+            return lambda: manager.step_analyze_and_build_result(
+                self.com_manager.workbook,
+                self.com_manager.worksheet,
+                selected_sizes,
+                ranges,
+                per_box
+            )
 
-                if start_from <= 1:
-                    progress.start_step(1)
-                    result = manager.step_analyze_and_build_result(
-                        self.com_manager.workbook,
-                        self.com_manager.worksheet,
-                        selected_sizes,
-                        box_ranges_dict,
-                        items_per_box
-                    )
+        def store_result(outcome):
+            nonlocal result
+            result = outcome
+            if not result.success:
+                progress.close()
+                messagebox.showerror(
+                    "Lỗi",
+                    f"Không thể xuất danh sách thùng:\n\n{result.error_message}"
+                )
+                self.status_label.config(text="Lỗi khi xuất danh sách thùng")
+                return False
 
-                    if not result.success:
-                        restore_screen_updating()
-                        progress.close()
-                        messagebox.showerror(
-                            "Lỗi",
-                            f"Không thể xuất danh sách thùng:\n\n{result.error_message}"
-                        )
-                        self.status_label.config(text="Lỗi khi xuất danh sách thùng")
-                        return
+        def create_sheet():
+            with self.com_manager.bulk_edit():
+                sheet = manager.create_new_sheet(
+                    self.com_manager.workbook,
+                    self.com_manager.worksheet
+                )
+                return sheet, sheet.Name
 
-                    progress.complete_step(1)
+        def store_sheet(outcome) -> None:
+            nonlocal new_sheet, new_sheet_name
+            new_sheet, new_sheet_name = outcome
 
-                if start_from <= 2:
-                    progress.start_step(2)
-                    new_sheet = manager.create_new_sheet(
-                        self.com_manager.workbook,
-                        self.com_manager.worksheet
-                    )
-                    progress.complete_step(2)
+        def prepare_paste():
+            box_ranges = result.box_ranges
+            sheet = new_sheet
+            per_box = items_per_box
 
-                if start_from <= 3:
-                    progress.start_step(3)
+            def paste() -> None:
+                with self.com_manager.bulk_edit():
                     paste_success = manager.paste_and_format_to_excel(
                         self.com_manager.workbook,
                         self.com_manager.worksheet,
-                        result.box_ranges,
-                        new_sheet,
+                        box_ranges,
+                        sheet,
                         "A",
                         1,
-                        items_per_box
+                        per_box
                     )
-                    if not paste_success:
-                        raise RuntimeError("Không thể ghi dữ liệu vào sheet mới")
-                    progress.complete_step(3)
+                if not paste_success:
+                    raise RuntimeError("Không thể ghi dữ liệu vào sheet mới")
 
-                if start_from <= 4:
-                    progress.start_step(4)
-                    manager.copy_to_clipboard(result.text)
-                    progress.complete_step(4)
+            return paste
 
-                restore_screen_updating()
+        def prepare_clipboard():
+            text = result.text
+            return lambda: manager.copy_to_clipboard(text)
 
-                progress.start_step(5)
-                progress.complete_step(5)
-                progress.finish()
-
-                summary = result.get_summary()
-                self.status_label.config(text=summary)
-                logger.info(f"Xuất danh sách thùng thành công: {summary}")
+        def on_finished() -> None:
+            progress.finish()
 
-                self.root.after(1200, lambda: messagebox.showinfo(
-                    "Thành Công",
-                    f"{summary}\n\n"
-                    f"Danh sách thùng đã được xuất vào sheet mới: {new_sheet.Name}\n"
-                    f"Tất cả nội dung đã được căn giữa tự động."
-                ))
+            summary = result.get_summary()
+            self.status_label.config(text=summary)
+            logger.info(f"Xuất danh sách thùng thành công: {summary}")
+
+            self.root.after(1200, lambda: messagebox.showinfo(
+                "Thành Công",
+                f"{summary}\n\n"
+                f"Danh sách thùng đã được xuất vào sheet mới: {new_sheet_name}\n"
+                f"Tất cả nội dung đã được căn giữa tự động."
+            ))
+
+        def on_error(step: int, error: BaseException) -> None:
+            nonlocal new_sheet
+            retry_from = step
+            if step == 3 and new_sheet is not None:
+                retry_from = 2
+                sheet = new_sheet
+                new_sheet = None
+                self._run_com(sheet.Delete, on_error=lambda _: None)
+            logger.error(f"Lỗi khi xuất danh sách thùng tại bước {step}: {error}", exc_info=error)
+            progress.show_error(
+                step, str(error),
+                lambda: run_export_steps(retry_from),
+                progress.close
+            )
 
-            except Exception as e:
-                restore_screen_updating()
-                step = progress.current_step
-                retry_from = step
-                if step == 3 and new_sheet is not None:
-                    retry_from = 2
-                    try:
-                        new_sheet.Delete()
-                        new_sheet = None
-                    except Exception:
-                        pass
-                logger.error(f"Lỗi khi xuất danh sách thùng tại bước {step}: {e}", exc_info=True)
-                progress.show_error(
-                    step, str(e),
-                    lambda: run_export_steps(retry_from),
-                    on_close_without_retry
-                )
+        def run_export_steps(start_from: int = 0) -> None:
+            self._run_com_steps(
+                progress,
+                [
+                    (0, lambda: read_box_ranges, store_box_ranges),
+                    (1, prepare_analyze, store_result),
+                    (2, lambda: create_sheet, store_sheet),
+                    (3, prepare_paste, None),
+                    (4, prepare_clipboard, None),
+                    (5, None, None),
+                ],
+                start_from,
+                on_finished,
+                on_error
+            )
 
         run_export_steps()
 
+    @com_operation("export_box_list_workbook")
+    def _export_box_list_workbook(self) -> None:
+        """Xuất danh sách thùng cho mọi sheet packing list của file đang mở trong một lần."""
+        if not self.com_manager:
+            messagebox.showwarning("Cảnh báo", "Vui lòng mở file Excel trước!")
+            return
+
+        if not messagebox.askyesno(
+            "Xuất cả file",
+            "Xuất danh sách thùng (tất cả size) cho mọi sheet packing list trong file này?\n"
+            "Mỗi sheet sẽ có một sheet box list mới."
+        ):
+            return
+
+        exporter = BoxListBatchExporter(BoxListExportConfig())
+        self.status_label.config(text="Đang xuất danh sách thùng cho cả file...")
+
+        def export() -> BatchExportReport:
+            with self.com_manager.bulk_edit():
+                return exporter.export_workbook(self.com_manager.excel_app, self.com_manager.workbook)
+
+        def on_exported(report: BatchExportReport) -> None:
+            summary = report.get_summary()
+            self.status_label.config(text=summary)
+            show = messagebox.showwarning if report.failed else messagebox.showinfo
+            show("Xuất danh sách thùng", report.to_text())
+
+        def on_error(error: BaseException) -> None:
+            logger.error(f"Lỗi khi xuất danh sách thùng cả file: {error}", exc_info=error)
+            self.status_label.config(text="Lỗi khi xuất danh sách thùng")
+            messagebox.showerror("Lỗi", f"Không thể xuất danh sách thùng:\n\n{error}")
+
+        self._run_com(export, on_success=on_exported, on_error=on_error)
+
     def _open_pdf_reader(self) -> None:
         """Mở dialog đọc PDF."""
         try:
@@ -1789,16 +2124,30 @@ class ExcelRealtimeController:
             messagebox.showerror("Lỗi", f"Lỗi mở PDF Reader: {e}")
 
     def _update_po_color_display(self) -> None:
-        if not self.com_manager or not self.com_manager.worksheet:
+        if not self.com_manager:
             return
 
-        try:
-            if self.current_mahang_label and self.current_file:
-                file_name = Path(self.current_file).stem
-                self.current_mahang_label.config(text=file_name, foreground="blue")
+        if self.current_mahang_label and self.current_file:
+            file_name = Path(self.current_file).stem
+            self.current_mahang_label.config(text=file_name, foreground="blue")
+
+        def read_po_color() -> Optional[Tuple[Optional[str], Optional[str]]]:
+            if not self.com_manager.worksheet:
+                return None
+
+            snapshot = self._get_snapshot()
 
             po_manager = POUpdateManager(self.config)
-            current_po = po_manager.get_current_po(self.com_manager.worksheet, 'A')
+            current_po = po_manager.get_current_po(self.com_manager.worksheet, 'A', snapshot=snapshot)
+
+            color_manager = ColorCodeUpdateManager(self.config)
+            current_color = color_manager.get_current_color_code(self.com_manager.worksheet, 'E', snapshot=snapshot)
+            return current_po, current_color
+
+        def on_read(result: Optional[Tuple[Optional[str], Optional[str]]]) -> None:
+            if result is None:
+                return
+            current_po, current_color = result
 
             if self.current_po_label:
                 if current_po:
@@ -1806,17 +2155,17 @@ class ExcelRealtimeController:
                 else:
                     self.current_po_label.config(text="Chưa có", foreground="gray")
 
-            color_manager = ColorCodeUpdateManager(self.config)
-            current_color = color_manager.get_current_color_code(self.com_manager.worksheet, 'E')
-
             if self.current_color_label:
                 if current_color:
                     self.current_color_label.config(text=current_color, foreground="blue")
                 else:
                     self.current_color_label.config(text="Chưa có", foreground="gray")
 
-        except Exception as e:
-            logger.error(f"Lỗi khi cập nhật hiển thị PO/Color: {e}")
+        self._run_com(
+            read_po_color,
+            on_success=on_read,
+            on_error=lambda e: logger.error(f"Lỗi khi cập nhật hiển thị PO/Color: {e}")
+        )
 
     def _highlight_update_buttons(self) -> None:
         self.po_updated = False
@@ -1836,6 +2185,94 @@ class ExcelRealtimeController:
         if self.update_color_btn:
             self.update_color_btn.configure(style='TButton')
 
+    def _get_snapshot(self, refresh: bool = False) -> Optional[SheetSnapshot]:
+        if not self.com_manager or not self.com_manager.worksheet:
+            return None
+
+        try:
+            return self.com_manager.get_snapshot(refresh=refresh)
+        except Exception as e:
+            logger.warning(f"Không thể chụp snapshot sheet, đọc trực tiếp từ Excel: {e}")
+            return None
+
+    def _run_com(self, func: Callable[[], Any],
+                 on_success: Optional[Callable[[Any], None]] = None,
+                 on_error: Optional[Callable[[BaseException], None]] = None,
+                 retry: bool = False) -> ComJob:
+        """
+        Gửi func sang luồng COM; on_success/on_error chạy lại trên luồng Tk.
+
+        retry=True (chỉ dùng cho job chạy lại được an toàn: đọc, ghi giá trị đích) thì cả job
+        được thử lại khi Excel bận; các lệnh ghi theo khối bên trong tự thử lại từng khối.
+        """
+        instrumentation = getattr(self.com_manager, "instrumentation", None)
+        name = getattr(func, "__name__", None)
+        if retry:
+            scheduler, job_func = self._retry_scheduler, func
+            func = lambda: scheduler.call(job_func, description=name or "job")
+        return self.com_worker.submit(
+            bind_operation(instrumentation, func),
+            on_success=bind_operation(instrumentation, on_success) if on_success else None,
+            on_error=bind_operation(instrumentation, on_error) if on_error else None,
+            name=name
+        )
+
+    def _on_excel_busy(self, wait: BusyWait) -> None:
+        """Chạy trên luồng COM: báo lên status bar rằng đang chờ Excel."""
+        text = f"⏳ Excel đang bận (đang sửa ô hoặc mở hộp thoại), thử lại sau {wait.delay:.1f}s..."
+        self._com_dispatcher(lambda: self.status_label.config(text=text))
+
+    def _on_excel_resumed(self, description: str) -> None:
+        self._com_dispatcher(lambda: self.status_label.config(text="Excel đã sẵn sàng, tiếp tục..."))
+
+    def _run_com_steps(
+        self,
+        progress: Any,
+        steps: List[Tuple[int, Optional[Callable[[], Optional[Callable[[], Any]]]], Optional[Callable[[Any], Any]]]],
+        start_from: int,
+        on_finish: Callable[[], None],
+        on_error: Callable[[int, BaseException], None]
+    ) -> None:
+        """
+        Chạy lần lượt các bước (index, prepare, apply) của một progress dialog.
+
+        `prepare()` chạy trên luồng Tk và trả về hàm cần chạy trên luồng COM (hoặc None),
+        `apply(result)` nhận kết quả trên luồng Tk; trả về False để dừng chuỗi.
+        Mỗi bước là một job riêng, nên phiên bulk_edit (nếu cần) phải mở và đóng trong chính job đó.
+        """
+        pending = [step for step in steps if step[0] >= start_from]
+
+        def run(position: int) -> None:
+            if position >= len(pending):
+                on_finish()
+                return
+
+            index, prepare, apply = pending[position]
+
+            def on_step_done(result: Any) -> None:
+                try:
+                    if apply is not None and apply(result) is False:
+                        return
+                    progress.complete_step(index)
+                except Exception as e:
+                    on_error(index, e)
+                    return
+                run(position + 1)
+
+            try:
+                progress.start_step(index)
+                work = prepare() if prepare is not None else None
+            except Exception as e:
+                on_error(index, e)
+                return
+
+            if work is None:
+                on_step_done(None)
+            else:
+                self._run_com(work, on_success=on_step_done, on_error=lambda e: on_error(index, e))
+
+        run(0)
+
     def _column_number_to_letter(self, col_num: int) -> str:
         result = ""
         while col_num > 0:
@@ -1846,102 +2283,175 @@ class ExcelRealtimeController:
 
     def _start_auto_refresh_sizes(self) -> None:
         self._stop_auto_refresh_sizes()
-        self._auto_refresh_sizes_timer_id = self.root.after(
-            self._auto_refresh_interval,
-            self._check_sizes_changed
-        )
+        self._auto_refresh_active = True
+        self._schedule_size_refresh()
+
+    def _schedule_size_refresh(self) -> None:
+        if not self._auto_refresh_active:
+            return
+        if self._events_active():
+            interval = self.EVENT_PUMP_INTERVAL_MS
+        else:
+            interval = self._size_change_detector.interval
+        self._auto_refresh_sizes_timer_id = self.root.after(interval, self._check_sizes_changed)
+
+    def _prime_size_change_detector(self, snapshot: Optional[SheetSnapshot] = None) -> None:
+        try:
+            self._size_change_detector.prime(
+                self.com_manager.worksheet,
+                self.config.get_column(),
+                self.config.get_start_row(),
+                snapshot=snapshot
+            )
+        except Exception as e:
+            logger.warning(f"Không đọc được dấu vân tay cột size: {e}")
+            self._size_change_detector.reset()
 
     def _stop_auto_refresh_sizes(self) -> None:
+        self._auto_refresh_active = False
         if self._auto_refresh_sizes_timer_id is not None:
             try:
                 self.root.after_cancel(self._auto_refresh_sizes_timer_id)
             except Exception:
                 pass
             self._auto_refresh_sizes_timer_id = None
+        if self._size_refresh_job is not None:
+            self._size_refresh_job.cancel()
+            self._size_refresh_job = None
 
+    @com_operation("size_refresh")
     def _check_sizes_changed(self) -> None:
-        try:
-            if not self.com_manager:
-                return
+        self._auto_refresh_sizes_timer_id = None
 
-            new_sizes = self.com_manager.scan_sizes()
-
-            if set(new_sizes) != set(self._cached_sizes):
-                current_quantities: Dict[str, str] = {}
-                for size, entry in self.quantity_entries.items():
-                    value = entry.get().strip()
-                    if value:
-                        current_quantities[size] = value
-
-                self._cached_sizes = new_sizes.copy()
-                self.available_sizes = new_sizes
-
-                for widget in self.scrollable_frame.winfo_children():
-                    widget.destroy()
-                self.checkboxes.clear()
-                self.quantity_entries.clear()
-
-                if not self.available_sizes:
-                    ttk.Label(
-                        self.scrollable_frame,
-                        text="Không tìm thấy size nào",
-                        foreground="red"
-                    ).pack(pady=20)
-
-                    self.sizes_count_label.config(
-                        text="0 sizes",
-                        foreground="red"
-                    )
-                else:
-                    num_columns = 5
-                    for col in range(num_columns):
-                        self.scrollable_frame.columnconfigure(col, weight=1, uniform="size_col")
-
-                    for idx, size in enumerate(self.available_sizes):
-                        row = idx // num_columns
-                        col = idx % num_columns
-
-                        size_frame = ttk.Frame(self.scrollable_frame)
-                        size_frame.grid(row=row, column=col, sticky=tk.EW, padx=2, pady=2)
-
-                        var = tk.BooleanVar(value=False)
-                        self.checkboxes[size] = var
-
-                        cb = ttk.Checkbutton(
-                            size_frame,
-                            text=size,
-                            variable=var,
-                            width=8,
-                            command=lambda s=size: self._on_checkbox_changed(s)
-                        )
-                        cb.pack(side=tk.LEFT)
-
-                        entry = ttk.Entry(size_frame, width=5)
-                        entry.pack(side=tk.LEFT, padx=(2, 0))
-                        entry.bind('<KeyRelease>', lambda e, s=size: self._on_quantity_changed(s, e))
-                        entry.bind('<MouseWheel>', lambda e: self.sizes_canvas.yview_scroll(int(-1 * (e.delta / 120)), "units"))
-                        self.quantity_entries[size] = entry
-
-                        if size in current_quantities:
-                            entry.insert(0, current_quantities[size])
-                            if current_quantities[size].isdigit() and int(current_quantities[size]) > 0:
-                                var.set(True)
-
-                    self.sizes_count_label.config(
-                        text=f"Tìm thấy {len(self.available_sizes)} sizes",
-                        foreground="green"
-                    )
+        if not self.com_manager:
+            self._schedule_size_refresh()
+            return
 
-                self._update_box_count_display()
+        column = self.config.get_column()
+        start_row = self.config.get_start_row()
+        sink = self._event_sink
+
+        def detect_from_events() -> Tuple[Optional[List[str]], Set[str], Optional[str]]:
+            com_manager = self.com_manager
+            sink.pump()
+            activated = sink.take_activated()
+            for sheet_name in sink.dirty_sheets():
+                if sheet_name != com_manager.current_sheet:
+                    com_manager.apply_dirty_regions(sheet_name, *sink.take_changes(sheet_name))
+
+            regions, areas = sink.take_changes(com_manager.current_sheet)
+            com_manager.apply_dirty_regions(com_manager.current_sheet, regions, areas)
+            if REGION_SIZES not in regions and self._event_ticks % self.EVENT_FALLBACK_POLL_TICKS == 0:
+                if self._size_change_detector.has_changed(com_manager.worksheet, column, start_row):
+                    com_manager.invalidate_snapshot()
+                    regions.add(REGION_SIZES)
+            new_sizes = com_manager.scan_sizes(use_snapshot=True) if REGION_SIZES in regions else None
+            return new_sizes, regions, activated
+
+        def detect() -> Tuple[Optional[List[str]], Set[str], Optional[str]]:
+            self._event_ticks += 1
+            if sink is not None and sink.active:
+                return detect_from_events()
+            if not self._size_change_detector.has_changed(self.com_manager.worksheet, column, start_row):
+                return None, set(), None
+            self.com_manager.invalidate_snapshot()
+            return self.com_manager.scan_sizes(), set(), None
+
+        def on_checked(result: Tuple[Optional[List[str]], Set[str], Optional[str]]) -> None:
+            self._size_refresh_job = None
+            new_sizes, regions, activated = result
+            try:
+                if new_sizes is not None and set(new_sizes) != set(self._cached_sizes):
+                    self._rebuild_size_grid(new_sizes)
+                if REGION_PO_COLOR in regions:
+                    self._update_po_color_display()
+                if activated and activated != self.current_sheet and activated in self.sheet_names:
+                    logger.info(f"Excel chuyển sang sheet '{activated}', đồng bộ theo")
+                    self.sheet_combobox.set(activated)
+                    self._on_sheet_changed(None)
+            except Exception as e:
+                logger.error(f"Lỗi khi check sizes changed: {e}")
+            finally:
+                self._schedule_size_refresh()
+
+        def on_error(error: BaseException) -> None:
+            self._size_refresh_job = None
+            if is_busy_error(error):
+                logger.debug("Excel đang bận, bỏ qua lần kiểm tra sizes này")
+            else:
+                logger.error(f"Lỗi khi check sizes changed: {error}")
+            self._schedule_size_refresh()
 
-        except Exception as e:
-            logger.error(f"Lỗi khi check sizes changed: {e}")
-        finally:
-            self._auto_refresh_sizes_timer_id = self.root.after(
-                self._auto_refresh_interval,
-                self._check_sizes_changed
+        self._size_refresh_job = self._run_com(detect, on_success=on_checked, on_error=on_error)
+
+    def _rebuild_size_grid(self, new_sizes: List[str]) -> None:
+        current_quantities: Dict[str, str] = {}
+        for size, entry in self.quantity_entries.items():
+            value = entry.get().strip()
+            if value:
+                current_quantities[size] = value
+
+        self._cached_sizes = new_sizes.copy()
+        self.available_sizes = new_sizes
+
+        for widget in self.scrollable_frame.winfo_children():
+            widget.destroy()
+        self.checkboxes.clear()
+        self.quantity_entries.clear()
+
+        if not self.available_sizes:
+            ttk.Label(
+                self.scrollable_frame,
+                text="Không tìm thấy size nào",
+                foreground="red"
+            ).pack(pady=20)
+
+            self.sizes_count_label.config(
+                text="0 sizes",
+                foreground="red"
+            )
+        else:
+            num_columns = 5
+            for col in range(num_columns):
+                self.scrollable_frame.columnconfigure(col, weight=1, uniform="size_col")
+
+            for idx, size in enumerate(self.available_sizes):
+                row = idx // num_columns
+                col = idx % num_columns
+
+                size_frame = ttk.Frame(self.scrollable_frame)
+                size_frame.grid(row=row, column=col, sticky=tk.EW, padx=2, pady=2)
+
+                var = tk.BooleanVar(value=False)
+                self.checkboxes[size] = var
+
+                cb = ttk.Checkbutton(
+                    size_frame,
+                    text=size,
+                    variable=var,
+                    width=8,
+                    command=lambda s=size: self._on_checkbox_changed(s)
+                )
+                cb.pack(side=tk.LEFT)
+
+                entry = ttk.Entry(size_frame, width=5)
+                entry.pack(side=tk.LEFT, padx=(2, 0))
+                entry.bind('<KeyRelease>', lambda e, s=size: self._on_quantity_changed(s, e))
+                entry.bind('<MouseWheel>', lambda e: self.sizes_canvas.yview_scroll(int(-1 * (e.delta / 120)), "units"))
+                self.quantity_entries[size] = entry
+
+                if size in current_quantities:
+                    entry.insert(0, current_quantities[size])
+                    if current_quantities[size].isdigit() and int(current_quantities[size]) > 0:
+                        var.set(True)
+
+            self.sizes_count_label.config(
+                text=f"Tìm thấy {len(self.available_sizes)} sizes",
+                foreground="green"
             )
 
+        self._update_box_count_display()
+
     def _on_closing(self) -> None:
         self._stop_auto_refresh_sizes()
 
@@ -1963,14 +2473,28 @@ class ExcelRealtimeController:
             )
 
             if response is None:
+                self._start_auto_refresh_sizes()
                 return
 
+            self.com_worker.cancel_pending()
             try:
-                self.com_manager.detach(save_changes=response)
+                if self._event_sink is not None:
+                    self.com_worker.call(self._event_sink.stop)
+                    self._event_sink = None
+                self.com_worker.call(self.com_manager.detach, save_changes=response)
                 logger.info(f"Đã detach COM manager (save={response}, Excel vẫn chạy)")
             except Exception as e:
                 logger.error(f"Lỗi khi detach COM manager: {e}")
+        else:
+            self.com_worker.cancel_pending()
+
+        try:
+            self.com_worker.call(self._excel_launcher.release)
+        except Exception as e:
+            logger.error(f"Lỗi khi tắt Excel khởi động sẵn: {e}")
 
+        self.com_worker.shutdown(wait=True, cancel_pending=True, timeout=5)
+        self._com_dispatcher.stop()
         self._save_window_geometry()
         self.root.destroy()
 
@@ -1,11 +1,11 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from typing import List, Dict, Optional, TYPE_CHECKING
+from typing import List, Dict, Optional, Tuple, TYPE_CHECKING
 import logging
 import math
-import re
 
 from excel_automation.utils import get_size_sort_key
+from excel_automation.sheet_layout_profile import get_layout_profile
 from excel_automation.carton_allocation_calculator import (
     CartonAllocationCalculator,
     AllocationResult
@@ -20,7 +20,8 @@ logger = logging.getLogger(__name__)
 
 class SizeQuantityInputDialog:
 
-    def __init__(self, parent: tk.Tk, selected_sizes: List[str], current_quantities: Optional[Dict[str, Optional[int]]] = None, worksheet: Optional['CDispatch'] = None):
+    def __init__(self, parent: tk.Tk, selected_sizes: List[str], current_quantities: Optional[Dict[str, Optional[int]]] = None, worksheet: Optional['CDispatch'] = None,
+                 excel_info: Optional[Tuple[Optional[int], Optional[int]]] = None):
         self.parent = parent
         self.selected_sizes = sorted(selected_sizes, key=get_size_sort_key)
         self.current_quantities = current_quantities or {}
@@ -36,9 +37,11 @@ class SizeQuantityInputDialog:
         self.allocation_text: Optional[tk.Text] = None
         self.allocation_result: Optional[AllocationResult] = None
 
-        if worksheet is not None:
-            self.total_qty = self._read_total_qty_from_excel(worksheet)
-            self.items_per_box = self._extract_divisor_from_formula(worksheet)
+        if excel_info is None and worksheet is not None:
+            excel_info = self.read_excel_info(worksheet)
+
+        if excel_info is not None:
+            self.total_qty, self.items_per_box = excel_info
             logger.info(f"Đã đọc thông tin từ Excel - Total QTY: {self.total_qty}, Items per box: {self.items_per_box}")
 
         self.dialog_config = DialogConfigManager()
@@ -70,10 +73,18 @@ class SizeQuantityInputDialog:
 
         self.dialog.geometry(f'{width}x{height}+{x}+{y}')
 
-    def _read_total_qty_from_excel(self, worksheet) -> Optional[int]:
+    @classmethod
+    def read_excel_info(cls, worksheet) -> Tuple[Optional[int], Optional[int]]:
+        """Đọc (Tot QTY, items per box) từ worksheet; gọi trên luồng COM trước khi mở dialog."""
+        return cls._read_total_qty_from_excel(worksheet), cls._extract_divisor_from_formula(worksheet)
+
+    @staticmethod
+    def _read_total_qty_from_excel(worksheet) -> Optional[int]:
         """
         Đọc tổng số lượng (Tot QTY) từ hàng 15 hoặc 16 trong Excel.
 
+        Vị trí nhãn Tot QTY lấy từ SheetLayoutProfile đã nhận diện, chỉ đọc ô giá trị.
+
         Args:
             worksheet: COM object của Excel worksheet
 
@@ -81,37 +92,19 @@ class SizeQuantityInputDialog:
             Tổng số lượng (int) nếu tìm thấy, None nếu không tìm thấy hoặc có lỗi
         """
         try:
-            for row in [15, 16]:
-                used_range = worksheet.UsedRange
-                last_col = used_range.Columns.Count
-
-                for col in range(1, last_col + 1):
-                    cell_value = worksheet.Cells(row, col).Value
-                    if cell_value and isinstance(cell_value, str):
-                        if "Tot QTY" in cell_value or "Total QTY" in cell_value:
-                            total_value = worksheet.Cells(row, last_col).Value
-                            if total_value is not None:
-                                try:
-                                    total_qty = int(total_value)
-                                    logger.info(f"Đọc được Tot QTY từ hàng {row}: {total_qty}")
-                                    return total_qty
-                                except (ValueError, TypeError):
-                                    logger.warning(f"Giá trị Tot QTY không hợp lệ ở hàng {row}: {total_value}")
-                                    continue
-
-            logger.warning("Không tìm thấy Tot QTY trong hàng 15/16")
-            return None
+            return get_layout_profile(worksheet).read_total_qty(worksheet)
 
         except Exception as e:
             logger.error(f"Lỗi khi đọc Tot QTY từ Excel: {e}", exc_info=True)
             return None
 
-    def _extract_divisor_from_formula(self, worksheet) -> Optional[int]:
+    @staticmethod
+    def _extract_divisor_from_formula(worksheet) -> Optional[int]:
         """
         Extract số chia (items per box) từ công thức Excel ở ô G18.
 
         Công thức có dạng: =SUM(...)/20 hoặc =A1/20
-        Method sẽ extract số 20 từ công thức.
+        Số chia được parse một lần khi nhận diện SheetLayoutProfile.
 
         Args:
             worksheet: COM object của Excel worksheet
@@ -120,20 +113,12 @@ class SizeQuantityInputDialog:
             Số chia (int) nếu parse thành công, None nếu không parse được hoặc có lỗi
         """
         try:
-            formula = worksheet.Cells(18, 7).Formula
-
-            if not formula or not isinstance(formula, str):
-                logger.warning("Ô G18 không chứa công thức")
-                return None
-
-            match = re.search(r'/\s*(\d+)\s*$', formula)
-            if match:
-                divisor = int(match.group(1))
-                logger.info(f"Extract được items per box từ công thức G18: {divisor}")
-                return divisor
+            divisor = get_layout_profile(worksheet).items_per_box
+            if divisor is None:
+                logger.warning("Không parse được số chia từ công thức G18")
             else:
-                logger.warning(f"Không parse được số chia từ công thức G18: {formula}")
-                return None
+                logger.info(f"Extract được items per box từ công thức G18: {divisor}")
+            return divisor
 
         except Exception as e:
             logger.error(f"Lỗi khi extract divisor từ công thức G18: {e}", exc_info=True)